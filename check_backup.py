@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+檢查備份資料庫是否與目前的資料庫一致（只比對、不寫入）
+
+用法：
+    python check_backup.py <備份資料庫網址>
+
+以區段雜湊比對，內容一致時每張表只需要幾次查詢；要實際補齊差異請改用
+python manage.py sync_databases --target <備份資料庫網址>
+"""
+
+import os
+import sys
+
+# 設定 Django 環境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'esports_site.settings')
+
+import django
+django.setup()
+
+from tournaments.dbsync import DatabaseSync, register_database
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    
+    target = register_database('backup', sys.argv[1])
+    print("🔍 比對目前資料庫與備份...")
+    result = DatabaseSync('default', target, dry_run=True, log=print).run()
+    for line in result.lines():
+        print(line)
+    
+    if result.changed:
+        print("⚠️ 備份與目前資料不一致")
+    else:
+        print("✅ 備份與目前資料一致")
+
+if __name__ == "__main__":
+    main()
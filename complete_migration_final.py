@@ -20,6 +20,12 @@ from tournaments.models import (
     Tournament, Team, Player, Match, Game, Group, Standing, PlayerGameStat
 )
 from django.db import transaction
+from tournaments.importer import BulkImporter
+
+def fetch_dicts(cursor):
+    """將查詢結果轉成以欄位名稱為鍵的 dict，交給匯入引擎依欄位名稱對應"""
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
 def clear_supabase_completely():
     """完全清空 Supabase 中的所有資料"""
@@ -102,42 +108,42 @@ def get_docker_data():
         
         # 1. 賽事
         cursor.execute("SELECT * FROM tournaments_tournament ORDER BY id;")
-        data['tournaments'] = cursor.fetchall()
+        data['tournaments'] = fetch_dicts(cursor)
         print(f"📋 取得賽事資料: {len(data['tournaments'])} 筆")
         
         # 2. 隊伍
         cursor.execute("SELECT * FROM tournaments_team ORDER BY id;")
-        data['teams'] = cursor.fetchall()
+        data['teams'] = fetch_dicts(cursor)
         print(f"📋 取得隊伍資料: {len(data['teams'])} 筆")
         
         # 3. 選手
         cursor.execute("SELECT * FROM tournaments_player ORDER BY id;")
-        data['players'] = cursor.fetchall()
+        data['players'] = fetch_dicts(cursor)
         print(f"📋 取得選手資料: {len(data['players'])} 筆")
         
         # 4. 小組
         cursor.execute("SELECT * FROM tournaments_group ORDER BY id;")
-        data['groups'] = cursor.fetchall()
+        data['groups'] = fetch_dicts(cursor)
         print(f"📋 取得小組資料: {len(data['groups'])} 筆")
         
         # 5. 比賽
         cursor.execute("SELECT * FROM tournaments_match ORDER BY id;")
-        data['matches'] = cursor.fetchall()
+        data['matches'] = fetch_dicts(cursor)
         print(f"📋 取得比賽資料: {len(data['matches'])} 筆")
         
         # 6. 遊戲
         cursor.execute("SELECT * FROM tournaments_game ORDER BY id;")
-        data['games'] = cursor.fetchall()
+        data['games'] = fetch_dicts(cursor)
         print(f"📋 取得遊戲資料: {len(data['games'])} 筆")
         
         # 7. 排名
         cursor.execute("SELECT * FROM tournaments_standing ORDER BY id;")
-        data['standings'] = cursor.fetchall()
+        data['standings'] = fetch_dicts(cursor)
         print(f"📋 取得排名資料: {len(data['standings'])} 筆")
         
         # 8. 統計記錄 - 重要！
         cursor.execute("SELECT * FROM tournaments_playergamestat ORDER BY id;")
-        data['playergamestats'] = cursor.fetchall()
+        data['playergamestats'] = fetch_dicts(cursor)
         print(f"📊 取得統計記錄: {len(data['playergamestats'])} 筆")
         
         # 取得欄位名稱
@@ -154,131 +160,21 @@ def get_docker_data():
         return None
 
 def import_to_supabase(docker_data):
-    """將 Docker 資料匯入到 Supabase"""
+    """將 Docker 資料匯入到 Supabase（COPY 快速路徑，外鍵對應與序列重設由匯入引擎處理）"""
     print("☁️ 匯入資料到 Supabase...")
     
-    with transaction.atomic():
-        # 1. 匯入賽事
-        print("📋 匯入賽事...")
-        for row in docker_data['tournaments']:
-            Tournament.objects.create(
-                id=row[0],
-                name=row[1],
-                game=row[2],
-                start_date=row[3],
-                end_date=row[4],
-                rules=row[5],
-                status=row[6],
-                format=row[7]
-            )
-        print(f"✅ 匯入賽事完成: {len(docker_data['tournaments'])} 筆")
-        
-        # 2. 匯入隊伍
-        print("📋 匯入隊伍...")
-        for row in docker_data['teams']:
-            Team.objects.create(
-                id=row[0],
-                name=row[1],
-                school=row[2] if len(row) > 2 else "",
-                logo=row[3] if len(row) > 3 and row[3] else None
-            )
-        print(f"✅ 匯入隊伍完成: {len(docker_data['teams'])} 筆")
-        
-        # 3. 匯入選手
-        print("📋 匯入選手...")
-        for row in docker_data['players']:
-            Player.objects.create(
-                id=row[0],
-                nickname=row[1],
-                team_id=row[2] if row[2] else None,
-                avatar=row[3] if len(row) > 3 else None,
-                role=row[4] if len(row) > 4 else None
-            )
-        print(f"✅ 匯入選手完成: {len(docker_data['players'])} 筆")
-        
-        # 4. 匯入小組
-        print("📋 匯入小組...")
-        for row in docker_data['groups']:
-            Group.objects.create(
-                id=row[0],
-                tournament_id=row[1],
-                name=row[2],
-                format=row[3] if len(row) > 3 else None
-            )
-        print(f"✅ 匯入小組完成: {len(docker_data['groups'])} 筆")
-        
-        # 5. 匯入比賽
-        print("📋 匯入比賽...")
-        for row in docker_data['matches']:
-            Match.objects.create(
-                id=row[0],
-                tournament_id=row[1],
-                team1_id=row[2],
-                team2_id=row[3],
-                team1_score=row[4],
-                team2_score=row[5],
-                scheduled_time=row[6],
-                status=row[7],
-                winner_id=row[8] if row[8] else None,
-                group_id=row[9] if len(row) > 9 and row[9] else None
-            )
-        print(f"✅ 匯入比賽完成: {len(docker_data['matches'])} 筆")
-        
-        # 6. 匯入遊戲
-        print("📋 匯入遊戲...")
-        for row in docker_data['games']:
-            Game.objects.create(
-                id=row[0],
-                match_id=row[1],
-                map_name=row[2],
-                team1_score=row[3],
-                team2_score=row[4],
-                winner_id=row[5] if row[5] else None,
-                duration=row[6] if len(row) > 6 else None
-            )
-        print(f"✅ 匯入遊戲完成: {len(docker_data['games'])} 筆")
-        
-        # 7. 匯入排名
-        print("📋 匯入排名...")
-        for row in docker_data['standings']:
-            Standing.objects.create(
-                id=row[0],
-                tournament_id=row[1],
-                team_id=row[2],
-                position=row[3],
-                points=row[4],
-                matches_played=row[5],
-                matches_won=row[6],
-                matches_lost=row[7],
-                games_won=row[8] if len(row) > 8 else 0,
-                games_lost=row[9] if len(row) > 9 else 0
-            )
-        print(f"✅ 匯入排名完成: {len(docker_data['standings'])} 筆")
-        
-        # 8. 匯入統計記錄 - 最重要的部分！
-        print("📊 匯入統計記錄...")
-        imported_stats = 0
-        for row in docker_data['playergamestats']:
-            try:
-                PlayerGameStat.objects.create(
-                    id=row[0],
-                    game_id=row[1],
-                    player_id=row[2],
-                    team_id=row[3],
-                    kills=row[4],
-                    deaths=row[5],
-                    assists=row[6],
-                    first_kills=row[7] if len(row) > 7 else 0,
-                    acs=row[8] if len(row) > 8 else 0.0
-                )
-                imported_stats += 1
-                if imported_stats % 100 == 0:
-                    print(f"   📊 已匯入 {imported_stats} 筆統計...")
-            except Exception as e:
-                print(f"   ⚠️ 統計記錄 {row[0]} 匯入失敗: {e}")
-        
-        print(f"✅ 匯入統計記錄完成: {imported_stats} 筆")
-        
+    records = (
+        (table, row)
+        for table, rows in docker_data.items() if isinstance(rows, list)
+        for row in rows
+        if isinstance(row, dict)
+    )
+    result = BulkImporter(copy=True, log=print).run(records)
+    for line in result.lines():
+        print(line)
+    
+    imported_stats = result['player_stats']['created']
+    print(f"✅ 匯入統計記錄完成: {imported_stats} 筆")
     return imported_stats
 
 def verify_migration():
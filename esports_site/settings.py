@@ -80,7 +80,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -88,6 +87,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # 模板只在第一次使用時讀取與編譯，之後每個請求重用編譯結果（base.html 不再重新解析）；
+            # 頁面中的積分榜、輪次與隊伍卡片另以 {% cache %} 片段快取（tournaments/fragments.py）
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -217,11 +224,20 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # 只套用在設定了對應 throttle 的端點（例如未登入的晉級機率模擬）
+    'DEFAULT_THROTTLE_RATES': {
+        'qualification': '30/hour',
+    },
 }
 
 # 日誌設定
+# Render 的檔案系統在重新部署與休眠後不會保留，預設只輸出到 console（由平台收集）；
+# 本機預設另寫入 logs/django.log，目錄只在啟用檔案日誌時建立
 LOGS_DIR = BASE_DIR / 'logs'
-LOGS_DIR.mkdir(exist_ok=True)
+LOG_TO_FILE = config('LOG_TO_FILE', default=not IS_RENDER, cast=bool)
+if LOG_TO_FILE:
+    LOGS_DIR.mkdir(exist_ok=True)
+LOG_HANDLERS = (['console'] if DEBUG or not LOG_TO_FILE else []) + (['file'] if LOG_TO_FILE else [])
 
 LOGGING = {
     'version': 1,
@@ -242,35 +258,34 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': LOGS_DIR / 'django.log',
-            'maxBytes': 1024*1024*5,  # 5MB
-            'backupCount': 3,
-            'formatter': 'verbose',
-        },
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'] if DEBUG else ['file'],
+            'handlers': LOG_HANDLERS,
             'level': 'INFO',
             'propagate': False,
         },
         'tournaments': {
-            'handlers': ['console', 'file'] if DEBUG else ['file'],
+            'handlers': LOG_HANDLERS,
             'level': 'INFO',
             'propagate': False,
         },
     },
 }
 
+if LOG_TO_FILE:
+    LOGGING['handlers']['file'] = {
+        'level': 'INFO',
+        'class': 'logging.handlers.RotatingFileHandler',
+        'filename': LOGS_DIR / 'django.log',
+        'maxBytes': 1024*1024*5,  # 5MB
+        'backupCount': 3,
+        'formatter': 'verbose',
+        'delay': True,  # 第一筆日誌寫入時才開啟檔案
+    }
+
 # Debug 模式特殊設定
 if DEBUG:
-    try:
-        print("💻 使用本地記憶體快取")
-    except UnicodeEncodeError:
-        print("Using local memory cache")
     LOGGING['handlers']['console']['level'] = 'DEBUG'
     for logger in LOGGING['loggers'].values():
         logger['level'] = 'DEBUG'
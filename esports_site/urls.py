@@ -6,11 +6,14 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
 from django.views.static import serve
-from tournaments.health import health_check
+from tournaments.health import health_check, health_details, health_live, health_ready
 
 urlpatterns = [
     # 健康檢查端點
     path('health/', health_check, name='health_check'),
+    path('health/live', health_live, name='health_live'),
+    path('health/ready', health_ready, name='health_ready'),
+    path('health/details', health_details, name='health_details'),
     
     # Admin 路由
     path('admin/', admin.site.urls),
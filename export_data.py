@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+串流匯出所有資料，等同 python manage.py export_data
+
+用法：
+    python export_data.py [檔案路徑] [--tournament ID] [--resume] [--chunk-size N]
+"""
+
+import os
+import sys
+
+# 設定 Django 環境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'esports_site.settings')
+
+import django
+django.setup()
+
+from django.core.management import call_command
+
+if __name__ == "__main__":
+    call_command('export_data', *sys.argv[1:])
@@ -21,6 +21,12 @@ from tournaments.models import (
     Tournament, Team, Player, Match, Game, Group, Standing, PlayerGameStat
 )
 from django.db import transaction
+from tournaments.importer import BulkImporter
+
+def fetch_dicts(cursor):
+    """將查詢結果轉成以欄位名稱為鍵的 dict，交給匯入引擎依欄位名稱對應"""
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
 def clear_supabase():
     """完全清空 Supabase 資料"""
@@ -97,52 +103,52 @@ def get_docker_data():
         
         # 1. 賽事
         cursor.execute("SELECT * FROM tournaments_tournament ORDER BY id;")
-        data['tournaments'] = cursor.fetchall()
+        data['tournaments'] = fetch_dicts(cursor)
         print(f"📋 賽事: {len(data['tournaments'])} 筆")
         
         # 2. 隊伍
         cursor.execute("SELECT id, name, logo FROM tournaments_team ORDER BY id;")
-        data['teams'] = cursor.fetchall()
+        data['teams'] = fetch_dicts(cursor)
         print(f"📋 隊伍: {len(data['teams'])} 筆")
         
         # 3. 選手
         cursor.execute("SELECT id, nickname, avatar, role, team_id FROM tournaments_player ORDER BY id;")
-        data['players'] = cursor.fetchall()
+        data['players'] = fetch_dicts(cursor)
         print(f"📋 選手: {len(data['players'])} 筆")
         
         # 4. 小組
         cursor.execute("SELECT id, name, tournament_id FROM tournaments_group ORDER BY id;")
-        data['groups'] = cursor.fetchall()
+        data['groups'] = fetch_dicts(cursor)
         print(f"📋 小組: {len(data['groups'])} 筆")
         
         # 5. 比賽
         cursor.execute("SELECT * FROM tournaments_match ORDER BY id;")
-        data['matches'] = cursor.fetchall()
+        data['matches'] = fetch_dicts(cursor)
         print(f"📋 比賽: {len(data['matches'])} 筆")
         
         # 6. 遊戲
         cursor.execute("SELECT * FROM tournaments_game ORDER BY id;")
-        data['games'] = cursor.fetchall()
+        data['games'] = fetch_dicts(cursor)
         print(f"📋 遊戲: {len(data['games'])} 筆")
         
         # 7. 排名
         cursor.execute("SELECT * FROM tournaments_standing ORDER BY id;")
-        data['standings'] = cursor.fetchall()
+        data['standings'] = fetch_dicts(cursor)
         print(f"📋 排名: {len(data['standings'])} 筆")
         
         # 8. 統計記錄 (最重要!)
         cursor.execute("SELECT * FROM tournaments_playergamestat ORDER BY id;")
-        data['stats'] = cursor.fetchall()
+        data['stats'] = fetch_dicts(cursor)
         print(f"📊 統計記錄: {len(data['stats'])} 筆 ⭐")
         
         # 9. 參賽隊伍關聯
         cursor.execute("SELECT * FROM tournaments_tournament_participants ORDER BY id;")
-        data['participants'] = cursor.fetchall()
+        data['participants'] = fetch_dicts(cursor)
         print(f"📋 參賽關聯: {len(data['participants'])} 筆")
         
         # 10. 小組隊伍關聯
         cursor.execute("SELECT * FROM tournaments_group_teams ORDER BY id;")
-        data['group_teams'] = cursor.fetchall()
+        data['group_teams'] = fetch_dicts(cursor)
         print(f"📋 小組隊伍: {len(data['group_teams'])} 筆")
         
         cursor.close()
@@ -155,122 +161,15 @@ def get_docker_data():
         return None
 
 def import_to_supabase(data):
-    """匯入所有資料到 Supabase"""
+    """匯入所有資料到 Supabase（COPY 快速路徑，外鍵對應與序列重設由匯入引擎處理）"""
     print("\n☁️ 匯入資料到 Supabase...")
     
-    with transaction.atomic():
-        # 1. 賽事
-        print("📋 匯入賽事...")
-        for row in data['tournaments']:
-            Tournament.objects.create(
-                id=row[0], name=row[1], game=row[2], 
-                start_date=row[3], end_date=row[4], 
-                rules=row[5], status=row[6], format=row[7]
-            )
-        print(f"✅ 賽事: {len(data['tournaments'])} 筆")
-        
-        # 2. 隊伍
-        print("📋 匯入隊伍...")
-        for row in data['teams']:
-            Team.objects.create(
-                id=row[0], name=row[1], 
-                logo=row[2] if len(row) > 2 and row[2] else '',
-                school=''  # Supabase 額外欄位
-            )
-        print(f"✅ 隊伍: {len(data['teams'])} 筆")
-        
-        # 3. 選手
-        print("📋 匯入選手...")
-        for row in data['players']:
-            Player.objects.create(
-                id=row[0], nickname=row[1],
-                avatar=row[2] if row[2] else '',
-                role=row[3], team_id=row[4]
-            )
-        print(f"✅ 選手: {len(data['players'])} 筆")
-        
-        # 4. 小組
-        print("📋 匯入小組...")
-        for row in data['groups']:
-            Group.objects.create(
-                id=row[0], name=row[1], 
-                tournament_id=row[2], max_teams=8
-            )
-        print(f"✅ 小組: {len(data['groups'])} 筆")
-        
-        # 5. 比賽
-        print("📋 匯入比賽...")
-        for row in data['matches']:
-            Match.objects.create(
-                id=row[0], round_number=row[1],
-                team1_score=row[2], team2_score=row[3],
-                match_time=row[4], status=row[5],
-                is_lower_bracket=row[6],
-                team1_id=row[7], team2_id=row[8],
-                winner_id=row[9], tournament_id=row[10],
-                map=row[11] if len(row) > 11 else None
-            )
-        print(f"✅ 比賽: {len(data['matches'])} 筆")
-        
-        # 6. 遊戲
-        print("📋 匯入遊戲...")
-        for row in data['games']:
-            Game.objects.create(
-                id=row[0], map_number=row[1],
-                map_name=row[2], team1_score=row[3],
-                team2_score=row[4], match_id=row[5],
-                winner_id=row[6]
-            )
-        print(f"✅ 遊戲: {len(data['games'])} 筆")
-        
-        # 7. 排名
-        print("📋 匯入排名...")
-        for row in data['standings']:
-            Standing.objects.create(
-                id=row[0], wins=row[1], losses=row[2],
-                draws=row[3], points=row[4],
-                group_id=row[5], team_id=row[6],
-                tournament_id=row[7]
-            )
-        print(f"✅ 排名: {len(data['standings'])} 筆")
-        
-        # 8. 統計記錄 (重點!)
-        print("📊 匯入統計記錄...")
-        batch_size = 100
-        imported = 0
-        
-        for i in range(0, len(data['stats']), batch_size):
-            batch = data['stats'][i:i + batch_size]
-            for row in batch:
-                PlayerGameStat.objects.create(
-                    id=row[0], kills=row[1], deaths=row[2],
-                    assists=row[3], first_kills=row[4],
-                    acs=row[5], game_id=row[6],
-                    player_id=row[7], team_id=row[8]
-                )
-                imported += 1
-            
-            print(f"   📊 已匯入 {imported}/{len(data['stats'])} 筆統計...")
-        
-        print(f"✅ 統計記錄: {imported} 筆 ⭐")
-        
-        # 9. 參賽關聯
-        print("📋 匯入參賽關聯...")
-        for row in data['participants']:
-            tournament = Tournament.objects.get(id=row[1])
-            team = Team.objects.get(id=row[2])
-            tournament.participants.add(team)
-        print(f"✅ 參賽關聯: {len(data['participants'])} 筆")
-        
-        # 10. 小組隊伍關聯
-        print("📋 匯入小組隊伍關聯...")
-        for row in data['group_teams']:
-            group = Group.objects.get(id=row[1])
-            team = Team.objects.get(id=row[2])
-            group.teams.add(team)
-        print(f"✅ 小組隊伍關聯: {len(data['group_teams'])} 筆")
-        
-        return imported
+    records = ((table, row) for table, rows in data.items() for row in rows)
+    result = BulkImporter(copy=True, log=print).run(records)
+    for line in result.lines():
+        print(line)
+    
+    return result['player_stats']['created']
 
 def verify_final_result():
     """最終驗證"""
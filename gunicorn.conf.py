@@ -0,0 +1,38 @@
+"""
+gunicorn 設定（render.yaml: gunicorn esports_site.wsgi:application -c gunicorn.conf.py）
+
+Render 免費方案休眠後喚醒時，master 在 when_ready 先載入 Django 並執行暖機（tournaments/warmup.py），
+之後 fork 出的 worker 直接繼承已編譯的模板與本機快取；資料庫連線不能跨行程共用，所以 master
+暖機後關閉連線，每個 worker 在 post_fork 建立自己的連線。
+
+設定 WARMUP_ON_START=false 可停用暖機。
+"""
+
+import os
+import time
+
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'true').lower() not in ('0', 'false', 'no')
+
+
+def when_ready(server):
+    if not WARMUP_ON_START:
+        return
+    started = time.perf_counter()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'esports_site.settings')
+    import django
+    django.setup()
+    setup_ms = (time.perf_counter() - started) * 1000
+
+    from django.db import connections
+    from tournaments import warmup
+    report = warmup.run(warmup.MASTER_PHASES, source='master', measured={'django_setup': setup_ms})
+    connections.close_all()
+    server.log.info(warmup.format_report(report))
+
+
+def post_fork(server, worker):
+    if not WARMUP_ON_START:
+        return
+    from tournaments import warmup
+    report = warmup.run(warmup.WORKER_PHASES, source=f'worker {worker.pid}', save=False)
+    server.log.info(warmup.format_report(report))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+從 production_data.json（或 .json.gz）匯入生產資料
+
+用法：
+    python import_production_data.py [檔案路徑] [--dry-run] [--upsert] [--batch-size N] [--recalculate-standings]
+"""
+
+import argparse
+import os
+
+# 設定 Django 環境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'esports_site.settings')
+
+import django
+django.setup()
+
+from tournaments.importer import add_import_arguments, import_dump_from_options
+
+def main():
+    parser = argparse.ArgumentParser(description='匯入生產資料')
+    add_import_arguments(parser)
+    options = vars(parser.parse_args())
+    
+    if not os.path.exists(options['path']):
+        print(f"❌ {options['path']} 檔案不存在！")
+        return
+    
+    print(f"🔄 開始匯入 {options['path']}...")
+    try:
+        result = import_dump_from_options(options['path'], options, log=print)
+    except Exception as e:
+        print(f"❌ 匯入失敗: {e}")
+        import traceback
+        traceback.print_exc()
+        return
+    
+    print("📊 匯入結果:")
+    for line in result.lines():
+        print(line)
+    print("🎉 資料匯入完成！")
+
+if __name__ == "__main__":
+    main()
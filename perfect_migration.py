@@ -20,7 +20,12 @@ django.setup()
 from tournaments.models import (
     Tournament, Team, Player, Match, Game, Group, Standing, PlayerGameStat
 )
-from django.db import transaction
+from tournaments.importer import BulkImporter
+
+def fetch_dicts(cursor):
+    """將查詢結果轉成以欄位名稱為鍵的 dict，交給匯入引擎依欄位名稱對應"""
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
 def get_docker_data():
     """從 Docker PostgreSQL 取得完整資料"""
@@ -40,52 +45,52 @@ def get_docker_data():
         
         # 1. 賽事 (根節點)
         cursor.execute("SELECT * FROM tournaments_tournament ORDER BY id;")
-        data['tournaments'] = cursor.fetchall()
+        data['tournaments'] = fetch_dicts(cursor)
         print(f"📋 賽事: {len(data['tournaments'])} 筆")
         
         # 2. 隊伍 (只取 Docker 實際有的欄位)
         cursor.execute("SELECT id, name, logo FROM tournaments_team ORDER BY id;")
-        data['teams'] = cursor.fetchall()
+        data['teams'] = fetch_dicts(cursor)
         print(f"📋 隊伍: {len(data['teams'])} 筆")
         
         # 3. 選手
         cursor.execute("SELECT id, nickname, avatar, role, team_id FROM tournaments_player ORDER BY id;")
-        data['players'] = cursor.fetchall()
+        data['players'] = fetch_dicts(cursor)
         print(f"📋 選手: {len(data['players'])} 筆")
         
         # 4. 小組 (只取 Docker 實際有的欄位)
         cursor.execute("SELECT id, name, tournament_id FROM tournaments_group ORDER BY id;")
-        data['groups'] = cursor.fetchall()
+        data['groups'] = fetch_dicts(cursor)
         print(f"📋 小組: {len(data['groups'])} 筆")
         
         # 5. 比賽
         cursor.execute("SELECT * FROM tournaments_match ORDER BY id;")
-        data['matches'] = cursor.fetchall()
+        data['matches'] = fetch_dicts(cursor)
         print(f"📋 比賽: {len(data['matches'])} 筆")
         
         # 6. 遊戲
         cursor.execute("SELECT * FROM tournaments_game ORDER BY id;")
-        data['games'] = cursor.fetchall()
+        data['games'] = fetch_dicts(cursor)
         print(f"📋 遊戲: {len(data['games'])} 筆")
         
         # 7. 排名
         cursor.execute("SELECT * FROM tournaments_standing ORDER BY id;")
-        data['standings'] = cursor.fetchall()
+        data['standings'] = fetch_dicts(cursor)
         print(f"📋 排名: {len(data['standings'])} 筆")
         
         # 8. 統計記錄 (最重要)
         cursor.execute("SELECT * FROM tournaments_playergamestat ORDER BY id;")
-        data['stats'] = cursor.fetchall()
+        data['stats'] = fetch_dicts(cursor)
         print(f"📊 統計記錄: {len(data['stats'])} 筆")
         
         # 9. 參賽隊伍關聯
         cursor.execute("SELECT * FROM tournaments_tournament_participants ORDER BY id;")
-        data['participants'] = cursor.fetchall()
+        data['participants'] = fetch_dicts(cursor)
         print(f"📋 參賽關聯: {len(data['participants'])} 筆")
         
         # 10. 小組隊伍關聯
         cursor.execute("SELECT * FROM tournaments_group_teams ORDER BY id;")
-        data['group_teams'] = cursor.fetchall()
+        data['group_teams'] = fetch_dicts(cursor)
         print(f"📋 小組隊伍: {len(data['group_teams'])} 筆")
         
         cursor.close()
@@ -98,163 +103,26 @@ def get_docker_data():
         return None
 
 def import_to_supabase(data):
-    """將資料匯入到 Supabase，按照依賴順序"""
+    """將資料匯入到 Supabase，依賴順序、外鍵對應與序列重設由匯入引擎處理"""
     print("\n☁️ 匯入資料到 Supabase...")
     
-    imported_counts = {}
+    def records():
+        for table, rows in data.items():
+            for row in rows:
+                yield table, row
+    
+    try:
+        result = BulkImporter(log=print).run(records())
+    except Exception as e:
+        print(f"❌ 匯入失敗: {e}")
+        raise
+    
+    for line in result.lines():
+        print(line)
     
-    with transaction.atomic():
-        try:
-            # 1. 賽事 (根節點)
-            print("📋 匯入賽事...")
-            for row in data['tournaments']:
-                Tournament.objects.create(
-                    id=row[0],
-                    name=row[1],
-                    game=row[2],
-                    start_date=row[3],
-                    end_date=row[4],
-                    rules=row[5],
-                    status=row[6],
-                    format=row[7]
-                )
-            imported_counts['tournaments'] = len(data['tournaments'])
-            print(f"✅ 賽事匯入完成: {imported_counts['tournaments']} 筆")
-            
-            # 2. 隊伍 (處理額外的 school 欄位)
-            print("📋 匯入隊伍...")
-            for row in data['teams']:
-                Team.objects.create(
-                    id=row[0],
-                    name=row[1],
-                    logo=row[2] if len(row) > 2 and row[2] else '',
-                    school=''  # Supabase 的額外欄位，設為空字串
-                )
-            imported_counts['teams'] = len(data['teams'])
-            print(f"✅ 隊伍匯入完成: {imported_counts['teams']} 筆")
-            
-            # 3. 選手
-            print("📋 匯入選手...")
-            for row in data['players']:
-                Player.objects.create(
-                    id=row[0],
-                    nickname=row[1],
-                    avatar=row[2] if row[2] else '',
-                    role=row[3],
-                    team_id=row[4]
-                )
-            imported_counts['players'] = len(data['players'])
-            print(f"✅ 選手匯入完成: {imported_counts['players']} 筆")
-            
-            # 4. 小組 (處理額外的 max_teams 欄位)
-            print("📋 匯入小組...")
-            for row in data['groups']:
-                Group.objects.create(
-                    id=row[0],
-                    name=row[1],
-                    tournament_id=row[2],
-                    max_teams=8  # Supabase 的額外欄位，設為預設值
-                )
-            imported_counts['groups'] = len(data['groups'])
-            print(f"✅ 小組匯入完成: {imported_counts['groups']} 筆")
-            
-            # 5. 比賽
-            print("📋 匯入比賽...")
-            for row in data['matches']:
-                Match.objects.create(
-                    id=row[0],
-                    round_number=row[1],
-                    team1_score=row[2],
-                    team2_score=row[3],
-                    match_time=row[4],
-                    status=row[5],
-                    is_lower_bracket=row[6],
-                    team1_id=row[7],
-                    team2_id=row[8],
-                    winner_id=row[9],
-                    tournament_id=row[10],
-                    map=row[11] if len(row) > 11 else None
-                )
-            imported_counts['matches'] = len(data['matches'])
-            print(f"✅ 比賽匯入完成: {imported_counts['matches']} 筆")
-            
-            # 6. 遊戲
-            print("📋 匯入遊戲...")
-            for row in data['games']:
-                Game.objects.create(
-                    id=row[0],
-                    map_number=row[1],
-                    map_name=row[2],
-                    team1_score=row[3],
-                    team2_score=row[4],
-                    match_id=row[5],
-                    winner_id=row[6]
-                )
-            imported_counts['games'] = len(data['games'])
-            print(f"✅ 遊戲匯入完成: {imported_counts['games']} 筆")
-            
-            # 7. 排名
-            print("📋 匯入排名...")
-            for row in data['standings']:
-                Standing.objects.create(
-                    id=row[0],
-                    wins=row[1],
-                    losses=row[2],
-                    draws=row[3],
-                    points=row[4],
-                    group_id=row[5],
-                    team_id=row[6],
-                    tournament_id=row[7]
-                )
-            imported_counts['standings'] = len(data['standings'])
-            print(f"✅ 排名匯入完成: {imported_counts['standings']} 筆")
-            
-            # 8. 統計記錄 (最重要的部分!)
-            print("📊 匯入統計記錄...")
-            stats_imported = 0
-            for row in data['stats']:
-                PlayerGameStat.objects.create(
-                    id=row[0],
-                    kills=row[1],
-                    deaths=row[2],
-                    assists=row[3],
-                    first_kills=row[4],
-                    acs=row[5],
-                    game_id=row[6],
-                    player_id=row[7],
-                    team_id=row[8]
-                )
-                stats_imported += 1
-                if stats_imported % 200 == 0:
-                    print(f"   📊 已匯入 {stats_imported}/{len(data['stats'])} 筆統計...")
-            
-            imported_counts['stats'] = stats_imported
-            print(f"✅ 統計記錄匯入完成: {imported_counts['stats']} 筆")
-            
-            # 9. 參賽關聯
-            print("📋 匯入參賽關聯...")
-            for row in data['participants']:
-                # 使用 Django ORM 建立多對多關聯
-                tournament = Tournament.objects.get(id=row[1])
-                team = Team.objects.get(id=row[2])
-                tournament.participants.add(team)
-            imported_counts['participants'] = len(data['participants'])
-            print(f"✅ 參賽關聯匯入完成: {imported_counts['participants']} 筆")
-            
-            # 10. 小組隊伍關聯
-            print("📋 匯入小組隊伍關聯...")
-            for row in data['group_teams']:
-                group = Group.objects.get(id=row[1])
-                team = Team.objects.get(id=row[2])
-                group.teams.add(team)
-            imported_counts['group_teams'] = len(data['group_teams'])
-            print(f"✅ 小組隊伍關聯匯入完成: {imported_counts['group_teams']} 筆")
-            
-            return imported_counts
-            
-        except Exception as e:
-            print(f"❌ 匯入失敗: {e}")
-            raise
+    imported_counts = {table: counter['created'] for table, counter in result.tables.items()}
+    imported_counts['m2m_links'] = result.m2m_links
+    return imported_counts
 
 def verify_migration():
     """驗證遷移結果"""
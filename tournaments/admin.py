@@ -1,7 +1,21 @@
 # tournaments/admin.py
 
+from datetime import timedelta
+
 from django.contrib import admin, messages
-from .models import Tournament, Team, Player, Match, Group, Standing, Game, PlayerGameStat
+from django.contrib.auth import get_permission_codename
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.urls import path
+from django.utils import timezone
+from .adminperf import PerformanceAdminMixin, autocomplete_filter, cached_filter
+from .batch import batch_updates
+from .exporter import FORMATS, export_filename, iter_export_text, iter_gzip_bytes, parse_resume_token
+from .importer import TABLE_SPECS
+from .models import Tournament, Team, TeamAvailability, Player, Match, Group, Standing, Game, PlayerGameStat
+from .scheduler import MatchScheduler
 from .logic import generate_round_robin_matches, generate_swiss_round_matches, generate_single_elimination_matches, generate_double_elimination_matches
 import logging
 
@@ -13,69 +27,129 @@ business_logger = logging.getLogger('tournaments.business')
 class PlayerGameStatInline(admin.TabularInline):
     model = PlayerGameStat
     extra = 1
-    autocomplete_fields = ['player', 'team'] 
+    autocomplete_fields = ['player', 'team']
+
+    # 選手欄位顯示「暱稱 (隊伍)」，預先載入隊伍
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('player__team', 'team')
+
+class TeamAvailabilityInline(admin.TabularInline):
+    model = TeamAvailability
+    extra = 1
+    fields = ('tournament', 'start', 'end')
 
 class GameInline(admin.TabularInline):
     model = Game
     extra = 1
     fields = ('map_number', 'map_name', 'team1_score', 'team2_score', 'winner')
+    autocomplete_fields = ['winner']
 
 # --- ModelAdmin 設定 (已為主要模型加入 ID 顯示) ---
 
 # 移除重複的 generate_matches_action 定義
 
 @admin.register(Tournament)
-class TournamentAdmin(admin.ModelAdmin):
+class TournamentAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'format', 'status') # <--- 加上 id
     list_filter = ('format', 'status')
     # actions 將在後面定義 generate_matches_action 後加入
     search_fields = ('name',)
 
+    def get_urls(self):
+        return [
+            path('export/', self.admin_site.admin_view(self.export_view), name='tournaments_tournament_export'),
+        ] + super().get_urls()
+
+    def has_export_permission(self, request):
+        """匯出包含隊伍、選手與數據等所有資料表，需要每個匯出模型的檢視（或修改）權限。"""
+        def can_view(opts):
+            return any(
+                request.user.has_perm(f'{opts.app_label}.{get_permission_codename(action, opts)}')
+                for action in ('view', 'change')
+            )
+        return all(can_view(spec.model._meta) for spec in TABLE_SPECS)
+
+    def export_view(self, request):
+        """
+        串流下載 gzip 壓縮的完整資料。
+        參數：format=ndjson|json、tournament=<id>（可重複）、resume=<表名>:<最後主鍵>（僅 NDJSON）
+        """
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        fmt = request.GET.get('format', 'ndjson')
+        tournament_ids = [int(pk) for pk in request.GET.getlist('tournament') if pk.isdigit()] or None
+        start = None
+        try:
+            if fmt not in FORMATS:
+                raise ValueError(f'不支援的匯出格式: {fmt}')
+            if request.GET.get('resume'):
+                if fmt != 'ndjson':
+                    raise ValueError('只有 NDJSON 格式支援續傳')
+                start = parse_resume_token(request.GET['resume'])
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        return export_response(request, fmt, tournament_ids, start)
+
 @admin.register(Team)
-class TeamAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name',) # <--- 加上 id
+class TeamAdmin(PerformanceAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'name', 'rating', 'rated_matches') # <--- 加上 id
     search_fields = ('name',)
+    readonly_fields = ('rating', 'rated_matches')
+    inlines = [TeamAvailabilityInline]
 
 @admin.register(Player)
-class PlayerAdmin(admin.ModelAdmin):
+class PlayerAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'nickname', 'team', 'role') # <--- 加上 id
-    list_filter = ('role', 'team') 
+    list_filter = ('role', autocomplete_filter('team', '所屬隊伍'))
+    list_select_related = ('team',)
     search_fields = ('nickname',)
     autocomplete_fields = ['team'] 
 
 @admin.register(Match)
-class MatchAdmin(admin.ModelAdmin):
+class MatchAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ('id', '__str__', 'tournament', 'status', 'team1_score', 'team2_score', 'winner') # <--- 加上比分和 id
-    list_filter = ('tournament', 'status', 'winner')
+    # 勝者篩選改用 autocomplete，不再列出所有隊伍；賽事選項從快取讀取
+    list_filter = (cached_filter('tournament', '所屬賽事'), 'status', autocomplete_filter('winner', '勝者'))
     search_fields = ('team1__name', 'team2__name')
     list_display_links = ('id', '__str__') # <-- 讓 id 也可以點擊
+    list_select_related = ('team1', 'team2', 'winner', 'tournament')
+    autocomplete_fields = ['tournament', 'team1', 'team2', 'winner']
     inlines = [GameInline]
-    
-    # 新增自定義欄位顯示
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('team1', 'team2', 'winner', 'tournament')
 
 @admin.register(Game)
-class GameAdmin(admin.ModelAdmin):
+class GameAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ('id', '__str__', 'map_name', 'winner') # <--- 加上 id
-    list_filter = ('match__tournament',)
+    list_filter = (cached_filter('match__tournament', '所屬賽事'),)
+    search_fields = ('match__team1__name', 'match__team2__name', 'map_name')
+    # __str__ 會用到比賽的賽事與雙方隊伍
+    list_select_related = ('match__tournament', 'match__team1', 'match__team2', 'winner')
+    autocomplete_fields = ['match', 'winner']
     inlines = [PlayerGameStatInline]
 
 @admin.register(Group)
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'tournament') # <--- 加上 id
+    list_select_related = ('tournament',)
     filter_horizontal = ('teams',)
 
 @admin.register(Standing)
-class StandingAdmin(admin.ModelAdmin):
+class StandingAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'team', 'tournament', 'wins', 'losses', 'points') # <--- 加上 id
-    list_filter = ('tournament',)
+    list_filter = (cached_filter('tournament', '所屬賽事'),)
+    list_select_related = ('team', 'tournament')
 
 @admin.register(PlayerGameStat)
-class PlayerGameStatAdmin(admin.ModelAdmin):
+class PlayerGameStatAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ('id', '__str__', 'kills', 'deaths', 'assists', 'acs')
-    list_filter = ('game__match__tournament',)
+    list_filter = (
+        cached_filter('game__match__tournament', '所屬賽事'),
+        autocomplete_filter('team', '代表隊伍'),
+        autocomplete_filter('player', '選手'),
+    )
     search_fields = ('player__nickname',)
+    # __str__ 依序用到小局 → 比賽 → 賽事與雙方隊伍，以及選手
+    list_select_related = ('game__match__tournament', 'game__match__team1', 'game__match__team2', 'player')
+    autocomplete_fields = ['game', 'player', 'team']
 
     # tournaments/admin.py
 
@@ -217,115 +291,123 @@ def fix_group_data_action(modeladmin, request, queryset):
             modeladmin.message_user(request, f"賽事 '{tournament.name}' 的分組資料正常", messages.SUCCESS)
 
 # 將 action 加入 TournamentAdmin
-TournamentAdmin.actions = [generate_matches_action, fix_group_data_action]
+def export_response(request, fmt, tournament_ids=None, start=None):
+    response = StreamingHttpResponse(
+        iter_gzip_bytes(iter_export_text(fmt, tournament_ids, start)),
+        content_type='application/gzip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, tournament_ids)}"'
+    business_logger.info('Data Exported', extra={
+        'event_type': 'data_exported',
+        'format': fmt,
+        'tournament_ids': tournament_ids,
+        'resume_from': start,
+        'user': str(request.user),
+    })
+    return response
+
+@admin.action(description='匯出選定賽事的資料（NDJSON.gz）')
+def export_tournaments_action(modeladmin, request, queryset):
+    return export_response(request, 'ndjson', list(queryset.values_list('pk', flat=True)))
+
+@admin.action(description='自動排定尚未安排時間的比賽（明天 18:00 起）')
+def schedule_matches_action(modeladmin, request, queryset):
+    start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    for tournament in queryset:
+        result = MatchScheduler(tournament, start=start).run()
+        level = messages.WARNING if result.unscheduled else messages.SUCCESS
+        modeladmin.message_user(request, f"{tournament.name}：" + '；'.join(line.strip(' -') for line in result.lines()), level)
+
+TournamentAdmin.actions = [generate_matches_action, fix_group_data_action, export_tournaments_action, schedule_matches_action]
 
 # --- 比賽管理 Admin Actions ---
+# 以 queryset.update 一次修改所有選定的比賽，在批次模式中每個受影響的賽事只重算一次積分榜、對戰矩陣與 Elo
+
+MATCH_LOG_FIELDS = ('id', 'tournament_id', 'team1__name', 'team2__name', 'team1_score', 'team2_score', 'winner__name')
+
+
+def _update_matches(batch, queryset, **changes):
+    """修改比賽並登記到批次中，回傳修改前的資料（供記錄變更）。"""
+    rows = list(queryset.values(*MATCH_LOG_FIELDS))
+    if rows:
+        Match.objects.filter(pk__in=[row['id'] for row in rows]).update(**changes)
+        batch.matches_changed({row['tournament_id'] for row in rows})
+    return rows
+
+
+def _set_winner(modeladmin, request, queryset, winner_field, label):
+    with transaction.atomic(), batch_updates() as batch:
+        rows = _update_matches(
+            batch, queryset.filter(team1__isnull=False, team2__isnull=False),
+            winner=F(winner_field), status='completed',  # 自動設為已完成
+        )
+
+    for row in rows:
+        # 記錄變更
+        business_logger.info('Match Winner Set Manually', extra={
+            'event_type': 'match_winner_set',
+            'match_id': row['id'],
+            'team1': row['team1__name'],
+            'team2': row['team2__name'],
+            'winner': row[f'{winner_field}__name'],
+            'old_winner': row['winner__name'],
+            'user': str(request.user),
+        })
 
-@admin.action(description='設置隊伍1為勝者（自動根據比分判斷）')
-def set_team1_as_winner_action(modeladmin, request, queryset):
-    """設置選定比賽的隊伍1為勝者"""
-    updated_count = 0
-    for match in queryset:
-        if match.team1 and match.team2:
-            old_winner = match.winner
-            match.winner = match.team1
-            match.status = 'completed'  # 自動設為已完成
-            match.save()
-            updated_count += 1
-            
-            # 記錄變更
-            business_logger.info('Match Winner Set Manually', extra={
-                'event_type': 'match_winner_set',
-                'match_id': match.id,
-                'team1': match.team1.name,
-                'team2': match.team2.name,
-                'winner': match.winner.name,
-                'old_winner': old_winner.name if old_winner else None,
-                'user': str(request.user),
-            })
-    
     modeladmin.message_user(
-        request, 
-        f"已成功設置 {updated_count} 場比賽的隊伍1為勝者，並自動觸發積分計算。", 
+        request,
+        f"已成功設置 {len(rows)} 場比賽的{label}為勝者，並自動觸發積分計算。",
         messages.SUCCESS
     )
 
+@admin.action(description='設置隊伍1為勝者（自動根據比分判斷）')
+def set_team1_as_winner_action(modeladmin, request, queryset):
+    """設置選定比賽的隊伍1為勝者"""
+    _set_winner(modeladmin, request, queryset, 'team1', '隊伍1')
+
 @admin.action(description='設置隊伍2為勝者（自動根據比分判斷）')
 def set_team2_as_winner_action(modeladmin, request, queryset):
     """設置選定比賽的隊伍2為勝者"""
-    updated_count = 0
-    for match in queryset:
-        if match.team1 and match.team2:
-            old_winner = match.winner
-            match.winner = match.team2
-            match.status = 'completed'  # 自動設為已完成
-            match.save()
-            updated_count += 1
-            
-            # 記錄變更
-            business_logger.info('Match Winner Set Manually', extra={
-                'event_type': 'match_winner_set',
-                'match_id': match.id,
-                'team1': match.team1.name,
-                'team2': match.team2.name,
-                'winner': match.winner.name,
-                'old_winner': old_winner.name if old_winner else None,
-                'user': str(request.user),
-            })
-    
-    modeladmin.message_user(
-        request, 
-        f"已成功設置 {updated_count} 場比賽的隊伍2為勝者，並自動觸發積分計算。", 
-        messages.SUCCESS
-    )
+    _set_winner(modeladmin, request, queryset, 'team2', '隊伍2')
 
 @admin.action(description='根據比分自動設置勝者')
 def auto_set_winner_by_score_action(modeladmin, request, queryset):
     """根據比分自動設置勝者"""
+    queryset = queryset.filter(team1__isnull=False, team2__isnull=False)
+    tie_count = queryset.filter(team1_score=F('team2_score')).count()
+
+    with transaction.atomic(), batch_updates() as batch:
+        changes = [
+            ('team1', _update_matches(batch, queryset.filter(team1_score__gt=F('team2_score')),
+                                      winner=F('team1'), status='completed')),
+            ('team2', _update_matches(batch, queryset.filter(team1_score__lt=F('team2_score')),
+                                      winner=F('team2'), status='completed')),
+        ]
+
     updated_count = 0
-    no_score_count = 0
-    tie_count = 0
-    
-    for match in queryset:
-        if match.team1_score is None or match.team2_score is None:
-            no_score_count += 1
-            continue
-            
-        if match.team1_score == match.team2_score:
-            tie_count += 1
-            continue
-            
-        old_winner = match.winner
-        
-        if match.team1_score > match.team2_score:
-            match.winner = match.team1
-        else:
-            match.winner = match.team2
-            
-        match.status = 'completed'
-        match.save()
-        updated_count += 1
-        
-        # 記錄變更
-        business_logger.info('Match Winner Auto-Set by Score', extra={
-            'event_type': 'match_winner_auto_set',
-            'match_id': match.id,
-            'team1': match.team1.name,
-            'team2': match.team2.name,
-            'team1_score': match.team1_score,
-            'team2_score': match.team2_score,
-            'winner': match.winner.name,
-            'old_winner': old_winner.name if old_winner else None,
-            'user': str(request.user),
-        })
+    for winner_field, rows in changes:
+        updated_count += len(rows)
+        for row in rows:
+            # 記錄變更
+            business_logger.info('Match Winner Auto-Set by Score', extra={
+                'event_type': 'match_winner_auto_set',
+                'match_id': row['id'],
+                'team1': row['team1__name'],
+                'team2': row['team2__name'],
+                'team1_score': row['team1_score'],
+                'team2_score': row['team2_score'],
+                'winner': row[f'{winner_field}__name'],
+                'old_winner': row['winner__name'],
+                'user': str(request.user),
+            })
     
     messages_list = []
     if updated_count > 0:
         messages_list.append(f"成功設置 {updated_count} 場比賽的勝者")
-    if no_score_count > 0:
-        messages_list.append(f"{no_score_count} 場比賽沒有比分，跳過")
     if tie_count > 0:
         messages_list.append(f"{tie_count} 場比賽平手，需要手動處理")
+    if not messages_list:
+        messages_list.append("沒有需要設置勝者的比賽")
         
     modeladmin.message_user(
         request, 
@@ -336,28 +418,24 @@ def auto_set_winner_by_score_action(modeladmin, request, queryset):
 @admin.action(description='清除勝者設置（重設比賽狀態）')
 def clear_winner_action(modeladmin, request, queryset):
     """清除選定比賽的勝者設置"""
-    updated_count = 0
-    for match in queryset:
-        if match.winner:
-            old_winner = match.winner
-            match.winner = None
-            match.status = 'scheduled'  # 重設為預定狀態
-            match.save()
-            updated_count += 1
-            
-            # 記錄變更
-            business_logger.info('Match Winner Cleared', extra={
-                'event_type': 'match_winner_cleared',
-                'match_id': match.id,
-                'team1': match.team1.name,
-                'team2': match.team2.name,
-                'old_winner': old_winner.name,
-                'user': str(request.user),
-            })
+    with transaction.atomic(), batch_updates() as batch:
+        # 重設為預定狀態
+        rows = _update_matches(batch, queryset.filter(winner__isnull=False), winner=None, status='scheduled')
+
+    for row in rows:
+        # 記錄變更
+        business_logger.info('Match Winner Cleared', extra={
+            'event_type': 'match_winner_cleared',
+            'match_id': row['id'],
+            'team1': row['team1__name'],
+            'team2': row['team2__name'],
+            'old_winner': row['winner__name'],
+            'user': str(request.user),
+        })
     
     modeladmin.message_user(
         request, 
-        f"已成功清除 {updated_count} 場比賽的勝者設置，並自動觸發積分重算。", 
+        f"已成功清除 {len(rows)} 場比賽的勝者設置，並自動觸發積分重算。", 
         messages.SUCCESS
     )
 
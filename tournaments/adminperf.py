@@ -0,0 +1,151 @@
+# tournaments/adminperf.py
+"""
+管理後台列表頁的效能工具
+
+- PerformanceAdminMixin：列表使用 EstimatedCountPaginator，並關閉額外的「全部筆數」COUNT 查詢
+- EstimatedCountPaginator：PostgreSQL 上未篩選的大型資料表以 pg_class.reltuples 估計筆數，
+  避免對數十萬筆資料執行 COUNT(*)；其他資料庫或有篩選條件時照常計算
+- autocomplete_filter()：以後台內建的 autocomplete 端點搜尋選項的篩選器，不會一次載入所有隊伍或選手
+- cached_filter()：選項數量少的關聯（例如賽事）改從快取讀取選項，資料變動時由 signals 清除
+"""
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+# 估計筆數超過此值才使用估計值（小資料表的精確 COUNT 很便宜）
+ESTIMATE_THRESHOLD = getattr(settings, 'ADMIN_ESTIMATE_THRESHOLD', 100000)
+FILTER_CACHE_TIMEOUT = 60 * 10
+
+
+def estimated_count(model, using):
+    """PostgreSQL 的估計筆數（由 ANALYZE / autovacuum 維護）；其他資料庫或尚未統計時回傳 None。"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    # 從未 ANALYZE 的資料表 reltuples 為 -1（舊版為 0）
+    return row[0] if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where and not queryset.query.distinct:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+AUTOCOMPLETE_MEDIA = forms.Media(
+    js=(
+        'admin/js/vendor/jquery/jquery.min.js',
+        'admin/js/vendor/select2/select2.full.min.js',
+        'admin/js/jquery.init.js',
+        'admin/js/autocomplete.js',
+    ),
+    css={'screen': ('admin/css/vendor/select2/select2.min.css', 'admin/css/autocomplete.css')},
+)
+
+
+class PerformanceAdminMixin:
+    paginator = EstimatedCountPaginator
+    # 有篩選條件時不再另外計算未篩選的總筆數
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        if any(isinstance(spec, type) and issubclass(spec, AutocompleteFilter) for spec in self.list_filter):
+            media += AUTOCOMPLETE_MEDIA
+        return media
+
+
+def _resolve(model, field_path):
+    """回傳 field_path 最後一段的 (所屬 model, 欄位)。"""
+    *parents, name = field_path.split('__')
+    for part in parents:
+        model = model._meta.get_field(part).remote_field.model
+    return model, model._meta.get_field(name)
+
+
+class RelatedIdFilter(admin.SimpleListFilter):
+    field_path = None
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(**{f'{self.field_path}__pk': value})
+        return queryset
+
+
+class AutocompleteFilter(RelatedIdFilter):
+    template = 'admin/tournaments/autocomplete_filter.html'
+
+    def lookups(self, request, model_admin):
+        # 選項由 autocomplete 端點依輸入的文字查詢，這裡不載入任何資料
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        source_model, field = _resolve(changelist.model, self.field_path)
+        selected = None
+        if self.value() and self.value().isdigit():
+            selected = field.remote_field.model._default_manager.filter(pk=self.value()).first()
+        yield {
+            'selected': selected,
+            'parameter_name': self.parameter_name,
+            'clear_query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'app_label': source_model._meta.app_label,
+            'model_name': source_model._meta.model_name,
+            'field_name': field.name,
+        }
+
+
+def autocomplete_filter(field_path, title):
+    """例如 autocomplete_filter('winner', '勝者')；關聯的 ModelAdmin 必須設定 search_fields。"""
+    return type(f'{field_path.title().replace("__", "")}AutocompleteFilter', (AutocompleteFilter,), {
+        'title': title, 'parameter_name': f'{field_path}__id__exact', 'field_path': field_path,
+    })
+
+
+def filter_cache_key(model):
+    return f"admin_filter:v{getattr(settings, 'CACHE_VERSION', 1)}:{model._meta.label_lower}"
+
+
+def invalidate_filter_choices(model):
+    cache.delete(filter_cache_key(model))
+
+
+class CachedFilter(RelatedIdFilter):
+    label_field = 'name'
+
+    def lookups(self, request, model_admin):
+        _, field = _resolve(model_admin.model, self.field_path)
+        model = field.remote_field.model
+        key = filter_cache_key(model)
+        choices = cache.get(key)
+        if choices is None:
+            choices = list(model._default_manager.order_by(self.label_field).values_list('pk', self.label_field))
+            cache.set(key, choices, FILTER_CACHE_TIMEOUT)
+        return choices
+
+
+def cached_filter(field_path, title, label_field='name'):
+    """例如 cached_filter('match__tournament', '賽事')。"""
+    return type(f'{field_path.title().replace("__", "")}CachedFilter', (CachedFilter,), {
+        'title': title, 'parameter_name': f'{field_path}__id__exact', 'field_path': field_path,
+        'label_field': label_field,
+    })
@@ -8,8 +8,12 @@ urlpatterns = [
     
     # 具體的 API 端點
     path('tournaments/', api_views.TournamentListAPI.as_view(), name='api_tournament_list'),
+    path('tournaments/<int:pk>/qualification/', api_views.QualificationAPI.as_view(), name='api_tournament_qualification'),
     path('teams/', api_views.TeamListAPI.as_view(), name='api_team_list'),
     path('players/', api_views.PlayerListAPI.as_view(), name='api_player_list'),
+    path('maps/', api_views.MapStatsAPI.as_view(), name='api_map_stats'),
+    path('leaderboards/', api_views.LeaderboardAPI.as_view(), name='api_leaderboards'),
+    path('rosters/', api_views.RosterUploadAPI.as_view(), name='api_roster_upload'),
     path('matches/<int:pk>/', api_views.MatchDetailAPI.as_view(), name='api_match_detail'),
     path('matches/<int:pk>/stats/', api_views.GameReportAPIView.as_view(), name='api_match_stats'),
 ]
\ No newline at end of file
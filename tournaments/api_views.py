@@ -1,11 +1,22 @@
 # tournaments/api_views.py
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny 
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.throttling import AnonRateThrottle
 from rest_framework import status
 from .models import Tournament, Team, Match, Game, PlayerGameStat, Player
 from .serializers import TournamentSerializer, TeamSerializer, MatchSerializer, PlayerGameStatSerializer
+from .batch import batch_updates
+from .compression import CompressedCacheMixin
+from . import leaderboards
+from .mapstats import map_overview, map_teams
+from .roster import RosterError, import_roster, parse_roster
+from .simulation import (
+    ANONYMOUS_SIMULATIONS, DEFAULT_SIMULATIONS, MAX_SIMULATIONS, qualification_probability, simulate_tournament,
+)
+from django.core.exceptions import ImproperlyConfigured
 from django.db import transaction
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
 import logging
 
@@ -26,23 +37,32 @@ class APIRootView(APIView):
                 'tournaments': request.build_absolute_uri(reverse('api_tournament_list')),
                 'teams': request.build_absolute_uri(reverse('api_team_list')),
                 'players': request.build_absolute_uri(reverse('api_player_list')),
+                'roster': request.build_absolute_uri(reverse('api_roster_upload')),
                 'match_detail': 'api/matches/{id}/',
+                'qualification': 'api/tournaments/{id}/qualification/',
                 'match_stats': 'api/matches/{id}/stats/',
+                'maps': request.build_absolute_uri(reverse('api_map_stats')),
+                'leaderboards': request.build_absolute_uri(reverse('api_leaderboards')),
             },
             'documentation': {
                 'tournaments': 'GET: 獲取所有賽事, POST: 創建新賽事',
-                'teams': 'POST: 創建新隊伍',
+                'teams': 'GET: 依 Elo 積分排序的隊伍列表, POST: 創建新隊伍',
                 'players': 'GET: 獲取所有選手暱稱列表',
-                'match_detail': 'GET: 獲取比賽詳情',
+                'roster': 'POST: 上傳 CSV/TSV 隊伍與選手名單（file 或 text，可指定 tournament 加入賽事，dry_run 只檢查）',
+                'match_detail': 'GET: 獲取比賽比分與狀態, PATCH: 更新比分與狀態',
+                'qualification': 'GET: 模擬剩餘比賽，回傳各隊晉級與各名次機率（?places=晉級名額；'
+                                 '登入後可用 ?simulations= 指定模擬次數，未登入時次數與頻率皆有上限）',
                 'match_stats': 'POST: 提交比賽統計資料',
             }
         })
 
-class TournamentListAPI(APIView):
+class TournamentListAPI(CompressedCacheMixin, APIView):
+    cache_scopes = ('tournament', 'team')
     def get(self, request):
-        tournaments = Tournament.objects.all()
-        serializer = TournamentSerializer(tournaments, many=True)
-        return Response(serializer.data)
+        # participants 是 M2M 欄位，預先載入避免每個賽事各查一次
+        tournaments = Tournament.objects.prefetch_related('participants')
+        # JSON 回應連同壓縮版本快取 cache_timeout 秒
+        return self.cached_response(request, lambda: TournamentSerializer(tournaments, many=True).data)
 
     def post(self, request):
         serializer = TournamentSerializer(data=request.data)
@@ -51,7 +71,48 @@ class TournamentListAPI(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class TeamListAPI(APIView):
+class QualificationThrottle(AnonRateThrottle):
+    """未登入使用者的模擬請求頻率，依 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['qualification']。"""
+    scope = 'qualification'
+
+class QualificationAPI(APIView):
+    """
+    晉級機率 API - 以 Monte Carlo 模擬分組循環或瑞士輪的剩餘比賽（結果依賽事狀態快取）
+    每次比賽結果變動都會讓快取失效，未登入的請求限制頻率，模擬次數最多 ANONYMOUS_SIMULATIONS
+    """
+    permission_classes = [AllowAny]
+    throttle_classes = [QualificationThrottle]
+
+    def get(self, request, pk):
+        tournament = get_object_or_404(Tournament, pk=pk)
+        try:
+            places = max(1, int(request.query_params.get('places', 2)))
+            simulations = int(request.query_params.get('simulations', DEFAULT_SIMULATIONS))
+        except ValueError:
+            return Response({'error': 'places 與 simulations 必須是整數'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = MAX_SIMULATIONS if request.user.is_authenticated else ANONYMOUS_SIMULATIONS
+        simulations = max(1, min(simulations, limit))
+
+        try:
+            result = simulate_tournament(tournament, simulations)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ImproperlyConfigured as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        for stage in result['stages']:
+            for team in stage['teams']:
+                team['qualification'] = round(qualification_probability(team, places), 6)
+        return Response(dict(result, places=places))
+
+class TeamListAPI(CompressedCacheMixin, APIView):
+    # 積分在比賽結果寫入時更新，比賽變動會遞增 'tournament'
+    cache_scopes = ('team', 'tournament')
+    def get(self, request):
+        # 依 Elo 積分由高到低排列
+        teams = Team.objects.order_by('-rating', 'name')
+        return self.cached_response(request, lambda: TeamSerializer(teams, many=True).data)
+
     def post(self, request):
         serializer = TeamSerializer(data=request.data)
         if serializer.is_valid():
@@ -59,7 +120,112 @@ class TeamListAPI(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class MapStatsAPI(CompressedCacheMixin, APIView):
+    """
+    地圖數據 API - 讀取地圖數據彙總表
+    參數：tournament（賽事ID）、team（隊伍ID，回傳該隊各地圖的勝率）、map（地圖名稱，另回傳各隊伍在該地圖的戰績）
+    """
+    permission_classes = [AllowAny]
+    # 彙總表隨小局與比賽變動，隊伍名稱來自 'team'
+    cache_scopes = ('tournament', 'team')
+
+    def get(self, request):
+        params = {}
+        for name, model in (('tournament', Tournament), ('team', Team)):
+            value = request.query_params.get(name)
+            if value:
+                if not value.isdigit():
+                    return Response({'error': f'{name} 必須是整數'}, status=status.HTTP_400_BAD_REQUEST)
+                params[name] = get_object_or_404(model, pk=value)
+        map_name = request.query_params.get('map')
+
+        def build():
+            data = {'maps': map_overview(**params)}
+            if map_name:
+                data['teams'] = map_teams(map_name, tournament=params.get('tournament'))
+            return data
+        return self.cached_response(request, build)
+
+class LeaderboardAPI(APIView):
+    """
+    選手排行榜 API
+    參數：metric（acs / kd / first_kills，預設 acs）、tournament（賽事ID，留空為所有賽事）、limit、
+    player（選手ID，另回傳該選手的名次）
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        metric = request.query_params.get('metric', 'acs')
+        if metric not in leaderboards.METRICS:
+            return Response({'error': f'metric 必須是 {", ".join(leaderboards.METRICS)} 之一'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        params = {}
+        for name in ('tournament', 'limit', 'player'):
+            value = request.query_params.get(name)
+            if value:
+                if not value.isdigit():
+                    return Response({'error': f'{name} 必須是整數'}, status=status.HTTP_400_BAD_REQUEST)
+                params[name] = int(value)
+        tournament_id = params.get('tournament')
+        if tournament_id is not None:
+            get_object_or_404(Tournament, pk=tournament_id)
+
+        entries = leaderboards.top(metric, tournament_id, params.get('limit', leaderboards.DEFAULT_LIMIT))
+        names = dict(Player.objects.filter(pk__in=[entry['player_id'] for entry in entries]).values_list('pk', 'nickname'))
+        data = {
+            'metric': metric,
+            'tournament': tournament_id,
+            'results': [dict(entry, nickname=names.get(entry['player_id'])) for entry in entries],
+        }
+        if 'player' in params:
+            data['player'] = leaderboards.rank(metric, params['player'], tournament_id)
+        return Response(data)
+
+class RosterUploadAPI(APIView):
+    """
+    名單批次匯入 API - 僅限管理員
+    欄位：file（CSV/TSV 檔）或 text、tournament（賽事ID，選填）、dry_run（只檢查不寫入）
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        try:
+            text = upload.read().decode('utf-8-sig') if upload else request.data.get('text', '')
+        except UnicodeDecodeError:
+            return Response({'error': '名單檔案必須是 UTF-8 編碼'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            roster = parse_roster(text)
+        except RosterError as e:
+            return Response(
+                {'error': '名單格式錯誤', 'errors': [{'line': line, 'message': message} for line, message in e.errors]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        tournament = None
+        tournament_id = str(request.data.get('tournament') or '').strip()
+        if tournament_id:
+            if not tournament_id.isdigit():
+                return Response({'error': 'tournament 必須是整數'}, status=status.HTTP_400_BAD_REQUEST)
+            tournament = get_object_or_404(Tournament, pk=tournament_id)
+
+        if str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes'):
+            return Response({'dry_run': True, 'teams': len(roster.teams), 'players': roster.player_count})
+
+        result = import_roster(roster, tournament=tournament)
+        api_logger.info('Roster Imported', extra={
+            'event_type': 'roster_import',
+            'tournament_id': tournament.pk if tournament else None,
+            **result.as_dict(),
+        })
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED)
+
 class MatchDetailAPI(APIView):
+    def get(self, request, pk):
+        match = get_object_or_404(Match, pk=pk)
+        return Response(MatchSerializer(match).data)
+
     def patch(self, request, pk):
         try:
             match = Match.objects.get(pk=pk)
@@ -133,31 +299,33 @@ class GameReportAPIView(APIView):
 
                 game.save()
 
-                for player_data in player_stats_list:
-                    nickname = player_data.get('nickname')
-                    if not nickname: continue
-                    try:
-                    # [關鍵修改] 查詢選手時，也檢查隊伍是否存在
-                        if not match.team1 or not match.team2:
-                        # 如果比賽隊伍未定，我們就放寬選手的查詢範圍
-                            player = Player.objects.get(nickname__iexact=nickname)
-                        else:
-                            player = Player.objects.get(nickname__iexact=nickname, team__in=[match.team1, match.team2])
-
-                        stat_obj, created = PlayerGameStat.objects.update_or_create(
-                            game=game, player=player,
-                            defaults={
-                                'team': player.team,
-                                'kills': player_data.get('kills', 0),
-                                'deaths': player_data.get('deaths', 0),
-                                'assists': player_data.get('assists', 0),
-                                'first_kills': player_data.get('first_kills', 0),
-                                'acs': player_data.get('acs', 0.0),
-                        }
-                    )
-                        created_stats.append({"player_nickname": player.nickname})
-                    except Player.DoesNotExist:
-                        errors.append({"nickname": nickname, "error": "Player not found for this match."})
+                # 排行榜在所有選手數據寫入後一次更新（每位選手 O(log n)）
+                with batch_updates():
+                    for player_data in player_stats_list:
+                        nickname = player_data.get('nickname')
+                        if not nickname: continue
+                        try:
+                        # [關鍵修改] 查詢選手時，也檢查隊伍是否存在
+                            if not match.team1 or not match.team2:
+                            # 如果比賽隊伍未定，我們就放寬選手的查詢範圍
+                                player = Player.objects.get(nickname__iexact=nickname)
+                            else:
+                                player = Player.objects.get(nickname__iexact=nickname, team__in=[match.team1, match.team2])
+
+                            stat_obj, created = PlayerGameStat.objects.update_or_create(
+                                game=game, player=player,
+                                defaults={
+                                    'team': player.team,
+                                    'kills': player_data.get('kills', 0),
+                                    'deaths': player_data.get('deaths', 0),
+                                    'assists': player_data.get('assists', 0),
+                                    'first_kills': player_data.get('first_kills', 0),
+                                    'acs': player_data.get('acs', 0.0),
+                            }
+                        )
+                            created_stats.append({"player_nickname": player.nickname})
+                        except Player.DoesNotExist:
+                            errors.append({"nickname": nickname, "error": "Player not found for this match."})
 
             if errors:
                 api_logger.warning('Game Report Completed with Errors', extra={
@@ -0,0 +1,131 @@
+# tournaments/batch.py
+"""
+批次模式：延後衍生資料的更新
+
+比賽每次儲存都會由 signals 重算整個賽事的積分榜、更新對戰矩陣快取與 Elo 積分。
+一次修改大量比賽時（admin 批次動作、匯入、產生賽程），在 batch_updates() 中進行：
+
+    with batch_updates() as batch:
+        Match.objects.filter(...).update(...)      # queryset 更新不會觸發 signal，自行登記
+        batch.matches_changed(tournament_ids)
+        match.save()                              # signal 只登記受影響的賽事，不立即計算
+
+離開時（最外層、且沒有發生例外）每個受影響的賽事只處理一次：
+清除對戰矩陣快取 → 依時間順序重算 Elo（backfill_ratings，整個資料庫一次）→ 重建地圖數據彙總（mapstats）
+→ 重算積分榜與名次 → 更新選手排行榜（leaderboards）→ 遞增頁面片段快取的版本號（fragments）。
+巢狀使用時由最外層統一處理。也可作為 decorator 使用。
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS
+
+logger = logging.getLogger('tournaments.batch')
+
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def current_batch():
+    """目前執行緒中進行中的批次，沒有時回傳 None。"""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+class PendingUpdates:
+    """批次中累積、離開時才執行的衍生資料更新。"""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.standings = set()
+        self.head_to_head = set()
+        self.ranks = set()
+        self.map_stats = set()
+        # 小局 id → 數據有變動的選手（排行榜增量更新）；bulk 寫入時改為整個失效
+        self.player_stats = defaultdict(set)
+        self.leaderboards_invalid = False
+        self.ratings = False
+
+    def matches_changed(self, tournament_ids, standings=True, ratings=True):
+        """登記比賽有變動的賽事（queryset.update / bulk 寫入後呼叫）。"""
+        tournament_ids = set(tournament_ids)
+        self.head_to_head |= tournament_ids
+        self.map_stats |= tournament_ids
+        if standings:
+            self.standings |= tournament_ids
+        self.ratings = self.ratings or (ratings and bool(tournament_ids))
+
+    def match_saved(self, match, deleted=False):
+        """signals 在批次中呼叫：依比賽狀態登記需要的更新。"""
+        self.head_to_head.add(match.tournament_id)
+        if match.status == 'completed' or deleted:
+            self.standings.add(match.tournament_id)
+        if match.status == 'completed' or match.rating_delta is not None:
+            self.ratings = True
+
+    def player_stat_saved(self, stat):
+        """signals 在批次中呼叫：登記選手在這個小局的數據有變動。"""
+        self.player_stats[stat.game_id].add(stat.player_id)
+
+    def player_stats_changed(self):
+        """bulk 寫入選手數據後呼叫：結束時讓所有排行榜失效，讀取時重建。"""
+        self.leaderboards_invalid = True
+
+    def ranks_changed(self, tournament_ids):
+        """只需要重新計算同分比較與名次的賽事（例如匯入了積分榜）。"""
+        self.ranks |= set(tournament_ids)
+
+    def flush(self):
+        from . import fragments, leaderboards, mapstats
+        from .headtohead import invalidate_tournaments
+        from .ratings import backfill_ratings
+        from .signals import recalculate_standings
+        from .tiebreakers import update_tiebreakers
+
+        if self.head_to_head:
+            invalidate_tournaments(self.head_to_head, self.using)
+        if self.ratings:
+            backfill_ratings(self.using)
+        if self.map_stats:
+            mapstats.rebuild(self.map_stats, self.using)
+        for tournament_id in sorted(self.standings):
+            recalculate_standings(tournament_id, self.using)
+        for tournament_id in sorted(self.ranks - self.standings):
+            update_tiebreakers(tournament_id, self.using)
+        if self.leaderboards_invalid:
+            leaderboards.invalidate()
+        elif self.player_stats:
+            leaderboards.update_games(self.player_stats, self.using)
+        fragments.bump('tournament', self.head_to_head | self.map_stats | self.standings | self.ranks)
+        logger.debug('batch flushed: standings=%s head_to_head=%s map_stats=%s ratings=%s',
+                     sorted(self.standings), sorted(self.head_to_head), sorted(self.map_stats), self.ratings)
+
+
+class batch_updates(ContextDecorator):
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    def __enter__(self):
+        stack = _stack()
+        # 巢狀時沿用外層的批次（同一個資料庫）
+        if stack and stack[-1].using == self.using:
+            stack.append(stack[-1])
+        else:
+            stack.append(PendingUpdates(self.using))
+        return stack[-1]
+
+    def __exit__(self, exc_type, exc, tb):
+        stack = _stack()
+        pending = stack.pop()
+        if exc_type is None and pending not in stack:
+            pending.flush()
+        return False
@@ -0,0 +1,125 @@
+# tournaments/bulkcopy.py
+"""
+大量寫入的快速路徑
+
+- PostgreSQL：在記憶體中組出 CSV 區塊，以 COPY ... FROM STDIN 寫入（psycopg2 與 psycopg 3 皆可）
+- 其他資料庫（SQLite）：分批以 executemany 執行 INSERT
+
+transfer_database() 在兩個資料庫之間逐表搬移資料：來源以 values_list().iterator() 串流讀取，
+每 chunk_size 筆寫入一次，記憶體用量與資料量無關；寫完後重設 PostgreSQL 序列並重建地圖數據彙總。
+"""
+
+import io
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .dbsync import sync_models
+from .importer import clear_tournament_data, reset_sequences
+from .mapstats import rebuild as rebuild_map_stats
+
+DEFAULT_COPY_CHUNK_SIZE = 5000
+
+
+def copy_columns(model):
+    return list(model._meta.concrete_fields)
+
+
+def _csv_value(value):
+    # 不加引號的空值代表 NULL，其餘一律加引號，空字串因此不會被當成 NULL
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_csv(connection, table, columns, rows):
+    qn = connection.ops.quote_name
+    sql = f"COPY {qn(table)} ({', '.join(qn(column) for column in columns)}) FROM STDIN WITH (FORMAT csv)"
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(_csv_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            raw.copy_expert(sql, buffer)
+        else:
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def _executemany(connection, table, columns, rows):
+    qn = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {qn(table)} ({', '.join(qn(column) for column in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def copy_rows(model, rows, using=DEFAULT_DB_ALIAS, chunk_size=DEFAULT_COPY_CHUNK_SIZE):
+    """
+    寫入依 copy_columns(model) 順序排列、尚未轉換的欄位值（例如 values_list 的結果）。
+    rows 可以是任意長度的 iterator，每 chunk_size 筆送出一次。回傳寫入筆數。
+    """
+    connection = connections[using]
+    fields = copy_columns(model)
+    columns = [field.column for field in fields]
+    write = _copy_csv if connection.vendor == 'postgresql' else _executemany
+
+    written = 0
+    chunk = []
+    for row in rows:
+        chunk.append([
+            field.get_db_prep_save(value, connection) for field, value in zip(fields, row)
+        ])
+        if len(chunk) >= chunk_size:
+            write(connection, model._meta.db_table, columns, chunk)
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        write(connection, model._meta.db_table, columns, chunk)
+        written += len(chunk)
+    return written
+
+
+def copy_instances(model, objs, using=DEFAULT_DB_ALIAS, chunk_size=DEFAULT_COPY_CHUNK_SIZE):
+    """以 copy_rows 寫入已指定主鍵的模型實例（取代 bulk_create）。"""
+    fields = copy_columns(model)
+    return copy_rows(
+        model,
+        ([field.pre_save(obj, True) for field in fields] for obj in objs),
+        using=using,
+        chunk_size=chunk_size,
+    )
+
+
+def transfer_database(source, target, clear=True, chunk_size=DEFAULT_COPY_CHUNK_SIZE, log=None):
+    """
+    把 source 的所有賽事資料搬到 target（依相依順序逐表寫入）。
+    clear=True 時先清空 target，整個過程在 target 的單一交易中完成。回傳 {表名: 筆數}。
+    """
+    log = log or (lambda message: None)
+    counts = Counter()
+    models = []
+    with transaction.atomic(using=target):
+        if clear:
+            clear_tournament_data(using=target)
+        for table, model in sync_models():
+            attnames = [field.attname for field in copy_columns(model)]
+            rows = model._default_manager.using(source).order_by('pk').values_list(*attnames).iterator(
+                chunk_size=chunk_size
+            )
+            counts[table] = copy_rows(model, rows, using=target, chunk_size=chunk_size)
+            models.append(model)
+            log(f'{table}: {counts[table]} 筆')
+        reset_sequences(models, target)
+        # 地圖數據彙總不在搬移的表中，由小局結果重建
+        rebuild_map_stats(using=target)
+    return counts
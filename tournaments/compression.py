@@ -0,0 +1,184 @@
+# tournaments/compression.py
+"""
+預先壓縮的動態回應快取
+
+WhiteNoise 只壓縮靜態檔；頁面與 API 回應若每次都重新壓縮，大型對戰樹頁面會在每個請求花費 CPU。
+這裡在回應第一次產生時就壓縮一次，把原文、gzip 與 brotli（有安裝 Brotli 套件時）三種版本
+一起存進快取，之後依 Accept-Encoding 直接送出已壓縮的位元組：
+
+- compressed_cache_page()：Django 函式視圖的 decorator，只快取未登入使用者的 GET / HEAD
+  （頁面中的導覽列與管理按鈕依使用者而不同），可傳入 version 函式把資料版本號放進快取鍵
+- CompressedCacheMixin：DRF APIView 在通過驗證與權限檢查後，以 cached_response() 快取 JSON 回應，
+  快取鍵包含 cache_scopes 中各 fragments scope 的整體版本號
+- uncacheable()：標記視圖捕捉例外後回傳的替代頁面，照常送出但不存入快取
+
+回應帶有 ETag（依原文計算），用戶端重新驗證時回傳 304。
+"""
+
+import gzip
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.response import Response
+
+from . import fragments
+
+try:
+    import brotli
+except ImportError:  # 選用套件
+    brotli = None
+
+# 太小的回應壓縮後反而變大
+MIN_COMPRESS_SIZE = 200
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# 同樣可接受時的優先順序
+ENCODING_PREFERENCE = ('br', 'gzip', 'identity')
+
+
+def parse_accept_encoding(header):
+    """回傳 {編碼: q 值}；'*' 代表其他未列出的編碼。"""
+    codings = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+class CompressedBody:
+    """一個回應的原文與壓縮版本（可直接存入快取）。"""
+
+    def __init__(self, content, content_type):
+        self.content_type = content_type
+        self.etag = hashlib.md5(content).hexdigest()[:20]
+        self.variants = {'identity': content}
+        if len(content) >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(content, GZIP_LEVEL, mtime=0)
+            if len(compressed) < len(content):
+                self.variants['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(content, quality=BROTLI_QUALITY)
+                if len(compressed) < len(content):
+                    self.variants['br'] = compressed
+
+    def negotiate(self, accept_encoding):
+        """選出用戶端接受（q > 0）且 q 值最高的壓縮版本，同分時依 ENCODING_PREFERENCE；都不接受時送原文。"""
+        codings = parse_accept_encoding(accept_encoding)
+        default = codings.get('*', 0.0)
+        candidates = [
+            (codings.get(encoding, default), -index, encoding)
+            for index, encoding in enumerate(ENCODING_PREFERENCE)
+            if encoding != 'identity' and encoding in self.variants
+        ]
+        q, _, encoding = max(candidates, default=(0.0, 0, 'identity'))
+        return encoding if q > 0 else 'identity'
+
+    def response(self, request):
+        encoding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+        etag = f'"{self.etag}-{encoding}"'
+        if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(self.variants[encoding], content_type=self.content_type)
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+            response['Content-Length'] = str(len(self.variants[encoding]))
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def response_cache_key(prefix, request, version=None):
+    digest = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    return f"compressed:v{getattr(settings, 'CACHE_VERSION', 1)}:{prefix}:{version}:{digest}"
+
+
+def uncacheable(response):
+    """標記回應不可存入快取（例如資料載入失敗時的暫時性頁面），回傳同一個回應。"""
+    response.skip_compressed_cache = True
+    return response
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not getattr(response, 'skip_compressed_cache', False)
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header('Content-Encoding')
+        # 頁面使用了 CSRF token 時，每個使用者的內容不同
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def compressed_cache_page(timeout, version=None):
+    """
+    用法：
+        @compressed_cache_page(600, version=lambda request, pk: fragments.get_version('tournament', pk))
+        def tournament_detail(request, pk): ...
+    """
+    def decorator(view):
+        prefix = f'{view.__module__}.{view.__name__}'
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            key = response_cache_key(prefix, request, version(request, *args, **kwargs) if version else None)
+            body = cache.get(key)
+            if body is None:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+                if not _cacheable(request, response):
+                    return response
+                body = CompressedBody(response.content, response['Content-Type'])
+                cache.set(key, body, timeout)
+            response = body.response(request)
+            # 登入後的內容不同
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapped
+    return decorator
+
+
+class CompressedCacheMixin:
+    """
+    DRF APIView 使用：
+        def get(self, request):
+            return self.cached_response(request, lambda: Serializer(queryset, many=True).data)
+
+    build 只在快取未命中時呼叫；只快取 JSON（瀏覽器的 browsable API 照常產生）。
+    cache_scopes 列出回應所依賴的 fragments scope，資料變動遞增版本號後不會讀到舊的回應。
+    """
+    cache_timeout = 60
+    cache_scopes = ()
+
+    def cached_response(self, request, build):
+        renderer = request.accepted_renderer
+        if request.method != 'GET' or renderer.format != 'json':
+            return Response(build())
+        version = fragments.get_scope_versions(self.cache_scopes) if self.cache_scopes else None
+        key = response_cache_key(type(self).__name__, request, version)
+        body = cache.get(key)
+        if body is None:
+            content = renderer.render(build(), request.accepted_media_type, self.get_renderer_context())
+            body = CompressedBody(content, renderer.media_type)
+            cache.set(key, body, self.cache_timeout)
+        return body.response(request)
@@ -0,0 +1,281 @@
+# tournaments/dbsync.py
+"""
+兩個資料庫之間的差異同步（Merkle 式的區段雜湊比對）
+
+取代原本「先數筆數、再整批複製」的比對與補資料腳本（manage.py sync_databases，--dry-run 只列出差異）：
+
+1. 每張表依主鍵範圍切成 fanout 個區段，兩邊各用一次查詢算出每個區段的筆數與雜湊
+2. 只有雜湊不同的區段才往下切；區段夠小（leaf_size 筆以內）時才把兩邊的資料列讀出來逐列比對
+3. 最後先刪除多出的資料列，再把新增、修改的資料列分批寫入目標資料庫
+
+兩邊是同一種資料庫（PostgreSQL，或 3.44 以上、支援 GROUP_CONCAT ... ORDER BY 的 SQLite）時雜湊在資料庫中計算，
+幾乎相同的兩份資料只需要每張表幾次雜湊查詢；不同種類的資料庫文字表示不一致、或舊版 SQLite 無法保證串接順序時，
+改在 Python 端逐表計算雜湊（仍只寫入差異）。
+"""
+
+import hashlib
+import math
+from collections import Counter, defaultdict
+
+import dj_database_url
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import Max, Min
+
+from .exporter import EXPORT_TABLES, _through_model
+from .importer import SPECS_BY_NAME, reset_sequences
+from .mapstats import rebuild as rebuild_map_stats
+
+DEFAULT_FANOUT = 16
+DEFAULT_LEAF_SIZE = 256
+# SQLite 的 GROUP_CONCAT 從 3.44 起才能指定串接順序
+SQLITE_ORDERED_CONCAT = (3, 44, 0)
+
+
+def sync_models():
+    """依相依順序回傳 [(表名, 模型)]，多對多關聯表放在最後。"""
+    return [
+        (table, SPECS_BY_NAME[table].model if table in SPECS_BY_NAME else _through_model(table))
+        for table in EXPORT_TABLES
+    ]
+
+
+def sql_hash_supported(connection):
+    """能否在資料庫中依主鍵順序串接雜湊。"""
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= SQLITE_ORDERED_CONCAT
+
+
+def register_database(alias, url):
+    """把資料庫網址（postgres://... 或 sqlite:///...）註冊成 Django 連線別名。"""
+    if alias not in connections.settings:
+        config = dj_database_url.parse(url)
+        connections.settings[alias] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: dict(connections.settings[DEFAULT_DB_ALIAS]),
+            alias: config,
+        })[alias]
+    return alias
+
+
+class SyncResult:
+    """每張表的同步統計。"""
+
+    COUNTERS = ('inserted', 'updated', 'deleted')
+
+    def __init__(self):
+        self.tables = defaultdict(Counter)
+        self.hash_queries = 0
+        self.rows_compared = 0
+
+    def __getitem__(self, table):
+        return self.tables[table]
+
+    @property
+    def changed(self):
+        return any(counter[key] for counter in self.tables.values() for key in self.COUNTERS)
+
+    def lines(self):
+        lines = []
+        for table, _ in sync_models():
+            counter = self.tables.get(table)
+            if counter and any(counter[key] for key in self.COUNTERS):
+                parts = [f'{key} {counter[key]}' for key in self.COUNTERS if counter[key]]
+                lines.append(f'  - {table}: {", ".join(parts)}')
+        lines.append(f'  - 雜湊查詢 {self.hash_queries} 次，逐列比對 {self.rows_compared} 筆')
+        return lines
+
+
+class _TablePlan:
+    def __init__(self, model):
+        self.model = model
+        self.columns = [field.attname for field in model._meta.concrete_fields if not field.primary_key]
+        self.inserts = []
+        self.updates = []
+        self.deletes = []
+
+
+class DatabaseSync:
+    """
+    把 target 同步成與 source 相同。
+
+    用法：
+        result = DatabaseSync('default', 'supabase').run()
+    """
+
+    def __init__(self, source, target, dry_run=False, fanout=DEFAULT_FANOUT,
+                 leaf_size=DEFAULT_LEAF_SIZE, batch_size=500, tables=None, log=None):
+        self.source = source
+        self.target = target
+        self.dry_run = dry_run
+        self.fanout = max(2, fanout)
+        self.leaf_size = max(1, leaf_size)
+        self.batch_size = batch_size
+        self.tables = tables
+        self.log = log or (lambda message: None)
+        self.result = SyncResult()
+
+        self.sql_hash = (
+            connections[source].vendor == connections[target].vendor
+            and sql_hash_supported(connections[source]) and sql_hash_supported(connections[target])
+        )
+
+    def run(self):
+        plans = []
+        for table, model in sync_models():
+            if self.tables and table not in self.tables:
+                continue
+            plan = _TablePlan(model)
+            self._diff_table(table, plan)
+            plans.append((table, plan))
+
+        if not self.dry_run:
+            self._apply(plans)
+        return self.result
+
+    # --- 比對 ---
+
+    def _diff_table(self, table, plan):
+        bounds = [
+            plan.model._default_manager.using(alias).aggregate(lo=Min('pk'), hi=Max('pk'))
+            for alias in (self.source, self.target)
+        ]
+        los = [b['lo'] for b in bounds if b['lo'] is not None]
+        if not los:
+            return
+        lo = min(los)
+        hi = max(b['hi'] for b in bounds if b['hi'] is not None) + 1
+
+        if self.sql_hash:
+            self._diff_range(table, plan, lo, hi)
+        else:
+            # Python 端計算雜湊需要讀完整張表，直接以葉節點大小分段，只讀一次
+            self._compare_buckets(table, plan, lo, hi, self.leaf_size)
+
+    def _diff_range(self, table, plan, lo, hi):
+        width = max(1, math.ceil((hi - lo) / self.fanout))
+        self._compare_buckets(table, plan, lo, hi, width)
+
+    def _compare_buckets(self, table, plan, lo, hi, width):
+        source = self._bucket_digests(plan, self.source, lo, hi, width)
+        target = self._bucket_digests(plan, self.target, lo, hi, width)
+        for bucket in sorted(set(source) | set(target)):
+            if source.get(bucket) == target.get(bucket):
+                continue
+            bucket_lo = lo + bucket * width
+            bucket_hi = min(hi, bucket_lo + width)
+            rows = max(source.get(bucket, (0, ''))[0], target.get(bucket, (0, ''))[0])
+            if rows <= self.leaf_size or width == 1:
+                self._diff_rows(table, plan, bucket_lo, bucket_hi)
+            else:
+                self._diff_range(table, plan, bucket_lo, bucket_hi)
+
+    def _bucket_digests(self, plan, alias, lo, hi, width):
+        """回傳 {區段編號: (筆數, 雜湊)}。"""
+        self.result.hash_queries += 1
+        if self.sql_hash:
+            return self._sql_bucket_digests(plan, alias, lo, hi, width)
+
+        digests = {}
+        queryset = plan.model._default_manager.using(alias).filter(pk__gte=lo, pk__lt=hi).order_by('pk')
+        for row in queryset.values_list('pk', *plan.columns).iterator(chunk_size=2000):
+            bucket = (row[0] - lo) // width
+            count, digest = digests.get(bucket, (0, hashlib.md5()))
+            digest.update(repr(row).encode('utf-8'))
+            digests[bucket] = (count + 1, digest)
+        return {bucket: (count, digest.hexdigest()) for bucket, (count, digest) in digests.items()}
+
+    def _sql_bucket_digests(self, plan, alias, lo, hi, width):
+        connection = connections[alias]
+        qn = connection.ops.quote_name
+        meta = plan.model._meta
+        pk = qn(meta.pk.column)
+        columns = [meta.pk.column] + [meta.get_field(name).column for name in plan.columns]
+        # 每個欄位以 N（NULL）或 V+文字 表示，避免 NULL 與空字串混淆
+        row_text = " || '|' || ".join(
+            f"(CASE WHEN {qn(column)} IS NULL THEN 'N' ELSE 'V' || CAST({qn(column)} AS TEXT) END)"
+            for column in columns
+        )
+        bucket = f'(({pk} - %s) / %s)'
+        if connection.vendor == 'postgresql':
+            sql = (
+                f"SELECT {bucket} AS bucket, COUNT(*), MD5(STRING_AGG(MD5({row_text}), '' ORDER BY {pk})) "
+                f"FROM {qn(meta.db_table)} WHERE {pk} >= %s AND {pk} < %s GROUP BY 1"
+            )
+        else:
+            # SQLite 不保證子查詢的排序會帶到 GROUP_CONCAT，必須在彙總函式中指定（sql_hash_supported）
+            sql = (
+                f"SELECT {bucket} AS bucket, COUNT(*), MD5(GROUP_CONCAT(MD5({row_text}), '' ORDER BY {pk})) "
+                f"FROM {qn(meta.db_table)} WHERE {pk} >= %s AND {pk} < %s GROUP BY 1"
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [lo, width, lo, hi])
+            return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    def _fetch_rows(self, plan, alias, lo, hi):
+        queryset = plan.model._default_manager.using(alias).filter(pk__gte=lo, pk__lt=hi)
+        return {row['id']: row for row in queryset.values('id', *plan.columns)}
+
+    def _diff_rows(self, table, plan, lo, hi):
+        source = self._fetch_rows(plan, self.source, lo, hi)
+        target = self._fetch_rows(plan, self.target, lo, hi)
+        self.result.rows_compared += len(source) + len(target)
+        for pk, row in source.items():
+            if pk not in target:
+                plan.inserts.append(row)
+                self.result[table]['inserted'] += 1
+            elif target[pk] != row:
+                plan.updates.append(row)
+                self.result[table]['updated'] += 1
+        for pk in target.keys() - source.keys():
+            plan.deletes.append(pk)
+            self.result[table]['deleted'] += 1
+
+    # --- 寫入 ---
+
+    def _delete_dependents(self, model, pks, synced):
+        """不在同步範圍內、參照這些資料列的資料（例如隊伍時段、地圖數據彙總）依 on_delete 刪除或清空。"""
+        for relation in model._meta.get_fields(include_hidden=True):
+            # 反向的外鍵（含多對多關聯表的外鍵）
+            if relation.concrete or not (relation.one_to_many or relation.one_to_one):
+                continue
+            if relation.related_model in synced:
+                continue
+            dependents = relation.related_model._default_manager.using(self.target).filter(
+                **{f'{relation.field.name}__in': pks}
+            )
+            if relation.on_delete is models.SET_NULL:
+                dependents.update(**{relation.field.name: None})
+            else:
+                dependents.delete()
+
+    def _apply(self, plans):
+        """
+        先以反向相依順序刪除多出的資料列，再依相依順序寫入新增與修改。
+        刪除直接執行 DELETE（不經過 CASCADE 與 signal），同步範圍內的關聯資料列各自依比對結果處理，
+        外鍵在交易提交時才檢查；刪除後以新主鍵重建、唯一欄位相同的資料列因此不會與新增衝突。
+        """
+        created_models = set()
+        synced = {plan.model for table, plan in plans}
+        with transaction.atomic(using=self.target):
+            for table, plan in reversed(plans):
+                if plan.deletes:
+                    manager = plan.model._default_manager.using(self.target)
+                    for start in range(0, len(plan.deletes), self.batch_size):
+                        pks = plan.deletes[start:start + self.batch_size]
+                        self._delete_dependents(plan.model, pks, synced)
+                        manager.filter(pk__in=pks)._raw_delete(self.target)
+                    self.log(f'{table}: 刪除 {len(plan.deletes)} 筆')
+            for table, plan in plans:
+                manager = plan.model._default_manager.using(self.target)
+                if plan.inserts:
+                    manager.bulk_create([plan.model(**row) for row in plan.inserts], batch_size=self.batch_size)
+                    created_models.add(plan.model)
+                if plan.updates and plan.columns:
+                    manager.bulk_update([plan.model(**row) for row in plan.updates], plan.columns,
+                                        batch_size=self.batch_size)
+                if plan.inserts or plan.updates:
+                    self.log(f'{table}: 寫入 {len(plan.inserts)} 筆、更新 {len(plan.updates)} 筆')
+            reset_sequences(created_models, self.target)
+            # 地圖數據彙總不在同步的表中，由小局結果重建
+            if any(plan.inserts or plan.updates or plan.deletes for table, plan in plans if table in ('matches', 'games')):
+                rebuild_map_stats(using=self.target)
@@ -0,0 +1,182 @@
+# tournaments/draw.py
+"""
+分組抽籤
+
+GroupDraw 把參賽隊伍分配到 num_groups 個分組：
+
+- 種子順序（seeding）：random 隨機、rating 依 Elo 積分、manual 依手動指定的種子序號
+  （未指定序號的隊伍排在後面，依積分排序）
+- 分配方式（method）：
+  - snake：依種子順序蛇形分配（1→A、2→B…，每一列反向）
+  - pots：每 num_groups 支隊伍一個種子籃，籃內隨機抽到不同分組
+- separate_schools：同一學校（Team.school）的隊伍盡量分到不同分組。抽籤前先檢查是否可行
+  （某學校的隊伍數超過分組數時無法完全分開），有衝突時以回溯搜尋調整，盡量保持原本的種子位置
+
+draw() 只在記憶體中計算（預覽），save() 在單一交易中清除舊分組後，以三次 bulk 寫入分組、
+分組隊伍關聯與積分榜（既有積分榜只更新分組）。
+"""
+
+import random
+
+from django.db import transaction
+
+from .models import Group, Standing
+from .ratings import seeding_order
+
+SEEDINGS = ('random', 'rating', 'manual')
+METHODS = ('snake', 'pots')
+# 回溯搜尋的嘗試次數上限
+MAX_STEPS = 100000
+
+
+class DrawError(ValueError):
+    pass
+
+
+def group_name(index):
+    return chr(65 + index) + '組'  # A組, B組, C組...
+
+
+class GroupDraw:
+    """
+    用法：
+        draw = GroupDraw(tournament, 4, seeding='rating', method='snake')
+        preview = draw.draw()     # [[team, ...], ...]，不寫入資料庫
+        groups = draw.save()      # 清除舊分組後寫入
+    """
+
+    def __init__(self, tournament, num_groups, seeding='random', method='snake', separate_schools=True,
+                 manual_seeds=None, seed=None, teams=None):
+        if seeding not in SEEDINGS:
+            raise DrawError(f'不支援的種子方式: {seeding}')
+        if method not in METHODS:
+            raise DrawError(f'不支援的分配方式: {method}')
+        self.tournament = tournament
+        self.num_groups = num_groups
+        self.seeding = seeding
+        self.method = method
+        self.separate_schools = separate_schools
+        self.manual_seeds = manual_seeds or {}
+        self.random = random.Random(seed)
+        self.teams = list(teams) if teams is not None else list(tournament.participants.all())
+        self.assignments = None
+
+    # --- 檢查 ---
+
+    def validate(self):
+        if self.num_groups < 1:
+            raise DrawError('分組數量必須大於 0')
+        if len(self.teams) < self.num_groups:
+            raise DrawError(f'參賽隊伍數量({len(self.teams)})不能少於分組數量({self.num_groups})')
+        if self.separate_schools:
+            counts = {}
+            for team in self.teams:
+                if team.school:
+                    counts[team.school] = counts.get(team.school, 0) + 1
+            crowded = [school for school, count in counts.items() if count > self.num_groups]
+            if crowded:
+                raise DrawError(
+                    f"以下學校的隊伍數超過分組數，無法分到不同分組: {', '.join(sorted(crowded))}"
+                    '（請增加分組數或取消同校分開）'
+                )
+
+    # --- 抽籤 ---
+
+    def ordered_teams(self):
+        if self.seeding == 'random':
+            teams = list(self.teams)
+            self.random.shuffle(teams)
+            return teams
+        teams = seeding_order(self.teams)
+        if self.seeding == 'manual':
+            unseeded = len(teams) + 1
+            teams.sort(key=lambda team: self.manual_seeds.get(team.pk, unseeded))
+        return teams
+
+    def draw(self):
+        self.validate()
+        ordered = self.ordered_teams()
+        rows = [ordered[start:start + self.num_groups] for start in range(0, len(ordered), self.num_groups)]
+        preferences = []
+        for row_index in range(len(rows)):
+            preferred = list(range(self.num_groups))
+            if self.method == 'pots':
+                self.random.shuffle(preferred)
+            elif row_index % 2:
+                preferred.reverse()
+            preferences.append(preferred)
+
+        groups = [[] for _ in range(self.num_groups)]
+        self.steps = 0
+        if not self._place(rows, preferences, groups, 0, 0, set()):
+            raise DrawError('無法在同校分開的限制下完成分組，請調整分組數或取消同校分開')
+        self.assignments = groups
+        return groups
+
+    def _conflicts(self, team, group):
+        return self.separate_schools and bool(team.school) and any(other.school == team.school for other in group)
+
+    def _place(self, rows, preferences, groups, row_index, position, used):
+        """
+        回溯搜尋：每一列的隊伍分到不同分組（各組人數因此保持平均），
+        第 i 支隊伍優先放到該列的 preferred[i]，有同校衝突時依序嘗試其他分組，整列無解時退回上一列。
+        """
+        if row_index == len(rows):
+            return True
+        row = rows[row_index]
+        if position == len(row):
+            return self._place(rows, preferences, groups, row_index + 1, 0, set())
+        team, preferred = row[position], preferences[row_index]
+        options = [preferred[position]] + [index for index in preferred if index != preferred[position]]
+        for index in options:
+            if index in used or self._conflicts(team, groups[index]):
+                continue
+            self.steps += 1
+            if self.steps > MAX_STEPS:
+                raise DrawError('同校分開的限制過多，無法在合理時間內完成抽籤，請調整分組數或取消同校分開')
+            groups[index].append(team)
+            used.add(index)
+            if self._place(rows, preferences, groups, row_index, position + 1, used):
+                return True
+            groups[index].pop()
+            used.discard(index)
+        return False
+
+    # --- 寫入 ---
+
+    def save(self):
+        """清除舊分組並寫入新的分組（三次 bulk 寫入，單一交易）。回傳建立的 Group 列表。"""
+        assignments = self.assignments or self.draw()
+        through = Group.teams.through
+        with transaction.atomic():
+            # 刪除分組會連帶刪除積分榜（CASCADE），先解除關聯，已有的戰績才會保留
+            Standing.objects.filter(tournament=self.tournament, group__isnull=False).update(group=None)
+            self.tournament.groups.all().delete()
+            groups = Group.objects.bulk_create([
+                Group(tournament=self.tournament, name=group_name(index),
+                      max_teams=max(len(teams), Group._meta.get_field('max_teams').default))
+                for index, teams in enumerate(assignments)
+            ])
+            through.objects.bulk_create([
+                through(group_id=group.pk, team_id=team.pk)
+                for group, teams in zip(groups, assignments)
+                for team in teams
+            ])
+            # 既有積分榜（unique: tournament + team）只更新分組，其餘新建
+            Standing.objects.bulk_create(
+                [
+                    Standing(tournament=self.tournament, team=team, group=group)
+                    for group, teams in zip(groups, assignments)
+                    for team in teams
+                ],
+                update_conflicts=True,
+                unique_fields=['tournament', 'team'],
+                update_fields=['group'],
+            )
+
+        # bulk 寫入不觸發 m2m_changed，清掉這個賽事的對戰矩陣快取
+        from . import fragments
+        from .headtohead import invalidate_tournaments
+        invalidate_tournaments([self.tournament.pk])
+        fragments.bump('tournament', [self.tournament.pk])
+        return groups
@@ -0,0 +1,244 @@
+# tournaments/exporter.py
+"""
+串流資料匯出
+
+export_data 指令、頂層的 export_production_data.py 與 Admin 的匯出端點都透過這裡輸出資料：
+
+- 每張表依主鍵順序以 values().iterator(chunk_size=...) 讀取，不建立模型實例，
+  記憶體用量只與單一區塊大小有關
+- 輸出格式為 NDJSON（每行 {"table": ..., "record": ...}）或 production_data.json 的
+  「表名 → 陣列」格式，兩者都可直接交給 tournaments.importer 匯入
+- 可以只匯出指定賽事相關的資料
+- NDJSON 檔案每寫完一個區塊就記錄進度（<檔名>.progress），中斷後可從最後完成的區塊繼續；
+  .gz 檔案的每個區塊是獨立的 gzip member，截斷到上一個區塊後仍是合法的壓縮檔
+"""
+
+import gzip
+import json
+import os
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+
+from .importer import M2M_TABLES, SPECS_BY_NAME, TABLE_SPECS, is_ndjson_path
+from .models import Group, Match, Standing
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+# 資料表輸出順序與匯入引擎的相依順序相同，多對多關聯放在最後
+EXPORT_TABLES = [spec.name for spec in TABLE_SPECS] + list(M2M_TABLES)
+
+FORMATS = ('ndjson', 'json')
+
+
+def _through_model(table):
+    owner, field_name, _, _ = M2M_TABLES[table]
+    return SPECS_BY_NAME[owner].m2m_fields[field_name].remote_field.through
+
+
+def export_querysets(tournament_ids=None, using=DEFAULT_DB_ALIAS):
+    """
+    回傳 {表名: QuerySet}。
+    指定 tournament_ids 時只包含這些賽事，以及參賽、出賽或出現在積分榜上的隊伍與其選手。
+    """
+    querysets = {}
+    for table in EXPORT_TABLES:
+        model = SPECS_BY_NAME[table].model if table in SPECS_BY_NAME else _through_model(table)
+        querysets[table] = model._default_manager.using(using).all()
+
+    if tournament_ids is None:
+        return querysets
+
+    ids = list(tournament_ids)
+    participants = _through_model('participants')._default_manager.using(using)
+    matches = Match.objects.using(using).filter(tournament_id__in=ids)
+    team_scope = (
+        Q(pk__in=participants.filter(tournament_id__in=ids).values('team_id'))
+        | Q(pk__in=matches.values('team1_id'))
+        | Q(pk__in=matches.values('team2_id'))
+        | Q(pk__in=Standing.objects.using(using).filter(tournament_id__in=ids).values('team_id'))
+    )
+    team_ids = querysets['teams'].filter(team_scope).values('pk')
+
+    querysets['tournaments'] = querysets['tournaments'].filter(pk__in=ids)
+    querysets['teams'] = querysets['teams'].filter(pk__in=team_ids)
+    querysets['players'] = querysets['players'].filter(team_id__in=team_ids)
+    querysets['groups'] = querysets['groups'].filter(tournament_id__in=ids)
+    querysets['matches'] = querysets['matches'].filter(tournament_id__in=ids)
+    querysets['games'] = querysets['games'].filter(match__tournament_id__in=ids)
+    querysets['standings'] = querysets['standings'].filter(tournament_id__in=ids)
+    querysets['player_stats'] = querysets['player_stats'].filter(game__match__tournament_id__in=ids)
+    querysets['participants'] = querysets['participants'].filter(tournament_id__in=ids)
+    querysets['group_teams'] = querysets['group_teams'].filter(
+        group_id__in=Group.objects.using(using).filter(tournament_id__in=ids).values('pk')
+    )
+    return querysets
+
+
+def iter_export_blocks(tournament_ids=None, start=None, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+                       using=DEFAULT_DB_ALIAS):
+    """
+    依表與主鍵順序逐區塊產生 (表名, [資料, ...])，每個區塊最多 chunk_size 筆。
+    start=(表名, 最後主鍵) 時從該表主鍵之後繼續，前面的表直接略過。
+    """
+    querysets = export_querysets(tournament_ids, using)
+    start_table, last_pk = start if start else (EXPORT_TABLES[0], None)
+    if start_table not in querysets:
+        raise ValueError(f'未知的資料表: {start_table}')
+
+    for table in EXPORT_TABLES[EXPORT_TABLES.index(start_table):]:
+        queryset = querysets[table]
+        if table == start_table and last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        block = []
+        for record in queryset.order_by('pk').values().iterator(chunk_size=chunk_size):
+            block.append(record)
+            if len(block) >= chunk_size:
+                yield table, block
+                block = []
+        if block:
+            yield table, block
+
+
+def dumps_record(record):
+    return json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def ndjson_block(table, block):
+    return ''.join(
+        f'{{"table": {json.dumps(table)}, "record": {dumps_record(record)}}}\n' for record in block
+    )
+
+
+def iter_json_text(blocks):
+    """把區塊轉成 production_data.json 格式的文字片段。"""
+    current = None
+    yield '{'
+    for table, block in blocks:
+        if table != current:
+            yield ('\n  ],\n' if current else '\n') + f'  {json.dumps(table)}: [\n'
+            separator = '    '
+            current = table
+        for record in block:
+            yield separator + dumps_record(record)
+            separator = ',\n    '
+    yield ('\n  ]\n' if current else '') + '}\n'
+
+
+def iter_export_text(fmt, tournament_ids=None, start=None, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+                     using=DEFAULT_DB_ALIAS):
+    if fmt not in FORMATS:
+        raise ValueError(f'不支援的匯出格式: {fmt}')
+    blocks = iter_export_blocks(tournament_ids, start, chunk_size, using)
+    if fmt == 'json':
+        return iter_json_text(blocks)
+    return (ndjson_block(table, block) for table, block in blocks)
+
+
+def iter_gzip_bytes(text_chunks):
+    """把文字片段壓縮成 gzip 串流，每個片段後 sync flush，讓用戶端可以邊收邊解。"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in text_chunks:
+        data = compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ===== 寫入檔案 =====
+
+def progress_path(path):
+    return f'{path}.progress'
+
+
+def _read_progress(path):
+    try:
+        with open(progress_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_progress(path, state):
+    tmp_path = progress_path(path) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, progress_path(path))
+
+
+def export_to_file(path, tournament_ids=None, resume=False, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+                   using=DEFAULT_DB_ALIAS, log=None):
+    """
+    匯出到檔案，依副檔名決定格式（.ndjson / .json，可加 .gz）。
+    回傳 {表名: 筆數}（續傳時只計算本次寫入的部分）。
+    """
+    log = log or (lambda message: None)
+    path = str(path)
+    compressed = path.endswith('.gz')
+    scope = sorted(tournament_ids) if tournament_ids is not None else None
+    counts = {}
+
+    if not is_ndjson_path(path):
+        if resume:
+            raise ValueError('只有 NDJSON 格式支援續傳')
+        with (gzip.open(path, 'wt', encoding='utf-8') if compressed
+              else open(path, 'w', encoding='utf-8')) as fp:
+            blocks = iter_export_blocks(scope, None, chunk_size, using)
+            for text in iter_json_text(_counting(blocks, counts, log)):
+                fp.write(text)
+        return counts
+
+    start = None
+    offset = 0
+    state = _read_progress(path) if resume and os.path.exists(path) else None
+    if state is not None:
+        if state['tournaments'] != scope:
+            raise ValueError('進度檔的匯出範圍與本次指定的賽事不同，請改為重新匯出')
+        start = (state['table'], state['last_pk'])
+        offset = state['offset']
+        log(f'從 {state["table"]} #{state["last_pk"]} 之後繼續匯出')
+    elif resume:
+        log('找不到進度檔，重新匯出')
+
+    with open(path, 'r+b' if state is not None else 'wb') as fp:
+        # 丟掉中斷時寫到一半的區塊
+        fp.truncate(offset)
+        fp.seek(offset)
+        for table, block in _counting(iter_export_blocks(scope, start, chunk_size, using), counts, log):
+            data = ndjson_block(table, block).encode('utf-8')
+            fp.write(gzip.compress(data) if compressed else data)
+            fp.flush()
+            _write_progress(path, {
+                'tournaments': scope,
+                'table': table,
+                'last_pk': block[-1]['id'],
+                'offset': fp.tell(),
+            })
+
+    if os.path.exists(progress_path(path)):
+        os.remove(progress_path(path))
+    return counts
+
+
+def _counting(blocks, counts, log):
+    for table, block in blocks:
+        if table not in counts:
+            log(f'匯出 {table}...')
+        counts[table] = counts.get(table, 0) + len(block)
+        yield table, block
+
+
+def parse_resume_token(token):
+    """解析 HTTP 續傳參數 '表名:最後主鍵'。"""
+    table, _, last_pk = token.partition(':')
+    if table not in EXPORT_TABLES or not last_pk.isdigit():
+        raise ValueError(f'無效的續傳位置: {token}')
+    return table, int(last_pk)
+
+
+def export_filename(fmt, tournament_ids=None):
+    suffix = '' if tournament_ids is None else '_' + '_'.join(map(str, sorted(tournament_ids)))
+    return f'production_data{suffix}.{fmt}.gz'
+
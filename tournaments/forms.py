@@ -1,5 +1,6 @@
 from django import forms
 from .models import Tournament, Team
+from .roster import RosterError, parse_roster
 
 class TournamentCreationStep1Form(forms.ModelForm):
     """
@@ -19,6 +20,31 @@ class TeamCreationStep2Form(forms.Form):
     """
     teams_text = forms.CharField(
         widget=forms.Textarea,
+        required=False,
         label="參賽隊伍名單",
-        help_text="請每行輸入一個隊伍名稱。例如：\n隊伍A\n隊伍B\n隊伍C"
-    )
\ No newline at end of file
+        help_text="請每行輸入一個隊伍名稱，或貼上 CSV / TSV 名單（隊伍, 學校, 選手暱稱, 角色，每列一位選手）。例如：\n"
+                  "隊伍A,第一高中,Alpha,Duelist\n隊伍A,第一高中,Bravo,守衛\n隊伍B"
+    )
+    roster_file = forms.FileField(
+        required=False,
+        label="上傳名單檔案",
+        help_text="CSV 或 TSV 檔（UTF-8），格式同上；上傳檔案時會忽略上方文字欄位"
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('roster_file')
+        if upload:
+            try:
+                text = upload.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise forms.ValidationError('名單檔案必須是 UTF-8 編碼')
+        else:
+            text = cleaned_data.get('teams_text', '')
+        if not text.strip():
+            raise forms.ValidationError('請輸入參賽隊伍名單或上傳名單檔案')
+        try:
+            cleaned_data['roster'] = parse_roster(text)
+        except RosterError as e:
+            raise forms.ValidationError([f'第 {line} 行：{message}' for line, message in e.errors])
+        return cleaned_data
\ No newline at end of file
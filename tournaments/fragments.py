@@ -0,0 +1,73 @@
+# tournaments/fragments.py
+"""
+模板片段快取的版本計數器
+
+公開頁面以 Django 內建的 {% cache %} 快取積分榜、輪次區塊與隊伍卡片，快取鍵包含資料的版本號：
+
+    {% load cache fragments %}
+    {% fragment_version 'tournament' tournament.pk as version %}
+    {% cache 86400 tournament_standings tournament.pk version %} ... {% endcache %}
+
+資料變動時只需遞增版本號（bump），舊片段不必逐一刪除，自然過期；沒有變動的片段在不同請求、不同使用者間共用。
+
+- 'tournament'：賽事本身、比賽、小局、分組與積分榜（signals、batch_updates 結束、分組抽籤、名次重算時遞增）
+- 'team'：隊伍名稱與 Logo（隊伍卡片）
+
+每個 scope 另有整體版本號（pk 為 ALL），任何一筆資料遞增時一併遞增，供列出全部資料的快取（API 清單）使用。
+
+版本號不會過期；若被快取淘汰，重新以目前時間（毫秒）產生，不會與舊的版本號重複。
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+SCOPES = ('tournament', 'team')
+ALL = 'all'
+
+
+def version_key(scope, pk):
+    return f"fragver:v{getattr(settings, 'CACHE_VERSION', 1)}:{scope}:{pk}"
+
+
+def _new_version():
+    return int(time.time() * 1000)
+
+
+def get_versions(scope, pks):
+    """回傳 {pk: 版本號}，一次 get_many。"""
+    keys = {version_key(scope, pk): pk for pk in pks if pk is not None}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    for key, pk in keys.items():
+        if key not in found:
+            # add 在其他請求搶先建立時不會覆寫，以快取中的值為準
+            cache.add(key, _new_version(), None)
+            versions[pk] = cache.get(key)
+    return versions
+
+
+def get_version(scope, pk):
+    return get_versions(scope, [pk]).get(pk)
+
+
+def get_scope_versions(scopes):
+    """回傳各 scope 整體版本號組成的字串，例如 '1718000000000-1718000000123'，可直接放進快取鍵。"""
+    return '-'.join(str(get_version(scope, ALL)) for scope in scopes)
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def bump(scope, pks):
+    """遞增版本號，讓這些資料的片段快取失效；有任何一筆時也遞增整體版本號。"""
+    pks = {pk for pk in pks if pk is not None}
+    for pk in pks:
+        _incr(version_key(scope, pk))
+    if pks:
+        _incr(version_key(scope, ALL))
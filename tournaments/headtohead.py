@@ -0,0 +1,263 @@
+# tournaments/headtohead.py
+"""
+分組對戰矩陣（head-to-head）
+
+每個分組一份「隊伍 × 隊伍」矩陣，存在快取中：
+- team_ids：組內隊伍 id（依 id 排序），位置即矩陣索引
+- cells：array('i')，每個有序配對 (i, j) 佔 FIELDS 個整數，記錄 i 對 j 的勝、和、敗、地圖差與回合差
+- matches：每場比賽目前計入的貢獻，比賽重新儲存時先扣掉舊的再加上新的，更新不會重複計算
+
+矩陣以一次查詢（比賽 LEFT JOIN 小局加總）建立；比賽或小局儲存時由 signals 呼叫 update_match()
+就地修改快取中的矩陣，對戰表與同分比較讀取任何一格都是 O(1)：
+
+- 對戰表：cross_table()
+- 同分比較（tiebreakers.update_tiebreakers）：分組循環的 head_to_head 條件讀取 get_group_matrix() 的
+  mini_table()；其他賽制沒有分組，以同一份比賽資料建立不快取的矩陣。比賽列（completed_match_rows）與
+  每場比賽的貢獻（match_contribution）兩邊共用
+"""
+
+from array import array
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q, Sum
+
+from .models import Group, Match, Standing
+
+FIELDS = ('wins', 'draws', 'losses', 'map_diff', 'round_diff')
+WIDTH = len(FIELDS)
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class Cell(namedtuple('Cell', FIELDS)):
+    __slots__ = ()
+
+    @property
+    def played(self):
+        return self.wins + self.draws + self.losses
+
+    @property
+    def points(self):
+        """對戰積分：勝 3、和 1。"""
+        return 3 * self.wins + self.draws
+
+
+def cache_key(group_id):
+    return f"h2h_v{getattr(settings, 'CACHE_VERSION', 1)}_group_{group_id}"
+
+
+def group_team_ids(group, using=DEFAULT_DB_ALIAS):
+    """組內隊伍：優先使用 Group.teams，舊資料沒有直接關聯時退回積分榜的分組欄位。"""
+    team_ids = list(Group.teams.through.objects.using(using).filter(group_id=group.pk).values_list('team_id', flat=True))
+    if not team_ids:
+        team_ids = list(Standing.objects.using(using).filter(group_id=group.pk).values_list('team_id', flat=True))
+    return sorted(set(team_ids))
+
+
+def match_contribution(row):
+    """
+    把一場已完成比賽轉成 (team1_id, team2_id, 結果, 地圖差, 回合差)，皆以 team1 的角度計算。
+    row 需要 team1_id、team2_id、winner_id、team1_score、team2_score、rounds1、rounds2。
+    """
+    if row['winner_id'] is None:
+        outcome = 0
+    else:
+        outcome = 1 if row['winner_id'] == row['team1_id'] else -1
+    map_diff = (row['team1_score'] or 0) - (row['team2_score'] or 0)
+    round_diff = (row['rounds1'] or 0) - (row['rounds2'] or 0)
+    return (row['team1_id'], row['team2_id'], outcome, map_diff, round_diff)
+
+
+def completed_match_rows(queryset):
+    """已完成且雙方確定的比賽，附上小局回合加總（match_contribution 需要的欄位）。"""
+    return queryset.filter(status='completed', team1__isnull=False, team2__isnull=False).values(
+        'id', 'team1_id', 'team2_id', 'winner_id', 'team1_score', 'team2_score'
+    ).annotate(rounds1=Sum('games__team1_score'), rounds2=Sum('games__team2_score'))
+
+
+class HeadToHeadMatrix:
+
+    def __init__(self, group_id, team_ids, cells=None, matches=None):
+        self.group_id = group_id
+        self.team_ids = list(team_ids)
+        self.index = {team_id: i for i, team_id in enumerate(self.team_ids)}
+        size = len(self.team_ids) ** 2 * WIDTH
+        self.cells = cells if cells is not None else array('i', bytes(size * array('i').itemsize))
+        self.matches = matches if matches is not None else {}
+
+    # --- 建立與快取 ---
+
+    @classmethod
+    def build(cls, group, using=DEFAULT_DB_ALIAS):
+        team_ids = group_team_ids(group, using)
+        matrix = cls(group.pk, team_ids)
+        if len(team_ids) > 1:
+            rows = completed_match_rows(Match.objects.using(using).filter(
+                tournament_id=group.tournament_id, team1_id__in=team_ids, team2_id__in=team_ids,
+            ))
+            for row in rows:
+                matrix.apply(row['id'], match_contribution(row))
+        return matrix
+
+    def to_cache(self):
+        return {'team_ids': self.team_ids, 'cells': self.cells, 'matches': self.matches}
+
+    @classmethod
+    def from_cache(cls, group_id, data):
+        return cls(group_id, data['team_ids'], data['cells'], data['matches'])
+
+    def save(self):
+        cache.set(cache_key(self.group_id), self.to_cache(), CACHE_TIMEOUT)
+
+    # --- 修改 ---
+
+    def _add(self, a, b, outcome, map_diff, round_diff, sign):
+        offset = (a * len(self.team_ids) + b) * WIDTH
+        self.cells[offset + (0 if outcome > 0 else 1 if outcome == 0 else 2)] += sign
+        self.cells[offset + 3] += sign * map_diff
+        self.cells[offset + 4] += sign * round_diff
+
+    def _apply(self, contribution, sign):
+        team1_id, team2_id, outcome, map_diff, round_diff = contribution
+        a, b = self.index[team1_id], self.index[team2_id]
+        self._add(a, b, outcome, map_diff, round_diff, sign)
+        self._add(b, a, -outcome, -map_diff, -round_diff, sign)
+
+    def covers(self, contribution):
+        return contribution[0] in self.index and contribution[1] in self.index
+
+    def sync(self, contributions):
+        """
+        讓矩陣與 contributions（{比賽 id: match_contribution()}，整個賽事的比賽）一致，只計入兩隊都在矩陣中的比賽；
+        回傳是否有變動（例如 queryset.update 等不經過 signal 的寫入之後）。
+        """
+        wanted = {match_id: value for match_id, value in contributions.items() if self.covers(value)}
+        changed = False
+        for match_id in self.matches.keys() - wanted.keys():
+            self.apply(match_id, None)
+            changed = True
+        for match_id, value in wanted.items():
+            if self.matches.get(match_id) != value:
+                self.apply(match_id, value)
+                changed = True
+        return changed
+
+    def apply(self, match_id, contribution):
+        """計入一場比賽；contribution 為 None 代表比賽已不計分（刪除或改回未完成）。"""
+        previous = self.matches.pop(match_id, None)
+        if previous is not None:
+            self._apply(previous, -1)
+        if contribution is not None:
+            self._apply(contribution, 1)
+            self.matches[match_id] = contribution
+
+    # --- 讀取 ---
+
+    def cell(self, team_id, opponent_id):
+        """team_id 對 opponent_id 的戰績；任一隊不在分組中時回傳 None。"""
+        a, b = self.index.get(team_id), self.index.get(opponent_id)
+        if a is None or b is None:
+            return None
+        offset = (a * len(self.team_ids) + b) * WIDTH
+        return Cell(*self.cells[offset:offset + WIDTH])
+
+    def mini_table(self, team_ids):
+        """只計算 team_ids 彼此之間的比賽，回傳 {team_id: Cell}，用於同分隊伍的比較。"""
+        table = {}
+        for team_id in team_ids:
+            totals = [0] * WIDTH
+            for opponent_id in team_ids:
+                if opponent_id != team_id:
+                    cell = self.cell(team_id, opponent_id)
+                    if cell is not None:
+                        for k in range(WIDTH):
+                            totals[k] += cell[k]
+            table[team_id] = Cell(*totals)
+        return table
+
+    def cross_table(self, teams):
+        """依 teams 的順序產生對戰表：[{'team': team, 'cells': [Cell 或 None（自己）, ...]}]。"""
+        return [
+            {
+                'team': team,
+                'cells': [None if other.pk == team.pk else self.cell(team.pk, other.pk) for other in teams],
+            }
+            for team in teams
+        ]
+
+
+def get_group_matrix(group, using=DEFAULT_DB_ALIAS, contributions=None, team_ids=None):
+    """
+    分組的矩陣（快取只用於 default 資料庫）。
+
+    呼叫端已載入賽事的比賽時傳入 contributions（{比賽 id: match_contribution()}），不再查詢比賽：
+    快取命中時以它校正快取中的矩陣；未命中時直接以它建立。未命中時若另外傳入 team_ids（例如同分比較的
+    分區隊伍），以這些隊伍建立臨時矩陣、不寫入快取（對戰表的快取矩陣以 group_team_ids() 為準）。
+    """
+    cached = using == DEFAULT_DB_ALIAS
+    data = cache.get(cache_key(group.pk)) if cached else None
+    if data is not None:
+        matrix = HeadToHeadMatrix.from_cache(group.pk, data)
+        if contributions is None or not matrix.sync(contributions):
+            return matrix
+    elif contributions is None:
+        matrix = HeadToHeadMatrix.build(group, using)
+    else:
+        matrix = HeadToHeadMatrix(group.pk, sorted(team_ids) if team_ids is not None else group_team_ids(group, using))
+        matrix.sync(contributions)
+        cached = cached and team_ids is None
+    if cached:
+        matrix.save()
+    return matrix
+
+
+def invalidate_group(group_id):
+    cache.delete(cache_key(group_id))
+
+
+def invalidate_tournaments(tournament_ids, using=DEFAULT_DB_ALIAS):
+    """大量匯入等不觸發 signal 的寫入之後，清掉相關賽事所有分組的矩陣。"""
+    group_ids = Group.objects.using(using).filter(tournament_id__in=tournament_ids).values_list('pk', flat=True)
+    cache.delete_many([cache_key(group_id) for group_id in group_ids])
+
+
+def update_match(match, using=DEFAULT_DB_ALIAS, previous=None):
+    """
+    比賽（或其小局）儲存、刪除後呼叫：只修改已在快取中的矩陣，尚未建立的矩陣等下次讀取時再建立。
+    previous 為比賽更換賽事或隊伍前的 (賽事, 隊伍一, 隊伍二)，原本分組的矩陣也會扣除這場比賽。
+    快取只存放 default 資料庫的矩陣，其他資料庫（同步、搬移）的寫入不需要處理。
+    """
+    if using != DEFAULT_DB_ALIAS:
+        return
+    sides = {
+        side for side in ((match.tournament_id, match.team1_id, match.team2_id), previous)
+        if side is not None and side[1] and side[2]
+    }
+    if not sides:
+        return
+    lookup = Q()
+    for tournament_id, team1_id, team2_id in sides:
+        lookup |= Q(group__tournament_id=tournament_id, team_id__in=[team1_id, team2_id])
+    tournaments = dict(Group.teams.through.objects.filter(lookup).values_list('group_id', 'group__tournament_id'))
+    keys = {cache_key(group_id): group_id for group_id in tournaments}
+    cached = cache.get_many(list(keys)) if keys else {}
+    if not cached:
+        return
+
+    contribution = None
+    row = completed_match_rows(Match.objects.filter(pk=match.pk)).first()
+    if row is not None:
+        contribution = match_contribution(row)
+
+    for key, data in cached.items():
+        matrix = HeadToHeadMatrix.from_cache(keys[key], data)
+        # 兩隊不在同一分組（或比賽已改到其他賽事）時這場比賽不屬於這個矩陣，之前若計入過仍需扣除
+        belongs = tournaments[matrix.group_id] == match.tournament_id
+        value = contribution if contribution is not None and belongs and matrix.covers(contribution) else None
+        if value is None and match.pk not in matrix.matches:
+            continue
+        matrix.apply(match.pk, value)
+        matrix.save()
+
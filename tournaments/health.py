@@ -1,61 +1,191 @@
-from django.http import JsonResponse
+"""
+健康檢查端點
+
+- /health/live：行程是否存活，不碰資料庫與快取（給平台頻繁探測用）
+- /health/ready：以目前的持久連線（CONN_MAX_AGE）執行 SELECT 1，PostgreSQL 上設定 statement_timeout，
+  資料庫無法使用時回傳 503
+- /health/details（以及舊的 /health/）：各資料表筆數與資料完整性、連線、快取、待處理工作與最近一次暖機的狀態；
+  PostgreSQL 上筆數取自 pg_class.reltuples 的估計值，整份結果快取 HEALTH_DETAILS_CACHE_SECONDS 秒
+
+可在 settings 中設定 HEALTH_DB_TIMEOUT_MS（預設 1000）與 HEALTH_DETAILS_CACHE_SECONDS（預設 30）。
+"""
+
+import time
+
 from django.conf import settings
-from django.db import connection
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import JsonResponse
+
+from tournaments import warmup
+from tournaments.adminperf import estimated_count
 from tournaments.models import Tournament, Team, Player, Match, Game, Group, Standing, PlayerGameStat
 
-def health_check(request):
-    """健康檢查端點 - 診斷系統狀態"""
+COUNTED_MODELS = {
+    'tournament_count': Tournament,
+    'team_count': Team,
+    'player_count': Player,
+    'match_count': Match,
+    'game_count': Game,
+    'group_count': Group,
+    'standing_count': Standing,
+    'playergamestat_count': PlayerGameStat,
+}
+
+
+def _db_timeout_ms():
+    return getattr(settings, 'HEALTH_DB_TIMEOUT_MS', 1000)
+
+
+def _details_cache_key():
+    return f"health_details:v{getattr(settings, 'CACHE_VERSION', 1)}"
+
+
+def _no_store(response):
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def ping_database(using=DEFAULT_DB_ALIAS):
+    """執行 SELECT 1，回傳花費的毫秒數；失敗時拋出例外。"""
+    connection = connections[using]
+    start = time.perf_counter()
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL statement_timeout = %s', [int(_db_timeout_ms())])
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def health_live(request):
+    """存活檢查：不使用資料庫"""
+    return _no_store(JsonResponse({'status': 'OK'}))
+
+
+def health_ready(request):
+    """就緒檢查：資料庫可以回應查詢"""
+    try:
+        latency = ping_database()
+    except Exception as e:
+        return _no_store(JsonResponse({'status': 'ERROR', 'database': 'Connection Failed',
+                                       'database_error': str(e)}, status=503))
+    return _no_store(JsonResponse({'status': 'OK', 'database': 'Connected', 'database_latency_ms': latency}))
+
+
+def table_counts(using=DEFAULT_DB_ALIAS):
+    """回傳 (各表筆數, 是否為估計值)；沒有統計資料的資料表（SQLite、尚未 ANALYZE）改用 COUNT(*)。"""
+    counts, approximate = {}, False
+    for key, model in COUNTED_MODELS.items():
+        estimate = estimated_count(model, using)
+        if estimate is None:
+            counts[key] = model._default_manager.using(using).count()
+        else:
+            counts[key] = estimate
+            approximate = True
+    return counts, approximate
+
+
+def data_issues(counts):
+    issues = []
+    total_data = (counts['tournament_count'] + counts['team_count'] + counts['player_count'] +
+                  counts['match_count'] + counts['group_count'] + counts['standing_count'])
+    if total_data == 0:
+        issues.append('所有資料表都是空的')
+    elif counts['tournament_count'] > 0 and counts['team_count'] == 0:
+        issues.append('有錦標賽但沒有隊伍資料')
+    elif counts['tournament_count'] > 0 and counts['group_count'] == 0:
+        issues.append('有錦標賽但沒有分組資料')
+    elif counts['tournament_count'] > 0 and counts['standing_count'] == 0:
+        issues.append('有錦標賽但沒有積分榜資料')
+    elif counts['game_count'] > 0 and counts['playergamestat_count'] == 0:
+        issues.append('有比賽局數但沒有選手統計數據')
+    return issues
+
+
+def connection_status(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    status = {
+        'vendor': connection.vendor,
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+        'conn_health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+        'connection_open': connection.connection is not None,
+    }
+    # Django 5.1+ 的 psycopg 連線池（OPTIONS['pool']）
+    pool = getattr(connection, 'pool', None)
+    if pool is not None and hasattr(pool, 'get_stats'):
+        status['pool'] = pool.get_stats()
+    return status
+
+
+def cache_status():
+    status = {'backend': settings.CACHES.get('default', {}).get('BACKEND')}
+    key = f'{_details_cache_key()}:probe'
+    start = time.perf_counter()
+    try:
+        cache.set(key, 1, 10)
+        status['ok'] = cache.get(key) == 1
+    except Exception as e:
+        status.update(ok=False, error=str(e))
+    status['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return status
+
+
+def queue_status():
+    """待處理的衍生資料：已完成但尚未計入 Elo 的比賽（大量匯入後需要 backfill_ratings）。"""
+    pending = Match.objects.filter(
+        status='completed', rating_delta__isnull=True, team1__isnull=False, team2__isnull=False,
+    ).count()
+    return {'pending_ratings': pending}
+
+
+def collect_details():
     status = {
         'status': 'OK',
         'debug': settings.DEBUG,
         'database': 'Unknown',
         'database_url_set': bool(getattr(settings, 'DATABASE_URL', None)),
-        'issues': []
+        'database_engine': settings.DATABASES.get('default', {}).get('ENGINE'),
+        'issues': [],
     }
-    
     try:
-        # 檢查資料庫連接
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
+        status['database_latency_ms'] = ping_database()
         status['database'] = 'Connected'
-        
-        # 檢查所有資料表
-        status['tournament_count'] = Tournament.objects.count()
-        status['team_count'] = Team.objects.count()
-        status['player_count'] = Player.objects.count()
-        status['match_count'] = Match.objects.count()
-        status['game_count'] = Game.objects.count()
-        status['group_count'] = Group.objects.count()
-        status['standing_count'] = Standing.objects.count()
-        status['playergamestat_count'] = PlayerGameStat.objects.count()
-        
-        # 檢查資料完整性
-        total_data = (status['tournament_count'] + status['team_count'] + 
-                     status['player_count'] + status['match_count'] + 
-                     status['group_count'] + status['standing_count'])
-        
-        if total_data == 0:
-            status['issues'].append('所有資料表都是空的')
-        elif status['tournament_count'] > 0 and status['team_count'] == 0:
-            status['issues'].append('有錦標賽但沒有隊伍資料')
-        elif status['tournament_count'] > 0 and status['group_count'] == 0:
-            status['issues'].append('有錦標賽但沒有分組資料')
-        elif status['tournament_count'] > 0 and status['standing_count'] == 0:
-            status['issues'].append('有錦標賽但沒有積分榜資料')
-        elif status['game_count'] > 0 and status['playergamestat_count'] == 0:
-            status['issues'].append('有比賽局數但沒有選手統計數據')
-        
+        counts, approximate = table_counts()
+        status.update(counts)
+        status['counts_approximate'] = approximate
+        status['issues'] += data_issues(counts)
+        status['queue'] = queue_status()
     except Exception as e:
         status['status'] = 'ERROR'
         status['database'] = 'Connection Failed'
         status['database_error'] = str(e)
         status['issues'].append(f'資料庫錯誤: {str(e)}')
-    
-    # 檢查關鍵設定
-    db_engine = settings.DATABASES.get('default', {}).get('ENGINE')
-    status['database_engine'] = db_engine
-    
+
+    status['connection'] = connection_status()
+    status['cache'] = cache_status()
+    # 最近一次啟動暖機（tournaments/warmup.py）各階段的耗時
+    status['warmup'] = warmup.last_report()
+    if not status['cache']['ok']:
+        status['issues'].append('快取無法使用')
     if not getattr(settings, 'DATABASE_URL', None):
         status['issues'].append('DATABASE_URL 環境變數未設定')
-    
-    return JsonResponse(status, status=500 if status['status'] == 'ERROR' else 200)
+    status['generated_at'] = time.time()
+    return status
+
+
+def health_details(request):
+    """詳細狀態（快取）；管理員可用 ?refresh=1 重新收集"""
+    key = _details_cache_key()
+    refresh = request.GET.get('refresh') and request.user.is_staff
+    status = None if refresh else cache.get(key)
+    if status is None:
+        status = collect_details()
+        # 錯誤結果不快取，恢復後下一次探測就能看到
+        if status['status'] == 'OK':
+            cache.set(key, status, getattr(settings, 'HEALTH_DETAILS_CACHE_SECONDS', 30))
+    return _no_store(JsonResponse(status, status=500 if status['status'] == 'ERROR' else 200))
+
+
+# 舊的 /health/ 端點：保留原本的欄位（部署腳本會讀取各表筆數）
+health_check = health_details
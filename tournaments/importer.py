@@ -0,0 +1,679 @@
+# tournaments/importer.py
+"""
+統一的資料匯入引擎
+
+load_tournament_data、reset_and_import、safe_import、force_reimport、migrate_from_docker
+以及頂層的遷移腳本都透過這裡匯入資料：
+
+- 以串流方式解析 JSON（production_data.json 的「表名 → 陣列」格式或 Django fixture 格式），
+  不會一次把整個檔案載入記憶體
+- 外鍵透過記憶體中的 id 對照表解析，不再逐筆 objects.get()
+- 依照相依順序分批 bulk_create / bulk_update，每張表只需要少量查詢
+- bulk 操作不會觸發 post_save signal，積分榜（選擇性）在最後每個賽事只重算一次
+- 支援 dry-run（只解析與驗證）與 upsert（更新已存在的資料）模式
+"""
+
+import gzip
+import json
+from collections import Counter, defaultdict
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .batch import batch_updates
+from .models import Tournament, Team, Player, Match, Game, Group, Standing, PlayerGameStat
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class TableSpec:
+    """描述一張資料表在匯入時的外鍵相依、多對多欄位與自然鍵。"""
+
+    def __init__(self, name, model, fks=None, natural_key=None):
+        self.name = name
+        self.model = model
+        # 外鍵 attname -> 目標資料表名稱
+        self.fks = fks or {}
+        # 用來比對「已存在資料」的欄位（除了主鍵之外）
+        self.natural_key = natural_key or ()
+        self.label = f'{model._meta.app_label}.{model._meta.model_name}'
+        self.m2m_fields = {f.name: f for f in model._meta.many_to_many}
+
+    @property
+    def dependencies(self):
+        return set(self.fks.values())
+
+
+# 依照相依順序排列：前面的表不會參照後面的表
+TABLE_SPECS = [
+    TableSpec('tournaments', Tournament),
+    TableSpec('teams', Team, natural_key=('name',)),
+    TableSpec('players', Player, fks={'team_id': 'teams'}),
+    TableSpec('groups', Group, fks={'tournament_id': 'tournaments'}),
+    TableSpec('matches', Match, fks={
+        'tournament_id': 'tournaments',
+        'team1_id': 'teams',
+        'team2_id': 'teams',
+        'winner_id': 'teams',
+    }),
+    TableSpec('games', Game, fks={'match_id': 'matches', 'winner_id': 'teams'},
+              natural_key=('match_id', 'map_number')),
+    TableSpec('standings', Standing, fks={
+        'tournament_id': 'tournaments',
+        'team_id': 'teams',
+        'group_id': 'groups',
+    }, natural_key=('tournament_id', 'team_id')),
+    TableSpec('player_stats', PlayerGameStat, fks={
+        'game_id': 'games',
+        'player_id': 'players',
+        'team_id': 'teams',
+    }, natural_key=('game_id', 'player_id')),
+]
+
+SPECS_BY_NAME = {spec.name: spec for spec in TABLE_SPECS}
+SPECS_BY_LABEL = {spec.label: spec for spec in TABLE_SPECS}
+
+# 舊匯出檔與遷移腳本使用過的其他表名
+TABLE_ALIASES = {
+    'stats': 'player_stats',
+    'playergamestats': 'player_stats',
+}
+
+# 以獨立陣列匯出的多對多關聯：表名 -> (擁有者資料表, 欄位, 擁有者欄位, 目標欄位)
+M2M_TABLES = {
+    'participants': ('tournaments', 'participants', 'tournament_id', 'team_id'),
+    'group_teams': ('groups', 'teams', 'group_id', 'team_id'),
+}
+
+
+# ===== 日期解析 =====
+
+def parse_datetime_value(value):
+    """
+    解析匯出檔中各種格式的日期時間：
+    '2025-08-15 10:12:54+00:00'、'2025-08-15T10:12:54Z'、'2025-08-15' 或 datetime 物件。
+    沒有時區的值會套用預設時區。
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime.combine(value, time.min)
+    else:
+        text = str(value).strip()
+        dt = parse_datetime(text)
+        if dt is None:
+            parsed_date = parse_date(text)
+            if parsed_date is None:
+                raise ValueError(f'無法解析日期時間: {value}')
+            dt = datetime.combine(parsed_date, time.min)
+    if settings.USE_TZ and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+# ===== 串流 JSON 解析 =====
+
+def open_dump(path, mode='rt'):
+    """開啟匯出檔，副檔名為 .gz 時自動解壓縮。"""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode[0], encoding='utf-8')
+
+
+def is_ndjson_path(path):
+    return str(path).endswith(('.ndjson', '.ndjson.gz'))
+
+
+class _JSONStream:
+    """
+    只處理最外層結構的增量 JSON 讀取器：
+    外層的 { } / [ ] 由這裡逐字元處理，每一筆資料則交給 json 的 raw_decode 解析，
+    因此記憶體用量只與單筆資料大小有關。
+    """
+
+    def __init__(self, fp, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳過空白、逗號與 BOM，回傳下一個字元；檔案結束時回傳空字串。"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n,﻿':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f'JSON 格式錯誤：預期 {char!r}，實際為 {found!r}')
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 數字等值可能剛好在區塊邊界被截斷，確認後面還有資料才接受
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def items(self):
+        """逐一產生目前所在陣列中的元素。"""
+        self.expect('[')
+        while True:
+            char = self.peek()
+            if char == ']':
+                self.pos += 1
+                return
+            if not char:
+                raise ValueError('JSON 檔案不完整')
+            yield self.value()
+
+
+def iter_dump_records(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    以串流方式讀取匯出檔，逐筆產生 (表名, 資料) 配對。
+    支援 production_data.json 格式（{"teams": [...], ...}）、Django fixture 格式（[{"model": ...}]）
+    以及 export_data 輸出的 NDJSON 格式（每行 {"table": ..., "record": ...}，副檔名 .ndjson / .ndjson.gz）。
+    """
+    if is_ndjson_path(path):
+        with open_dump(path) as fp:
+            for line in fp:
+                if line.strip():
+                    obj = json.loads(line)
+                    yield obj['table'], obj['record']
+        return
+
+    with open_dump(path) as fp:
+        stream = _JSONStream(fp, chunk_size)
+        first = stream.peek()
+        if first == '[':
+            for obj in stream.items():
+                spec = SPECS_BY_LABEL.get(obj.get('model'))
+                if spec is None:
+                    continue
+                yield spec.name, {'id': obj.get('pk'), **obj.get('fields', {})}
+        elif first == '{':
+            stream.expect('{')
+            while True:
+                char = stream.peek()
+                if char == '}':
+                    return
+                if not char:
+                    raise ValueError('JSON 檔案不完整')
+                table = stream.value()
+                stream.expect(':')
+                if stream.peek() != '[':
+                    # 非資料表的欄位（例如匯出時間），略過
+                    stream.value()
+                    continue
+                for record in stream.items():
+                    yield table, record
+        else:
+            raise ValueError('無法辨識的匯出檔格式')
+
+
+# ===== 匯入引擎 =====
+
+class ImportResult:
+    """每張資料表的匯入統計。"""
+
+    COUNTERS = ('created', 'updated', 'skipped', 'orphaned', 'nulled')
+
+    def __init__(self):
+        self.tables = defaultdict(Counter)
+        self.m2m_links = 0
+        self.recalculated = []
+
+    def __getitem__(self, table):
+        return self.tables[table]
+
+    def lines(self):
+        lines = []
+        for spec in TABLE_SPECS:
+            counter = self.tables.get(spec.name)
+            if not counter:
+                continue
+            parts = [f'{key} {counter[key]}' for key in self.COUNTERS if counter[key]]
+            lines.append(f'  - {spec.name}: {", ".join(parts) or "無變更"}')
+        if self.m2m_links:
+            lines.append(f'  - 多對多關聯: {self.m2m_links}')
+        if self.recalculated:
+            lines.append(f'  - 重算積分榜的賽事: {", ".join(map(str, self.recalculated))}')
+        return lines
+
+
+class BulkImporter:
+    """
+    分批匯入引擎。
+
+    用法：
+        importer = BulkImporter(mode='upsert')
+        result = importer.run(iter_dump_records('production_data.json'))
+
+    mode='insert' 時已存在的資料（主鍵或自然鍵相同）會略過，相當於 get_or_create；
+    mode='upsert' 時會以檔案內容更新已存在的資料。
+    """
+
+    def __init__(self, mode='insert', dry_run=False, batch_size=DEFAULT_BATCH_SIZE,
+                 recalculate_standings=False, using=DEFAULT_DB_ALIAS, log=None, copy=False):
+        if mode not in ('insert', 'upsert'):
+            raise ValueError(f'不支援的匯入模式: {mode}')
+        self.mode = mode
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.recalculate_standings = recalculate_standings
+        self.using = using
+        self.copy = copy
+        self.log = log or (lambda message: None)
+
+        self.result = ImportResult()
+        # 來源 id -> 目標資料庫 id
+        self.id_maps = {spec.name: {} for spec in TABLE_SPECS}
+        # 本次匯入已處理的自然鍵 -> 目標資料庫 id
+        self.natural_index = {spec.name: {} for spec in TABLE_SPECS}
+        self.pending = {spec.name: [] for spec in TABLE_SPECS}
+        self.flush_at = {spec.name: batch_size for spec in TABLE_SPECS}
+        # (擁有者資料表, 欄位, 擁有者來源 id, 目標來源 id)
+        self.m2m_pending = []
+        self.affected_tournaments = set()
+        # 匯入了積分榜的賽事，結束後重新計算同分比較與名次
+        self.ranked_tournaments = set()
+        self.created_models = set()
+
+    # --- 對外介面 ---
+
+    def run(self, records, atomic=True):
+        """匯入所有資料並完成收尾；atomic=True 時整個匯入在單一交易中完成。"""
+        if atomic and not self.dry_run:
+            with transaction.atomic(using=self.using):
+                self.feed(records)
+                self.finish()
+        else:
+            self.feed(records)
+            self.finish()
+        return self.result
+
+    def feed(self, records):
+        for table, record in records:
+            self.add(table, record)
+
+    def add(self, table, record):
+        table = TABLE_ALIASES.get(table, table)
+        if table in M2M_TABLES:
+            owner, field_name, owner_key, target_key = M2M_TABLES[table]
+            self.m2m_pending.append((owner, field_name, record.get(owner_key), record.get(target_key)))
+            return
+        spec = SPECS_BY_NAME.get(table)
+        if spec is None:
+            return
+
+        row = self._normalize(spec, record)
+        self.pending[spec.name].append(row)
+        if len(self.pending[spec.name]) >= self.flush_at[spec.name]:
+            self._flush(spec, final=False)
+
+    def finish(self):
+        for spec in TABLE_SPECS:
+            self._flush(spec, final=True)
+        self._flush_m2m()
+
+        if not self.dry_run:
+            self._reset_sequences()
+            # bulk 寫入不會觸發 signal：清除對戰矩陣快取、依時間順序重算 Elo，
+            # 需要時重算積分榜，匯入了積分榜的賽事重新計算名次，每個賽事只處理一次
+            with batch_updates(self.using) as batch:
+                batch.matches_changed(self.affected_tournaments, standings=self.recalculate_standings)
+                batch.ranks_changed(self.ranked_tournaments)
+                if self.result['player_stats']['created'] or self.result['player_stats']['updated']:
+                    batch.player_stats_changed()
+            if self.recalculate_standings:
+                self.result.recalculated.extend(sorted(self.affected_tournaments))
+        return self.result
+
+    # --- 資料整理 ---
+
+    def _normalize(self, spec, record):
+        """把一筆原始資料轉成 {attname: value}，外鍵統一為 *_id，多對多欄位另外排入佇列。"""
+        meta = spec.model._meta
+        row = {}
+        for key, value in record.items():
+            if key in ('id', 'pk'):
+                row['id'] = value
+                continue
+            if key in spec.m2m_fields:
+                for target in value or ():
+                    self.m2m_pending.append((spec.name, key, record.get('id', record.get('pk')), target))
+                continue
+            try:
+                field = meta.get_field(key)
+            except Exception:
+                continue  # 舊版本匯出檔中已不存在的欄位
+            if not field.concrete:
+                continue
+            if isinstance(field, models.DateTimeField):
+                value = parse_datetime_value(value)
+            if value is None and not field.null and not field.is_relation:
+                continue  # 交給模型預設值處理
+            row[field.attname] = value
+        return row
+
+    def _resolve(self, spec, row, final):
+        """
+        用 id 對照表把外鍵轉成目標資料庫的 id。
+        回傳 (resolved_row, status)，status 為 'ok'、'wait'（參照的資料尚未讀到）或 'orphan'。
+        """
+        resolved = dict(row)
+        for attname, dep in spec.fks.items():
+            source_id = row.get(attname)
+            if source_id is None:
+                if spec.model._meta.get_field(attname).null:
+                    continue
+                return None, 'orphan'
+            target_id = self.id_maps[dep].get(source_id)
+            if target_id is not None:
+                resolved[attname] = target_id
+                continue
+            if not final:
+                return None, 'wait'
+            if spec.model._meta.get_field(attname).null:
+                resolved[attname] = None
+                self.result[spec.name]['nulled'] += 1
+                continue
+            return None, 'orphan'
+        return resolved, 'ok'
+
+    def _load_existing_targets(self, spec, rows):
+        """收尾時，外鍵參照的資料可能不在檔案中而是已經存在於資料庫，每張相依表只查一次。"""
+        missing = defaultdict(set)
+        for row in rows:
+            for attname, dep in spec.fks.items():
+                source_id = row.get(attname)
+                if source_id is not None and source_id not in self.id_maps[dep]:
+                    missing[dep].add(source_id)
+        for dep, ids in missing.items():
+            existing = SPECS_BY_NAME[dep].model._default_manager.using(self.using).filter(
+                pk__in=ids
+            ).values_list('pk', flat=True)
+            for pk in existing:
+                self.id_maps[dep][pk] = pk
+
+    # --- 批次寫入 ---
+
+    def _flush(self, spec, final):
+        rows = self.pending[spec.name]
+        if not rows:
+            return
+        if final:
+            self._load_existing_targets(spec, rows)
+
+        ready, waiting, orphans = [], [], 0
+        for row in rows:
+            resolved, status = self._resolve(spec, row, final)
+            if status == 'ok':
+                resolved['_source_id'] = row.get('id')
+                ready.append(resolved)
+            elif status == 'wait':
+                waiting.append(row)
+            else:
+                orphans += 1
+                if orphans <= 3:
+                    self.log(f'  ⚠️ {spec.name} id={row.get("id")} 參照的資料不存在，略過')
+        self.pending[spec.name] = waiting
+        self.result[spec.name]['orphaned'] += orphans
+
+        # 若多數資料仍在等待相依表，提高下次嘗試的門檻，避免反覆掃描
+        if not final and len(waiting) >= self.flush_at[spec.name]:
+            self.flush_at[spec.name] = len(waiting) + self.batch_size
+
+        for start in range(0, len(ready), self.batch_size):
+            self._write_batch(spec, ready[start:start + self.batch_size])
+
+    def _natural_key(self, spec, row):
+        if not spec.natural_key:
+            return None
+        return tuple(row.get(field) for field in spec.natural_key)
+
+    def _existing_rows(self, spec, rows):
+        """一次查詢找出這批資料中主鍵或自然鍵已存在的資料。"""
+        ids = [row['id'] for row in rows if row.get('id') is not None]
+        query = Q(pk__in=ids)
+        if spec.natural_key:
+            first = spec.natural_key[0]
+            query |= Q(**{f'{first}__in': {row.get(first) for row in rows}})
+        existing = spec.model._default_manager.using(self.using).filter(query).values_list(
+            'pk', *spec.natural_key
+        )
+        by_pk, by_natural_key = set(), {}
+        for pk, *natural_key in existing:
+            by_pk.add(pk)
+            if natural_key:
+                by_natural_key[tuple(natural_key)] = pk
+        return by_pk, by_natural_key
+
+    def _write_batch(self, spec, rows):
+        model = spec.model
+        by_pk, by_natural_key = self._existing_rows(spec, rows)
+        natural_index = self.natural_index[spec.name]
+        id_map = self.id_maps[spec.name]
+        counter = self.result[spec.name]
+
+        to_create, created_keys, existing, duplicates = [], [], [], []
+        batch_ids, batch_natural_keys = set(), set()
+        for row in rows:
+            source_id = row.pop('_source_id')
+            row_id = row.get('id')
+            natural_key = self._natural_key(spec, row)
+            fields = {key: value for key, value in row.items() if key != 'id'}
+
+            if source_id is not None and source_id in id_map:
+                target_id = id_map[source_id]
+            elif row_id is not None and (row_id in by_pk or row_id in batch_ids):
+                target_id = row_id
+            elif natural_key is not None:
+                target_id = by_natural_key.get(natural_key, natural_index.get(natural_key))
+            else:
+                target_id = None
+
+            if target_id is None and natural_key is not None and natural_key in batch_natural_keys:
+                # 同一批中自然鍵重複、但尚未取得 id 的資料，等建立完再處理
+                duplicates.append((source_id, natural_key, fields))
+                continue
+            if target_id is not None:
+                existing.append((source_id, target_id, fields))
+                continue
+
+            if model is Team and not fields.get('school') and '-' in fields.get('name', ''):
+                # 舊資料沒有學校欄位，從「學校-隊名」格式的隊伍名稱取出
+                fields['school'] = fields['name'].split('-')[0].strip()
+            to_create.append(model(id=row_id, **fields))
+            created_keys.append((source_id, natural_key))
+            if row_id is not None:
+                batch_ids.add(row_id)
+            if natural_key is not None:
+                batch_natural_keys.add(natural_key)
+
+        if to_create and not self.dry_run:
+            self._create(model, to_create)
+            self.created_models.add(model)
+        for obj, (source_id, natural_key) in zip(to_create, created_keys):
+            target_id = obj.pk if obj.pk is not None else source_id
+            if source_id is not None:
+                id_map[source_id] = target_id
+            if natural_key is not None:
+                natural_index[natural_key] = target_id
+        counter['created'] += len(to_create)
+
+        for source_id, natural_key, fields in duplicates:
+            existing.append((source_id, natural_index.get(natural_key), fields))
+
+        to_update, update_fields = [], None
+        for source_id, target_id, fields in existing:
+            if source_id is not None and target_id is not None:
+                id_map[source_id] = target_id
+            if self.mode == 'upsert' and target_id is not None:
+                to_update.append(model(pk=target_id, **fields))
+                keys = set(fields)
+                update_fields = keys if update_fields is None else update_fields & keys
+                counter['updated'] += 1
+            else:
+                counter['skipped'] += 1
+
+        if to_update and update_fields and not self.dry_run:
+            model._default_manager.using(self.using).bulk_update(
+                to_update, sorted(update_fields), batch_size=self.batch_size
+            )
+
+        if model is Match:
+            self.affected_tournaments.update(row['tournament_id'] for row in rows)
+        elif model is Standing:
+            self.ranked_tournaments.update(row['tournament_id'] for row in rows)
+
+    def _create(self, model, objs):
+        """
+        copy=True 且所有資料都有指定 id 時走 COPY（PostgreSQL）/ executemany 快速路徑；
+        需要由資料庫產生 id 的資料仍使用 bulk_create 取回 id。
+        """
+        if self.copy and all(obj.pk is not None for obj in objs):
+            from .bulkcopy import copy_instances
+            copy_instances(model, objs, using=self.using)
+        else:
+            model._default_manager.using(self.using).bulk_create(objs, batch_size=self.batch_size)
+
+    def _flush_m2m(self):
+        """所有資料表寫入後，再一次建立多對多關聯（已存在的關聯會被忽略）。"""
+        links = defaultdict(set)
+        for owner, field_name, owner_source, target_source in self.m2m_pending:
+            links[(owner, field_name)].add((owner_source, target_source))
+        self.m2m_pending = []
+
+        for (owner, field_name), pairs in links.items():
+            spec = SPECS_BY_NAME[owner]
+            field = spec.m2m_fields[field_name]
+            target_table = SPECS_BY_LABEL[field.related_model._meta.label_lower].name
+
+            unresolved = [target for _, target in pairs if target not in self.id_maps[target_table]]
+            if unresolved:
+                existing = field.related_model._default_manager.using(self.using).filter(
+                    pk__in=unresolved
+                ).values_list('pk', flat=True)
+                for pk in existing:
+                    self.id_maps[target_table][pk] = pk
+            unresolved_owners = [o for o, _ in pairs if o not in self.id_maps[owner]]
+            if unresolved_owners:
+                existing = spec.model._default_manager.using(self.using).filter(
+                    pk__in=unresolved_owners
+                ).values_list('pk', flat=True)
+                for pk in existing:
+                    self.id_maps[owner][pk] = pk
+
+            through = field.remote_field.through
+            owner_attname = field.m2m_column_name()
+            target_attname = field.m2m_reverse_name()
+            rows = []
+            for owner_source, target_source in pairs:
+                owner_id = self.id_maps[owner].get(owner_source)
+                target_id = self.id_maps[target_table].get(target_source)
+                if owner_id is None or target_id is None:
+                    continue
+                rows.append(through(**{owner_attname: owner_id, target_attname: target_id}))
+
+            if rows and not self.dry_run:
+                through._default_manager.using(self.using).bulk_create(
+                    rows, batch_size=self.batch_size, ignore_conflicts=True
+                )
+            self.result.m2m_links += len(rows)
+
+    def _reset_sequences(self):
+        reset_sequences(self.created_models, self.using)
+
+
+def reset_sequences(model_classes, using=DEFAULT_DB_ALIAS):
+    """以指定 id 建立資料後，PostgreSQL 的序列需要同步到最大 id（SQLite 不需要）。"""
+    if not model_classes:
+        return
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(no_style(), sorted(
+        model_classes, key=lambda model: model._meta.label
+    ))
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+# ===== 指令共用工具 =====
+
+def add_import_arguments(parser, default_path='production_data.json'):
+    """所有匯入指令共用的參數。"""
+    parser.add_argument('path', nargs='?', default=default_path,
+                        help=f'匯入檔案路徑，支援 .json、.ndjson 與其 .gz 壓縮檔（預設: {default_path}）')
+    parser.add_argument('--dry-run', action='store_true', help='只解析與驗證，不寫入資料庫')
+    parser.add_argument('--upsert', action='store_true', help='以檔案內容更新已存在的資料（預設為略過）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批寫入的筆數')
+    parser.add_argument('--recalculate-standings', action='store_true',
+                        help='匯入後依比賽結果重算積分榜（每個賽事只算一次）')
+    parser.add_argument('--copy', action='store_true',
+                        help='新資料以 PostgreSQL COPY 寫入（SQLite 改為分批 executemany）')
+
+
+def import_dump(path, mode='insert', dry_run=False, batch_size=DEFAULT_BATCH_SIZE,
+                recalculate_standings=False, using=DEFAULT_DB_ALIAS, log=None, atomic=True, copy=False):
+    """從匯出檔匯入資料，回傳 ImportResult。"""
+    importer = BulkImporter(
+        mode=mode, dry_run=dry_run, batch_size=batch_size,
+        recalculate_standings=recalculate_standings, using=using, log=log, copy=copy,
+    )
+    return importer.run(iter_dump_records(path), atomic=atomic)
+
+
+def import_dump_from_options(path, options, log=None, atomic=True):
+    """依照 add_import_arguments 產生的參數執行匯入。"""
+    return import_dump(
+        path,
+        mode='upsert' if options.get('upsert') else 'insert',
+        dry_run=options.get('dry_run', False),
+        batch_size=options.get('batch_size') or DEFAULT_BATCH_SIZE,
+        recalculate_standings=options.get('recalculate_standings', False),
+        log=log,
+        atomic=atomic,
+        copy=options.get('copy', False),
+    )
+
+
+def clear_tournament_data(using=DEFAULT_DB_ALIAS):
+    """依照相依順序的反向刪除所有賽事資料。"""
+    for spec in reversed(TABLE_SPECS):
+        spec.model._default_manager.using(using).all().delete()
@@ -0,0 +1,407 @@
+# tournaments/leaderboards.py
+"""
+選手排行榜（平均 ACS、K/D、首殺）
+
+每個範圍（單一賽事，或 'all' 代表所有賽事）的每個指標是一個有序集合，成員為選手 id、分數為該指標：
+
+- 快取使用 django-redis 時存放在 Redis sorted set（ZADD / ZREVRANGE / ZREVRANK）
+- 其他快取（本地開發、測試的 locmem）使用行程內的 SortedSet（skip list，與 Redis 相同的排序規則），
+  如同 LocMemCache，各行程分別保存，第一次讀取時各自由資料庫建立
+
+前 N 名與「某選手的名次」都是 O(log n)（前 N 名另加 N），不必排序所有 PlayerGameStat：
+
+- update_games() / update_players()：戰報寫入（PlayerGameStat 儲存）後只以一次彙總查詢重算有變動的選手，
+  寫入賽事與 'all' 兩個範圍；批次模式（batch.batch_updates）中延到結束時一次處理
+- rebuild()：以一次彙總查詢重建一個範圍；rebuild_all() 與管理指令 rebuild_leaderboards 重建全部
+- invalidate()：bulk 寫入（匯入）與刪除小局、選手後讓排行榜失效
+- 範圍尚未建立、或建立超過 LEADERBOARD_TIMEOUT 秒（預設 6 小時）時，讀取前自動 rebuild()
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Avg, Sum
+
+from .models import Game, PlayerGameStat, Tournament
+
+try:
+    from django_redis import get_redis_connection
+except ImportError:  # 選用套件
+    get_redis_connection = None
+
+logger = logging.getLogger('tournaments.leaderboards')
+
+METRICS = {
+    'acs': '平均 ACS',
+    'kd': 'K/D',
+    'first_kills': '首殺',
+}
+ALL = 'all'
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def timeout():
+    """排行榜建立後保留的秒數，過期後下次讀取時重新建立。"""
+    return getattr(settings, 'LEADERBOARD_TIMEOUT', 6 * 60 * 60)
+
+
+def scope_of(tournament_id=None):
+    return ALL if tournament_id is None else str(tournament_id)
+
+
+def board_key(scope, metric):
+    return f"leaderboard:v{getattr(settings, 'CACHE_VERSION', 1)}:{scope}:{metric}"
+
+
+# --- 行程內的有序集合 ---
+
+class _Node:
+    __slots__ = ('key', 'forward', 'span')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.forward = [None] * level
+        self.span = [0] * level
+
+
+class SortedSet:
+    """
+    依 (分數, 成員) 由小到大排列的 skip list，每層記錄跨越的節點數（span），
+    新增、刪除、查名次與依名次取值都是 O(log n)。與 Redis 相同，同分時依成員字串排序。
+    """
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self.scores = {}
+        self.head = _Node(None, self.MAX_LEVEL)
+        self.level = 1
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def _insert(self, key):
+        update, rank = [None] * self.MAX_LEVEL, [0] * self.MAX_LEVEL
+        node = self.head
+        for i in reversed(range(self.level)):
+            rank[i] = 0 if i == self.level - 1 else rank[i + 1]
+            while node.forward[i] is not None and node.forward[i].key < key:
+                rank[i] += node.span[i]
+                node = node.forward[i]
+            update[i] = node
+        level = self._random_level()
+        if level > self.level:
+            for i in range(self.level, level):
+                update[i] = self.head
+                self.head.span[i] = self.length
+            self.level = level
+        new = _Node(key, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self.level):
+            update[i].span[i] += 1
+        self.length += 1
+
+    def _delete(self, key):
+        update = [None] * self.MAX_LEVEL
+        node = self.head
+        for i in reversed(range(self.level)):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+        target = node.forward[0]
+        for i in range(self.level):
+            if update[i].forward[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+        self.length -= 1
+
+    def add(self, member, score):
+        previous = self.scores.get(member)
+        if previous == score:
+            return
+        if previous is not None:
+            self._delete((previous, member))
+        self._insert((score, member))
+        self.scores[member] = score
+
+    def discard(self, member):
+        score = self.scores.pop(member, None)
+        if score is not None:
+            self._delete((score, member))
+
+    def rank(self, member):
+        """由小到大的名次（0 起算），不存在時回傳 None。"""
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        key, rank, node = (score, member), 0, self.head
+        for i in reversed(range(self.level)):
+            while node.forward[i] is not None and node.forward[i].key <= key:
+                rank += node.span[i]
+                node = node.forward[i]
+            if node.key == key:
+                return rank - 1
+        return None
+
+    def _node_at(self, rank):
+        """由小到大第 rank 個（0 起算）節點。"""
+        traversed, node = 0, self.head
+        for i in reversed(range(self.level)):
+            while node.forward[i] is not None and traversed + node.span[i] <= rank + 1:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if traversed == rank + 1:
+                return node
+        return None
+
+    def revrange(self, start, stop):
+        """由大到小第 start～stop 名（含，0 起算）的 [(成員, 分數)]，同 ZREVRANGE。"""
+        length = self.length
+        stop = min(stop, length - 1)
+        if start > stop:
+            return []
+        node, items = self._node_at(length - 1 - stop), []
+        for _ in range(stop - start + 1):
+            items.append(node.key)
+            node = node.forward[0]
+        return [(member, score) for score, member in reversed(items)]
+
+
+class MemoryLeaderboard:
+    """行程內的排行榜（locmem 快取時使用）：{範圍: (建立時間, {指標: SortedSet})}。"""
+
+    def __init__(self):
+        self.scopes = {}
+        self.lock = threading.Lock()
+
+    def built(self, scope):
+        entry = self.scopes.get(scope)
+        return entry is not None and time.monotonic() - entry[0] < timeout()
+
+    def replace(self, scope, boards):
+        sorted_sets = {}
+        for metric, scores in boards.items():
+            sorted_sets[metric] = SortedSet()
+            for member, score in scores.items():
+                sorted_sets[metric].add(member, score)
+        with self.lock:
+            self.scopes[scope] = (time.monotonic(), sorted_sets)
+
+    def update(self, scope, boards, removed=()):
+        with self.lock:
+            entry = self.scopes.get(scope)
+            if entry is None:
+                return
+            for metric, scores in boards.items():
+                board = entry[1][metric]
+                for member, score in scores.items():
+                    board.add(member, score)
+                for member in removed:
+                    board.discard(member)
+
+    def top(self, scope, metric, start, stop):
+        with self.lock:
+            entry = self.scopes.get(scope)
+            return entry[1][metric].revrange(start, stop) if entry is not None else []
+
+    def rank(self, scope, metric, member):
+        with self.lock:
+            entry = self.scopes.get(scope)
+            board = entry[1][metric] if entry is not None else None
+            rank = board.rank(member) if board is not None else None
+            if rank is None:
+                return None
+            return len(board) - 1 - rank, board.scores[member], len(board)
+
+    def clear(self):
+        with self.lock:
+            self.scopes.clear()
+
+
+class RedisLeaderboard:
+    """
+    Redis sorted set 的排行榜。各範圍的建立時間記在一個 hash 中（空的排行榜也視為已建立），
+    invalidate() 只需刪除這個 hash；排行榜本身在 timeout() 秒後過期。
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def built(self, scope):
+        built_at = self.client.hget(board_key('built', 'at'), scope)
+        return built_at is not None and time.time() - float(built_at) < timeout()
+
+    def replace(self, scope, boards):
+        pipe = self.client.pipeline(transaction=True)
+        for metric, scores in boards.items():
+            key = board_key(scope, metric)
+            pipe.delete(key)
+            if scores:
+                pipe.zadd(key, scores)
+                pipe.expire(key, timeout())
+        pipe.hset(board_key('built', 'at'), scope, time.time())
+        pipe.execute()
+
+    def update(self, scope, boards, removed=()):
+        pipe = self.client.pipeline(transaction=True)
+        for metric, scores in boards.items():
+            key = board_key(scope, metric)
+            if scores:
+                pipe.zadd(key, scores)
+            if removed:
+                pipe.zrem(key, *removed)
+        pipe.execute()
+
+    def top(self, scope, metric, start, stop):
+        entries = self.client.zrevrange(board_key(scope, metric), start, stop, withscores=True)
+        return [(member.decode(), score) for member, score in entries]
+
+    def rank(self, scope, metric, member):
+        key = board_key(scope, metric)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(key, member)
+        pipe.zscore(key, member)
+        pipe.zcard(key)
+        rank, score, size = pipe.execute()
+        return None if rank is None else (rank, score, size)
+
+    def clear(self):
+        self.client.delete(board_key('built', 'at'))
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+        if get_redis_connection is not None and backend.startswith('django_redis.'):
+            _backend = RedisLeaderboard(get_redis_connection('default'))
+        else:
+            _backend = MemoryLeaderboard()
+    return _backend
+
+
+# --- 由資料庫計算分數 ---
+
+def player_scores(tournament_id=None, player_ids=None, using=DEFAULT_DB_ALIAS):
+    """一次彙總查詢，回傳 {指標: {選手 id 字串: 分數}}。"""
+    stats = PlayerGameStat.objects.using(using)
+    if tournament_id is not None:
+        stats = stats.filter(game__match__tournament_id=tournament_id)
+    if player_ids is not None:
+        stats = stats.filter(player_id__in=player_ids)
+    rows = stats.values('player_id').annotate(
+        kills=Sum('kills'), deaths=Sum('deaths'), first_kills=Sum('first_kills'), acs=Avg('acs'),
+    ).order_by()
+    scores = {metric: {} for metric in METRICS}
+    for row in rows:
+        member = str(row['player_id'])
+        scores['acs'][member] = round(row['acs'] or 0, 2)
+        scores['kd'][member] = round(row['kills'] / row['deaths'], 3) if row['deaths'] else float(row['kills'])
+        scores['first_kills'][member] = row['first_kills']
+    return scores
+
+
+def rebuild(tournament_id=None, using=DEFAULT_DB_ALIAS):
+    """重建一個範圍的所有指標，回傳選手數。"""
+    scores = player_scores(tournament_id, using=using)
+    get_backend().replace(scope_of(tournament_id), scores)
+    return len(scores['acs'])
+
+
+def rebuild_all(using=DEFAULT_DB_ALIAS):
+    """重建 'all' 與每個賽事的排行榜，回傳 {範圍: 選手數}。"""
+    counts = {ALL: rebuild(using=using)}
+    for tournament_id in Tournament.objects.using(using).values_list('pk', flat=True):
+        counts[str(tournament_id)] = rebuild(tournament_id, using)
+    return counts
+
+
+def invalidate():
+    """讓所有排行榜失效（bulk 寫入後），下次讀取時各範圍重新建立。"""
+    get_backend().clear()
+
+
+def update_players(tournament_id, player_ids, using=DEFAULT_DB_ALIAS):
+    """重算這些選手在賽事與 'all' 範圍的分數；已沒有數據的選手移出排行榜。尚未建立的範圍略過。"""
+    player_ids = {str(pk) for pk in player_ids}
+    backend = get_backend()
+    for scoped_id in {tournament_id, None}:
+        scope = scope_of(scoped_id)
+        if not player_ids or not backend.built(scope):
+            continue
+        scores = player_scores(scoped_id, player_ids, using)
+        backend.update(scope, scores, [pk for pk in player_ids if pk not in scores['acs']])
+
+
+def update_games(game_players, using=DEFAULT_DB_ALIAS):
+    """戰報寫入後呼叫：{小局 id: {選手 id}}，依小局所屬的賽事分組後 update_players()。"""
+    tournaments = dict(
+        Game.objects.using(using).filter(pk__in=game_players).values_list('pk', 'match__tournament_id')
+    )
+    if len(tournaments) < len(game_players):
+        # 小局已刪除，無法得知所屬賽事
+        invalidate()
+        return
+    players = defaultdict(set)
+    for game_id, player_ids in game_players.items():
+        players[tournaments[game_id]] |= set(player_ids)
+    for tournament_id, player_ids in sorted(players.items()):
+        update_players(tournament_id, player_ids, using)
+
+
+def _ensure(tournament_id):
+    if not get_backend().built(scope_of(tournament_id)):
+        count = rebuild(tournament_id)
+        logger.info('leaderboard %s built with %d players', scope_of(tournament_id), count)
+
+
+def _check_metric(metric):
+    if metric not in METRICS:
+        raise ValueError(f'未知的排行指標: {metric}（可用: {", ".join(METRICS)}）')
+
+
+def top(metric, tournament_id=None, limit=DEFAULT_LIMIT, offset=0):
+    """前 limit 名：[{'rank': 名次（1 起算）, 'player_id', 'score'}]。"""
+    _check_metric(metric)
+    _ensure(tournament_id)
+    limit = max(1, min(limit, MAX_LIMIT))
+    entries = get_backend().top(scope_of(tournament_id), metric, offset, offset + limit - 1)
+    return [
+        {'rank': offset + index + 1, 'player_id': int(member), 'score': score}
+        for index, (member, score) in enumerate(entries)
+    ]
+
+
+def rank(metric, player_id, tournament_id=None):
+    """選手的名次：{'rank', 'score', 'total'}，沒有數據時回傳 None。"""
+    _check_metric(metric)
+    _ensure(tournament_id)
+    found = get_backend().rank(scope_of(tournament_id), metric, str(player_id))
+    if found is None:
+        return None
+    position, score, total = found
+    return {'rank': position + 1, 'score': score, 'total': total}
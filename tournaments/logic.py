@@ -1,9 +1,13 @@
 # tournaments/logic.py (這是新檔案)
 
-from itertools import combinations
+from itertools import zip_longest
 from django.db import models
+from .batch import batch_updates, current_batch
 from .models import Match, Standing, Group, Team
+from .tiebreakers import STANDING_ORDER
+from .scheduler import circle_rounds
 
+@batch_updates()
 def generate_round_robin_matches(tournament):
     """
     為一場「分組循環」賽事自動產生所有比賽。
@@ -23,22 +27,31 @@ def generate_round_robin_matches(tournament):
         if len(teams_in_group) < 2:
             continue
 
-        # 使用 combinations 函式庫，自動產生所有不重複的隊伍配對
-        # 例如 [A, B, C] -> (A, B), (A, C), (B, C)
-        for team1, team2 in combinations(teams_in_group, 2):
-            Match.objects.create(
+        # 以輪轉法產生所有不重複的配對並分配輪次，每輪每隊最多出賽一場
+        # 例如 4 隊共 3 輪、每輪 2 場；奇數隊時每輪有一隊輪空
+        new_matches = [
+            Match(
                 tournament=tournament,
-                round_number=1, # 分組賽通常視為第一輪
-                team1=team1,
-                team2=team2,
+                round_number=round_number,
+                team1_id=team1_id,
+                team2_id=team2_id,
                 status='scheduled' # 將狀態設為「尚未開始」
             )
-            matches_created_count += 1
+            for round_number, pairs in enumerate(circle_rounds([team.pk for team in teams_in_group]), start=1)
+            for team1_id, team2_id in pairs
+        ]
+        # 尚未開始的比賽不影響積分榜，直接批次建立
+        Match.objects.bulk_create(new_matches)
+        matches_created_count += len(new_matches)
+
+    # bulk_create 不經過 signals，在批次中登記（對戰矩陣與頁面快取在結束時更新）
+    current_batch().matches_changed([tournament.pk], standings=False, ratings=False)
 
     return matches_created_count
 
 # ... (檔案上半部的程式碼維持不變) ...
 
+@batch_updates()
 def generate_swiss_round_matches(tournament):
     """
     為「瑞士輪」賽事產生下一輪的對戰組合。
@@ -48,8 +61,13 @@ def generate_swiss_round_matches(tournament):
     current_round = last_match.round_number if last_match else 0
     next_round = current_round + 1
 
-    # 取得所有隊伍的積分榜，並按照分數高低排序
-    standings = list(tournament.standings.all().order_by('-points', '-wins'))
+    # 取得所有隊伍的積分榜，依持久化的名次（含同分比較）排序，同分隊伍的配對順序因此是固定的
+    standings = list(tournament.standings.select_related('team').order_by(*STANDING_ORDER))
+    if current_round == 0:
+        # 第一輪依 Elo 積分排種子，前半段對後半段（1 對 n/2+1、2 對 n/2+2…）
+        seeded = sorted(standings, key=lambda standing: (-standing.team.rating, standing.team.name))
+        half = (len(seeded) + 1) // 2
+        standings = [s for pair in zip_longest(seeded[:half], seeded[half:]) for s in pair if s is not None]
 
     # 找出已經配對過的隊伍
     paired_teams = set()
@@ -97,6 +115,7 @@ def generate_swiss_round_matches(tournament):
     return matches_created_count
 
 
+@batch_updates()
 def generate_single_elimination_matches(tournament):
     """
     為「單淘汰」賽事自動產生所有比賽。
@@ -164,6 +183,7 @@ def generate_single_elimination_matches(tournament):
     return matches_created_count
 
 
+@batch_updates()
 def generate_double_elimination_matches(tournament):
     """
     為「雙淘汰」賽事自動產生所有比賽。
@@ -314,6 +334,7 @@ def generate_double_elimination_matches(tournament):
     return matches_created_count
 
 
+@batch_updates()
 def advance_single_elimination_winners(tournament):
     """
     單淘汰賽：將勝者晉級到下一輪比賽
@@ -359,6 +380,7 @@ def advance_single_elimination_winners(tournament):
     return updated_matches
 
 
+@batch_updates()
 def advance_double_elimination_winners(tournament):
     """
     雙淘汰賽：處理勝者晉級和敗者掉入敗部的邏輯
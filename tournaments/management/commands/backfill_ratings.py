@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tournaments.ratings import backfill_ratings
+
+
+class Command(BaseCommand):
+    help = '依時間順序重播所有已完成比賽，重新計算隊伍的 Elo 積分與每場比賽的積分紀錄'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='資料庫別名（預設: default）')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = backfill_ratings(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ 已重算 {count} 場比賽的 Elo 積分（{time.perf_counter() - started:.2f} 秒）'
+        ))
@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from tournaments import fragments, views
+from tournaments.models import Team, Tournament
+
+
+class Command(BaseCommand):
+    help = '量測公開頁面在片段快取失效（cold）與命中（warm）時的渲染時間與查詢數'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tournament', type=int, action='append', help='賽事 id（可重複；預設為最新的 3 個賽事）')
+        parser.add_argument('--iterations', type=int, default=20, help='每種情況渲染的次數（預設: 20）')
+
+    def handle(self, *args, **options):
+        ids = options['tournament'] or list(Tournament.objects.order_by('-start_date').values_list('pk', flat=True)[:3])
+        if not ids:
+            raise CommandError('沒有可量測的賽事')
+        factory = RequestFactory()
+
+        def request(path):
+            req = factory.get(path)
+            req.user = AnonymousUser()
+            return req
+
+        pages = [
+            (f'tournament_detail #{pk}', lambda pk=pk: views.tournament_detail(request(f'/tournaments/{pk}/'), pk),
+             lambda pk=pk: fragments.bump('tournament', [pk]))
+            for pk in ids
+        ]
+        pages.append(('team_list', lambda: views.team_list(request('/teams/')),
+                      lambda: fragments.bump('team', Team.objects.values_list('pk', flat=True))))
+
+        for label, render, invalidate in pages:
+            cold = self.measure(render, invalidate, options['iterations'])
+            warm = self.measure(render, None, options['iterations'])
+            self.stdout.write(
+                f'{label:<24} cold {cold[0]:8.2f} ms / {cold[1]:3d} 查詢   '
+                f'warm {warm[0]:8.2f} ms / {warm[1]:3d} 查詢   '
+                f'{cold[0] / warm[0] if warm[0] else 0:5.1f}x'
+            )
+
+    def measure(self, render, invalidate, iterations):
+        """回傳 (渲染時間中位數 ms, 最後一次的查詢數)；invalidate 為 None 時先渲染一次暖機。"""
+        if invalidate is None:
+            render()
+        timings = []
+        for _ in range(iterations):
+            if invalidate is not None:
+                invalidate()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                render()
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(queries)
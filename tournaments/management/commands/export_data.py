@@ -0,0 +1,45 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.exporter import DEFAULT_EXPORT_CHUNK_SIZE, export_to_file
+from tournaments.models import Tournament
+
+
+class Command(BaseCommand):
+    help = '以串流方式匯出所有資料（NDJSON 或 production_data.json 格式，可壓縮、可續傳）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='production_data.ndjson.gz',
+                            help='輸出檔案，依副檔名決定格式：.ndjson / .json，可加 .gz（預設: production_data.ndjson.gz）')
+        parser.add_argument('--tournament', type=int, action='append', dest='tournaments',
+                            help='只匯出指定賽事相關的資料，可重複指定')
+        parser.add_argument('--resume', action='store_true', help='從上次中斷的位置繼續（僅限 NDJSON）')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_EXPORT_CHUNK_SIZE, help='每個區塊的筆數')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        tournament_ids = options['tournaments']
+        if tournament_ids:
+            missing = set(tournament_ids) - set(
+                Tournament.objects.filter(pk__in=tournament_ids).values_list('pk', flat=True)
+            )
+            if missing:
+                raise CommandError(f"找不到賽事: {', '.join(map(str, sorted(missing)))}")
+
+        self.stdout.write(f"🔄 開始匯出到 {path}...")
+        try:
+            counts = export_to_file(
+                path,
+                tournament_ids=tournament_ids,
+                resume=options['resume'],
+                chunk_size=options['chunk_size'],
+                log=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write("📊 匯出結果:")
+        for table, count in counts.items():
+            self.stdout.write(f"  - {table}: {count} 筆")
+        self.stdout.write(self.style.SUCCESS(f"✅ 匯出完成（{os.path.getsize(path)} bytes）"))
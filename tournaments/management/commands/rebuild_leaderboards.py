@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tournaments.leaderboards import get_backend, rebuild, rebuild_all
+
+
+class Command(BaseCommand):
+    help = '由選手數據重建排行榜（Redis sorted set；locmem 快取時只影響本行程，通常不需要執行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tournament', type=int, action='append', help='只重建指定賽事（可重複；預設為全部）')
+        parser.add_argument('--database', default='default', help='資料庫別名（預設: default）')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['tournament']:
+            counts = {pk: rebuild(pk, options['database']) for pk in options['tournament']}
+        else:
+            counts = rebuild_all(options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ 已重建 {len(counts)} 個排行榜、共 {sum(counts.values())} 筆選手分數'
+            f'（{type(get_backend()).__name__}，{time.perf_counter() - started:.2f} 秒）'
+        ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tournaments.mapstats import rebuild
+
+
+class Command(BaseCommand):
+    help = '以一次彙總查詢從小局結果重建地圖數據（賽事 × 隊伍 × 地圖）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tournament', type=int, action='append', help='只重建指定賽事（可重複；預設為全部）')
+        parser.add_argument('--database', default='default', help='資料庫別名（預設: default）')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild(options['tournament'], using=options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ 已重建 {count} 筆地圖數據（{time.perf_counter() - started:.2f} 秒）'
+        ))
@@ -0,0 +1,75 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tournaments.models import Tournament
+from tournaments.scheduler import (
+    DEFAULT_CONCURRENT, DEFAULT_DAY_END, DEFAULT_DAY_START, DEFAULT_MAX_DAYS, DEFAULT_MAX_PER_DAY,
+    DEFAULT_SLOT_MINUTES, MatchScheduler,
+)
+
+
+def parse_time(value):
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'無效的時間: {value}（格式 HH:MM）')
+
+
+class Command(BaseCommand):
+    help = '為賽事尚未開打的比賽安排輪次與比賽時間（考慮隊伍可出賽時段、每日場數與同時場數）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int, help='賽事ID')
+        parser.add_argument('--start', help='最早的比賽日期時間，例如 2026-11-01T18:00（預設: 現在）')
+        parser.add_argument('--slot-minutes', type=int, default=DEFAULT_SLOT_MINUTES, help='每個時段的分鐘數')
+        parser.add_argument('--day-start', default=DEFAULT_DAY_START.strftime('%H:%M'), help='每日第一個時段')
+        parser.add_argument('--day-end', default=DEFAULT_DAY_END.strftime('%H:%M'), help='每日最後一個時段的結束時間')
+        parser.add_argument('--concurrent', type=int, default=DEFAULT_CONCURRENT, help='同一時段最多同時進行的比賽數')
+        parser.add_argument('--max-per-day', type=int, default=DEFAULT_MAX_PER_DAY, help='每隊每天最多比賽數')
+        parser.add_argument('--max-days', type=int, default=DEFAULT_MAX_DAYS, help='最多排到開始日期後幾天')
+        parser.add_argument('--reschedule', action='store_true', help='已有時間但尚未開打的比賽也重新排定')
+        parser.add_argument('--dry-run', action='store_true', help='只顯示結果，不寫入資料庫')
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"找不到ID為{options['tournament_id']}的賽事")
+
+        start = None
+        if options['start']:
+            try:
+                start = datetime.fromisoformat(options['start'])
+            except ValueError:
+                raise CommandError(f"無效的開始時間: {options['start']}")
+            if timezone.is_naive(start):
+                start = timezone.make_aware(start)
+
+        try:
+            scheduler = MatchScheduler(
+                tournament,
+                start=start,
+                slot_minutes=options['slot_minutes'],
+                day_start=parse_time(options['day_start']),
+                day_end=parse_time(options['day_end']),
+                concurrent=options['concurrent'],
+                max_per_team_per_day=options['max_per_day'],
+                max_days=options['max_days'],
+                reschedule=options['reschedule'],
+                dry_run=options['dry_run'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'🗓️ 排定 {tournament.name} 的賽程...')
+        result = scheduler.run()
+        for line in result.lines():
+            self.stdout.write(line)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🧪 Dry-run：未寫入任何資料'))
+        elif result.unscheduled:
+            self.stdout.write(self.style.WARNING('⚠️ 部分比賽無法排入，請放寬限制或增加可出賽時段'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ 賽程排定完成'))
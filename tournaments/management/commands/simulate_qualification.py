@@ -0,0 +1,68 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.simulation import (
+    DEFAULT_SIMULATIONS, benchmark_stage, qualification_probability, simulate_stage, simulate_tournament,
+)
+
+
+class Command(BaseCommand):
+    help = '以 Monte Carlo 模擬剩餘比賽，列出每支隊伍的晉級與各名次機率'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int, nargs='?', help='賽事ID（分組循環或瑞士輪）')
+        parser.add_argument('--simulations', type=int, default=DEFAULT_SIMULATIONS, help='模擬次數')
+        parser.add_argument('--qualify', type=int, default=2, help='每個分組（或整個瑞士輪）的晉級名額')
+        parser.add_argument('--seed', type=int, help='亂數種子，指定後結果可重現')
+        parser.add_argument('--no-cache', action='store_true', help='忽略快取，重新模擬')
+        parser.add_argument('--benchmark', type=int, metavar='TEAMS',
+                            help='不讀取資料庫，以 TEAMS 隊的單循環（已打完一半）測試模擬速度')
+
+    def handle(self, *args, **options):
+        try:
+            if options['benchmark']:
+                self.benchmark(options['benchmark'], options['simulations'], options['seed'])
+            else:
+                self.simulate(options)
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+    def benchmark(self, teams, simulations, seed):
+        stage = benchmark_stage(teams, seed=seed or 0)
+        started = time.perf_counter()
+        simulate_stage(stage, simulations, seed)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'⏱️ {teams} 隊、剩餘 {len(stage.remaining)} 場比賽，模擬 {simulations} 次：{elapsed:.2f} 秒'
+        )
+
+    def simulate(self, options):
+        if options['tournament_id'] is None:
+            raise CommandError('請指定賽事ID，或使用 --benchmark')
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"找不到ID為{options['tournament_id']}的賽事")
+
+        try:
+            result = simulate_tournament(
+                tournament, options['simulations'], seed=options['seed'], use_cache=not options['no_cache'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        places = options['qualify']
+        self.stdout.write(f"🎲 {tournament.name}：模擬 {result['simulations']} 次（{result['elapsed']} 秒）")
+        for stage in result['stages']:
+            title = f"分組 #{stage['group_id']}" if stage['group_id'] else '整體'
+            self.stdout.write(f"\n{title}（剩餘 {stage['remaining_matches']} 場）")
+            teams = sorted(stage['teams'], key=lambda team: -qualification_probability(team, places))
+            for team in teams:
+                best = max(range(len(team['positions'])), key=lambda i: team['positions'][i]) + 1
+                self.stdout.write(
+                    f"  {team['team_name']:<20} {team['points']:>3} 分  "
+                    f"晉級 {qualification_probability(team, places):6.1%}  最可能第 {best} 名"
+                )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tournaments.dbsync import DEFAULT_FANOUT, DEFAULT_LEAF_SIZE, DatabaseSync, register_database, sync_models
+
+
+class Command(BaseCommand):
+    help = '以區段雜湊比對兩個資料庫，只同步有差異的資料列'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default='default',
+                            help='來源資料庫：settings 中的別名或資料庫網址（預設: default）')
+        parser.add_argument('--target', required=True,
+                            help='目標資料庫：settings 中的別名或資料庫網址，例如 Supabase 的 postgresql://...')
+        parser.add_argument('--table', action='append', dest='tables',
+                            choices=[table for table, _ in sync_models()], help='只同步指定的資料表，可重複指定')
+        parser.add_argument('--dry-run', action='store_true', help='只列出差異，不寫入目標資料庫')
+        parser.add_argument('--fanout', type=int, default=DEFAULT_FANOUT, help='每一層切分的區段數')
+        parser.add_argument('--leaf-size', type=int, default=DEFAULT_LEAF_SIZE, help='逐列比對的區段大小上限')
+
+    def resolve(self, value, alias):
+        if value in connections.settings:
+            return value
+        if '://' not in value:
+            raise CommandError(f'找不到資料庫別名: {value}')
+        return register_database(alias, value)
+
+    def handle(self, *args, **options):
+        source = self.resolve(options['source'], 'sync_source')
+        target = self.resolve(options['target'], 'sync_target')
+        if source == target:
+            raise CommandError('來源與目標是同一個資料庫')
+
+        self.stdout.write(f"🔍 比對 {source} → {target}...")
+        result = DatabaseSync(
+            source, target,
+            dry_run=options['dry_run'],
+            fanout=options['fanout'],
+            leaf_size=options['leaf_size'],
+            tables=options['tables'],
+            log=self.stdout.write,
+        ).run()
+
+        self.stdout.write("📊 同步結果:")
+        for line in result.lines():
+            self.stdout.write(line)
+        if not result.changed:
+            self.stdout.write(self.style.SUCCESS("✅ 兩個資料庫內容一致"))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING("🧪 Dry-run：未寫入任何資料"))
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ 同步完成"))
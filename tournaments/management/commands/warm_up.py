@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from tournaments import warmup
+
+
+class Command(BaseCommand):
+    help = '預先建立資料庫連線、編譯模板並填入首頁、進行中賽事與排行榜的快取，列出每個階段的耗時'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--phase', action='append', choices=list(warmup.PHASES),
+                            help='只執行指定階段（可重複；預設為全部）')
+        parser.add_argument('--database', default='default', help='資料庫別名（預設: default）')
+
+    def handle(self, *args, **options):
+        report = warmup.run(options['phase'] or warmup.MASTER_PHASES, options['database'], source='manage.py')
+        for phase in report['phases']:
+            line = f"{phase['name']:<16} {phase['ms']:9.2f} ms   {phase['detail']}"
+            self.stdout.write(line if phase['ok'] else self.style.WARNING(f'{line}（失敗）'))
+        if report['ok']:
+            self.stdout.write(self.style.SUCCESS(f"✅ 暖機完成，共 {report['total_ms']:.2f} ms"))
+        else:
+            self.stdout.write(self.style.WARNING(f"⚠️ 暖機完成但有階段失敗，共 {report['total_ms']:.2f} ms"))
@@ -0,0 +1,204 @@
+# tournaments/mapstats.py
+"""
+地圖數據彙總（MapStat）
+
+每一列是「賽事 × 隊伍 × 地圖」已分出勝負的地圖數、勝場與回合數；每張有地圖名稱與勝者的小局（Game）
+為比賽雙方各貢獻一列。頁面與 API 只讀取彙總表，不掃描小局：
+
+- 小局以 save() / delete() 寫入時由 signals 增量更新：寫入前記下資料庫中原本的貢獻（game_rows），
+  寫入後扣回舊的、加上新的（apply_rows，以 F() 加減）
+- 比賽更換賽事或隊伍時，寫入前讀取其小局（match_games），以 match_change 算出前後的貢獻
+- 批次模式（batch.batch_updates）與 bulk 寫入（比分輸入、匯入）在結束時以 rebuild() 重建受影響的賽事
+- rebuild()：以一次彙總查詢重建全部或指定賽事；部署此功能或直接修改資料庫後執行 rebuild_map_stats
+
+讀取：
+- map_overview()：每張地圖的場數與選圖率；指定隊伍時另含該隊的勝率與回合差
+- map_teams()：某張地圖上各隊伍的戰績
+"""
+
+import logging
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Game, MapStat
+
+logger = logging.getLogger('tournaments.mapstats')
+
+COUNTERS = ('played', 'wins', 'rounds_won', 'rounds_lost')
+SUMS = {name: Sum(name) for name in COUNTERS}
+
+# 計入彙總的小局：有地圖名稱、有勝者，且比賽雙方都已確定
+COUNTED_GAMES = (
+    Q(map_name__gt='') & Q(winner__isnull=False)
+    & Q(match__team1__isnull=False) & Q(match__team2__isnull=False)
+)
+
+
+def contribution(tournament_id, team1_id, team2_id, map_name, winner_id, team1_score, team2_score):
+    """一張地圖對彙總表的貢獻：[(賽事, 隊伍, 地圖, 勝場, 贏得回合, 失去回合)]，不計入時回傳 []。"""
+    if not (map_name and winner_id and team1_id and team2_id):
+        return []
+    return [
+        (tournament_id, team1_id, map_name, int(winner_id == team1_id), team1_score, team2_score),
+        (tournament_id, team2_id, map_name, int(winner_id == team2_id), team2_score, team1_score),
+    ]
+
+
+# contribution() 的參數，依序從小局讀取
+GAME_VALUES = (
+    'match__tournament_id', 'match__team1_id', 'match__team2_id',
+    'map_name', 'winner_id', 'team1_score', 'team2_score',
+)
+
+
+def game_rows(game_id, using=DEFAULT_DB_ALIAS):
+    """資料庫中這張地圖目前的貢獻（新建、尚未寫入時為 []）。"""
+    if game_id is None:
+        return []
+    values = Game.objects.using(using).filter(pk=game_id).values_list(*GAME_VALUES).first()
+    return contribution(*values) if values else []
+
+
+def match_games(match_id, using=DEFAULT_DB_ALIAS):
+    """資料庫中這場比賽各小局的 contribution() 參數（包含目前不計入彙總的小局）。"""
+    return list(Game.objects.using(using).filter(match_id=match_id).values_list(*GAME_VALUES))
+
+
+def match_change(games, tournament_id, team1_id, team2_id):
+    """比賽改為新的賽事與隊伍後，games（match_games()）的 (舊貢獻, 新貢獻)。"""
+    previous, current = [], []
+    for values in games:
+        previous += contribution(*values)
+        current += contribution(tournament_id, team1_id, team2_id, *values[3:])
+    return previous, current
+
+
+def apply_rows(rows, sign, using=DEFAULT_DB_ALIAS):
+    """把貢獻加入（sign=1）或扣回（sign=-1）彙總表；扣到沒有出賽的列會刪除。"""
+    for tournament_id, team_id, map_name, wins, rounds_won, rounds_lost in rows:
+        key = {'tournament_id': tournament_id, 'team_id': team_id, 'map_name': map_name}
+        stats = MapStat.objects.using(using).filter(**key)
+        if sign > 0:
+            MapStat.objects.using(using).get_or_create(**key)
+        stats.update(
+            played=F('played') + sign,
+            wins=F('wins') + sign * wins,
+            rounds_won=F('rounds_won') + sign * rounds_won,
+            rounds_lost=F('rounds_lost') + sign * rounds_lost,
+        )
+        if sign < 0:
+            stats.filter(played__lte=0).delete()
+
+
+def update_game(previous, current, using=DEFAULT_DB_ALIAS):
+    """小局寫入後呼叫：previous / current 為寫入前後的 game_rows()。"""
+    if previous == current:
+        return
+    with transaction.atomic(using=using):
+        apply_rows(previous, -1, using)
+        apply_rows(current, 1, using)
+
+
+def aggregate_rows(tournament_ids=None, using=DEFAULT_DB_ALIAS):
+    """
+    以一次查詢（兩個 GROUP BY 以 UNION ALL 合併）彙總小局，回傳 {(賽事, 隊伍, 地圖): {計數}}。
+    兩邊各以隊伍一、隊伍二的角度分組，同一隊伍在兩邊的結果在 Python 中相加。
+    """
+    games = Game.objects.using(using).filter(COUNTED_GAMES)
+    if tournament_ids is not None:
+        games = games.filter(match__tournament_id__in=tournament_ids)
+
+    def side(team, own_score, opponent_score):
+        return (
+            games.values('map_name', tournament=F('match__tournament_id'), team=F(team))
+            .annotate(
+                played=Count('id'),
+                wins=Count('id', filter=Q(winner_id=F(team))),
+                rounds_won=Sum(own_score),
+                rounds_lost=Sum(opponent_score),
+            )
+            .order_by()
+        )
+
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    rows = side('match__team1_id', 'team1_score', 'team2_score').union(
+        side('match__team2_id', 'team2_score', 'team1_score'), all=True
+    )
+    for values in rows:
+        row = totals[(values['tournament'], values['team'], values['map_name'])]
+        for name in COUNTERS:
+            row[name] += values[name]
+    return totals
+
+
+def rebuild(tournament_ids=None, using=DEFAULT_DB_ALIAS, batch_size=1000):
+    """重建全部（tournament_ids 為 None）或指定賽事的彙總表，回傳寫入的列數。"""
+    if tournament_ids is not None:
+        tournament_ids = sorted(set(tournament_ids))
+    totals = aggregate_rows(tournament_ids, using)
+    existing = MapStat.objects.using(using)
+    if tournament_ids is not None:
+        existing = existing.filter(tournament_id__in=tournament_ids)
+    # 在呼叫端的交易中（批次模式結束時）不需要另外建立 savepoint
+    with transaction.atomic(using=using, savepoint=False):
+        existing.delete()
+        MapStat.objects.using(using).bulk_create([
+            MapStat(tournament_id=tournament_id, team_id=team_id, map_name=map_name, **counts)
+            for (tournament_id, team_id, map_name), counts in totals.items()
+        ], batch_size=batch_size)
+    logger.debug('map stats rebuilt: tournaments=%s rows=%d', tournament_ids or 'all', len(totals))
+    return len(totals)
+
+
+# --- 讀取 ---
+
+def _filtered(tournament=None, team=None, map_name=None, using=DEFAULT_DB_ALIAS):
+    stats = MapStat.objects.using(using)
+    if tournament is not None:
+        stats = stats.filter(tournament=tournament)
+    if team is not None:
+        stats = stats.filter(team=team)
+    if map_name is not None:
+        stats = stats.filter(map_name=map_name)
+    return stats
+
+
+def _with_record(row):
+    row['losses'] = row['played'] - row['wins']
+    row['win_rate'] = round(row['wins'] * 100 / row['played'], 1) if row['played'] else 0
+    row['round_diff'] = row['rounds_won'] - row['rounds_lost']
+    return row
+
+
+def map_overview(tournament=None, team=None, using=DEFAULT_DB_ALIAS):
+    """
+    每張地圖一列（依場數排序）：map_name、games、pick_rate（佔所有地圖場數的百分比）。
+    指定 team 時只計該隊的地圖，另含 wins / losses / win_rate / round_diff。
+    """
+    rows = list(
+        _filtered(tournament, team, using=using)
+        .values('map_name').annotate(**SUMS).order_by('-played', 'map_name')
+    )
+    # 不指定隊伍時，每張地圖由雙方各計一次
+    sides = 1 if team is not None else 2
+    total = sum(row['played'] for row in rows)
+    result = []
+    for row in rows:
+        if team is not None:
+            _with_record(row)
+        row['games'] = row['played'] // sides
+        row['pick_rate'] = round(row['played'] * 100 / total, 1) if total else 0
+        result.append(row)
+    return result
+
+
+def map_teams(map_name, tournament=None, using=DEFAULT_DB_ALIAS):
+    """某張地圖上每支隊伍的戰績：team_id、team_name、played、wins、losses、win_rate、round_diff。"""
+    rows = (
+        _filtered(tournament, map_name=map_name, using=using)
+        .values('team_id').annotate(team_name=F('team__name'), **SUMS)
+        .order_by('-wins', '-played', 'team_name')
+    )
+    return [_with_record(row) for row in rows]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:22
+
+import tournaments.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0004_group_max_teams_team_school'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='standing',
+            name='buchholz',
+            field=models.IntegerField(default=0, verbose_name='Buchholz'),
+        ),
+        migrations.AddField(
+            model_name='standing',
+            name='map_diff',
+            field=models.IntegerField(default=0, verbose_name='地圖差'),
+        ),
+        migrations.AddField(
+            model_name='standing',
+            name='rank',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='排名'),
+        ),
+        migrations.AddField(
+            model_name='standing',
+            name='round_diff',
+            field=models.IntegerField(default=0, verbose_name='回合差'),
+        ),
+        migrations.AddField(
+            model_name='standing',
+            name='sonneborn_berger',
+            field=models.FloatField(default=0, verbose_name='Sonneborn-Berger'),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='tiebreakers',
+            field=models.CharField(blank=True, default='head_to_head,map_diff,round_diff', help_text='以逗號分隔，依序套用：head_to_head、map_diff、round_diff、buchholz、sonneborn_berger', max_length=200, validators=[tournaments.models.validate_tiebreakers], verbose_name='同分比較順序'),
+        ),
+        migrations.AddIndex(
+            model_name='standing',
+            index=models.Index(fields=['tournament', 'group', 'rank'], name='tournaments_tournam_7420a6_idx'),
+        ),
+    ]
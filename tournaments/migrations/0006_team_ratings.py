@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0005_standing_tiebreakers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='rating_delta',
+            field=models.FloatField(blank=True, null=True, verbose_name='積分變化'),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='team1_rating',
+            field=models.FloatField(blank=True, null=True, verbose_name='隊伍一賽前積分'),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='team2_rating',
+            field=models.FloatField(blank=True, null=True, verbose_name='隊伍二賽前積分'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='rated_matches',
+            field=models.PositiveIntegerField(default=0, verbose_name='已計分場數'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='rating',
+            field=models.FloatField(db_index=True, default=1500, verbose_name='Elo 積分'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0006_team_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(verbose_name='開始時間')),
+                ('end', models.DateTimeField(verbose_name='結束時間')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='tournaments.team', verbose_name='隊伍')),
+                ('tournament', models.ForeignKey(blank=True, help_text='留空代表適用所有賽事', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='team_availability', to='tournaments.tournament', verbose_name='適用賽事')),
+            ],
+            options={
+                'verbose_name': '隊伍可出賽時段',
+                'verbose_name_plural': '隊伍可出賽時段',
+                'ordering': ['start'],
+            },
+        ),
+    ]
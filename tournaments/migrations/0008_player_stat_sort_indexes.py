@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0007_team_availability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playergamestat',
+            index=models.Index(fields=['acs', 'id'], name='pgs_acs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playergamestat',
+            index=models.Index(fields=['kills', 'id'], name='pgs_kills_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playergamestat',
+            index=models.Index(fields=['deaths', 'id'], name='pgs_deaths_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playergamestat',
+            index=models.Index(fields=['assists', 'id'], name='pgs_assists_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playergamestat',
+            index=models.Index(fields=['first_kills', 'id'], name='pgs_first_kills_idx'),
+        ),
+    ]
@@ -0,0 +1,125 @@
+# 全站搜尋（tournaments/search.py）使用的索引：
+# PostgreSQL 建立 pg_trgm 與全文檢索的 GIN 索引；SQLite 建立 FTS5 虛擬表並以 trigger 同步
+# 注意：SQLite 上之後的 migration 若重建 team / player / tournament 資料表，trigger 會一併消失，
+# 需要在該 migration 中執行 drop_search_indexes 與 create_search_indexes 重新建立
+
+from django.db import migrations
+
+PG_TRIGRAM_FIELDS = [
+    ('tournaments_team', 'name'),
+    ('tournaments_team', 'school'),
+    ('tournaments_player', 'nickname'),
+    ('tournaments_tournament', 'name'),
+]
+PG_FULLTEXT_FIELDS = [
+    ('tournaments_team', 'name'),
+    ('tournaments_player', 'nickname'),
+    ('tournaments_tournament', 'name'),
+]
+
+# rowid = 物件 id * 4 + 種類代碼（隊伍 1、選手 2、賽事 3），與 search.FTS_KIND_CODES 相同
+# label：名稱；keywords：其他可搜尋的文字（隊伍的學校）；detail：只用於顯示（學校、所屬隊伍、遊戲）
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE tournaments_search USING fts5(label, keywords, detail UNINDEXED, tokenize='trigram')",
+    # 隊伍：名稱 / 學校
+    """CREATE TRIGGER tournaments_search_team_ai AFTER INSERT ON tournaments_team BEGIN
+        INSERT INTO tournaments_search(rowid, label, keywords, detail)
+            VALUES (new.id * 4 + 1, new.name, new.school, new.school);
+    END""",
+    """CREATE TRIGGER tournaments_search_team_au AFTER UPDATE OF name, school ON tournaments_team BEGIN
+        UPDATE tournaments_search SET label = new.name, keywords = new.school, detail = new.school
+            WHERE rowid = new.id * 4 + 1;
+        UPDATE tournaments_search SET detail = new.name
+            WHERE old.name IS NOT new.name
+              AND rowid IN (SELECT id * 4 + 2 FROM tournaments_player WHERE team_id = new.id);
+    END""",
+    """CREATE TRIGGER tournaments_search_team_ad AFTER DELETE ON tournaments_team BEGIN
+        DELETE FROM tournaments_search WHERE rowid = old.id * 4 + 1;
+    END""",
+    # 選手：暱稱 / 所屬隊伍名稱
+    """CREATE TRIGGER tournaments_search_player_ai AFTER INSERT ON tournaments_player BEGIN
+        INSERT INTO tournaments_search(rowid, label, detail)
+            VALUES (new.id * 4 + 2, new.nickname, (SELECT name FROM tournaments_team WHERE id = new.team_id));
+    END""",
+    """CREATE TRIGGER tournaments_search_player_au AFTER UPDATE OF nickname, team_id ON tournaments_player BEGIN
+        UPDATE tournaments_search
+            SET label = new.nickname, detail = (SELECT name FROM tournaments_team WHERE id = new.team_id)
+            WHERE rowid = new.id * 4 + 2;
+    END""",
+    """CREATE TRIGGER tournaments_search_player_ad AFTER DELETE ON tournaments_player BEGIN
+        DELETE FROM tournaments_search WHERE rowid = old.id * 4 + 2;
+    END""",
+    # 賽事：名稱 / 遊戲
+    """CREATE TRIGGER tournaments_search_tournament_ai AFTER INSERT ON tournaments_tournament BEGIN
+        INSERT INTO tournaments_search(rowid, label, detail) VALUES (new.id * 4 + 3, new.name, new.game);
+    END""",
+    """CREATE TRIGGER tournaments_search_tournament_au AFTER UPDATE OF name, game ON tournaments_tournament BEGIN
+        UPDATE tournaments_search SET label = new.name, detail = new.game WHERE rowid = new.id * 4 + 3;
+    END""",
+    """CREATE TRIGGER tournaments_search_tournament_ad AFTER DELETE ON tournaments_tournament BEGIN
+        DELETE FROM tournaments_search WHERE rowid = old.id * 4 + 3;
+    END""",
+    # 既有資料
+    """INSERT INTO tournaments_search(rowid, label, keywords, detail)
+        SELECT id * 4 + 1, name, school, school FROM tournaments_team""",
+    """INSERT INTO tournaments_search(rowid, label, detail)
+        SELECT p.id * 4 + 2, p.nickname, t.name FROM tournaments_player p JOIN tournaments_team t ON t.id = p.team_id""",
+    "INSERT INTO tournaments_search(rowid, label, detail) SELECT id * 4 + 3, name, game FROM tournaments_tournament",
+]
+
+SQLITE_TRIGGERS = [
+    f'tournaments_search_{table}_{event}'
+    for table in ('team', 'player', 'tournament') for event in ('ai', 'au', 'ad')
+]
+
+
+def _sqlite_has_fts5_trigram(schema_editor):
+    # trigram tokenizer 需要 SQLite 3.34 以上；沒有時 search 模組會改用 icontains
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize='trigram')")
+            cursor.execute('DROP TABLE temp.fts5_probe')
+    except Exception:
+        return False
+    return True
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, field in PG_TRIGRAM_FIELDS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{field}_trgm ON {table} USING gin ({field} gin_trgm_ops)'
+            )
+        for table, field in PG_FULLTEXT_FIELDS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_{field}_fts ON {table} USING gin (to_tsvector('simple', {field}))"
+            )
+    elif vendor == 'sqlite' and _sqlite_has_fts5_trigram(schema_editor):
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for table, field in PG_TRIGRAM_FIELDS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{field}_trgm')
+        for table, field in PG_FULLTEXT_FIELDS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{field}_fts')
+    elif vendor == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS tournaments_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0008_player_stat_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
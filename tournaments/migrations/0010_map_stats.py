@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0009_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MapStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('map_name', models.CharField(max_length=100, verbose_name='地圖名稱')),
+                ('played', models.IntegerField(default=0, verbose_name='出賽地圖數')),
+                ('wins', models.IntegerField(default=0, verbose_name='勝場')),
+                ('rounds_won', models.IntegerField(default=0, verbose_name='贏得回合')),
+                ('rounds_lost', models.IntegerField(default=0, verbose_name='失去回合')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='map_stats', to='tournaments.team', verbose_name='隊伍')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='map_stats', to='tournaments.tournament', verbose_name='所屬賽事')),
+            ],
+            options={
+                'verbose_name': '地圖數據',
+                'verbose_name_plural': '地圖數據',
+                'indexes': [models.Index(fields=['map_name', 'tournament'], name='mapstat_map_idx'), models.Index(fields=['team', 'map_name'], name='mapstat_team_idx')],
+                'unique_together': {('tournament', 'team', 'map_name')},
+            },
+        ),
+    ]
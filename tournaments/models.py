@@ -1,8 +1,26 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 from django.urls import reverse
 
 
+# 可用的同分比較條件（依設定順序套用）
+TIEBREAKER_CHOICES = {
+    'head_to_head': '同分隊伍間對戰',
+    'map_diff': '地圖差',
+    'round_diff': '回合差',
+    'buchholz': 'Buchholz（對手積分總和）',
+    'sonneborn_berger': 'Sonneborn-Berger（擊敗對手積分總和）',
+}
+DEFAULT_TIEBREAKERS = 'head_to_head,map_diff,round_diff'
+
+
+def validate_tiebreakers(value):
+    unknown = [name for name in value.split(',') if name.strip() and name.strip() not in TIEBREAKER_CHOICES]
+    if unknown:
+        raise ValidationError(f"未知的同分比較條件: {', '.join(unknown)}（可用: {', '.join(TIEBREAKER_CHOICES)}）")
+
+
 class Tournament(models.Model):
     class Format(models.TextChoices):
         SINGLE_ELIMINATION = 'single_elimination', '單敗淘汰'
@@ -28,14 +46,28 @@ class Tournament(models.Model):
         default=Format.SINGLE_ELIMINATION,
         verbose_name="賽制"
     )
+    tiebreakers = models.CharField(
+        max_length=200,
+        blank=True,
+        default=DEFAULT_TIEBREAKERS,
+        validators=[validate_tiebreakers],
+        verbose_name="同分比較順序",
+        help_text="以逗號分隔，依序套用：head_to_head、map_diff、round_diff、buchholz、sonneborn_berger",
+    )
 
     def __str__(self):
         return self.name
 
+    def get_tiebreakers(self):
+        return [name.strip() for name in self.tiebreakers.split(',') if name.strip() in TIEBREAKER_CHOICES]
+
 class Team(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="隊伍名稱")
     school = models.CharField(max_length=200, blank=True, verbose_name="學校名稱")
     logo = models.ImageField(upload_to='team_logos/', null=True, blank=True, verbose_name="隊伍Logo")
+    # 由 ratings 模組維護：比賽完成時增量更新，backfill_ratings() 可依時間順序全部重算
+    rating = models.FloatField(default=1500, db_index=True, verbose_name="Elo 積分")
+    rated_matches = models.PositiveIntegerField(default=0, verbose_name="已計分場數")
 
     def __str__(self):
         return self.name
@@ -50,6 +82,24 @@ PLAYER_ROLES = [
     ('Flex', '自由位'),
 ]
 
+class TeamAvailability(models.Model):
+    """隊伍可出賽的時段；隊伍沒有任何時段時視為隨時可出賽（排程器 scheduler.MatchScheduler 使用）。"""
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='availability', verbose_name="隊伍")
+    tournament = models.ForeignKey(
+        'Tournament', on_delete=models.CASCADE, null=True, blank=True, related_name='team_availability',
+        verbose_name="適用賽事", help_text="留空代表適用所有賽事",
+    )
+    start = models.DateTimeField(verbose_name="開始時間")
+    end = models.DateTimeField(verbose_name="結束時間")
+
+    class Meta:
+        ordering = ['start']
+        verbose_name = "隊伍可出賽時段"
+        verbose_name_plural = "隊伍可出賽時段"
+
+    def __str__(self):
+        return f"{self.team.name}: {self.start:%Y-%m-%d %H:%M} ~ {self.end:%Y-%m-%d %H:%M}"
+
 class Player(models.Model):
     nickname = models.CharField(max_length=100, verbose_name="遊戲內暱稱")
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='players', verbose_name="所屬隊伍")
@@ -84,6 +134,10 @@ class Match(models.Model):
         verbose_name="比賽狀態"
     )
     is_lower_bracket = models.BooleanField(default=False, verbose_name="是否為敗部賽")
+    # Elo 歷史：賽前雙方積分與隊伍一的積分變化（隊伍二為相反數），未計分時為 NULL
+    team1_rating = models.FloatField(null=True, blank=True, verbose_name="隊伍一賽前積分")
+    team2_rating = models.FloatField(null=True, blank=True, verbose_name="隊伍二賽前積分")
+    rating_delta = models.FloatField(null=True, blank=True, verbose_name="積分變化")
 
     def __str__(self):
         bracket = " (敗部)" if self.is_lower_bracket else ""
@@ -123,13 +177,43 @@ class Standing(models.Model):
     losses = models.PositiveIntegerField(default=0, verbose_name="敗場")
     draws = models.PositiveIntegerField(default=0, verbose_name="平局")
     points = models.IntegerField(default=0, verbose_name="積分")
+    # 以下由 tiebreakers.update_tiebreakers() 計算後寫入，讓資料庫可以直接依 rank 排序與分頁
+    map_diff = models.IntegerField(default=0, verbose_name="地圖差")
+    round_diff = models.IntegerField(default=0, verbose_name="回合差")
+    buchholz = models.IntegerField(default=0, verbose_name="Buchholz")
+    sonneborn_berger = models.FloatField(default=0, verbose_name="Sonneborn-Berger")
+    rank = models.PositiveIntegerField(null=True, blank=True, verbose_name="排名")
 
     class Meta:
         unique_together = ('tournament', 'team')
+        indexes = [models.Index(fields=['tournament', 'group', 'rank'])]
 
     def __str__(self):
         return f"{self.tournament.name} - {self.team.name}: {self.points}分"
 
+class MapStat(models.Model):
+    """地圖數據彙總（賽事 × 隊伍 × 地圖），由 mapstats 依小局結果維護，不要直接編輯。"""
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='map_stats', verbose_name="所屬賽事")
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='map_stats', verbose_name="隊伍")
+    map_name = models.CharField(max_length=100, verbose_name="地圖名稱")
+    # 增量更新時以 F() 加減，使用可為負的 IntegerField 避免中間狀態違反限制
+    played = models.IntegerField(default=0, verbose_name="出賽地圖數")
+    wins = models.IntegerField(default=0, verbose_name="勝場")
+    rounds_won = models.IntegerField(default=0, verbose_name="贏得回合")
+    rounds_lost = models.IntegerField(default=0, verbose_name="失去回合")
+
+    class Meta:
+        unique_together = ('tournament', 'team', 'map_name')
+        indexes = [
+            models.Index(fields=['map_name', 'tournament'], name='mapstat_map_idx'),
+            models.Index(fields=['team', 'map_name'], name='mapstat_team_idx'),
+        ]
+        verbose_name = "地圖數據"
+        verbose_name_plural = "地圖數據"
+
+    def __str__(self):
+        return f"{self.tournament.name} - {self.team.name} @ {self.map_name}: {self.wins}/{self.played}"
+
 class PlayerGameStat(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='player_stats', verbose_name="對應小局")
     player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='game_stats', verbose_name="選手")
@@ -143,6 +227,14 @@ class PlayerGameStat(models.Model):
     class Meta:
         # unique_together 現在是 game 和 player
         unique_together = ('game', 'player')
+        # 數據表依這些欄位排序並做 keyset 分頁（tables.SORTABLE_COLUMNS）
+        indexes = [
+            models.Index(fields=['acs', 'id'], name='pgs_acs_idx'),
+            models.Index(fields=['kills', 'id'], name='pgs_kills_idx'),
+            models.Index(fields=['deaths', 'id'], name='pgs_deaths_idx'),
+            models.Index(fields=['assists', 'id'], name='pgs_assists_idx'),
+            models.Index(fields=['first_kills', 'id'], name='pgs_first_kills_idx'),
+        ]
         verbose_name = "選手單局數據"
         verbose_name_plural = "選手單局數據"
 
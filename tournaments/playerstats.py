@@ -0,0 +1,119 @@
+# tournaments/playerstats.py
+"""
+選手個人頁的數據
+
+所有統計都在資料庫中以 values().annotate() 彙總，不把選手的每一筆小局數據載入 Python：
+
+- career_totals()：生涯總計（一次 aggregate）
+- splits()：依地圖、賽事或對手分組的彙總，各只回傳 SPLIT_LIMIT 組
+- game_log()：依比賽時間排序的逐局紀錄（分頁，只讀取一頁）
+- timeseries()：圖表用的精簡時間序列（最近 TIMESERIES_LIMIT 局）
+
+頁面的查詢數與讀取的列數固定，不隨選手的生涯長度增加。
+"""
+
+from django.db.models import Avg, Case, CharField, Count, F, IntegerField, Q, Sum, When
+
+from .models import PlayerGameStat
+
+SPLIT_LIMIT = 10
+GAME_LOG_PAGE_SIZE = 20
+TIMESERIES_LIMIT = 200
+TIMESERIES_FIELDS = ('date', 'acs', 'kills', 'deaths', 'assists', 'first_kills')
+
+# 每一組彙總的欄位
+AGGREGATES = {
+    'games': Count('id'),
+    'wins': Count('id', filter=Q(game__winner_id=F('team_id'))),
+    'kills': Sum('kills'),
+    'deaths': Sum('deaths'),
+    'assists': Sum('assists'),
+    'first_kills': Sum('first_kills'),
+    'avg_acs': Avg('acs'),
+}
+
+# 選手代表隊伍的對手（比賽中的另一隊）
+OPPONENT_ID = Case(
+    When(team_id=F('game__match__team1_id'), then=F('game__match__team2_id')),
+    default=F('game__match__team1_id'),
+    output_field=IntegerField(),
+)
+OPPONENT_NAME = Case(
+    When(team_id=F('game__match__team1_id'), then=F('game__match__team2__name')),
+    default=F('game__match__team1__name'),
+    output_field=CharField(),
+)
+
+# 分組方式 → (分組欄位, 顯示名稱欄位, 排序)
+SPLITS = {
+    'map': ({'key': F('game__map_name')}, 'key', ('-games', 'key')),
+    'tournament': (
+        {'key': F('game__match__tournament_id'), 'label': F('game__match__tournament__name'),
+         'start_date': F('game__match__tournament__start_date')},
+        'label', ('-start_date', 'key'),
+    ),
+    'opponent': ({'key': OPPONENT_ID, 'label': OPPONENT_NAME}, 'label', ('-games', 'label')),
+}
+
+
+def _with_ratios(row):
+    row['kd'] = round(row['kills'] / row['deaths'], 2) if row['deaths'] else float(row['kills'] or 0)
+    row['win_rate'] = round(row['wins'] * 100 / row['games']) if row['games'] else 0
+    row['avg_acs'] = round(row['avg_acs'] or 0, 1)
+    return row
+
+
+def career_totals(player):
+    totals = PlayerGameStat.objects.filter(player=player).aggregate(**AGGREGATES)
+    for name in ('kills', 'deaths', 'assists', 'first_kills'):
+        totals[name] = totals[name] or 0
+    return _with_ratios(totals)
+
+
+def splits(player, by, limit=SPLIT_LIMIT):
+    """回傳 [{'key', 'label', 'games', 'wins', 'kills', ..., 'kd', 'win_rate'}]。"""
+    fields, label, ordering = SPLITS[by]
+    rows = (
+        PlayerGameStat.objects.filter(player=player)
+        .annotate(**fields)
+        .values(*fields)
+        .annotate(**AGGREGATES)
+        .order_by(*ordering)[:limit]
+    )
+    result = []
+    for row in rows:
+        row['label'] = row[label] or '未知'
+        result.append(_with_ratios(row))
+    return result
+
+
+def game_log(player):
+    """逐局紀錄（新到舊）；尚未排定時間的比賽排在最後。"""
+    return (
+        PlayerGameStat.objects.filter(player=player)
+        .values('id', 'kills', 'deaths', 'assists', 'first_kills', 'acs')
+        .annotate(
+            tournament_id=F('game__match__tournament_id'),
+            tournament_name=F('game__match__tournament__name'),
+            round_number=F('game__match__round_number'),
+            match_time=F('game__match__match_time'),
+            map_name=F('game__map_name'),
+            opponent=OPPONENT_NAME,
+            won=Case(When(game__winner_id=F('team_id'), then=True), default=False),
+        )
+        .order_by(F('game__match__match_time').desc(nulls_last=True), '-id')
+    )
+
+
+def timeseries(player, limit=TIMESERIES_LIMIT):
+    """{'fields': TIMESERIES_FIELDS, 'rows': [[日期, acs, ...], ...]}，由舊到新，最多 limit 局。"""
+    rows = list(
+        PlayerGameStat.objects.filter(player=player)
+        .order_by(F('game__match__match_time').desc(nulls_last=True), '-id')
+        .values_list('game__match__match_time', 'acs', 'kills', 'deaths', 'assists', 'first_kills')[:limit]
+    )
+    rows.reverse()
+    return {
+        'fields': TIMESERIES_FIELDS,
+        'rows': [[time.date().isoformat() if time else None, round(acs, 1), *rest] for time, acs, *rest in rows],
+    }
@@ -0,0 +1,135 @@
+# tournaments/ratings.py
+"""
+隊伍 Elo 積分
+
+- 比賽完成（或結果修改、改回未完成、刪除）時由 signals 呼叫 apply_match() / revert_match()，
+  只用 F() 更新兩支隊伍的積分，不重算其他比賽
+- 每場比賽記錄賽前雙方積分與隊伍一的積分變化（Match.team1_rating / team2_rating / rating_delta），
+  歷史不需要另外的資料表，任一時點的積分都可以由比賽紀錄還原
+- backfill_ratings() 依時間順序一次讀出所有已完成比賽，在記憶體中重播後分批寫回；
+  修改較早的比賽結果或大量匯入後，以此取得與逐場計算完全相同的結果
+
+可在 settings 中設定 ELO_INITIAL_RATING（預設 1500）與 ELO_K_FACTOR（預設 32）。
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+
+from .models import Match, Team
+
+# 比賽的時間順序：先依賽事，再依輪次與比賽時間
+CHRONOLOGICAL_ORDER = (
+    'tournament__start_date', 'tournament_id', 'round_number', F('match_time').asc(nulls_last=True), 'id',
+)
+RATING_FIELDS = ['team1_rating', 'team2_rating', 'rating_delta']
+
+
+def initial_rating():
+    return getattr(settings, 'ELO_INITIAL_RATING', 1500)
+
+
+def k_factor():
+    return getattr(settings, 'ELO_K_FACTOR', 32)
+
+
+def expected_score(rating, opponent_rating):
+    """Elo 期望勝率。"""
+    return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+
+
+def match_score(team1_id, winner_id):
+    """隊伍一的實際得分：勝 1、和 0.5、敗 0。"""
+    if winner_id is None:
+        return 0.5
+    return 1.0 if winner_id == team1_id else 0.0
+
+
+def rating_delta(rating1, rating2, score, k=None):
+    return (k_factor() if k is None else k) * (score - expected_score(rating1, rating2))
+
+
+def _shift(team_id, delta, matches, using):
+    Team.objects.using(using).filter(pk=team_id).update(
+        rating=F('rating') + delta, rated_matches=F('rated_matches') + matches
+    )
+
+
+def revert_match(match, using=DEFAULT_DB_ALIAS):
+    """扣回一場比賽已計入的積分變化（比賽刪除時，instance 上仍有 rating_delta）。"""
+    if match.rating_delta is None or not match.team1_id or not match.team2_id:
+        return
+    _shift(match.team1_id, -match.rating_delta, -1, using)
+    _shift(match.team2_id, match.rating_delta, -1, using)
+
+
+def apply_match(match, using=DEFAULT_DB_ALIAS, previous=None):
+    """
+    比賽儲存後呼叫：先扣回這場比賽之前計入的變化（previous 為寫入前資料庫中的
+    {'team1_id', 'team2_id', 'rating_delta'}，隊伍可能已更換或清空），
+    比賽已完成且雙方都已確定時再以雙方目前的積分重新計算。
+    修改的若不是雙方最近的一場比賽，結果會與依時間重播略有差異，需要時執行 backfill_ratings()。
+    """
+    rated = match.status == 'completed' and match.team1_id and match.team2_id
+    if previous is None and not rated:
+        return
+    with transaction.atomic(using=using):
+        if previous is not None and previous['team1_id'] and previous['team2_id']:
+            _shift(previous['team1_id'], -previous['rating_delta'], -1, using)
+            _shift(previous['team2_id'], previous['rating_delta'], -1, using)
+
+        values = dict.fromkeys(RATING_FIELDS)
+        if rated:
+            ratings = dict(Team.objects.using(using).filter(
+                pk__in=[match.team1_id, match.team2_id]
+            ).values_list('pk', 'rating'))
+            rating1, rating2 = ratings[match.team1_id], ratings[match.team2_id]
+            delta = rating_delta(rating1, rating2, match_score(match.team1_id, match.winner_id))
+            _shift(match.team1_id, delta, 1, using)
+            _shift(match.team2_id, -delta, 1, using)
+            values = {'team1_rating': rating1, 'team2_rating': rating2, 'rating_delta': delta}
+
+        Match.objects.using(using).filter(pk=match.pk).update(**values)
+        for field, value in values.items():
+            setattr(match, field, value)
+
+
+def backfill_ratings(using=DEFAULT_DB_ALIAS, batch_size=500):
+    """
+    依時間順序重播所有已完成比賽，重新計算每支隊伍的積分與每場比賽的積分紀錄。
+    只需要一次讀取比賽的查詢，寫入以 bulk_update 分批進行。回傳計分的比賽數。
+    """
+    start, k = initial_rating(), k_factor()
+    ratings = {}
+    played = Counter()
+    history = []
+    matches = Match.objects.using(using).filter(
+        status='completed', team1__isnull=False, team2__isnull=False
+    ).order_by(*CHRONOLOGICAL_ORDER).values_list('id', 'team1_id', 'team2_id', 'winner_id')
+    for match_id, team1_id, team2_id, winner_id in matches.iterator(chunk_size=2000):
+        rating1, rating2 = ratings.get(team1_id, start), ratings.get(team2_id, start)
+        delta = rating_delta(rating1, rating2, match_score(team1_id, winner_id), k)
+        ratings[team1_id] = rating1 + delta
+        ratings[team2_id] = rating2 - delta
+        played[team1_id] += 1
+        played[team2_id] += 1
+        history.append(Match(pk=match_id, team1_rating=rating1, team2_rating=rating2, rating_delta=delta))
+
+    with transaction.atomic(using=using):
+        Match.objects.using(using).filter(rating_delta__isnull=False).exclude(
+            status='completed', team1__isnull=False, team2__isnull=False
+        ).update(**dict.fromkeys(RATING_FIELDS))
+        Match.objects.using(using).bulk_update(history, RATING_FIELDS, batch_size=batch_size)
+        Team.objects.using(using).update(rating=start, rated_matches=0)
+        Team.objects.using(using).bulk_update(
+            [Team(pk=team_id, rating=rating, rated_matches=played[team_id]) for team_id, rating in ratings.items()],
+            ['rating', 'rated_matches'], batch_size=batch_size,
+        )
+    return len(history)
+
+
+def seeding_order(teams):
+    """依積分由高到低排列隊伍（同分依隊名），作為分組種子或瑞士輪首輪的順序。"""
+    return sorted(teams, key=lambda team: (-team.rating, team.name))
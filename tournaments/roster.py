@@ -0,0 +1,214 @@
+# tournaments/roster.py
+"""
+隊伍與選手名單批次匯入
+
+名單為 CSV 或 TSV（自動判斷），每列一位選手，欄位依序為：
+
+    隊伍, 學校, 選手暱稱, 角色
+
+- 可有標題列（第一欄為 team / 隊伍 / 隊伍名稱 時略過）
+- 只有隊伍名稱的列代表只建立隊伍（與舊版「每行一個隊伍」的格式相容）
+- 角色可填代碼（Duelist）或中文（決鬥者）；留空時新選手為自由位（Flex），既有選手維持原角色
+
+parse_roster() 一次讀完並檢查所有列，錯誤集中回報；import_roster() 以每種資料各一次 IN 查詢
+比對既有的隊伍與選手，新資料以 bulk_create 建立，已有的隊伍只補上學校、已有的選手只更新角色。
+"""
+
+import csv
+import io
+
+from django.db import transaction
+
+from .models import PLAYER_ROLES, Player, Team
+
+HEADER_NAMES = ('team', 'teams', '隊伍', '隊伍名稱')
+ROLE_LOOKUP = {code.lower(): code for code, _ in PLAYER_ROLES}
+ROLE_LOOKUP.update({label: code for code, label in PLAYER_ROLES})
+DEFAULT_ROLE = 'Flex'
+TEAM_NAME_LENGTH = Team._meta.get_field('name').max_length
+SCHOOL_LENGTH = Team._meta.get_field('school').max_length
+NICKNAME_LENGTH = Player._meta.get_field('nickname').max_length
+
+
+class RosterError(ValueError):
+    """名單格式錯誤；errors 為 [(行號, 訊息), ...]。"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('\n'.join(f'第 {line} 行：{message}' for line, message in errors))
+
+
+class Roster:
+    """解析後的名單：teams 依出現順序保存 {隊伍名稱: {'school': ..., 'players': [(暱稱, 角色), ...]}}。"""
+
+    def __init__(self, teams=None):
+        self.teams = teams or {}
+
+    @property
+    def team_names(self):
+        return list(self.teams)
+
+    @property
+    def player_count(self):
+        return sum(len(team['players']) for team in self.teams.values())
+
+    def to_session(self):
+        """轉成可存進 session 的 JSON 資料。"""
+        return [
+            {'name': name, 'school': team['school'], 'players': [list(player) for player in team['players']]}
+            for name, team in self.teams.items()
+        ]
+
+    def to_text(self):
+        """轉回 CSV 文字（精靈返回上一步時填回表單）。"""
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator='\n')
+        for name, team in self.teams.items():
+            if not team['players']:
+                writer.writerow([name, team['school']] if team['school'] else [name])
+            for nickname, role in team['players']:
+                writer.writerow([name, team['school'], nickname, role])
+        return output.getvalue()
+
+    @classmethod
+    def from_session(cls, data):
+        return cls({
+            item['name']: {'school': item['school'], 'players': [tuple(player) for player in item['players']]}
+            for item in data
+        })
+
+
+def _dialect(text):
+    sample = text[:4096]
+    return 'excel-tab' if '\t' in sample else 'excel'
+
+
+def parse_roster(text):
+    """解析名單文字，有任何錯誤時拋出 RosterError（列出所有錯誤）。"""
+    text = text.lstrip('\ufeff')
+    teams = {}
+    errors = []
+    for line, row in enumerate(csv.reader(io.StringIO(text), dialect=_dialect(text)), start=1):
+        row = [cell.strip() for cell in row]
+        if not any(row):
+            continue
+        if line == 1 and row[0].lower() in HEADER_NAMES:
+            continue
+        name, school, nickname, role = (row + [''] * 4)[:4]
+        if not name:
+            errors.append((line, '缺少隊伍名稱'))
+            continue
+        if len(name) > TEAM_NAME_LENGTH:
+            errors.append((line, f'隊伍名稱超過 {TEAM_NAME_LENGTH} 個字'))
+            continue
+        if len(school) > SCHOOL_LENGTH:
+            errors.append((line, f'學校名稱超過 {SCHOOL_LENGTH} 個字'))
+            continue
+
+        team = teams.setdefault(name, {'school': school, 'players': [], 'nicknames': set()})
+        if school:
+            if team['school'] and team['school'] != school:
+                errors.append((line, f'隊伍「{name}」的學校與前面的列不同（{team["school"]} / {school}）'))
+                continue
+            team['school'] = school
+
+        if not nickname:
+            if role:
+                errors.append((line, '有角色但缺少選手暱稱'))
+            continue
+        if len(nickname) > NICKNAME_LENGTH:
+            errors.append((line, f'選手暱稱超過 {NICKNAME_LENGTH} 個字'))
+            continue
+        code = ROLE_LOOKUP.get(role.lower(), ROLE_LOOKUP.get(role)) if role else ''
+        if code is None:
+            errors.append((line, f'未知的角色「{role}」'))
+            continue
+        if nickname in team['nicknames']:
+            errors.append((line, f'選手「{nickname}」在隊伍「{name}」中重複'))
+            continue
+        team['nicknames'].add(nickname)
+        team['players'].append((nickname, code))
+
+    if errors:
+        raise RosterError(errors)
+    if not teams:
+        raise RosterError([(1, '名單是空的')])
+    for team in teams.values():
+        del team['nicknames']
+    return Roster(teams)
+
+
+class RosterResult:
+
+    def __init__(self):
+        self.teams = []
+        self.teams_created = 0
+        self.teams_updated = 0
+        self.players_created = 0
+        self.players_updated = 0
+
+    def as_dict(self):
+        return {
+            'teams': len(self.teams),
+            'teams_created': self.teams_created,
+            'teams_updated': self.teams_updated,
+            'players_created': self.players_created,
+            'players_updated': self.players_updated,
+        }
+
+
+def import_roster(roster, tournament=None):
+    """
+    寫入名單並（指定 tournament 時）把所有隊伍加入賽事。
+    回傳 RosterResult，其中 teams 依名單順序排列。
+    """
+    result = RosterResult()
+    names = roster.team_names
+    with transaction.atomic():
+        existing = {team.name: team for team in Team.objects.filter(name__in=names)}
+        changed = []
+        for name, team in existing.items():
+            school = roster.teams[name]['school']
+            if school and team.school != school:
+                team.school = school
+                changed.append(team)
+        if changed:
+            Team.objects.bulk_update(changed, ['school'])
+        created = Team.objects.bulk_create([
+            Team(name=name, school=roster.teams[name]['school']) for name in names if name not in existing
+        ])
+        result.teams_created, result.teams_updated = len(created), len(changed)
+        teams = dict(existing, **{team.name: team for team in created})
+        result.teams = [teams[name] for name in names]
+
+        # 選手只在既有隊伍中可能已存在
+        wanted = {
+            (teams[name].pk, nickname): role
+            for name, team in roster.teams.items()
+            for nickname, role in team['players']
+        }
+        players = {}
+        existing_team_ids = [team.pk for team in existing.values()]
+        if existing_team_ids and wanted:
+            for player in Player.objects.filter(
+                team_id__in=existing_team_ids, nickname__in={nickname for _, nickname in wanted}
+            ).only('pk', 'team_id', 'nickname', 'role'):
+                players[(player.team_id, player.nickname)] = player
+        updated = []
+        for key, role in wanted.items():
+            player = players.get(key)
+            if player is not None and role and player.role != role:
+                player.role = role
+                updated.append(player)
+        if updated:
+            Player.objects.bulk_update(updated, ['role'])
+        new_players = Player.objects.bulk_create([
+            Player(team_id=team_id, nickname=nickname, role=role or DEFAULT_ROLE)
+            for (team_id, nickname), role in wanted.items()
+            if (team_id, nickname) not in players
+        ])
+        result.players_created, result.players_updated = len(new_players), len(updated)
+
+        if tournament is not None:
+            tournament.participants.add(*result.teams)
+    return result
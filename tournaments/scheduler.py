@@ -0,0 +1,304 @@
+# tournaments/scheduler.py
+"""
+賽程時間排程
+
+MatchScheduler 為賽事尚未開打的比賽安排輪次與比賽時間：
+
+1. 分組循環以輪轉法（circle method）重新分配輪次，每輪每隊最多出賽一場
+2. 從開始日期起，每天 day_start ~ day_end 之間每 slot_minutes 分鐘一個時段，
+   每個時段最多同時進行 concurrent 場比賽
+3. 依 (輪次, id) 順序貪婪地把每場比賽放進最早可行的時段：
+   - 兩隊都在可出賽時段內（TeamAvailability；沒有設定代表隨時可出賽）
+   - 兩隊當天的比賽數未達 max_per_team_per_day
+   - 晚於兩隊前一場比賽；隊伍未定的淘汰賽比賽晚於前一輪所有比賽
+4. 放不進去的比賽再以修補模式重試一次（不要求晚於前一場，只要時段與隊伍都沒有衝突），
+   仍失敗的列在結果中，match_time 保持原值
+
+所有比賽在記憶體中排完後以一次 bulk_update 寫回，並遞增賽事的片段快取版本號（fragments）。
+"""
+
+import bisect
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import fragments
+from .models import Match, Standing, TeamAvailability, Tournament
+
+DEFAULT_SLOT_MINUTES = 60
+DEFAULT_DAY_START = time(18, 0)
+DEFAULT_DAY_END = time(22, 0)
+DEFAULT_CONCURRENT = 4
+DEFAULT_MAX_PER_DAY = 2
+DEFAULT_MAX_DAYS = 180
+
+
+def circle_rounds(team_ids):
+    """
+    輪轉法：n 隊（奇數時補一個輪空）共 n - 1 輪，每輪每隊恰好一場。
+    回傳 [[(team1_id, team2_id), ...], ...]，輪空的配對不列出。
+    """
+    teams = list(team_ids)
+    if len(teams) % 2:
+        teams.append(None)
+    size = len(teams)
+    rounds = []
+    for index in range(size - 1):
+        pairs = []
+        for i in range(size // 2):
+            first, second = teams[i], teams[size - 1 - i]
+            if first is not None and second is not None:
+                # 主客場交替，避免同一隊總是隊伍一
+                pairs.append((first, second) if (index + i) % 2 == 0 else (second, first))
+        rounds.append(pairs)
+        # 第一隊固定，其餘順時針轉一格
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return rounds
+
+
+def round_robin_round_numbers(tournament):
+    """依各分組的輪轉法回傳 {frozenset((team1_id, team2_id)): 輪次}。"""
+    members = defaultdict(list)
+    for group_id, team_id in Standing.objects.filter(
+        tournament=tournament, group__isnull=False
+    ).order_by('group_id', 'team_id').values_list('group_id', 'team_id'):
+        members[group_id].append(team_id)
+    if not members:
+        for group in tournament.groups.prefetch_related('teams'):
+            members[group.pk] = sorted(team.pk for team in group.teams.all())
+
+    numbers = {}
+    for team_ids in members.values():
+        for round_number, pairs in enumerate(circle_rounds(team_ids), start=1):
+            for pair in pairs:
+                numbers[frozenset(pair)] = round_number
+    return numbers
+
+
+class ScheduleResult:
+
+    def __init__(self):
+        self.scheduled = []
+        self.unscheduled = []
+        self.repaired = 0
+        self.first_time = None
+        self.last_time = None
+
+    def lines(self):
+        lines = [f'  - 已排定 {len(self.scheduled)} 場比賽']
+        if self.first_time:
+            lines.append(f'  - 時間範圍: {self.first_time:%Y-%m-%d %H:%M} ~ {self.last_time:%Y-%m-%d %H:%M}')
+        if self.repaired:
+            lines.append(f'  - 以修補模式排入 {self.repaired} 場（未依輪次先後）')
+        if self.unscheduled:
+            lines.append(f'  - 無法排入 {len(self.unscheduled)} 場: ' + ', '.join(f'#{m.pk}' for m in self.unscheduled))
+        return lines
+
+
+class MatchScheduler:
+    """
+    用法：
+        result = MatchScheduler(tournament, start=timezone.now()).run()
+    """
+
+    def __init__(self, tournament, start=None, slot_minutes=DEFAULT_SLOT_MINUTES, day_start=DEFAULT_DAY_START,
+                 day_end=DEFAULT_DAY_END, concurrent=DEFAULT_CONCURRENT, max_per_team_per_day=DEFAULT_MAX_PER_DAY,
+                 max_days=DEFAULT_MAX_DAYS, reschedule=False, dry_run=False):
+        if day_end <= day_start:
+            raise ValueError('每日結束時間必須晚於開始時間')
+        if slot_minutes <= 0 or concurrent <= 0 or max_per_team_per_day <= 0:
+            raise ValueError('時段長度、同時場數與每日場數上限都必須大於 0')
+        self.tournament = tournament
+        start = start or timezone.now()
+        # 每日時段以當地時間計算
+        self.start = timezone.localtime(start) if timezone.is_aware(start) else start
+        self.slot = timedelta(minutes=slot_minutes)
+        self.day_start = day_start
+        self.concurrent = concurrent
+        self.max_per_day = max_per_team_per_day
+        self.max_days = max_days
+        self.reschedule = reschedule
+        self.dry_run = dry_run
+        minutes = (datetime.combine(self.start.date(), day_end) - datetime.combine(self.start.date(), day_start))
+        self.slots_per_day = max(1, int(minutes / self.slot))
+        self.result = ScheduleResult()
+
+    # --- 時段 ---
+
+    def slot_time(self, index):
+        day, offset = divmod(index, self.slots_per_day)
+        date = self.start.date() + timedelta(days=day)
+        moment = datetime.combine(date, self.day_start) + self.slot * offset
+        if timezone.is_aware(self.start):
+            moment = timezone.make_aware(moment, self.start.tzinfo)
+        return moment
+
+    def first_slot(self):
+        """開始時間之後的第一個時段。"""
+        index = 0
+        while self.slot_time(index) < self.start:
+            index += 1
+        return index
+
+    def _load_availability(self, team_ids):
+        windows = defaultdict(list)
+        for team_id, start, end in TeamAvailability.objects.filter(
+            Q(tournament=self.tournament) | Q(tournament__isnull=True), team_id__in=team_ids,
+        ).order_by('start').values_list('team_id', 'start', 'end'):
+            windows[team_id].append((start, end))
+        return {team_id: ([s for s, _ in spans], spans) for team_id, spans in windows.items()}
+
+    def slot_index(self, moment):
+        """比賽時間對應的時段；不在時段格線上時回傳 None。"""
+        moment = timezone.localtime(moment) if timezone.is_aware(moment) else moment
+        day = (moment.date() - self.start.date()).days
+        offset = datetime.combine(moment.date(), moment.time()) - datetime.combine(moment.date(), self.day_start)
+        if day < 0 or offset % self.slot or not 0 <= offset // self.slot < self.slots_per_day:
+            return None
+        return day * self.slots_per_day + offset // self.slot
+
+    def available(self, team_id, index):
+        if team_id not in self.windows:
+            return True
+        key = (team_id, index)
+        if key not in self.available_cache:
+            starts, spans = self.windows[team_id]
+            begin = self.slot_time(index)
+            position = bisect.bisect_right(starts, begin)
+            # 開始時間不晚於時段開始、且結束時間涵蓋整個時段的區間
+            self.available_cache[key] = any(
+                end >= begin + self.slot for _, end in spans[:position]
+            )
+        return self.available_cache[key]
+
+    # --- 排程 ---
+
+    def matches(self):
+        queryset = Match.objects.filter(tournament=self.tournament, status='scheduled')
+        if not self.reschedule:
+            queryset = queryset.filter(match_time__isnull=True)
+        return list(queryset.order_by('round_number', 'id'))
+
+    def run(self):
+        matches = self.matches()
+        original_rounds = {match.pk: match.round_number for match in matches}
+        if self.tournament.format == Tournament.Format.ROUND_ROBIN:
+            numbers = round_robin_round_numbers(self.tournament)
+            for match in matches:
+                if match.team1_id and match.team2_id:
+                    match.round_number = numbers.get(frozenset((match.team1_id, match.team2_id)), match.round_number)
+            matches.sort(key=lambda match: (match.round_number, match.pk))
+
+        team_ids = {team_id for match in matches for team_id in (match.team1_id, match.team2_id) if team_id}
+        self.windows = self._load_availability(team_ids)
+        self.available_cache = {}
+        self.used = Counter()
+        self.busy = defaultdict(set)
+        self.per_day = Counter()
+        self.last_slot = {}
+        self.round_end = {}
+        self.first_open = self.first_slot()
+        self.horizon = self.max_days * self.slots_per_day
+        self._reserve_existing(matches)
+
+        failed = []
+        for match in matches:
+            earliest = self._earliest(match)
+            index = self._search(match, earliest)
+            if index is None:
+                failed.append(match)
+            else:
+                self._place(match, index)
+
+        # 修補：只要求時段與隊伍沒有衝突
+        for match in failed:
+            index = self._search(match, self.first_open)
+            if index is None:
+                self.result.unscheduled.append(match)
+            else:
+                self._place(match, index)
+                self.result.repaired += 1
+
+        placed = self.result.scheduled
+        if placed:
+            times = [match.match_time for match in placed]
+            self.result.first_time, self.result.last_time = min(times), max(times)
+        if not self.dry_run and placed:
+            # 輪次沒有變動時（例如已由輪轉法產生的賽程）只寫入比賽時間，bulk_update 的 CASE 少一半
+            fields = ['match_time']
+            if any(match.round_number != original_rounds[match.pk] for match in placed):
+                fields.append('round_number')
+            with transaction.atomic():
+                Match.objects.bulk_update(placed, fields, batch_size=1000)
+            # bulk_update 不經過 signals，賽事頁面與輪次片段的快取由這裡失效
+            fragments.bump('tournament', [self.tournament.pk])
+        return self.result
+
+    def _reserve_existing(self, matches):
+        """已有時間、這次不重排的比賽先佔住時段，避免衝突。"""
+        pending = {match.pk for match in matches}
+        existing = Match.objects.filter(tournament=self.tournament, match_time__isnull=False).exclude(
+            pk__in=pending
+        ).values_list('match_time', 'team1_id', 'team2_id')
+        for match_time, *teams in existing:
+            index = self.slot_index(match_time)
+            if index is None:
+                continue
+            self.used[index] += 1
+            for team_id in teams:
+                if team_id:
+                    self.busy[team_id].add(index)
+                    self.per_day[(team_id, index // self.slots_per_day)] += 1
+        while self.used[self.first_open] >= self.concurrent:
+            self.first_open += 1
+
+    def _earliest(self, match):
+        teams = [team_id for team_id in (match.team1_id, match.team2_id) if team_id]
+        earliest = max([self.last_slot.get(team_id, -1) + 1 for team_id in teams] + [self.first_open])
+        if len(teams) < 2:
+            # 隊伍未定（淘汰賽後段）：必須在前面所有輪次結束之後
+            previous = [end for number, end in self.round_end.items() if number < match.round_number]
+            if previous:
+                earliest = max(earliest, max(previous) + 1)
+        return earliest
+
+    def _team_ok(self, team_id, index, day):
+        return (
+            index not in self.busy[team_id]
+            and self.per_day[(team_id, day)] < self.max_per_day
+            and self.available(team_id, index)
+        )
+
+    def _search(self, match, index):
+        teams = [team_id for team_id in (match.team1_id, match.team2_id) if team_id]
+        while index < self.horizon:
+            if self.used[index] >= self.concurrent:
+                index += 1
+                continue
+            day = index // self.slots_per_day
+            full = [team_id for team_id in teams if self.per_day[(team_id, day)] >= self.max_per_day]
+            if full:
+                # 當天已達上限，直接跳到隔天第一個時段
+                index = (day + 1) * self.slots_per_day
+                continue
+            if all(self._team_ok(team_id, index, day) for team_id in teams):
+                return index
+            index += 1
+        return None
+
+    def _place(self, match, index):
+        day = index // self.slots_per_day
+        self.used[index] += 1
+        while self.used[self.first_open] >= self.concurrent:
+            self.first_open += 1
+        for team_id in (match.team1_id, match.team2_id):
+            if team_id:
+                self.busy[team_id].add(index)
+                self.per_day[(team_id, day)] += 1
+                self.last_slot[team_id] = max(index, self.last_slot.get(team_id, -1))
+        self.round_end[match.round_number] = max(index, self.round_end.get(match.round_number, -1))
+        match.match_time = self.slot_time(index)
+        self.result.scheduled.append(match)
@@ -0,0 +1,206 @@
+# tournaments/scoreentry.py
+"""
+比賽日批次輸入比分
+
+ScoreSheet 載入賽事某一輪的所有比賽與地圖，解析表單一次送出的整輪比分：
+
+- 每場比賽最多 maps 張地圖，每張地圖填地圖名稱與雙方回合數（都留空代表沒有打這張地圖）
+- 地圖不能平手，地圖勝者為回合數較多的一方；比賽比分為雙方贏得的地圖數
+- 勝者可選「依地圖數」（預設）或直接指定；指定的勝者與地圖數不符、地圖數相同卻沒有指定勝者時視為錯誤
+- 沒有地圖也沒有指定勝者的比賽為尚未開始；沒有地圖時保留比賽原本的比分
+
+所有比賽檢查通過後才寫入：在單一交易中以 bulk_update / bulk_create 與一次 delete 寫入有變動的比賽與地圖，
+並在批次模式（batch.batch_updates）中只重算一次積分榜、對戰矩陣與 Elo。
+"""
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .batch import batch_updates
+from .models import Game, Match
+
+DEFAULT_MAPS = 3
+MAX_MAPS = 7
+MATCH_FIELDS = ['team1_score', 'team2_score', 'winner', 'status']
+GAME_FIELDS = ['map_name', 'team1_score', 'team2_score', 'winner']
+
+
+def field_name(match_id, name, map_number=None):
+    if map_number is None:
+        return f'match-{match_id}-{name}'
+    return f'match-{match_id}-map{map_number}-{name}'
+
+
+def _score(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValueError
+    return int(value)
+
+
+class ScoreRow:
+    """一場比賽在表單上的內容：maps 為 [(地圖名稱, 隊伍一回合數, 隊伍二回合數)]，未填為 None。"""
+
+    def __init__(self, match, maps, winner_choice=''):
+        self.match = match
+        self.maps = maps
+        self.winner_choice = winner_choice
+        self.errors = []
+
+    @classmethod
+    def from_match(cls, match, map_count):
+        games = {game.map_number: game for game in match.games.all()}
+        maps = []
+        for number in range(1, map_count + 1):
+            game = games.get(number)
+            maps.append((game.map_name or '', game.team1_score, game.team2_score) if game else ('', None, None))
+        # 勝者與地圖數一致時顯示「依地圖數」，否則（例如沒有地圖紀錄）保留原本指定的勝者
+        team1_maps = sum(game.team1_score > game.team2_score for game in games.values())
+        team2_maps = sum(game.team2_score > game.team1_score for game in games.values())
+        winner_choice = ''
+        if match.winner_id and match.winner_id == match.team1_id and (not games or team1_maps <= team2_maps):
+            winner_choice = 'team1'
+        elif match.winner_id and match.winner_id == match.team2_id and (not games or team2_maps <= team1_maps):
+            winner_choice = 'team2'
+        return cls(match, maps, winner_choice)
+
+    @property
+    def played_maps(self):
+        return [(number, name, t1, t2) for number, (name, t1, t2) in enumerate(self.maps, start=1) if t1 is not None]
+
+    def clean(self):
+        match = self.match
+        team1_maps = team2_maps = 0
+        for number, (name, t1, t2) in enumerate(self.maps, start=1):
+            if (t1 is None) != (t2 is None):
+                self.errors.append(f'地圖 {number} 需要填寫雙方比分')
+            elif t1 is not None and t1 == t2:
+                self.errors.append(f'地圖 {number} 不能平手')
+            elif t1 is not None:
+                team1_maps += t1 > t2
+                team2_maps += t2 > t1
+        if self.winner_choice not in ('', 'team1', 'team2'):
+            self.errors.append('勝者選項無效')
+        if (self.played_maps or self.winner_choice) and not (match.team1_id and match.team2_id):
+            self.errors.append('隊伍尚未確定，不能輸入比分')
+        if self.errors:
+            return
+
+        if self.winner_choice == 'team1' and team1_maps < team2_maps:
+            self.errors.append('指定的勝者（隊伍一）贏得的地圖較少')
+        elif self.winner_choice == 'team2' and team2_maps < team1_maps:
+            self.errors.append('指定的勝者（隊伍二）贏得的地圖較少')
+        elif not self.winner_choice and self.played_maps and team1_maps == team2_maps:
+            self.errors.append('雙方地圖數相同，請指定勝者')
+        if self.errors:
+            return
+
+        if self.played_maps:
+            self.team1_score, self.team2_score = team1_maps, team2_maps
+        else:
+            # 沒有地圖紀錄時保留比賽原本的比分
+            self.team1_score, self.team2_score = match.team1_score, match.team2_score
+        if self.winner_choice:
+            self.winner_id = getattr(match, f'{self.winner_choice}_id')
+        elif self.played_maps:
+            self.winner_id = match.team1_id if team1_maps > team2_maps else match.team2_id
+        else:
+            self.winner_id = None
+        self.status = 'completed' if self.winner_id else 'scheduled'
+
+
+class ScoreSheet:
+    """
+    用法：
+        sheet = ScoreSheet(tournament, round_number)
+        if sheet.bind(request.POST):
+            result = sheet.save()
+    """
+
+    def __init__(self, tournament, round_number, maps=None):
+        self.tournament = tournament
+        self.round_number = round_number
+        self.matches = list(
+            Match.objects.filter(tournament=tournament, round_number=round_number)
+            .select_related('team1', 'team2')
+            .prefetch_related(Prefetch('games', queryset=Game.objects.order_by('map_number')))
+            .order_by('is_lower_bracket', 'match_time', 'id')
+        )
+        most = max((len(match.games.all()) for match in self.matches), default=0)
+        self.map_count = min(MAX_MAPS, max(maps or DEFAULT_MAPS, most))
+        self.rows = [ScoreRow.from_match(match, self.map_count) for match in self.matches]
+        self.bound = False
+
+    @property
+    def map_numbers(self):
+        return list(range(1, self.map_count + 1))
+
+    @property
+    def errors(self):
+        return {row.match.pk: row.errors for row in self.rows if row.errors}
+
+    def bind(self, data):
+        """讀取表單並檢查所有比賽，全部正確時回傳 True。"""
+        self.bound = True
+        rows = []
+        for match in self.matches:
+            maps, errors = [], []
+            for number in self.map_numbers:
+                name = data.get(field_name(match.pk, 'name', number), '').strip()[:100]
+                try:
+                    t1 = _score(data.get(field_name(match.pk, 't1', number)))
+                    t2 = _score(data.get(field_name(match.pk, 't2', number)))
+                except ValueError:
+                    errors.append(f'地圖 {number} 的比分必須是非負整數')
+                    t1 = t2 = None
+                maps.append((name, t1, t2))
+            row = ScoreRow(match, maps, data.get(field_name(match.pk, 'winner'), ''))
+            row.errors = errors
+            if not errors:
+                row.clean()
+            rows.append(row)
+        self.rows = rows
+        return not self.errors
+
+    def save(self):
+        """寫入有變動的比賽與地圖，回傳 {'matches': 變動的比賽數, 'games': 寫入的地圖數}。"""
+        if not self.bound or self.errors:
+            raise ValueError('比分尚未通過檢查')
+
+        changed_matches, new_games, changed_games, removed_games = [], [], [], []
+        for row in self.rows:
+            match = row.match
+            values = {'team1_score': row.team1_score, 'team2_score': row.team2_score,
+                      'winner_id': row.winner_id, 'status': row.status}
+            if any(getattr(match, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(match, field, value)
+                changed_matches.append(match)
+
+            games = {game.map_number: game for game in match.games.all()}
+            played = {number for number, *_ in row.played_maps}
+            removed_games += [game.pk for number, game in games.items() if number not in played]
+            for number, name, t1, t2 in row.played_maps:
+                winner_id = match.team1_id if t1 > t2 else match.team2_id
+                game = games.get(number)
+                if game is None:
+                    new_games.append(Game(match=match, map_number=number, map_name=name or None,
+                                          team1_score=t1, team2_score=t2, winner_id=winner_id))
+                elif (game.map_name or '', game.team1_score, game.team2_score, game.winner_id) != (name, t1, t2, winner_id):
+                    game.map_name, game.team1_score, game.team2_score, game.winner_id = name or None, t1, t2, winner_id
+                    changed_games.append(game)
+
+        with transaction.atomic(), batch_updates() as batch:
+            if changed_matches:
+                Match.objects.bulk_update(changed_matches, MATCH_FIELDS)
+            if removed_games:
+                Game.objects.filter(pk__in=removed_games).delete()
+            if changed_games:
+                Game.objects.bulk_update(changed_games, GAME_FIELDS)
+            if new_games:
+                Game.objects.bulk_create(new_games)
+            if changed_matches or removed_games or changed_games or new_games:
+                batch.matches_changed([self.tournament.pk])
+        return {'matches': len(changed_matches), 'games': len(new_games) + len(changed_games) + len(removed_games)}
@@ -0,0 +1,201 @@
+# tournaments/search.py
+"""
+全站搜尋：隊伍（名稱、學校）、選手（暱稱）、賽事（名稱）
+
+依資料庫選擇實作，三種實作回傳相同的 SearchResult：
+
+- PostgreSQL：pg_trgm 的 word_similarity（<% 運算子）容許錯字，ILIKE 子字串比對與 'simple' 設定的全文檢索
+  都有 GIN 索引（migration 0009）；分數 = 相似度 + 全文檢索 ts_rank + 開頭相符加分
+- SQLite：migration 0009 建立的 FTS5 虛擬表 tournaments_search（trigram tokenizer），由 trigger 與原資料表同步；
+  label 為名稱、keywords 為其他可搜尋文字（隊伍的學校）、detail 只用於顯示；
+  查詢拆成 trigram 以 OR 比對，少數字元打錯仍會命中，以 bm25 排序；不足三個字時改用 LIKE
+- 其他資料庫（或沒有 FTS5 的 SQLite）：icontains 查詢
+
+PostgreSQL 與 SQLite 的實作都只執行一次查詢，適合 typeahead 使用。
+"""
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.urls import reverse
+
+from .models import Player, Team, Tournament
+
+KINDS = ('team', 'player', 'tournament')
+KIND_LABELS = {'team': '隊伍', 'player': '選手', 'tournament': '賽事'}
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_QUERY_LENGTH = 100
+
+# PostgreSQL：<% 運算子使用的 word_similarity 門檻（預設 0.6 對錯字太嚴格）
+WORD_SIMILARITY_THRESHOLD = 0.3
+
+# SQLite FTS5：rowid = 物件 id * 4 + 種類代碼，trigger 可以直接以 rowid 更新或刪除
+FTS_TABLE = 'tournaments_search'
+FTS_KIND_CODES = {'team': 1, 'player': 2, 'tournament': 3}
+
+_URL_NAMES = {'team': 'team_detail', 'player': 'player_detail', 'tournament': 'tournament_detail'}
+
+
+class SearchResult:
+
+    def __init__(self, kind, pk, label, detail, score):
+        self.kind = kind
+        self.pk = pk
+        self.label = label
+        self.detail = detail or ''
+        self.score = score
+
+    @property
+    def kind_label(self):
+        return KIND_LABELS[self.kind]
+
+    @property
+    def url(self):
+        return reverse(_URL_NAMES[self.kind], args=[self.pk])
+
+    def as_dict(self):
+        return {'kind': self.kind, 'id': self.pk, 'label': self.label, 'detail': self.detail, 'url': self.url}
+
+    def __repr__(self):
+        return f'<SearchResult {self.kind}:{self.pk} {self.label!r} {self.score:.3f}>'
+
+
+def normalize_query(query):
+    return ' '.join((query or '').split())[:MAX_QUERY_LENGTH]
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+_fts_tables = {}
+
+
+def search_backend(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        if using not in _fts_tables:
+            with connection.cursor() as cursor:
+                _fts_tables[using] = FTS_TABLE in connection.introspection.table_names(cursor)
+        if _fts_tables[using]:
+            return 'fts5'
+    return 'basic'
+
+
+def search(query, kinds=KINDS, limit=DEFAULT_LIMIT, using=DEFAULT_DB_ALIAS):
+    """回傳依分數排序的 SearchResult 列表。"""
+    query = normalize_query(query)
+    kinds = [kind for kind in KINDS if kind in kinds]
+    limit = max(1, min(limit, MAX_LIMIT))
+    if not query or not kinds:
+        return []
+    backend = search_backend(using)
+    if backend == 'postgresql':
+        return _search_postgresql(query, kinds, limit, using)
+    if backend == 'fts5':
+        return _search_fts5(query, kinds, limit, using)
+    return _search_basic(query, kinds, limit, using)
+
+
+# --- PostgreSQL ---
+
+# 種類 → (FROM, 名稱欄位, 說明欄位, 其他可搜尋欄位)
+_PG_SOURCES = {
+    'team': ('tournaments_team t', 't.name', 't.school', ['t.school']),
+    'player': ('tournaments_player t JOIN tournaments_team team ON team.id = t.team_id', 't.nickname', 'team.name', []),
+    'tournament': ('tournaments_tournament t', 't.name', 't.game', []),
+}
+
+
+def _pg_select(kind):
+    source, label, detail, extra = _PG_SOURCES[kind]
+    fields = [label] + extra
+    similarity = ', '.join(f'word_similarity(%(q)s, {field})' for field in fields)
+    matches = ' OR '.join(f'%(q)s <%% {field} OR {field} ILIKE %(contains)s' for field in fields)
+    tsvector = f"to_tsvector('simple', {label})"
+    return (
+        f"SELECT '{kind}', t.id, {label}, {detail}, "
+        f"GREATEST({similarity}) "
+        f"+ ts_rank({tsvector}, websearch_to_tsquery('simple', %(q)s)) "
+        f"+ CASE WHEN {label} ILIKE %(prefix)s THEN 1 ELSE 0 END AS score "
+        f"FROM {source} "
+        f"WHERE {matches} OR {tsvector} @@ websearch_to_tsquery('simple', %(q)s)"
+    )
+
+
+def _search_postgresql(query, kinds, limit, using):
+    escaped = _like_escape(query)
+    sql = ' UNION ALL '.join(f'({_pg_select(kind)})' for kind in kinds)
+    sql += ' ORDER BY score DESC, 3 LIMIT %(limit)s'
+    params = {'q': query, 'contains': f'%{escaped}%', 'prefix': f'{escaped}%', 'limit': limit}
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute('SET LOCAL pg_trgm.word_similarity_threshold = %s', [WORD_SIMILARITY_THRESHOLD])
+        cursor.execute(sql, params)
+        return [SearchResult(*row) for row in cursor.fetchall()]
+
+
+# --- SQLite FTS5 ---
+
+def _trigram_query(query):
+    """把查詢拆成 trigram 以 OR 連接（FTS5 字串以雙引號包住）。"""
+    text = query.lower()
+    grams = dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2))
+    return ' OR '.join('"' + gram.replace('"', '""') + '"' for gram in grams if gram.strip())
+
+
+def _search_fts5(query, kinds, limit, using):
+    escaped = _like_escape(query)
+    codes = [FTS_KIND_CODES[kind] for kind in kinds]
+    boost = (
+        "CASE WHEN label LIKE %s ESCAPE '\\' THEN 2 "
+        "WHEN label LIKE %s ESCAPE '\\' OR keywords LIKE %s ESCAPE '\\' THEN 1 ELSE 0 END"
+    )
+    boost_params = [f'{escaped}%', f'%{escaped}%', f'%{escaped}%']
+    kind_filter = f"rowid %% 4 IN ({', '.join(['%s'] * len(codes))})"
+    match = _trigram_query(query)
+    if match:
+        # bm25 越小越相關；名稱的權重高於學校，detail 只用於顯示
+        sql = (
+            f"SELECT rowid, label, detail, {boost} - bm25({FTS_TABLE}, 1.0, 0.5, 0.0) AS score "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND {kind_filter} "
+            f"ORDER BY score DESC, label LIMIT %s"
+        )
+        params = boost_params + [match] + codes + [limit]
+    else:
+        # trigram 至少需要三個字元
+        sql = (
+            f"SELECT rowid, label, detail, {boost} AS score FROM {FTS_TABLE} "
+            f"WHERE (label LIKE %s ESCAPE '\\' OR keywords LIKE %s ESCAPE '\\') AND {kind_filter} "
+            f"ORDER BY score DESC, label LIMIT %s"
+        )
+        params = boost_params + [f'%{escaped}%', f'%{escaped}%'] + codes + [limit]
+    kinds_by_code = {code: kind for kind, code in FTS_KIND_CODES.items()}
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            SearchResult(kinds_by_code[rowid % 4], rowid // 4, label, detail, score)
+            for rowid, label, detail, score in cursor.fetchall()
+        ]
+
+
+# --- 其他資料庫 ---
+
+def _search_basic(query, kinds, limit, using):
+    sources = {
+        'team': (Team.objects.values_list('id', 'name', 'school'), 'name', ['school']),
+        'player': (Player.objects.values_list('id', 'nickname', 'team__name'), 'nickname', []),
+        'tournament': (Tournament.objects.values_list('id', 'name', 'game'), 'name', []),
+    }
+    results = []
+    for kind in kinds:
+        queryset, label, extra = sources[kind]
+        condition = Q(**{f'{label}__icontains': query})
+        for field in extra:
+            condition |= Q(**{f'{field}__icontains': query})
+        for pk, name, detail in queryset.using(using).filter(condition)[:limit]:
+            score = 2 if name.lower().startswith(query.lower()) else 1
+            results.append(SearchResult(kind, pk, name, detail, score))
+    results.sort(key=lambda result: (-result.score, result.label))
+    return results[:limit]
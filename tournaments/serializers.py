@@ -5,7 +5,8 @@ from .models import Tournament, Team, Match, Game, PlayerGameStat
 class TeamSerializer(serializers.ModelSerializer):
     class Meta:
         model = Team
-        fields = ['id', 'name', 'logo']
+        fields = ['id', 'name', 'logo', 'rating', 'rated_matches']
+        read_only_fields = ['rating', 'rated_matches']
 
 class TournamentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,28 +1,33 @@
 # tournaments/signals.py
 
-from django.db.models.signals import post_save
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Match, Standing, Tournament
+from .models import Game, Group, Match, Player, PlayerGameStat, Standing, Team, Tournament
+from . import fragments, headtohead, leaderboards, mapstats, ratings
+from .adminperf import invalidate_filter_choices
+from .batch import current_batch
+from .tiebreakers import update_tiebreakers
 
 # tournaments/signals.py
 
-def recalculate_standings(tournament_id):
+def recalculate_standings(tournament_id, using=DEFAULT_DB_ALIAS):
     """
     重新計算一場完整賽事的所有積分榜數據（更穩健的版本）。
     """
-    tournament = Tournament.objects.get(id=tournament_id)
+    tournament = Tournament.objects.using(using).get(id=tournament_id)
 
     # 在計算前，先確保所有參賽者都有一個積分榜紀錄
     for team in tournament.participants.all():
-        Standing.objects.get_or_create(tournament=tournament, team=team)
+        Standing.objects.using(using).get_or_create(tournament=tournament, team=team)
 
     # 1. 將所有該賽事的積分榜數據歸零
-    Standing.objects.filter(tournament=tournament).update(
+    Standing.objects.using(using).filter(tournament=tournament).update(
         wins=0, losses=0, draws=0, points=0
     )
 
     # 2. 找出所有已完成的比賽
-    completed_matches = Match.objects.filter(
+    completed_matches = Match.objects.using(using).filter(
         tournament=tournament, 
         status='completed'
     )
@@ -34,12 +39,12 @@ def recalculate_standings(tournament_id):
             loser_team = match.team1 if match.team2 == winner_team else match.team2
 
             # 因為我們在開頭確保了紀錄存在，所以這裡可以安心用 .get()
-            winner_standing = Standing.objects.get(tournament=tournament, team=winner_team)
+            winner_standing = Standing.objects.using(using).get(tournament=tournament, team=winner_team)
             winner_standing.wins += 1
             winner_standing.points += 3 # 勝者得 3 分
             winner_standing.save()
 
-            loser_standing = Standing.objects.get(tournament=tournament, team=loser_team)
+            loser_standing = Standing.objects.using(using).get(tournament=tournament, team=loser_team)
             loser_standing.losses += 1
             loser_standing.save()
 
@@ -47,11 +52,230 @@ def recalculate_standings(tournament_id):
         # elif match.team1_score == match.team2_score:
         #     ...
 
+    # 4. 依賽事設定的同分比較條件計算名次
+    update_tiebreakers(tournament_id, using)
+    fragments.bump('tournament', [tournament_id])
+
+
+def _deferred(using):
+    """批次模式（batch.batch_updates）中回傳待處理的更新，signal 只登記、不立即計算。"""
+    batch = current_batch()
+    return batch if batch is not None and batch.using == using else None
+
+def _moved_from(instance):
+    """比賽寫入前所屬的賽事與隊伍（remember_stored_match），沒有變動時回傳 None。"""
+    stored = getattr(instance, '_stored_match', None)
+    if stored is None:
+        return None
+    old = (stored['tournament_id'], stored['team1_id'], stored['team2_id'])
+    return old if old != (instance.tournament_id, instance.team1_id, instance.team2_id) else None
+
+@receiver(pre_save, sender=Match)
+def remember_stored_match(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # 寫入前資料庫中的賽事、隊伍與積分變化：比賽更換賽事或隊伍後，
+    # 積分榜、對戰矩陣、地圖數據與 Elo 積分都要從原本的位置扣回（以下 receiver 共用這一次查詢）
+    instance._stored_match = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._stored_match = Match.objects.using(using).filter(pk=instance.pk).values(
+            'tournament_id', 'team1_id', 'team2_id', 'rating_delta'
+        ).first()
+
 @receiver(post_save, sender=Match)
-def update_standings_on_match_save(sender, instance, **kwargs):
+def update_standings_on_match_save(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
     """
     當一場比賽被儲存後，觸發完整的積分榜重新計算。
     """
-    # 只在比賽狀態為「已結束」時才觸發
+    moved = _moved_from(instance)
+    batch = _deferred(using)
+    if batch is not None:
+        batch.match_saved(instance)
+        if moved is not None and moved[0] != instance.tournament_id:
+            batch.matches_changed([moved[0]], ratings=False)
+        return
+    # 只在比賽狀態為「已結束」時才觸發；改到其他賽事時原本的賽事也要重算
+    if moved is not None and moved[0] != instance.tournament_id:
+        recalculate_standings(moved[0], using)
     if instance.status == 'completed':
-        recalculate_standings(instance.tournament.id)
\ No newline at end of file
+        recalculate_standings(instance.tournament_id, using)
+
+@receiver(post_delete, sender=Match)
+def defer_match_delete(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    batch = _deferred(using)
+    if batch is not None:
+        batch.match_saved(instance, deleted=True)
+
+
+# --- 分組對戰矩陣的增量更新 ---
+
+@receiver(post_save, sender=Match)
+def update_head_to_head_on_match_save(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if _deferred(using) is None:
+        headtohead.update_match(instance, using, _moved_from(instance))
+
+@receiver(post_delete, sender=Match)
+def update_head_to_head_on_match_delete(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if _deferred(using) is None:
+        headtohead.update_match(instance, using)
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def update_head_to_head_on_game_change(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # 回合差來自小局比分，小局變動時重新計入所屬比賽
+    batch = _deferred(using)
+    if batch is not None:
+        batch.head_to_head.update(Match.objects.using(using).filter(pk=instance.match_id).values_list('tournament_id', flat=True))
+        return
+    match = Match.objects.using(using).filter(pk=instance.match_id).first()
+    if match is not None:
+        headtohead.update_match(match, using)
+        fragments.bump('tournament', [match.tournament_id])
+
+# --- 地圖數據彙總（mapstats）的增量更新 ---
+
+@receiver(pre_save, sender=Game)
+@receiver(pre_delete, sender=Game)
+def remember_map_stat_rows(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # 寫入前資料庫中的貢獻，寫入後扣回
+    if _deferred(using) is None:
+        instance._map_stat_rows = mapstats.game_rows(instance.pk, using)
+
+def _update_map_stats(instance, using, deleted):
+    batch = _deferred(using)
+    if batch is not None:
+        batch.map_stats.update(Match.objects.using(using).filter(pk=instance.match_id).values_list('tournament_id', flat=True))
+        return
+    current = [] if deleted else mapstats.game_rows(instance.pk, using)
+    mapstats.update_game(getattr(instance, '_map_stat_rows', []), current, using)
+    instance._map_stat_rows = current
+
+@receiver(post_save, sender=Game)
+def update_map_stats_on_game_save(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    _update_map_stats(instance, using, deleted=False)
+
+@receiver(post_delete, sender=Game)
+def update_map_stats_on_game_delete(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    _update_map_stats(instance, using, deleted=True)
+
+@receiver(pre_save, sender=Match)
+def remember_match_map_stats(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # 比賽更換賽事或隊伍時，小局的貢獻改計到新的賽事與隊伍
+    instance._map_stat_change = None
+    moved = _moved_from(instance)
+    if moved is None:
+        return
+    batch = _deferred(using)
+    if batch is not None:
+        batch.map_stats.update({moved[0], instance.tournament_id})
+        return
+    games = mapstats.match_games(instance.pk, using)
+    if games:
+        instance._map_stat_change = mapstats.match_change(
+            games, instance.tournament_id, instance.team1_id, instance.team2_id
+        )
+
+@receiver(post_save, sender=Match)
+def update_map_stats_on_match_save(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    change = getattr(instance, '_map_stat_change', None)
+    if change is not None:
+        mapstats.update_game(*change, using)
+        instance._map_stat_change = None
+
+# --- 選手排行榜（leaderboards）---
+
+@receiver(post_save, sender=PlayerGameStat)
+def update_leaderboards_on_stat_save(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    batch = _deferred(using)
+    if batch is not None:
+        batch.player_stat_saved(instance)
+        return
+    leaderboards.update_games({instance.game_id: {instance.player_id}}, using)
+
+@receiver(post_delete, sender=PlayerGameStat)
+def update_leaderboards_on_stat_delete(sender, instance, using=DEFAULT_DB_ALIAS, origin=None, **kwargs):
+    # 刪除小局、選手（或其上層資料）時的 CASCADE 由下方的 receiver 讓排行榜整個失效
+    if type(origin) is not PlayerGameStat and getattr(origin, 'model', None) is not PlayerGameStat:
+        return
+    batch = _deferred(using)
+    if batch is not None:
+        batch.player_stat_saved(instance)
+        return
+    leaderboards.update_games({instance.game_id: {instance.player_id}}, using)
+
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=Player)
+def invalidate_leaderboards_on_delete(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    # 選手數據隨小局或選手以 CASCADE 一併刪除，不逐筆更新，排行榜整個失效
+    batch = _deferred(using)
+    if batch is not None:
+        batch.player_stats_changed()
+    else:
+        leaderboards.invalidate()
+
+# --- Elo 積分的增量更新 ---
+
+@receiver(post_save, sender=Match)
+def update_ratings_on_match_save(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if _deferred(using) is None:
+        # 從寫入前計入積分的隊伍扣回（隊伍可能已更換或清空）
+        stored = getattr(instance, '_stored_match', None)
+        previous = stored if stored is not None and stored['rating_delta'] is not None else None
+        ratings.apply_match(instance, using, previous)
+
+@receiver(post_delete, sender=Match)
+def revert_ratings_on_match_delete(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if _deferred(using) is None:
+        ratings.revert_match(instance, using)
+
+@receiver(m2m_changed, sender=Group.teams.through)
+def invalidate_head_to_head_on_group_change(sender, instance, action, reverse, pk_set, using=DEFAULT_DB_ALIAS, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        headtohead.invalidate_group(instance.pk)
+        fragments.bump('tournament', [instance.tournament_id])
+    else:
+        group_ids = pk_set or Group.objects.using(using).values_list('pk', flat=True)
+        for group_id in group_ids:
+            headtohead.invalidate_group(group_id)
+        fragments.bump('tournament', Group.objects.using(using).filter(pk__in=group_ids).values_list('tournament_id', flat=True))
+
+# --- 管理後台篩選器的快取選項 ---
+
+@receiver(post_save, sender=Tournament)
+@receiver(post_delete, sender=Tournament)
+def invalidate_admin_filter_choices(sender, **kwargs):
+    invalidate_filter_choices(sender)
+
+
+# --- 公開頁面的片段快取（fragments）---
+
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+def bump_fragments_on_match_change(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # 批次模式結束時統一遞增
+    if _deferred(using) is None:
+        fragments.bump('tournament', [instance.tournament_id])
+
+@receiver(post_save, sender=Tournament)
+@receiver(post_delete, sender=Tournament)
+def bump_fragments_on_tournament_change(sender, instance, **kwargs):
+    fragments.bump('tournament', [instance.pk])
+
+@receiver(m2m_changed, sender=Tournament.participants.through)
+def bump_fragments_on_participants_change(sender, instance, action, reverse, pk_set, using=DEFAULT_DB_ALIAS, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        fragments.bump('tournament', [instance.pk])
+    else:
+        fragments.bump('tournament', pk_set or Tournament.objects.using(using).values_list('pk', flat=True))
+
+@receiver(post_save, sender=Team)
+@receiver(pre_delete, sender=Team)
+def bump_fragments_on_team_change(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # 頁面只讀取 default 資料庫；同步、搬移其他資料庫時不需要處理
+    if using != DEFAULT_DB_ALIAS:
+        return
+    # 隊伍名稱也出現在參加的賽事頁面中
+    fragments.bump('team', [instance.pk])
+    fragments.bump('tournament', Tournament.objects.using(using).filter(participants=instance.pk).values_list('pk', flat=True))
@@ -97,4 +97,47 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     }
-});
\ No newline at end of file
+});
+
+// ===== 全站搜尋 typeahead =====
+document.addEventListener('DOMContentLoaded', function() {
+    const input = document.querySelector('input[data-typeahead-url]');
+    if (!input) return;
+    const menu = input.parentElement.querySelector('[data-typeahead-menu]');
+    let timer = null;
+    let controller = null;
+
+    function render(results) {
+        menu.innerHTML = '';
+        results.forEach(result => {
+            const item = document.createElement('a');
+            item.className = 'dropdown-item';
+            item.href = result.url;
+            item.textContent = result.label;
+            if (result.detail) {
+                const detail = document.createElement('small');
+                detail.className = 'text-muted ms-2';
+                detail.textContent = result.detail;
+                item.appendChild(detail);
+            }
+            menu.appendChild(item);
+        });
+        menu.classList.toggle('show', results.length > 0);
+    }
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (!query) { render([]); return; }
+        // 停止輸入 150ms 後才查詢，並取消尚未完成的上一次查詢
+        timer = setTimeout(() => {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            fetch(`${input.dataset.typeaheadUrl}?q=${encodeURIComponent(query)}&limit=8`, {signal: controller.signal})
+                .then(response => response.json())
+                .then(data => render(data.results))
+                .catch(() => {});
+        }, 150);
+    });
+    input.addEventListener('blur', () => setTimeout(() => menu.classList.remove('show'), 200));
+});
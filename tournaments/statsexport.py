@@ -0,0 +1,170 @@
+# tournaments/statsexport.py
+"""
+選手數據匯出（CSV / XLSX）
+
+- 以 StreamingHttpResponse 逐段輸出，資料來自 values_list().iterator(chunk_size=...)：
+  PostgreSQL 使用伺服器端 cursor，每次只取一個區塊（與 exporter 相同的 DEFAULT_EXPORT_CHUNK_SIZE），
+  記憶體用量與筆數無關，第一批資料讀到就開始送出
+- CSV 開頭加上 UTF-8 BOM，Excel 直接開啟時中文不會變成亂碼
+- XLSX 不需要額外套件：以 zipfile 寫入不可 seek 的串流，工作表使用 inline string，
+  每寫入 XLSX_FLUSH_ROWS 列就把已壓縮的資料送出
+"""
+
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .exporter import DEFAULT_EXPORT_CHUNK_SIZE
+from .tables import stats_rows
+
+XLSX_FLUSH_ROWS = 500
+
+# (標題, stats_rows() 的欄位)
+EXPORT_COLUMNS = (
+    ('賽事', 'tournament_name'),
+    ('輪次', 'round_number'),
+    ('地圖編號', 'map_number'),
+    ('地圖', 'map_name'),
+    ('選手', 'player_name'),
+    ('隊伍', 'team_name'),
+    ('對手', 'opponent'),
+    ('擊殺', 'kills'),
+    ('死亡', 'deaths'),
+    ('助攻', 'assists'),
+    ('首殺', 'first_kills'),
+    ('ACS', 'acs'),
+)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def export_rows(queryset):
+    """PlayerGameStat queryset 轉成依 id 排序的 tuple 串流。"""
+    rows = stats_rows(queryset).annotate(
+        tournament_name=F('game__match__tournament__name'),
+        map_number=F('game__map_number'),
+    )
+    rows = rows.values_list(*(field for _, field in EXPORT_COLUMNS)).order_by('id')
+    return rows.iterator(chunk_size=DEFAULT_EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """csv.writer 寫入後直接回傳該列文字，不保留任何內容。"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow([title for title, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _StreamBuffer:
+    """zipfile 的輸出目標：沒有 seek / tell，zipfile 會改用資料描述區並自行計算位置。"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+# XML 1.0 不允許的控制字元
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_FILES = (
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+     'Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ('xl/workbook.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="stats" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+     'Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+)
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_INVALID_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return ('<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>').encode('utf-8')
+
+
+def stream_xlsx(rows):
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_FILES:
+            archive.writestr(name, content)
+        yield buffer.take()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(title for title, _ in EXPORT_COLUMNS))
+            for count, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row))
+                if count % XLSX_FLUSH_ROWS == 0:
+                    yield buffer.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.take()
+
+
+def export_response(queryset, fmt, filename):
+    """fmt 為 EXPORT_FORMATS 其中之一；filename 不含副檔名。"""
+    rows = export_rows(queryset)
+    stream = stream_xlsx(rows) if fmt == 'xlsx' else stream_csv(rows)
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[fmt])
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{fmt}"'
+    return response
@@ -1,77 +1,204 @@
 # tournaments/tables.py
+"""
+選手數據表
+
+- stats_rows()：以 values() 與 SQL 註解一次取出表格需要的欄位，對手名稱以 Case/When
+  依選手所屬隊伍在 team1 / team2 之間選擇，不需要載入任何 model 物件
+- keyset_page()：依排序欄位與 id 做 keyset 分頁（WHERE (欄位, id) < (上一頁最後一筆)），
+  不使用 OFFSET，也不計算總筆數，任何一頁都只讀取 PAGE_SIZE + 1 筆
+- filter_stats()：數據統計頁與匯出共用的篩選條件
+- 只能依有 (欄位, id) 複合索引的數據欄位排序（SORTABLE_COLUMNS）
+"""
+
 import django_tables2 as tables
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, Case, CharField, F, Q, When
+
 from .models import PlayerGameStat
 
+# 每個欄位在 PlayerGameStat.Meta.indexes 中都有 (欄位, id) 複合索引
+SORTABLE_COLUMNS = ('acs', 'kills', 'deaths', 'assists', 'first_kills')
+DEFAULT_SORT = '-acs'
+PAGE_SIZE = 50
+
+STAT_FIELDS = ('id', 'kills', 'deaths', 'assists', 'first_kills', 'acs')
+
+
+def stats_rows(queryset):
+    """把 PlayerGameStat queryset 轉成表格用的 dict 列。"""
+    return queryset.values(*STAT_FIELDS).annotate(
+        player_name=F('player__nickname'),
+        team_name=F('team__name'),
+        map_name=F('game__map_name'),
+        round_number=F('game__match__round_number'),
+        tournament_id=F('game__match__tournament_id'),
+        team1_name=F('game__match__team1__name'),
+        team2_name=F('game__match__team2__name'),
+        opponent=Case(
+            When(team_id=F('game__match__team1_id'), then=F('game__match__team2__name')),
+            When(team_id=F('game__match__team2_id'), then=F('game__match__team1__name')),
+            default=None,
+            output_field=CharField(),
+        ),
+        # 選手隊伍是否為比賽的其中一隊（不是時顯示完整對戰）
+        in_match=Case(
+            When(Q(team_id=F('game__match__team1_id')) | Q(team_id=F('game__match__team2_id')), then=True),
+            default=False,
+            output_field=BooleanField(),
+        ),
+    )
+
+
+def filter_stats(queryset, params):
+    """套用數據統計頁的篩選條件：team（隊伍 id）、player_name（選手名稱）、tournament（賽事 id）。"""
+    team_id = params.get('team')
+    if team_id and team_id.isdigit():
+        queryset = queryset.filter(team_id=team_id)
+    player_name = params.get('player_name')
+    if player_name:
+        queryset = queryset.filter(player__nickname__icontains=player_name)
+    tournament_id = params.get('tournament')
+    if tournament_id and tournament_id.isdigit():
+        queryset = queryset.filter(game__match__tournament_id=tournament_id)
+    return queryset
+
+
 def get_opponent_info(record):
     """
     根據選手所屬隊伍，返回對手信息
     """
-    match = record.game.match
-    player_team = record.team
-    
-    # 確定對手隊伍
-    if match.team1 == player_team:
-        opponent = match.team2
-    elif match.team2 == player_team:
-        opponent = match.team1
-    else:
+    round_label = f"R{record['round_number']}"
+    if not record['in_match']:
         # 如果選手隊伍不是比賽中的任一隊伍，顯示完整對戰信息
-        if match.team1 and match.team2:
-            return f"R{match.round_number}: {match.team1.name} vs {match.team2.name}"
-        else:
-            return f"R{match.round_number}: TBD"
-    
+        if record['team1_name'] and record['team2_name']:
+            return f"{round_label}: {record['team1_name']} vs {record['team2_name']}"
+        return f"{round_label}: TBD"
     # 顯示對手名稱 - 簡潔版本
-    if opponent:
-        return f"R{match.round_number} vs {opponent.name}"
-    else:
-        return f"R{match.round_number} vs TBD"
+    return f"{round_label} vs {record['opponent'] or 'TBD'}"
+
+
+def parse_sort(sort):
+    """回傳 (欄位, 是否遞減)；不允許的欄位改用預設排序。"""
+    field = (sort or '').lstrip('-')
+    if field not in SORTABLE_COLUMNS:
+        return parse_sort(DEFAULT_SORT)
+    return field, sort.startswith('-')
+
+
+def encode_cursor(sort, row):
+    return f"{sort}|{row[parse_sort(sort)[0]]}|{row['id']}"
+
+
+def decode_cursor(sort, cursor):
+    """cursor 格式為「排序|欄位值|id」；格式錯誤或排序不同時回傳 None（從第一頁開始）。"""
+    if not cursor:
+        return None
+    try:
+        cursor_sort, value, pk = cursor.split('|')
+        if cursor_sort != sort:
+            return None
+        return PlayerGameStat._meta.get_field(parse_sort(sort)[0]).to_python(value), int(pk)
+    except (ValueError, ValidationError):
+        return None
+
+
+class KeysetPage:
+
+    def __init__(self, rows, sort, has_next, has_previous):
+        self.rows = rows
+        self.sort = sort
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.sort, self.rows[-1]) if self.has_next and self.rows else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.sort, self.rows[0]) if self.has_previous and self.rows else None
+
+
+def keyset_page(queryset, sort=DEFAULT_SORT, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    取出一頁資料：after 為下一頁（接在該筆之後），before 為上一頁（在該筆之前）。
+    每頁只執行一次查詢，多讀一筆用來判斷是否還有下一頁（或上一頁）。
+    """
+    field, descending = parse_sort(sort)
+    sort = f"-{field}" if descending else field
+    backwards = before is not None and after is None
+    cursor = decode_cursor(sort, before if backwards else after)
+
+    # 往回翻頁時以相反順序查詢，取得後再反轉
+    forward_desc = descending != backwards
+    ordering = [f'-{field}', '-id'] if forward_desc else [field, 'id']
+    if cursor is not None:
+        value, pk = cursor
+        if forward_desc:
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+        else:
+            queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk}))
+
+    rows = list(queryset.order_by(*ordering)[:page_size + 1])
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+        return KeysetPage(rows, sort, has_next=cursor is not None, has_previous=more)
+    return KeysetPage(rows, sort, has_next=more, has_previous=cursor is not None)
+
 
 class StatsTable(tables.Table):
     # --- [修改] 比賽欄位 - 顯示對手信息 ---
-    # 使用 lambda 函數顯示對手信息
+    # 對手、輪次都已由 stats_rows() 的 SQL 註解取得
     match = tables.LinkColumn(
         "tournament_detail",
-        text=lambda record: get_opponent_info(record),
-        args=[tables.A("game.match.tournament.pk")],
+        text=get_opponent_info,
+        args=[tables.A("tournament_id")],
+        accessor="round_number",
+        orderable=False,
         verbose_name="比賽"
     )
-    
+
     # --- [修改] 選手欄位 ---
-    # 使用 accessor 直接抓取 player 物件中的 nickname 屬性
     player = tables.Column(
-        accessor="player.nickname", 
+        accessor="player_name",
+        orderable=False,
         verbose_name="選手"
     )
 
     # --- [修改] 代表隊伍欄位 ---
-    # 同樣只抓取 team 的 name 屬性
     team = tables.Column(
-        accessor="team.name",
+        accessor="team_name",
+        orderable=False,
         verbose_name="代表隊伍"
     )
 
     # --- [修改] 地圖欄位 ---
-    # 使用 accessor 直接抓取關聯的 game 物件中的 map_name 欄位
     game = tables.Column(
-        accessor="game.map_name", 
+        accessor="map_name",
+        orderable=False,
         verbose_name="地圖"
     )
 
+    kills = tables.Column(verbose_name="擊殺")
+    deaths = tables.Column(verbose_name="死亡")
+    assists = tables.Column(verbose_name="助攻")
+    first_kills = tables.Column(verbose_name="首殺")
+    acs = tables.Column(verbose_name="ACS")
+
     class Meta:
-        model = PlayerGameStat
         template_name = "django_tables2/bootstrap5.html"
-        
+
         # 欄位順序與要顯示的欄位
-        fields = (
-            "match", 
-            "player", 
-            "team", 
+        sequence = (
+            "match",
+            "player",
+            "team",
             "game",  # <-- 注意這裡的名字要和上面我們定義的變數名一致
-            "kills", 
-            "deaths", 
-            "assists", 
-            "first_kills", 
+            "kills",
+            "deaths",
+            "assists",
+            "first_kills",
             "acs"
         )
-        sequence = fields
\ No newline at end of file
@@ -0,0 +1,23 @@
+from django import template
+
+from tournaments.fragments import get_version, get_versions
+
+register = template.Library()
+
+
+@register.simple_tag
+def fragment_version(scope, pk):
+    """{% fragment_version 'tournament' tournament.pk as version %}"""
+    return get_version(scope, pk)
+
+
+@register.simple_tag
+def fragment_versions(scope, objects):
+    """{% fragment_versions 'team' teams as versions %}：一次取得多筆資料的版本號"""
+    return get_versions(scope, [getattr(obj, 'pk', obj) for obj in objects])
+
+
+@register.filter
+def version_of(versions, pk):
+    """{{ versions|version_of:team.pk }}"""
+    return versions.get(pk)
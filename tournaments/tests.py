@@ -1,3 +1,1985 @@
+import csv
+import gzip
+import io
+import json
+import random
+import re
+import tempfile
+import zipfile
+from collections import Counter
+from datetime import timedelta
+from itertools import combinations
+from pathlib import Path
+from unittest import mock, skipIf
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections
+from django.db.models import F, Q, Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import exporter
+from .adminperf import EstimatedCountPaginator, estimated_count
+from .api_views import QualificationThrottle
+from .batch import batch_updates
+from .compression import CompressedBody
+from .bulkcopy import transfer_database
+from .headtohead import HeadToHeadMatrix, completed_match_rows, get_group_matrix, match_contribution
+from . import fragments, leaderboards, mapstats, playerstats, simulation, warmup
+from .ratings import backfill_ratings, seeding_order
+from .scheduler import MatchScheduler, circle_rounds
+from .search import search, search_backend
+from .tiebreakers import STANDING_ORDER, update_tiebreakers
+from .dbsync import DatabaseSync, register_database, sync_models
+from .draw import DrawError, GroupDraw
+from .exporter import export_to_file, iter_export_blocks, progress_path
+from .logic import generate_round_robin_matches, generate_swiss_round_matches
+from .importer import BulkImporter, clear_tournament_data, import_dump, iter_dump_records, parse_datetime_value
+from .signals import recalculate_standings
+from .tables import get_opponent_info, keyset_page, stats_rows
+from .roster import RosterError, import_roster, parse_roster
+from .models import Tournament, Team, TeamAvailability, Player, Match, Game, Group, Standing, PlayerGameStat, MapStat
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PRODUCTION_DUMP = BASE_DIR / 'production_data.json'
+FIXTURE_DUMP = BASE_DIR / 'fixtures' / 'all_tournament_data.json'
+
+# 差異同步測試用的兩個 SQLite 資料庫（測試時由 test runner 建立成記憶體資料庫）
+SYNC_SOURCE = register_database('sync_source', 'sqlite:///sync_source.sqlite3')
+SYNC_TARGET = register_database('sync_target', 'sqlite:///sync_target.sqlite3')
+
+
+# ===== 測試資料建立 =====
+
+def seed_tournament_data(scale):
+    """
+    依照 scale 建立一組完整的測試資料（隊伍、選手、四種賽制的賽事、比賽、小局與選手數據）。
+    scale 越大，每張資料表的筆數都會等比例增加，用來檢查查詢數是否與資料量無關。
+    全部使用 bulk_create，不會觸發積分榜 signal。
+    """
+    now = timezone.now()
+    num_teams = 4 * scale
+
+    teams = Team.objects.bulk_create([
+        Team(name=f'測試學校{i}-隊伍{i}', school=f'測試學校{i}') for i in range(num_teams)
+    ])
+    players = Player.objects.bulk_create([
+        Player(nickname=f'player{t.pk}_{n}', team=t) for t in teams for n in range(2)
+    ])
+    players_by_team = {}
+    for player in players:
+        players_by_team.setdefault(player.team_id, []).append(player)
+
+    tournaments = {}
+    for copy in range(scale):
+        for fmt in Tournament.Format.values:
+            tournament = Tournament.objects.create(
+                name=f'{fmt} 測試賽 {copy}',
+                game='Valorant',
+                end_date=now + timedelta(days=30),
+                rules='測試規章',
+                status='ongoing',
+                format=fmt,
+            )
+            tournament.participants.add(*teams)
+            tournaments.setdefault(fmt, tournament)
+
+            matches = Match.objects.bulk_create([
+                Match(
+                    tournament=tournament,
+                    round_number=index % 3 + 1,
+                    team1=team1,
+                    team2=team2,
+                    team1_score=2 if index % 2 == 0 else 0,
+                    team2_score=0 if index % 2 == 0 else 0,
+                    winner=team1 if index % 2 == 0 else None,
+                    status='completed' if index % 2 == 0 else 'scheduled',
+                    match_time=now + timedelta(hours=index + 1),
+                    is_lower_bracket=(fmt == Tournament.Format.DOUBLE_ELIMINATION and index % 4 == 2),
+                )
+                for index, (team1, team2) in enumerate(combinations(teams, 2))
+            ])
+
+            completed = [m for m in matches if m.status == 'completed']
+            games = Game.objects.bulk_create([
+                Game(match=m, map_number=1, map_name='Ascent', team1_score=13, team2_score=7, winner=m.team1)
+                for m in completed
+            ])
+            PlayerGameStat.objects.bulk_create([
+                PlayerGameStat(
+                    game=game, player=player, team_id=player.team_id,
+                    kills=15, deaths=10, assists=5, first_kills=2, acs=200.0,
+                )
+                for game in games
+                for team in (game.match.team1, game.match.team2)
+                for player in players_by_team[team.pk]
+            ])
+
+            standings = [Standing(tournament=tournament, team=t, wins=1, points=3) for t in teams]
+            if fmt == Tournament.Format.ROUND_ROBIN:
+                group = Group.objects.create(tournament=tournament, name='A組')
+                group.teams.add(*teams)
+                for standing in standings:
+                    standing.group = group
+            Standing.objects.bulk_create(standings)
+
+    return {
+        'tournaments': tournaments,
+        'team': teams[0],
+        'player': players[0],
+    }
+
+
+def clear_seeded_data():
+    Tournament.objects.all().delete()
+    Team.objects.all().delete()
+
+
+# ===== 查詢預算檢查 =====
+
+_SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql):
+    """把 SQL 中的常數換成 ?，讓只差在參數的 N+1 查詢可以被歸為同一類。"""
+    return _SQL_LITERAL_RE.sub('?', sql)
+
+
+def format_duplicated_queries(captured):
+    """列出重複出現的查詢（依正規化後的 SQL 分組），並附上一筆實際的 SQL。"""
+    groups = Counter(normalize_sql(q['sql']) for q in captured)
+    samples = {}
+    for q in captured:
+        samples.setdefault(normalize_sql(q['sql']), q['sql'])
+
+    lines = []
+    for sql, count in groups.most_common():
+        if count < 2:
+            break
+        lines.append(f'  [{count}x] {sql}\n        e.g. {samples[sql]}')
+    return '\n'.join(lines) or '  (沒有重複的查詢)'
+
+
+class QueryBudgetMixin:
+    """
+    在兩種資料量下呼叫同一個端點，確認查詢數不會隨資料量成長。
+    超出預算時，錯誤訊息會列出大資料量下重複執行的 SQL。
+    """
+    small_scale = 1
+    large_scale = 3
+
+    def measure(self, client, url):
+        cache.clear()
+        # 先熱身一次，排除 ContentType 等一次性快取查詢的影響
+        client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertLess(response.status_code, 400, f'{url} 回傳 {response.status_code}')
+        return list(ctx.captured_queries)
+
+    def assertConstantQueries(self, url_for, client=None, budget=None):
+        client = client or self.client
+
+        world = seed_tournament_data(self.small_scale)
+        small = self.measure(client, url_for(world))
+        clear_seeded_data()
+
+        world = seed_tournament_data(self.large_scale)
+        url = url_for(world)
+        large = self.measure(client, url)
+
+        limit = len(small) if budget is None else min(budget, len(small))
+        if len(large) > limit or (budget is not None and len(small) > budget):
+            self.fail(
+                f'{url} 的查詢數隨資料量成長或超出預算：'
+                f'scale={self.small_scale} 時 {len(small)} 次，'
+                f'scale={self.large_scale} 時 {len(large)} 次'
+                f'{f"，預算 {budget} 次" if budget is not None else ""}。\n'
+                f'重複的查詢：\n{format_duplicated_queries(large)}'
+            )
+
+
+class PublicViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """所有公開頁面的查詢數都必須與資料量無關。"""
+
+    def test_tournament_list(self):
+        self.assertConstantQueries(lambda w: reverse('tournament_list'))
+
+    def test_tournament_detail_round_robin(self):
+        self.assertConstantQueries(
+            lambda w: reverse('tournament_detail', args=[w['tournaments']['round_robin'].pk]))
+
+    def test_tournament_detail_swiss(self):
+        self.assertConstantQueries(
+            lambda w: reverse('tournament_detail', args=[w['tournaments']['swiss'].pk]))
+
+    def test_tournament_detail_single_elimination(self):
+        self.assertConstantQueries(
+            lambda w: reverse('tournament_detail', args=[w['tournaments']['single_elimination'].pk]))
+
+    def test_tournament_detail_double_elimination(self):
+        self.assertConstantQueries(
+            lambda w: reverse('tournament_detail', args=[w['tournaments']['double_elimination'].pk]))
+
+    def test_team_list(self):
+        self.assertConstantQueries(lambda w: reverse('team_list'))
+
+    def test_team_detail(self):
+        self.assertConstantQueries(lambda w: reverse('team_detail', args=[w['team'].pk]))
+
+    def test_player_detail(self):
+        self.assertConstantQueries(lambda w: reverse('player_detail', args=[w['player'].pk]))
+
+    def test_overall_stats(self):
+        self.assertConstantQueries(lambda w: reverse('overall_stats'))
+
+    def test_tournament_stats(self):
+        self.assertConstantQueries(
+            lambda w: reverse('tournament_stats', args=[w['tournaments']['round_robin'].pk]))
+
+
+class APIQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """所有 API GET 端點的查詢數都必須與資料量無關。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('api-tester', password='pass')
+        self.client.force_login(self.user)
+
+    def test_api_root(self):
+        self.assertConstantQueries(lambda w: reverse('api_root'))
+
+    def test_api_tournament_list(self):
+        self.assertConstantQueries(lambda w: reverse('api_tournament_list'))
+
+    def test_api_player_list(self):
+        self.assertConstantQueries(lambda w: reverse('api_player_list'))
+
+    def test_api_team_list(self):
+        self.assertConstantQueries(lambda w: reverse('api_team_list'))
+
+    def test_api_teams(self):
+        self.assertConstantQueries(lambda w: reverse('api_teams'))
+
+    def test_api_match_detail(self):
+        self.assertConstantQueries(
+            lambda w: reverse('api_match_detail', args=[w['tournaments']['round_robin'].matches.first().pk]))
+
+    @skipIf(simulation.np is None, '需要 numpy')
+    def test_api_tournament_qualification(self):
+        self.assertConstantQueries(
+            lambda w: reverse('api_tournament_qualification', args=[w['tournaments']['round_robin'].pk]))
+
+    def test_api_map_stats(self):
+        def url_for(world):
+            mapstats.rebuild()
+            return reverse('api_map_stats') + f"?team={world['team'].pk}&map=Ascent"
+        self.assertConstantQueries(url_for)
+
+    def test_api_leaderboards(self):
+        def url_for(world):
+            leaderboards.invalidate()
+            return reverse('api_leaderboards') + f"?player={world['player'].pk}"
+        self.assertConstantQueries(url_for)
+
+
+class QueryBudgetReportTests(TestCase):
+    """確認超出預算時的錯誤訊息會指出重複的 SQL。"""
+
+    def test_duplicated_sql_is_reported(self):
+        captured = [
+            {'sql': 'SELECT "name" FROM "tournaments_team" WHERE "id" = 1'},
+            {'sql': 'SELECT "name" FROM "tournaments_team" WHERE "id" = 2'},
+            {'sql': 'SELECT COUNT(*) FROM "tournaments_match"'},
+        ]
+        report = format_duplicated_queries(captured)
+        self.assertIn('[2x] SELECT "name" FROM "tournaments_team" WHERE "id" = ?', report)
+        self.assertNotIn('COUNT', report)
+
+
+class BulkImporterTests(TestCase):
+    """統一匯入引擎：串流解析、分批寫入與各種模式。"""
+
+    def test_streaming_parser_matches_json_load(self):
+        with open(PRODUCTION_DUMP, encoding='utf-8') as f:
+            data = json.load(f)
+        expected = [(table, row) for table, rows in data.items() for row in rows]
+        # 用很小的區塊大小，確保跨區塊邊界的資料也能正確解析
+        self.assertEqual(list(iter_dump_records(PRODUCTION_DUMP, chunk_size=7)), expected)
+
+    def test_fixture_format_is_normalized(self):
+        records = list(iter_dump_records(FIXTURE_DUMP))
+        table, tournament = records[0]
+        self.assertEqual(table, 'tournaments')
+        self.assertEqual(tournament['id'], 9)
+        self.assertIn('participants', tournament)
+
+    def test_parse_datetime_value_formats(self):
+        expected = parse_datetime_value('2025-08-15T10:12:54Z')
+        self.assertEqual(parse_datetime_value('2025-08-15 10:12:54+00:00'), expected)
+        self.assertIsNotNone(parse_datetime_value('2025-08-15').tzinfo)
+        self.assertIsNone(parse_datetime_value(''))
+
+    def test_import_production_dump_in_few_queries_per_table(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result = import_dump(PRODUCTION_DUMP)
+        with open(PRODUCTION_DUMP, encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.assertEqual(Tournament.objects.count(), len(data['tournaments']))
+        self.assertEqual(Team.objects.count(), len(data['teams']))
+        self.assertEqual(Group.objects.count(), len(data['groups']))
+        self.assertEqual(Match.objects.count() + result['matches']['orphaned'], len(data['matches']))
+        self.assertEqual(Player.objects.count() + result['players']['orphaned'], len(data['players']))
+        self.assertEqual(Standing.objects.count(), len(data['standings']))
+        # 8 張表加上重建的地圖數據彙總、每張表只需要少量的查詢（查既有資料 + bulk_create）
+        self.assertLessEqual(len(ctx.captured_queries), 9 * 4, format_duplicated_queries(ctx.captured_queries))
+
+    def test_import_fixture_dump_with_m2m(self):
+        with CaptureQueriesContext(connection) as ctx:
+            import_dump(FIXTURE_DUMP)
+        tournament = Tournament.objects.get(pk=9)
+        self.assertEqual(tournament.participants.count(), 36)
+        self.assertEqual(Group.objects.get(pk=99).teams.count(), 9)
+        self.assertEqual(Player.objects.count(), 207)
+        self.assertLessEqual(len(ctx.captured_queries), 9 * 4, format_duplicated_queries(ctx.captured_queries))
+
+    def test_dry_run_writes_nothing(self):
+        result = import_dump(PRODUCTION_DUMP, dry_run=True)
+        self.assertGreater(result['teams']['created'], 0)
+        self.assertEqual(Team.objects.count(), 0)
+        self.assertEqual(Tournament.objects.count(), 0)
+
+    def test_insert_mode_skips_existing_rows(self):
+        import_dump(PRODUCTION_DUMP)
+        team_count = Team.objects.count()
+        result = import_dump(PRODUCTION_DUMP)
+        self.assertEqual(result['teams']['created'], 0)
+        self.assertEqual(result['teams']['skipped'], team_count)
+        self.assertEqual(Team.objects.count(), team_count)
+
+    def test_upsert_mode_updates_existing_rows(self):
+        import_dump(PRODUCTION_DUMP)
+        Team.objects.filter(pk=70).update(logo='')
+        Standing.objects.filter(pk=85).update(points=99)
+
+        result = import_dump(PRODUCTION_DUMP, mode='upsert')
+        self.assertEqual(result['teams']['created'], 0)
+        self.assertEqual(Team.objects.get(pk=70).logo.name, 'team_logos/啟英.png')
+        self.assertEqual(Standing.objects.get(pk=85).points, 0)
+
+    def test_foreign_keys_resolve_through_natural_keys(self):
+        # 資料庫中已有同名隊伍但 id 不同，匯入的選手應該指向既有的隊伍
+        existing = Team.objects.create(id=5000, name='既有隊伍')
+        records = [
+            ('teams', {'id': 1, 'name': '既有隊伍'}),
+            ('players', {'id': 1, 'nickname': 'ace', 'team_id': 1}),
+        ]
+        BulkImporter().run(records)
+        self.assertEqual(Player.objects.get(pk=1).team_id, existing.pk)
+        self.assertEqual(Team.objects.count(), 1)
+
+    def test_out_of_order_records_wait_for_dependencies(self):
+        records = [
+            ('players', {'id': 1, 'nickname': 'ace', 'team_id': 7}),
+            ('teams', {'id': 7, 'name': '學校-隊伍'}),
+        ]
+        result = BulkImporter(batch_size=1).run(records)
+        self.assertEqual(result['players']['created'], 1)
+        self.assertEqual(Team.objects.get(pk=7).school, '學校')
+
+    def test_recalculate_standings_runs_once_per_tournament(self):
+        import_dump(PRODUCTION_DUMP)
+        Standing.objects.update(points=0, wins=0)
+        result = import_dump(PRODUCTION_DUMP, recalculate_standings=True)
+        self.assertEqual(result.recalculated, [9])
+        completed_wins = Match.objects.filter(status='completed', winner__isnull=False).count()
+        self.assertEqual(sum(Standing.objects.values_list('wins', flat=True)), completed_wins)
+
+
+class DataExportTests(TestCase):
+    """串流匯出：格式可被匯入引擎讀回、可依賽事篩選、中斷後可續傳。"""
+
+    def setUp(self):
+        import_dump(FIXTURE_DUMP)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return str(Path(self.tmp.name) / name)
+
+    def snapshot(self):
+        return {
+            'teams': list(Team.objects.order_by('pk').values()),
+            'players': list(Player.objects.order_by('pk').values()),
+            'matches': list(Match.objects.order_by('pk').values()),
+            'standings': list(Standing.objects.order_by('pk').values()),
+            'participants': sorted(Tournament.participants.through.objects.values_list('tournament_id', 'team_id')),
+            'group_teams': sorted(Group.teams.through.objects.values_list('group_id', 'team_id')),
+        }
+
+    def assertRoundTrip(self, path):
+        before = self.snapshot()
+        clear_tournament_data()
+        import_dump(path)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_ndjson_gz_round_trip(self):
+        path = self.path('data.ndjson.gz')
+        counts = export_to_file(path, chunk_size=50)
+        self.assertEqual(counts['players'], Player.objects.count())
+        self.assertFalse(Path(progress_path(path)).exists())
+        self.assertRoundTrip(path)
+
+    def test_json_schema_round_trip(self):
+        path = self.path('data.json')
+        export_to_file(path, chunk_size=50)
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['teams']), Team.objects.count())
+        self.assertRoundTrip(path)
+
+    def test_tournament_scope(self):
+        other = Tournament.objects.create(name='其他賽事', game='VALORANT', start_date=timezone.now(),
+                                          end_date=timezone.now())
+        stray = Team.objects.create(name='不相關隊伍')
+        other.participants.add(stray)
+        scoped = Tournament.objects.exclude(pk=other.pk).values_list('pk', flat=True)
+
+        tables = Counter()
+        for table, block in iter_export_blocks(list(scoped)):
+            tables[table] += len(block)
+            if table == 'teams':
+                self.assertNotIn(stray.pk, [record['id'] for record in block])
+        self.assertEqual(tables['tournaments'], len(scoped))
+        self.assertEqual(tables['teams'], Team.objects.count() - 1)
+
+    def test_resume_after_interruption(self):
+        full_path = self.path('full.ndjson.gz')
+        export_to_file(full_path, chunk_size=40)
+
+        path = self.path('partial.ndjson.gz')
+        original = exporter.iter_export_blocks
+
+        def interrupted(*args, **kwargs):
+            for index, item in enumerate(original(*args, **kwargs)):
+                if index == 3:
+                    raise KeyboardInterrupt
+                yield item
+
+        with self.assertRaises(KeyboardInterrupt):
+            with mock.patch.object(exporter, 'iter_export_blocks', interrupted):
+                export_to_file(path, chunk_size=40)
+        self.assertTrue(Path(progress_path(path)).exists())
+
+        # 模擬寫到一半的區塊
+        with open(path, 'ab') as f:
+            f.write(b'\x1f\x8b partial')
+        export_to_file(path, resume=True, chunk_size=40)
+
+        with gzip.open(path, 'rt', encoding='utf-8') as resumed, \
+                gzip.open(full_path, 'rt', encoding='utf-8') as full:
+            self.assertEqual(resumed.read(), full.read())
+
+    def test_admin_export_streams_gzip(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        tournament = Tournament.objects.first()
+
+        response = self.client.get(reverse('admin:tournaments_tournament_export'),
+                                   {'tournament': tournament.pk, 'resume': 'teams:0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        tables = Counter(json.loads(line)['table'] for line in lines)
+        self.assertNotIn('tournaments', tables)
+        self.assertEqual(tables['participants'], tournament.participants.count())
+
+        response = self.client.get(reverse('admin:tournaments_tournament_export'), {'resume': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_export_requires_view_permission_on_every_table(self):
+        user = get_user_model().objects.create_user('viewer', is_staff=True)
+        user.user_permissions.add(Permission.objects.get(codename='view_tournament'))
+        self.client.force_login(user)
+        url = reverse('admin:tournaments_tournament_export')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        user.user_permissions.add(*Permission.objects.filter(
+            content_type__app_label='tournaments', codename__startswith='view_',
+        ))
+        self.client.force_login(get_user_model().objects.get(pk=user.pk))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class DatabaseSyncTests(TestCase):
+    databases = {'default', SYNC_SOURCE, SYNC_TARGET}
+
+    def setUp(self):
+        import_dump(FIXTURE_DUMP, using=SYNC_SOURCE)
+        import_dump(FIXTURE_DUMP, using=SYNC_TARGET)
+
+    def snapshot(self, alias):
+        return {
+            table: list(model.objects.using(alias).order_by('pk').values())
+            for table, model in sync_models()
+        }
+
+    def diverge_target(self):
+        Team.objects.using(SYNC_TARGET).filter(pk=Team.objects.using(SYNC_TARGET).first().pk).update(logo='')
+        Player.objects.using(SYNC_TARGET).filter(pk=Player.objects.using(SYNC_TARGET).last().pk).delete()
+        Standing.objects.using(SYNC_TARGET).filter(
+            pk=Standing.objects.using(SYNC_TARGET).first().pk
+        ).update(points=99)
+        tournament = Tournament.objects.using(SYNC_TARGET).first()
+        Match.objects.using(SYNC_TARGET).create(id=90000, tournament=tournament, round_number=1)
+
+    def test_identical_databases_only_compare_hashes(self):
+        result = DatabaseSync(SYNC_SOURCE, SYNC_TARGET).run()
+        self.assertFalse(result.changed)
+        self.assertEqual(result.rows_compared, 0)
+        # 每張有資料的表兩邊各一次雜湊查詢
+        populated = sum(1 for _, model in sync_models() if model.objects.using(SYNC_SOURCE).exists())
+        self.assertEqual(result.hash_queries, 2 * populated)
+
+    def test_sync_applies_only_differences(self):
+        self.diverge_target()
+        result = DatabaseSync(SYNC_SOURCE, SYNC_TARGET, leaf_size=16).run()
+
+        self.assertEqual(result['teams']['updated'], 1)
+        self.assertEqual(result['players']['inserted'], 1)
+        self.assertEqual(result['standings']['updated'], 1)
+        self.assertEqual(result['matches']['deleted'], 1)
+        self.assertLess(result.rows_compared, 4 * 16 * 4)
+        self.assertEqual(self.snapshot(SYNC_TARGET), self.snapshot(SYNC_SOURCE))
+        self.assertFalse(DatabaseSync(SYNC_SOURCE, SYNC_TARGET).run().changed)
+
+    def test_deleted_and_recreated_unique_rows(self):
+        teams = Team.objects.using(SYNC_TARGET)
+        team = teams.first()
+        teams.get(pk=team.pk).delete()
+        recreated = teams.create(id=90000, name=team.name)
+        TeamAvailability.objects.using(SYNC_TARGET).create(team=recreated, start=timezone.now(), end=timezone.now())
+        Tournament.objects.using(SYNC_TARGET).first().participants.add(recreated)
+        standing = Standing.objects.using(SYNC_TARGET).last()
+        standing.delete()
+        standing.pk = 90000
+        standing.save(using=SYNC_TARGET, force_insert=True)
+        match_id = Match.objects.using(SYNC_SOURCE).first().pk
+        for alias, pk in ((SYNC_SOURCE, 80000), (SYNC_TARGET, 90000)):
+            Game.objects.using(alias).create(id=pk, match_id=match_id, map_number=1, map_name='Bind')
+
+        result = DatabaseSync(SYNC_SOURCE, SYNC_TARGET).run()
+        self.assertEqual((result['teams']['inserted'], result['teams']['deleted']), (1, 1))
+        self.assertEqual(self.snapshot(SYNC_TARGET), self.snapshot(SYNC_SOURCE))
+        self.assertFalse(TeamAvailability.objects.using(SYNC_TARGET).exists())
+
+    def test_sql_hashing_requires_ordered_concat(self):
+        sqlite = connections[SYNC_SOURCE]
+        with mock.patch.object(sqlite.Database, 'sqlite_version_info', (3, 43, 2)):
+            self.assertFalse(DatabaseSync(SYNC_SOURCE, SYNC_TARGET).sql_hash)
+        with mock.patch.object(sqlite.Database, 'sqlite_version_info', (3, 44, 0)):
+            self.assertTrue(DatabaseSync(SYNC_SOURCE, SYNC_TARGET).sql_hash)
+
+    def test_dry_run_and_python_hashing(self):
+        self.diverge_target()
+        before = self.snapshot(SYNC_TARGET)
+        sync = DatabaseSync(SYNC_SOURCE, SYNC_TARGET, dry_run=True)
+        sync.sql_hash = False
+        result = sync.run()
+        self.assertEqual(result['players']['inserted'], 1)
+        self.assertEqual(result['matches']['deleted'], 1)
+        self.assertEqual(self.snapshot(SYNC_TARGET), before)
+
+
+class BulkCopyTests(TestCase):
+    databases = {'default', SYNC_SOURCE, SYNC_TARGET}
+
+    def test_copy_import_matches_bulk_create(self):
+        import_dump(FIXTURE_DUMP, using=SYNC_SOURCE)
+        result = import_dump(FIXTURE_DUMP, using=SYNC_TARGET, copy=True)
+        self.assertEqual(result['players']['created'], 207)
+        for table, model in sync_models():
+            self.assertEqual(
+                list(model.objects.using(SYNC_TARGET).order_by('pk').values()),
+                list(model.objects.using(SYNC_SOURCE).order_by('pk').values()),
+                table,
+            )
+
+    def test_transfer_database_replaces_target(self):
+        import_dump(FIXTURE_DUMP, using=SYNC_SOURCE)
+        Team.objects.using(SYNC_TARGET).create(name='舊資料')
+
+        counts = transfer_database(SYNC_SOURCE, SYNC_TARGET, chunk_size=50)
+        self.assertEqual(counts['teams'], Team.objects.using(SYNC_SOURCE).count())
+        self.assertFalse(DatabaseSync(SYNC_SOURCE, SYNC_TARGET).run().changed)
+        # 搬移後可以繼續以自動遞增的 id 新增資料
+        self.assertGreater(Team.objects.using(SYNC_TARGET).create(name='新隊伍').pk,
+                           Team.objects.using(SYNC_SOURCE).order_by('-pk').first().pk)
+
+
+class HeadToHeadMatrixTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tournament = Tournament.objects.create(
+            name='循環賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.ROUND_ROBIN,
+        )
+        self.a, self.b, self.c = Team.objects.bulk_create([Team(name=name) for name in ('A隊', 'B隊', 'C隊')])
+        self.tournament.participants.add(self.a, self.b, self.c)
+        self.group = Group.objects.create(tournament=self.tournament, name='A組')
+        self.group.teams.add(self.a, self.b, self.c)
+
+    def play(self, team1, team2, winner, maps=(2, 1), rounds=((13, 7), (10, 13), (13, 11))):
+        match = Match.objects.create(
+            tournament=self.tournament, round_number=1, team1=team1, team2=team2,
+            team1_score=maps[0], team2_score=maps[1], winner=winner, status='completed',
+        )
+        for number, (score1, score2) in enumerate(rounds, start=1):
+            Game.objects.create(match=match, map_number=number, team1_score=score1, team2_score=score2)
+        return match
+
+    def assertMatchesRebuild(self):
+        cached = get_group_matrix(self.group)
+        rebuilt = HeadToHeadMatrix.build(self.group)
+        self.assertEqual(list(cached.cells), list(rebuilt.cells))
+
+    def test_cells_are_mirrored(self):
+        self.play(self.a, self.b, self.a)
+        matrix = get_group_matrix(self.group)
+        self.assertEqual(matrix.cell(self.a.pk, self.b.pk), (1, 0, 0, 1, 5))
+        self.assertEqual(matrix.cell(self.b.pk, self.a.pk), (0, 0, 1, -1, -5))
+        self.assertEqual(matrix.cell(self.a.pk, self.c.pk).played, 0)
+
+    def test_incremental_updates_match_rebuild(self):
+        get_group_matrix(self.group)  # 先建立快取，之後的變動走增量更新
+        match = self.play(self.a, self.b, self.a)
+        self.play(self.b, self.c, self.c, maps=(0, 2), rounds=((5, 13), (8, 13)))
+        self.assertMatchesRebuild()
+
+        match.winner, match.team1_score, match.team2_score = self.b, 1, 2
+        match.save()
+        Game.objects.filter(match=match, map_number=1).update(team1_score=3)
+        Game.objects.get(match=match, map_number=2).save()
+        self.assertMatchesRebuild()
+
+        match.delete()
+        self.assertEqual(get_group_matrix(self.group).cell(self.a.pk, self.b.pk).played, 0)
+
+    def test_moving_a_match_updates_the_old_group(self):
+        other = Tournament.objects.create(
+            name='循環賽二', game='Valorant', end_date=timezone.now(), format=Tournament.Format.ROUND_ROBIN,
+        )
+        other.participants.add(self.a, self.b)
+        other_group = Group.objects.create(tournament=other, name='A組')
+        other_group.teams.add(self.a, self.b)
+        get_group_matrix(self.group)
+        get_group_matrix(other_group)
+        match = self.play(self.a, self.b, self.a)
+        self.assertEqual(get_group_matrix(self.group).cell(self.a.pk, self.b.pk).played, 1)
+
+        match.tournament = other
+        match.save()
+        self.assertEqual(get_group_matrix(self.group).cell(self.a.pk, self.b.pk).played, 0)
+        self.assertEqual(get_group_matrix(other_group).cell(self.a.pk, self.b.pk).played, 1)
+        self.assertMatchesRebuild()
+
+        match.tournament, match.team2 = self.tournament, self.c
+        match.save()
+        self.assertEqual(get_group_matrix(other_group).cell(self.a.pk, self.b.pk).played, 0)
+        self.assertEqual(get_group_matrix(self.group).cell(self.a.pk, self.c.pk).played, 1)
+        self.assertMatchesRebuild()
+
+    def test_contributions_repair_stale_cache(self):
+        match = self.play(self.a, self.b, self.a)
+        get_group_matrix(self.group)
+        # queryset.update 不經過 signal，快取中的矩陣仍是舊的結果
+        Match.objects.filter(pk=match.pk).update(winner=self.b, team1_score=1, team2_score=2)
+        rows = completed_match_rows(Match.objects.filter(tournament=self.tournament))
+        contributions = {row['id']: match_contribution(row) for row in rows}
+        with self.assertNumQueries(0):
+            matrix = get_group_matrix(self.group, contributions=contributions)
+        self.assertEqual(matrix.cell(self.b.pk, self.a.pk).points, 3)
+        self.assertMatchesRebuild()
+
+    def test_build_uses_one_match_query(self):
+        self.play(self.a, self.b, self.a)
+        self.play(self.b, self.c, self.b)
+        with self.assertNumQueries(2):  # 組內隊伍 + 比賽與小局加總
+            HeadToHeadMatrix.build(self.group)
+
+    def test_ties_are_broken_by_head_to_head(self):
+        # 三隊各一勝一敗：A 勝 B、B 勝 C、C 勝 A，對戰積分相同，由地圖差決定排名
+        self.play(self.a, self.b, self.a, maps=(2, 0), rounds=((13, 0), (13, 0)))
+        self.play(self.b, self.c, self.b, maps=(2, 1))
+        self.play(self.c, self.a, self.c, maps=(2, 1))
+        # 積分榜由 signal 建立，三隊同為 1 勝 1 敗 3 分
+        Standing.objects.filter(tournament=self.tournament).update(group=self.group)
+        update_tiebreakers(self.tournament.pk)
+
+        response = self.client.get(reverse('tournament_detail', args=[self.tournament.pk]))
+        self.assertEqual([s.team for s in response.context['group_standings']], [self.a, self.c, self.b])
+        self.assertEqual(len(response.context['cross_table']), 3)
+
+
+class TiebreakerTests(TestCase):
+
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name='瑞士輪', game='Valorant', end_date=timezone.now(), format=Tournament.Format.SWISS,
+        )
+        self.teams = Team.objects.bulk_create([Team(name=f'{name}隊') for name in 'ABCD'])
+        self.a, self.b, self.c, self.d = self.teams
+
+    def result(self, team1, team2, winner, maps=(2, 0)):
+        Match.objects.create(
+            tournament=self.tournament, round_number=1, team1=team1, team2=team2,
+            team1_score=maps[0], team2_score=maps[1], winner=winner, status='completed',
+        )
+
+    def set_standings(self, points):
+        Standing.objects.bulk_create([
+            Standing(tournament=self.tournament, team=team, points=value, wins=value // 3)
+            for team, value in zip(self.teams, points)
+        ])
+
+    def ranked(self):
+        return [s.team for s in Standing.objects.filter(tournament=self.tournament).order_by(*STANDING_ORDER)]
+
+    def test_buchholz_and_sonneborn_berger(self):
+        # bulk_create 不觸發 signal，積分直接指定
+        Match.objects.bulk_create([
+            Match(tournament=self.tournament, round_number=1, team1=self.a, team2=self.c, winner=self.a,
+                  team1_score=2, team2_score=1, status='completed'),
+            Match(tournament=self.tournament, round_number=1, team1=self.b, team2=self.d, winner=self.b,
+                  team1_score=2, team2_score=0, status='completed'),
+        ])
+        self.set_standings([3, 3, 0, 0])
+        self.tournament.tiebreakers = 'map_diff'
+        self.tournament.save()
+        update_tiebreakers(self.tournament.pk)
+        self.assertEqual(self.ranked(), [self.b, self.a, self.c, self.d])
+
+        Standing.objects.filter(team=self.c).update(points=1)
+        self.tournament.tiebreakers = 'buchholz,map_diff'
+        self.tournament.save()
+        standings = {s.team_id: s for s in update_tiebreakers(self.tournament.pk)}
+        self.assertEqual(standings[self.a.pk].buchholz, 1)
+        self.assertEqual(standings[self.a.pk].sonneborn_berger, 1)
+        self.assertEqual(self.ranked(), [self.a, self.b, self.c, self.d])
+
+    def test_match_save_persists_ranks_for_swiss_pairing(self):
+        self.tournament.participants.add(*self.teams)
+        self.result(self.a, self.b, self.b, maps=(1, 2))
+        self.result(self.c, self.d, self.c, maps=(2, 0))
+        # 兩隊同為 3 分：C 的地圖差較大
+        self.assertEqual(self.ranked(), [self.c, self.b, self.a, self.d])
+        self.assertEqual(list(Standing.objects.filter(tournament=self.tournament)
+                              .order_by('rank').values_list('rank', flat=True)), [1, 2, 3, 4])
+
+    def test_round_robin_head_to_head_reads_group_matrix(self):
+        tournament = Tournament.objects.create(
+            name='循環賽', game='Valorant', end_date=timezone.now(),
+            format=Tournament.Format.ROUND_ROBIN, tiebreakers='head_to_head',
+        )
+        tournament.participants.add(*self.teams)
+        group = Group.objects.create(tournament=tournament, name='A組')
+        group.teams.add(*self.teams)
+        Standing.objects.bulk_create([Standing(tournament=tournament, team=team, group=group) for team in self.teams])
+        cache.clear()
+        get_group_matrix(group)  # 快取中的矩陣還沒有任何比賽
+        # bulk_create 不觸發 signal：A、B 同為 2 勝，B 在對戰中勝 A
+        Match.objects.bulk_create([
+            Match(tournament=tournament, round_number=1, team1=team1, team2=team2, winner=winner,
+                  team1_score=2, team2_score=0, status='completed')
+            for team1, team2, winner in (
+                (self.b, self.a, self.b), (self.a, self.c, self.a), (self.a, self.d, self.a),
+                (self.c, self.b, self.c), (self.b, self.d, self.b),
+            )
+        ])
+        recalculate_standings(tournament.pk)
+        ranked = Standing.objects.filter(tournament=tournament).order_by(*STANDING_ORDER)
+        self.assertEqual([s.team for s in ranked], [self.b, self.a, self.c, self.d])
+        # 同分比較以剛載入的比賽校正了快取中的矩陣
+        self.assertEqual(get_group_matrix(group).cell(self.b.pk, self.a.pk).wins, 1)
+
+    def test_invalid_tiebreaker_is_rejected(self):
+        self.tournament.tiebreakers = 'map_diff,coin_flip'
+        with self.assertRaises(ValidationError):
+            self.tournament.full_clean()
+
+
+@skipIf(simulation.np is None, '需要 numpy')
+class QualificationSimulationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tournament = Tournament.objects.create(
+            name='循環賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.ROUND_ROBIN,
+        )
+        self.teams = Team.objects.bulk_create([Team(name=f'{name}隊') for name in 'ABCD'])
+        self.group = Group.objects.create(tournament=self.tournament, name='A組')
+        self.group.teams.add(*self.teams)
+        self.tournament.participants.add(*self.teams)
+        Standing.objects.bulk_create([
+            Standing(tournament=self.tournament, team=team, group=self.group) for team in self.teams
+        ])
+
+    def schedule(self, team1, team2, winner=None, maps=(2, 1)):
+        Match.objects.create(
+            tournament=self.tournament, round_number=1, team1=team1, team2=team2, winner=winner,
+            team1_score=maps[0] if winner else 0, team2_score=maps[1] if winner else 0,
+            status='completed' if winner else 'scheduled',
+        )
+
+    def test_completed_stage_matches_tiebreaker_engine(self):
+        a, b, c, d = self.teams
+        for team1, team2, winner, maps in [
+            (a, b, a, (2, 0)), (c, d, c, (2, 1)), (a, c, c, (1, 2)),
+            (b, d, b, (2, 0)), (a, d, a, (2, 1)), (b, c, b, (2, 1)),
+        ]:
+            self.schedule(team1, team2, winner, maps)
+        Standing.objects.filter(tournament=self.tournament).update(group=self.group)
+        update_tiebreakers(self.tournament.pk)
+
+        result = simulation.simulate_tournament(self.tournament, 1000, seed=1)
+        ranks = dict(Standing.objects.filter(tournament=self.tournament).values_list('team_id', 'rank'))
+        for team in result['stages'][0]['teams']:
+            self.assertEqual(team['positions'][ranks[team['team_id']] - 1], 1.0)
+
+    def test_probabilities_and_cache_version(self):
+        a, b, c, d = self.teams
+        self.schedule(a, b, a)
+        self.schedule(c, d)
+        self.schedule(a, c)
+
+        result = simulation.simulate_tournament(self.tournament, 20000, seed=7)
+        teams = {team['team_id']: team for team in result['stages'][0]['teams']}
+        for team in teams.values():
+            self.assertAlmostEqual(sum(team['positions']), 1.0, places=4)
+        for position in range(4):
+            self.assertAlmostEqual(sum(team['positions'][position] for team in teams.values()), 1.0, places=4)
+        # B 已輸一場且沒有剩餘比賽，不可能拿第一；A 已有 3 分，不可能墊底
+        self.assertEqual(teams[b.pk]['positions'][0], 0)
+        self.assertEqual(simulation.qualification_probability(teams[a.pk], 3), 1.0)
+
+        # 賽事狀態未變時直接讀快取；比賽結果改變後雜湊不同，重新模擬
+        with self.assertNumQueries(2):  # 積分榜 + 比賽，用來計算狀態雜湊
+            self.assertEqual(simulation.simulate_tournament(self.tournament, 20000, seed=7), result)
+        Match.objects.filter(team1=c, team2=d).update(status='completed', winner=c, team1_score=2)
+        changed = simulation.simulate_tournament(self.tournament, 20000, seed=7)
+        self.assertEqual(changed['stages'][0]['remaining_matches'], 1)
+
+    def test_api_rejects_elimination_formats(self):
+        url = reverse('api_tournament_qualification', args=[self.tournament.pk])
+        self.assertEqual(self.client.get(url, {'places': 1}).status_code, 200)
+        self.tournament.format = Tournament.Format.SINGLE_ELIMINATION
+        self.tournament.save()
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_anonymous_requests_are_capped_and_throttled(self):
+        url = reverse('api_tournament_qualification', args=[self.tournament.pk])
+        with mock.patch.dict(QualificationThrottle.THROTTLE_RATES, qualification='2/minute'):
+            response = self.client.get(url, {'simulations': simulation.MAX_SIMULATIONS})
+            self.assertEqual(response.json()['simulations'], simulation.ANONYMOUS_SIMULATIONS)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(self.client.get(url).status_code, 429)
+            # 登入的使用者不受頻率限制，可指定模擬次數
+            self.client.force_login(get_user_model().objects.create_user('analyst', password='pw'))
+            response = self.client.get(url, {'simulations': 20000})
+            self.assertEqual(response.json()['simulations'], 20000)
+
+
+class RatingTests(TestCase):
+
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name='積分賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.SWISS,
+        )
+        self.teams = Team.objects.bulk_create([Team(name=f'{name}隊') for name in 'ABCD'])
+        self.a, self.b, self.c, self.d = self.teams
+        self.tournament.participants.add(*self.teams)
+
+    def play(self, team1, team2, winner, round_number=1):
+        return Match.objects.create(
+            tournament=self.tournament, round_number=round_number, team1=team1, team2=team2,
+            winner=winner, status='completed',
+        )
+
+    def ratings(self):
+        return dict(Team.objects.values_list('pk', 'rating'))
+
+    def test_incremental_updates_match_backfill(self):
+        self.play(self.a, self.b, self.a)
+        self.play(self.c, self.d, self.d)
+        self.play(self.a, self.d, self.a, round_number=2)
+        self.play(self.b, self.c, None, round_number=2)
+        a = Team.objects.get(pk=self.a.pk)
+        self.assertAlmostEqual(a.rating, 1500 + 16 + 32 * (1 - 1 / (1 + 10 ** ((1516 - 1516) / 400))))
+        self.assertEqual(a.rated_matches, 2)
+        self.assertAlmostEqual(sum(self.ratings().values()), 1500 * 4)
+
+        incremental = self.ratings()
+        Team.objects.update(rating=1000, rated_matches=0)
+        with self.assertNumQueries(7):  # 讀取比賽 + 交易 + 清除 + 比賽與隊伍各一次 bulk_update + 重設隊伍
+            self.assertEqual(backfill_ratings(), 4)
+        for team_id, rating in self.ratings().items():
+            self.assertAlmostEqual(rating, incremental[team_id])
+
+    def test_result_changes_and_deletes_are_reverted(self):
+        match = self.play(self.a, self.b, self.a)
+        match.winner = self.b
+        match.save()
+        self.assertLess(Team.objects.get(pk=self.a.pk).rating, 1500)
+        self.assertEqual(Team.objects.get(pk=self.a.pk).rated_matches, 1)
+
+        match.status = 'scheduled'
+        match.save()
+        self.assertEqual(set(self.ratings().values()), {1500})
+        self.assertIsNone(Match.objects.get(pk=match.pk).rating_delta)
+
+        match = self.play(self.c, self.d, self.c)
+        Match.objects.get(pk=match.pk).delete()
+        self.assertEqual(set(self.ratings().values()), {1500})
+
+    def test_team_changes_revert_the_rated_teams(self):
+        match = self.play(self.a, self.b, self.a)
+        match.team2 = self.c
+        match.save()
+        a, b, c = (Team.objects.get(pk=team.pk) for team in (self.a, self.b, self.c))
+        self.assertEqual((b.rating, b.rated_matches), (1500, 0))
+        self.assertEqual((a.rated_matches, c.rated_matches), (1, 1))
+        self.assertAlmostEqual(a.rating + c.rating, 3000)
+
+        match.team2 = None
+        match.save()
+        self.assertEqual(set(self.ratings().values()), {1500})
+        self.assertFalse(Team.objects.filter(rated_matches__gt=0).exists())
+        self.assertIsNone(Match.objects.get(pk=match.pk).rating_delta)
+
+    def test_seeding(self):
+        for rating, team in zip((1600, 1550, 1500, 1450), self.teams):
+            team.rating = rating
+        self.assertEqual(seeding_order(reversed(self.teams)), self.teams)
+
+        Team.objects.bulk_update(self.teams, ['rating'])
+        Standing.objects.bulk_create([Standing(tournament=self.tournament, team=team) for team in self.teams])
+        generate_swiss_round_matches(self.tournament)
+        pairs = set(Match.objects.filter(tournament=self.tournament).values_list('team1_id', 'team2_id'))
+        self.assertEqual(pairs, {(self.a.pk, self.c.pk), (self.b.pk, self.d.pk)})
+
+
+class MatchSchedulerTests(TestCase):
+
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name='排程賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.ROUND_ROBIN,
+        )
+        self.start = timezone.make_aware(timezone.datetime(2026, 11, 2, 0, 0))
+
+    def create_group(self, count):
+        teams = Team.objects.bulk_create([Team(name=f'排程隊伍{i:02d}') for i in range(count)])
+        group = Group.objects.create(tournament=self.tournament, name='A組')
+        group.teams.add(*teams)
+        Standing.objects.bulk_create([Standing(tournament=self.tournament, team=t, group=group) for t in teams])
+        generate_round_robin_matches(self.tournament)
+        return teams
+
+    def test_circle_rounds_cover_every_pair_once(self):
+        rounds = circle_rounds(range(5))
+        self.assertEqual(len(rounds), 5)
+        for pairs in rounds:
+            teams = [team for pair in pairs for team in pair]
+            self.assertEqual(len(teams), len(set(teams)))
+        pairs = [frozenset(pair) for pairs in rounds for pair in pairs]
+        self.assertEqual(len(pairs), 10)
+        self.assertEqual(set(pairs), {frozenset(pair) for pair in combinations(range(5), 2)})
+
+    def test_constraints_are_respected(self):
+        self.create_group(64)
+        result = MatchScheduler(self.tournament, start=self.start, concurrent=8, max_per_team_per_day=2).run()
+        self.assertFalse(result.unscheduled)
+
+        matches = list(Match.objects.filter(tournament=self.tournament).values(
+            'team1_id', 'team2_id', 'round_number', 'match_time'))
+        self.assertEqual(len(matches), 64 * 63 // 2)
+        slots = Counter(m['match_time'] for m in matches)
+        self.assertLessEqual(max(slots.values()), 8)
+        per_day, team_slots, last_round = Counter(), Counter(), {}
+        for m in sorted(matches, key=lambda m: m['match_time']):
+            local = timezone.localtime(m['match_time'])
+            self.assertTrue(18 <= local.hour < 22)
+            for team_id in (m['team1_id'], m['team2_id']):
+                per_day[(team_id, local.date())] += 1
+                team_slots[(team_id, m['match_time'])] += 1
+                # 每隊的比賽依輪次先後進行
+                self.assertGreater(m['round_number'], last_round.get(team_id, 0))
+                last_round[team_id] = m['round_number']
+        self.assertLessEqual(max(per_day.values()), 2)
+        self.assertEqual(max(team_slots.values()), 1)
+
+    def test_availability_windows(self):
+        a, b, c, d = self.create_group(4)
+        day_two = self.start + timedelta(days=1)
+        TeamAvailability.objects.create(team=a, start=day_two, end=day_two + timedelta(days=1))
+        version = fragments.get_version('tournament', self.tournament.pk)
+        result = MatchScheduler(self.tournament, start=self.start, max_per_team_per_day=3).run()
+        self.assertEqual(len(result.scheduled), 6)
+        # bulk_update 不經過 signals，排程後賽事頁面的快取仍要失效
+        self.assertNotEqual(fragments.get_version('tournament', self.tournament.pk), version)
+        for match in Match.objects.filter(Q(team1=a) | Q(team2=a)):
+            self.assertEqual(timezone.localtime(match.match_time).date(), timezone.localtime(day_two).date())
+
+        # 已排定的比賽不會重排；--reschedule 才會
+        self.assertEqual(MatchScheduler(self.tournament, start=self.start).run().scheduled, [])
+
+
+class GroupDrawTests(TestCase):
+
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name='抽籤賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.ROUND_ROBIN,
+        )
+        schools = ['甲校', '甲校', '乙校', '乙校', '丙校', '丙校', '', '']
+        self.teams = Team.objects.bulk_create([
+            Team(name=f'抽籤隊伍{i}', school=school, rating=1600 - i * 10) for i, school in enumerate(schools)
+        ])
+        self.tournament.participants.add(*self.teams)
+
+    def test_snake_by_rating_separates_schools(self):
+        groups = GroupDraw(self.tournament, 2, seeding='rating', separate_schools=False).draw()
+        self.assertEqual([len(group) for group in groups], [4, 4])
+        self.assertEqual(groups[0][:2], [self.teams[0], self.teams[3]])
+
+        for seed in range(5):
+            groups = GroupDraw(self.tournament, 2, seeding='random', method='pots', seed=seed).draw()
+            for group in groups:
+                schools = [team.school for team in group if team.school]
+                self.assertEqual(len(schools), len(set(schools)))
+
+        self.teams[6].school = '甲校'
+        with self.assertRaises(DrawError):
+            GroupDraw(self.tournament, 2, teams=self.teams).draw()
+
+    def test_manual_seeds(self):
+        seeds = {self.teams[7].pk: 1, self.teams[6].pk: 2}
+        groups = GroupDraw(self.tournament, 4, seeding='manual', manual_seeds=seeds, separate_schools=False).draw()
+        self.assertEqual([group[0] for group in groups[:2]], [self.teams[7], self.teams[6]])
+
+    def test_save_uses_bulk_inserts_and_keeps_standings(self):
+        old = Group.objects.create(tournament=self.tournament, name='舊組')
+        Standing.objects.create(tournament=self.tournament, team=self.teams[0], group=old, wins=2, points=6)
+        draw = GroupDraw(self.tournament, 2, seeding='rating')
+        draw.draw()
+        with CaptureQueriesContext(connection) as ctx:
+            groups = draw.save()
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+
+        self.assertEqual(self.tournament.groups.count(), 2)
+        self.assertEqual(Standing.objects.filter(tournament=self.tournament, group__in=groups).count(), 8)
+        standing = Standing.objects.get(tournament=self.tournament, team=self.teams[0])
+        self.assertEqual((standing.wins, standing.points, standing.group_id), (2, 6, groups[0].pk))
+
+    def test_preview_writes_nothing(self):
+        user = get_user_model().objects.create_superuser('draw-admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        url = reverse('auto_random_grouping', args=[self.tournament.pk])
+        response = self.client.post(url, {'num_groups': 2, 'seeding': 'rating', 'method': 'snake',
+                                          'separate_schools': '1', 'preview': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['preview']), 2)
+        self.assertFalse(Group.objects.exists())
+
+        response = self.client.post(url, {'num_groups': 2, 'seeding': 'rating', 'separate_schools': '1'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Group.objects.filter(tournament=self.tournament).count(), 2)
+
+    def test_confirm_saves_the_previewed_draw(self):
+        user = get_user_model().objects.create_superuser('draw-admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        url = reverse('auto_random_grouping', args=[self.tournament.pk])
+        options = {'num_groups': 2, 'seeding': 'random', 'method': 'pots', 'separate_schools': '1'}
+        response = self.client.post(url, dict(options, preview='1'))
+        seed = response.context['draw_seed']
+        self.assertContains(response, f'name="draw_seed" value="{seed}"')
+        previewed = [{team.pk for team in group['teams']} for group in response.context['preview']]
+
+        self.client.post(url, dict(options, draw_seed=seed))
+        saved = [set(group.teams.values_list('pk', flat=True)) for group in self.tournament.groups.order_by('name')]
+        self.assertEqual(saved, previewed)
+
+
+class RosterImportTests(TestCase):
+
+    def league_csv(self, teams=64, players=400):
+        lines = ['team,school,player,role']
+        for i in range(players):
+            lines.append(f'聯賽隊伍{i % teams:02d},學校{i % teams // 2},選手{i:03d},{("Duelist", "守衛", "")[i % 3]}')
+        return '\n'.join(lines)
+
+    def test_parse_reports_all_errors(self):
+        with self.assertRaises(RosterError) as ctx:
+            parse_roster('隊伍A,甲校,Alpha,Tank\n,甲校,Bravo\n隊伍A,乙校,Charlie\n隊伍A,甲校,Alpha')
+        self.assertEqual([line for line, _ in ctx.exception.errors], [1, 2, 3])
+
+        roster = parse_roster('隊伍A\t甲校\tAlpha\t決鬥者\n隊伍B\n')
+        self.assertEqual(roster.team_names, ['隊伍A', '隊伍B'])
+        self.assertEqual(roster.teams['隊伍A']['players'], [('Alpha', 'Duelist')])
+        self.assertEqual(parse_roster(roster.to_text()).teams, roster.teams)
+
+    def test_league_import_uses_few_queries(self):
+        Team.objects.create(name='聯賽隊伍00')
+        tournament = Tournament.objects.create(name='名單賽', game='Valorant', end_date=timezone.now())
+        roster = parse_roster(self.league_csv())
+        with CaptureQueriesContext(connection) as ctx:
+            result = import_roster(roster, tournament=tournament)
+        self.assertLessEqual(len(ctx.captured_queries), 12)
+        self.assertEqual((result.teams_created, result.teams_updated, result.players_created), (63, 1, 400))
+        self.assertEqual(tournament.participants.count(), 64)
+        self.assertEqual(Player.objects.filter(role='Flex').count(), 133)
+
+        # 重新匯入：比對既有資料，只更新有變動的角色
+        result = import_roster(parse_roster('聯賽隊伍00,學校0,選手000,Sentinel\n聯賽隊伍00,學校0,選手064'))
+        self.assertEqual((result.teams_created, result.players_created, result.players_updated), (0, 0, 1))
+        self.assertEqual(Player.objects.get(nickname='選手064').role, 'Sentinel')
+        self.assertEqual(Player.objects.count(), 400)
+
+    def test_wizard_and_api_upload(self):
+        user = get_user_model().objects.create_superuser('roster-admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        session = self.client.session
+        session['wizard_data'] = {'step1': {
+            'name': '精靈賽', 'game': 'Valorant', 'format': 'round_robin', 'rules': '',
+            'start_date': timezone.now().isoformat(), 'end_date': timezone.now().isoformat(),
+        }}
+        session.save()
+        upload = SimpleUploadedFile('roster.csv', self.league_csv(8, 40).encode('utf-8-sig'))
+        response = self.client.post(reverse('tournament_create_step2'), {'teams_text': '', 'roster_file': upload})
+        self.assertRedirects(response, reverse('tournament_create_step3'))
+        self.client.post(reverse('tournament_create_step3'))
+        tournament = Tournament.objects.get(name='精靈賽')
+        self.assertEqual(tournament.participants.count(), 8)
+        self.assertEqual(Player.objects.filter(team__in=tournament.participants.all()).count(), 40)
+
+        url = reverse('api_roster_upload')
+        response = self.client.post(url, {'text': '新隊伍,丙校,Delta', 'dry_run': 'true'})
+        self.assertEqual(response.json(), {'dry_run': True, 'teams': 1, 'players': 1})
+        self.assertEqual(self.client.post(url, {'text': ',丙校'}).status_code, 400)
+        response = self.client.post(url, {'text': '新隊伍,丙校,Delta', 'tournament': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'text': '新隊伍,丙校,Delta', 'tournament': tournament.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(tournament.participants.count(), 9)
+
+        self.client.logout()
+        self.assertIn(self.client.post(url, {'text': '新隊伍'}).status_code, (401, 403))
+
+
+class BatchUpdatesTests(TestCase):
+    databases = {'default', SYNC_TARGET}
+
+    def setUp(self):
+        self.tournaments = [
+            Tournament.objects.create(name=f'批次賽{i}', game='Valorant', end_date=timezone.now(),
+                                      format=Tournament.Format.ROUND_ROBIN)
+            for i in range(2)
+        ]
+        self.teams = Team.objects.bulk_create([Team(name=f'批次隊伍{i}') for i in range(6)])
+        for tournament in self.tournaments:
+            tournament.participants.add(*self.teams)
+            GroupDraw(tournament, 1).save()
+            generate_round_robin_matches(tournament)
+        Match.objects.update(team1_score=13, team2_score=7)
+
+    def test_admin_action_recalculates_once_per_tournament(self):
+        user = get_user_model().objects.create_superuser('batch-admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        ids = list(Match.objects.values_list('pk', flat=True))
+        url = reverse('admin:tournaments_match_changelist')
+        with mock.patch('tournaments.signals.recalculate_standings', wraps=recalculate_standings) as recalc:
+            self.client.post(url, {'action': 'auto_set_winner_by_score_action', '_selected_action': ids})
+        self.assertEqual(sorted(call.args[0] for call in recalc.call_args_list),
+                         sorted(t.pk for t in self.tournaments))
+        self.assertEqual(Match.objects.filter(status='completed', winner=F('team1')).count(), len(ids))
+        self.assertEqual(Standing.objects.aggregate(total=Sum('wins'))['total'], len(ids))
+        ratings = dict(Team.objects.values_list('pk', 'rating'))
+        backfill_ratings()
+        for pk, rating in Team.objects.values_list('pk', 'rating'):
+            self.assertAlmostEqual(ratings[pk], rating)
+
+        with mock.patch('tournaments.signals.recalculate_standings', wraps=recalculate_standings) as recalc:
+            self.client.post(url, {'action': 'clear_winner_action', '_selected_action': ids[:3]})
+        self.assertEqual(recalc.call_count, 1)
+        self.assertEqual(Standing.objects.aggregate(total=Sum('wins'))['total'], len(ids) - 3)
+
+    def test_saves_are_deferred_until_outermost_exit(self):
+        tournament = self.tournaments[0]
+        matches = list(Match.objects.filter(tournament=tournament))
+        with mock.patch('tournaments.signals.recalculate_standings', wraps=recalculate_standings) as recalc:
+            with batch_updates():
+                with batch_updates():
+                    for match in matches:
+                        match.winner, match.status = match.team2, 'completed'
+                        match.save()
+                self.assertFalse(Standing.objects.filter(wins__gt=0).exists())
+                self.assertEqual(recalc.call_count, 0)
+            recalc.assert_called_once_with(tournament.pk, 'default')
+        self.assertEqual(Team.objects.filter(rated_matches=5).count(), 6)
+
+        with self.assertRaises(RuntimeError), batch_updates():
+            matches[0].delete()
+            raise RuntimeError
+        self.assertEqual(Team.objects.filter(rated_matches=5).count(), 6)
+
+    def test_round_robin_generation_is_batched(self):
+        tournament = self.tournaments[0]
+        version = fragments.get_version('tournament', tournament.pk)
+        with mock.patch('tournaments.signals.headtohead.update_match') as update_match:
+            self.assertEqual(generate_round_robin_matches(tournament), 15)
+        update_match.assert_not_called()
+        self.assertNotEqual(fragments.get_version('tournament', tournament.pk), version)
+        self.assertEqual(Match.objects.filter(tournament=tournament).count(), 15)
+
+    def test_signals_write_to_the_saving_database(self):
+        tournament = Tournament.objects.using(SYNC_TARGET).create(
+            name='同步賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.ROUND_ROBIN,
+        )
+        team1, team2 = (Team.objects.using(SYNC_TARGET).create(name=f'同步隊伍{i}') for i in range(2))
+        tournament.participants.add(team1, team2)
+        match = Match.objects.using(SYNC_TARGET).create(
+            tournament=tournament, round_number=1, team1=team1, team2=team2, winner=team1, status='completed',
+        )
+        Game.objects.using(SYNC_TARGET).create(match=match, map_number=1, map_name='Ascent', team1_score=13, team2_score=7)
+        standings = Standing.objects.using(SYNC_TARGET).filter(tournament=tournament)
+        self.assertEqual(dict(standings.values_list('team_id', 'wins')), {team1.pk: 1, team2.pk: 0})
+        self.assertEqual(Team.objects.using(SYNC_TARGET).get(pk=team1.pk).rated_matches, 1)
+        self.assertFalse(Standing.objects.filter(tournament_id=tournament.pk, team_id=team1.pk, wins=1).exists())
+
+        match.delete()
+        self.assertEqual(Team.objects.using(SYNC_TARGET).get(pk=team1.pk).rated_matches, 0)
+
+
+class ScoreEntryTests(TestCase):
+
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name='比分賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.ROUND_ROBIN,
+        )
+        teams = Team.objects.bulk_create([Team(name=f'比分隊伍{i}') for i in range(8)])
+        self.tournament.participants.add(*teams)
+        GroupDraw(self.tournament, 1).save()
+        generate_round_robin_matches(self.tournament)
+        self.matches = list(Match.objects.filter(tournament=self.tournament, round_number=1).order_by('id'))
+        self.user = get_user_model().objects.create_user('scorer', 'scorer@example.com', 'pw', is_staff=True)
+        self.client.force_login(self.user)
+        self.url = reverse('score_entry', args=[self.tournament.pk]) + '?round=1'
+
+    def round_data(self, **overrides):
+        data = {}
+        for match in self.matches:
+            data[f'match-{match.pk}-map1-name'] = 'Ascent'
+            data[f'match-{match.pk}-map1-t1'], data[f'match-{match.pk}-map1-t2'] = '13', '9'
+            data[f'match-{match.pk}-map2-t1'], data[f'match-{match.pk}-map2-t2'] = '7', '13'
+            data[f'match-{match.pk}-map3-t1'], data[f'match-{match.pk}-map3-t2'] = '13', '11'
+        data.update(overrides)
+        return data
+
+    def test_whole_round_is_saved_at_once(self):
+        self.assertEqual(len(self.matches), 4)
+        with mock.patch('tournaments.signals.recalculate_standings', wraps=recalculate_standings) as recalc:
+            response = self.client.post(self.url, self.round_data())
+        self.assertEqual(response.status_code, 302)
+        recalc.assert_called_once_with(self.tournament.pk, 'default')
+        self.assertEqual(Game.objects.filter(match__in=self.matches).count(), 12)
+        for match in Match.objects.filter(pk__in=[m.pk for m in self.matches]):
+            self.assertEqual((match.status, match.team1_score, match.team2_score, match.winner_id),
+                             ('completed', 2, 1, match.team1_id))
+        self.assertEqual(Standing.objects.filter(tournament=self.tournament, wins=1).count(), 4)
+
+        # 再次送出：移除第三張地圖並改判隊伍二獲勝（以地圖數 1:1 指定勝者）
+        first = self.matches[0]
+        response = self.client.post(self.url, self.round_data(**{
+            f'match-{first.pk}-map3-t1': '', f'match-{first.pk}-map3-t2': '', f'match-{first.pk}-winner': 'team2',
+        }))
+        self.assertEqual(response.status_code, 302)
+        first.refresh_from_db()
+        self.assertEqual((first.team1_score, first.team2_score, first.winner_id), (1, 1, first.team2_id))
+        self.assertEqual(first.games.count(), 2)
+
+        page = self.client.get(self.url)
+        self.assertContains(page, f'name="match-{first.pk}-map1-t1"')
+        self.assertEqual(page.context['sheet'].rows[0].winner_choice, 'team2')
+
+    def test_invalid_round_writes_nothing(self):
+        first, second = self.matches[:2]
+        response = self.client.post(self.url, self.round_data(**{
+            f'match-{first.pk}-map2-t2': '',
+            f'match-{second.pk}-winner': 'team2',
+        }))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.context['sheet'].errors), {first.pk, second.pk})
+        self.assertFalse(Game.objects.exists())
+        self.assertFalse(Match.objects.filter(status='completed').exists())
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class AdminPerformanceTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('perf-admin', 'admin@example.com', 'pw')
+        self.client.force_login(self.user)
+        self.tournament = Tournament.objects.create(name='後台賽', game='Valorant', end_date=timezone.now())
+        self.teams = Team.objects.bulk_create([Team(name=f'後台隊伍{i}') for i in range(4)])
+        self.tournament.participants.add(*self.teams)
+        self.players = Player.objects.bulk_create([Player(nickname=f'後台選手{i}', team=self.teams[i % 2]) for i in range(10)])
+        cache.clear()
+
+    def add_stats(self, matches):
+        for _ in range(matches):
+            match = Match.objects.create(tournament=self.tournament, round_number=1, team1=self.teams[0],
+                                         team2=self.teams[1], winner=self.teams[0], status='completed')
+            game = Game.objects.create(match=match, map_number=1, winner=self.teams[0])
+            PlayerGameStat.objects.bulk_create([
+                PlayerGameStat(game=game, player=player, team=player.team) for player in self.players
+            ])
+
+    def changelist_queries(self, model, query=''):
+        url = reverse(f'admin:tournaments_{model}_changelist') + query
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_stats(2)
+        models = ('playergamestat', 'game', 'match', 'player')
+        for model in models:
+            self.changelist_queries(model)  # 篩選器選項寫入快取
+        counts = {model: self.changelist_queries(model)[0] for model in models}
+        self.add_stats(3)
+        for model, count in counts.items():
+            self.assertEqual(self.changelist_queries(model)[0], count, model)
+
+    def test_filters_use_autocomplete_and_cached_choices(self):
+        self.add_stats(1)
+        first, response = self.changelist_queries('match')
+        self.assertContains(response, 'autocomplete-filter')
+        # 勝者篩選不列出隊伍名稱，只有已選取的隊伍
+        self.assertNotContains(response, '後台隊伍3')
+        second, _ = self.changelist_queries('match')
+        self.assertEqual(second, first - 1)
+        self.tournament.save()
+        self.assertEqual(self.changelist_queries('match')[0], first)
+
+        count, response = self.changelist_queries('playergamestat', f'?team__id__exact={self.teams[1].pk}')
+        self.assertEqual(response.context['cl'].result_count, 5)
+        self.assertContains(response, f'<option value="{self.teams[1].pk}" selected>')
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'tournaments', 'model_name': 'match', 'field_name': 'winner', 'term': '隊伍3',
+        })
+        self.assertEqual([item['text'] for item in response.json()['results']], ['後台隊伍3'])
+
+    def test_estimated_count_falls_back_to_exact_count(self):
+        self.add_stats(1)
+        self.assertIsNone(estimated_count(PlayerGameStat, 'default'))
+        self.assertEqual(EstimatedCountPaginator(PlayerGameStat.objects.order_by('pk'), 5).count, 10)
+        with mock.patch('tournaments.adminperf.estimated_count', return_value=600000):
+            self.assertEqual(EstimatedCountPaginator(PlayerGameStat.objects.order_by('pk'), 5).count, 600000)
+            # 有篩選條件時仍是精確計算
+            filtered = PlayerGameStat.objects.filter(team=self.teams[0]).order_by('pk')
+            self.assertEqual(EstimatedCountPaginator(filtered, 5).count, 5)
+
+
+class StatsTableTests(TestCase):
+
+    def setUp(self):
+        tournament = Tournament.objects.create(name='數據賽', game='Valorant', end_date=timezone.now())
+        self.a, self.b, self.c = Team.objects.bulk_create([Team(name=name) for name in ('數據甲', '數據乙', '數據丙')])
+        tournament.participants.add(self.a, self.b)
+        match = Match.objects.create(tournament=tournament, round_number=3, team1=self.a, team2=self.b)
+        game = Game.objects.create(match=match, map_number=1, map_name='Bind')
+        players = Player.objects.bulk_create(
+            [Player(nickname=f'數據選手{i}', team=(self.a, self.b, self.c)[i % 3]) for i in range(3)]
+        )
+        PlayerGameStat.objects.bulk_create([
+            PlayerGameStat(game=game, player=player, team=player.team, acs=200 + i) for i, player in enumerate(players)
+        ])
+        self.game = game
+
+    def test_opponent_is_resolved_in_sql(self):
+        rows = {row['player_name']: row for row in stats_rows(PlayerGameStat.objects.all())}
+        self.assertEqual(get_opponent_info(rows['數據選手0']), 'R3 vs 數據乙')
+        self.assertEqual(get_opponent_info(rows['數據選手1']), 'R3 vs 數據甲')
+        self.assertEqual(get_opponent_info(rows['數據選手2']), 'R3: 數據甲 vs 數據乙')
+        self.assertEqual(rows['數據選手0']['map_name'], 'Bind')
+
+    def test_keyset_pages_cover_every_row_once(self):
+        players = Player.objects.bulk_create([Player(nickname=f'分頁選手{i}', team=self.a) for i in range(117)])
+        PlayerGameStat.objects.bulk_create([
+            PlayerGameStat(game=self.game, player=player, team=self.a, kills=i % 7) for i, player in enumerate(players)
+        ])
+        expected = list(PlayerGameStat.objects.order_by('-kills', '-id').values_list('id', flat=True))
+        seen, pages, after = [], [], None
+        while True:
+            with self.assertNumQueries(1):
+                page = keyset_page(stats_rows(PlayerGameStat.objects.all()), '-kills', after=after)
+            pages.append(page)
+            seen += [row['id'] for row in page.rows]
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        previous = keyset_page(stats_rows(PlayerGameStat.objects.all()), '-kills', before=pages[2].previous_cursor)
+        self.assertEqual([row['id'] for row in previous.rows], [row['id'] for row in pages[1].rows])
+        self.assertTrue(previous.has_previous)
+
+        # 不允許的排序欄位改用預設；其他排序的 cursor 不套用
+        self.assertEqual(keyset_page(PlayerGameStat.objects.values('id', 'acs'), 'player__nickname').sort, '-acs')
+        page = keyset_page(stats_rows(PlayerGameStat.objects.all()), 'kills', after=pages[0].next_cursor)
+        self.assertFalse(page.has_previous)
+
+    def test_overall_stats_page(self):
+        response = self.client.get(reverse('overall_stats'), {'sort': 'kills', 'team': self.a.pk})
+        self.assertContains(response, 'R3 vs 數據乙')
+        self.assertNotContains(response, '數據選手1')
+        self.assertEqual(response.context['page'].sort, 'kills')
+
+
+class StatsExportTests(TestCase):
+
+    setUp = StatsTableTests.setUp
+
+    def test_csv_export_streams_filtered_rows(self):
+        response = self.client.get(reverse('export_stats'), {'team': self.a.pk})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0][:2], ['賽事', '輪次'])
+        self.assertEqual(rows[1], ['數據賽', '3', '1', 'Bind', '數據選手0', '數據甲', '數據乙', '0', '0', '0', '0', '200.0'])
+        self.assertEqual(len(rows), 2)
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        response = self.client.get(
+            reverse('export_tournament_stats', args=[self.game.match.tournament_id]), {'format': 'xlsx'}
+        )
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertIn('數據選手2', sheet)
+        self.assertIn('.xlsx', response['Content-Disposition'])
+
+
+class PlayerDetailTests(TestCase):
+
+    def setUp(self):
+        self.a, self.b, self.c = Team.objects.bulk_create([Team(name=name) for name in ('生涯甲', '生涯乙', '生涯丙')])
+        self.player = Player.objects.create(nickname='生涯選手', team=self.a)
+        self.spring = Tournament.objects.create(name='春季賽', game='Valorant', start_date=timezone.now() - timedelta(days=60), end_date=timezone.now())
+        self.summer = Tournament.objects.create(name='夏季賽', game='Valorant', start_date=timezone.now(), end_date=timezone.now())
+        now = timezone.now()
+        # 春季賽對乙 2 張地圖（1 勝），夏季賽以隊伍二的身分對丙 1 張地圖（勝）
+        spring = Match.objects.create(tournament=self.spring, round_number=1, team1=self.a, team2=self.b,
+                                      match_time=now - timedelta(days=50))
+        summer = Match.objects.create(tournament=self.summer, round_number=1, team1=self.c, team2=self.a,
+                                      match_time=now - timedelta(days=1))
+        games = [
+            Game.objects.create(match=spring, map_number=1, map_name='Bind', winner=self.a),
+            Game.objects.create(match=spring, map_number=2, map_name='Haven', winner=self.b),
+            Game.objects.create(match=summer, map_number=1, map_name='Bind', winner=self.a),
+        ]
+        PlayerGameStat.objects.bulk_create([
+            PlayerGameStat(game=game, player=self.player, team=self.a, kills=kills, deaths=10, assists=2, acs=acs)
+            for game, kills, acs in zip(games, (20, 10, 30), (250, 150, 320))
+        ])
+
+    def test_totals_and_splits_are_aggregated(self):
+        totals = playerstats.career_totals(self.player)
+        self.assertEqual((totals['games'], totals['wins'], totals['kills'], totals['deaths']), (3, 2, 60, 30))
+        self.assertEqual((totals['kd'], totals['win_rate'], totals['avg_acs']), (2.0, 67, 240.0))
+
+        maps = playerstats.splits(self.player, 'map')
+        self.assertEqual([(row['label'], row['games'], row['wins']) for row in maps], [('Bind', 2, 2), ('Haven', 1, 0)])
+        tournaments = playerstats.splits(self.player, 'tournament')
+        self.assertEqual([(row['label'], row['games']) for row in tournaments], [('夏季賽', 1), ('春季賽', 2)])
+        opponents = playerstats.splits(self.player, 'opponent')
+        self.assertEqual([(row['label'], row['games']) for row in opponents], [('生涯乙', 2), ('生涯丙', 1)])
+
+    def test_game_log_is_paginated(self):
+        with mock.patch.object(playerstats, 'GAME_LOG_PAGE_SIZE', 2):
+            response = self.client.get(reverse('player_detail', args=[self.player.pk]), {'page': 1})
+        page = response.context['page_obj']
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual([(row['tournament_name'], row['opponent']) for row in page], [('夏季賽', '生涯丙'), ('春季賽', '生涯乙')])
+        self.assertContains(response, '?page=2')
+
+    def test_query_count_does_not_grow_with_career(self):
+        url = reverse('player_detail', args=[self.player.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as short:
+            self.client.get(url)
+        match = Match.objects.create(tournament=self.summer, round_number=2, team1=self.a, team2=self.b)
+        games = Game.objects.bulk_create([Game(match=match, map_number=i, map_name=f'Map{i}') for i in range(40)])
+        PlayerGameStat.objects.bulk_create([PlayerGameStat(game=game, player=self.player, team=self.a) for game in games])
+        with CaptureQueriesContext(connection) as long:
+            self.client.get(url)
+        self.assertEqual(len(long), len(short))
+
+    def test_timeseries_is_compact_and_chronological(self):
+        response = self.client.get(reverse('player_timeseries', args=[self.player.pk]), {'limit': 2})
+        data = response.json()
+        self.assertEqual(data['fields'][:2], ['date', 'acs'])
+        self.assertEqual([row[1] for row in data['rows']], [150.0, 320.0])
+        self.assertEqual(self.client.get(reverse('player_timeseries', args=[999999])).status_code, 404)
+
+
+class MapStatsTests(TestCase):
+
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name='地圖賽', game='Valorant', end_date=timezone.now())
+        self.a, self.b, self.c = Team.objects.bulk_create([Team(name=name) for name in ('地圖甲', '地圖乙', '地圖丙')])
+        self.ab = Match.objects.create(tournament=self.tournament, round_number=1, team1=self.a, team2=self.b)
+        self.ac = Match.objects.create(tournament=self.tournament, round_number=1, team1=self.a, team2=self.c)
+
+    def snapshot(self):
+        return sorted(MapStat.objects.values_list('team__name', 'map_name', 'played', 'wins', 'rounds_won', 'rounds_lost'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        mapstats.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_game_saves_update_rollups_incrementally(self):
+        game = Game.objects.create(match=self.ab, map_number=1, map_name='Bind', team1_score=13, team2_score=8, winner=self.a)
+        Game.objects.create(match=self.ac, map_number=1, map_name='Bind', team1_score=5, team2_score=13, winner=self.c)
+        Game.objects.create(match=self.ab, map_number=2, map_name='', team1_score=13, team2_score=2, winner=self.a)
+        self.assertEqual(self.snapshot(), [
+            ('地圖丙', 'Bind', 1, 1, 13, 5), ('地圖乙', 'Bind', 1, 0, 8, 13), ('地圖甲', 'Bind', 2, 1, 18, 21),
+        ])
+        self.assertMatchesRebuild()
+
+        game.map_name, game.winner, game.team1_score, game.team2_score = 'Haven', self.b, 10, 13
+        game.save()
+        self.assertEqual(MapStat.objects.get(team=self.b, map_name='Haven').wins, 1)
+        self.assertFalse(MapStat.objects.filter(team=self.b, map_name='Bind').exists())
+        self.assertMatchesRebuild()
+
+        game.delete()
+        self.assertFalse(MapStat.objects.filter(map_name='Haven').exists())
+        self.assertMatchesRebuild()
+
+    def test_bulk_writes_in_batch_are_rebuilt_on_flush(self):
+        with batch_updates() as batch:
+            Game.objects.bulk_create([
+                Game(match=self.ab, map_number=1, map_name='Ascent', team1_score=13, team2_score=11, winner=self.a),
+                Game(match=self.ac, map_number=1, map_name='Ascent', team1_score=13, team2_score=3, winner=self.a),
+            ])
+            batch.matches_changed([self.tournament.pk])
+            Game.objects.create(match=self.ab, map_number=2, map_name='Lotus', team1_score=9, team2_score=13, winner=self.b)
+            self.assertFalse(MapStat.objects.exists())
+        self.assertEqual(MapStat.objects.get(team=self.a, map_name='Ascent').wins, 2)
+        self.assertEqual(MapStat.objects.get(team=self.b, map_name='Lotus').wins, 1)
+
+    def test_match_team_and_tournament_changes_move_rollups(self):
+        Game.objects.create(match=self.ab, map_number=1, map_name='Bind', team1_score=13, team2_score=8, winner=self.a)
+        self.ab.team2 = self.c
+        self.ab.save()
+        self.assertEqual(self.snapshot(), [('地圖丙', 'Bind', 1, 0, 8, 13), ('地圖甲', 'Bind', 1, 1, 13, 8)])
+        self.assertMatchesRebuild()
+
+        other = Tournament.objects.create(name='地圖賽二', game='Valorant', end_date=timezone.now())
+        self.ab.tournament = other
+        self.ab.save()
+        self.assertEqual(set(MapStat.objects.values_list('tournament_id', flat=True)), {other.pk})
+        self.assertMatchesRebuild()
+
+        with batch_updates():
+            self.ab.tournament, self.ab.team2 = self.tournament, self.b
+            self.ab.save()
+        self.assertEqual(set(MapStat.objects.values_list('tournament_id', 'team__name')),
+                         {(self.tournament.pk, '地圖甲'), (self.tournament.pk, '地圖乙')})
+        self.assertMatchesRebuild()
+
+    def test_rebuild_aggregates_in_one_query(self):
+        Game.objects.create(match=self.ab, map_number=1, map_name='Bind', team1_score=13, team2_score=8, winner=self.a)
+        with self.assertNumQueries(1):
+            rows = mapstats.aggregate_rows()
+        self.assertEqual(rows[(self.tournament.pk, self.b.pk, 'Bind')]['rounds_lost'], 13)
+
+    def test_overview_page_and_api_read_rollups(self):
+        for number, name in enumerate(('Bind', 'Bind', 'Haven'), 1):
+            Game.objects.create(match=self.ab, map_number=number, map_name=name, team1_score=13, team2_score=7, winner=self.a)
+        overview = mapstats.map_overview(tournament=self.tournament)
+        self.assertEqual([(row['map_name'], row['games'], row['pick_rate']) for row in overview],
+                         [('Bind', 2, 66.7), ('Haven', 1, 33.3)])
+        team = mapstats.map_overview(team=self.b)
+        self.assertEqual((team[0]['losses'], team[0]['win_rate'], team[0]['round_diff']), (2, 0, -12))
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('map_stats'), {'map': 'Bind'})
+        self.assertContains(response, '66.7%')
+        self.assertEqual([row['team_name'] for row in response.context['map_teams']], ['地圖甲', '地圖乙'])
+
+        data = self.client.get(reverse('api_map_stats'), {'team': self.a.pk, 'map': 'Haven'}).json()
+        self.assertEqual(data['maps'][0]['wins'], 2)
+        self.assertEqual(data['teams'][0]['team_name'], '地圖甲')
+        self.assertEqual(self.client.get(reverse('api_map_stats'), {'team': 'x'}).status_code, 400)
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        leaderboards.invalidate()
+        self.tournament = Tournament.objects.create(name='排行賽', game='Valorant', end_date=timezone.now())
+        self.a, self.b = Team.objects.bulk_create([Team(name='排行甲'), Team(name='排行乙')])
+        self.match = Match.objects.create(tournament=self.tournament, round_number=1, team1=self.a, team2=self.b)
+        self.players = Player.objects.bulk_create(
+            [Player(nickname=f'排行選手{i}', team=(self.a, self.b)[i % 2]) for i in range(4)]
+        )
+        game = Game.objects.create(match=self.match, map_number=1, map_name='Bind')
+        PlayerGameStat.objects.bulk_create([
+            PlayerGameStat(game=game, player=player, team=player.team, kills=10 + i, deaths=10, first_kills=i, acs=200 + 10 * i)
+            for i, player in enumerate(self.players)
+        ])
+
+    def test_sorted_set_matches_sorting(self):
+        rng = random.Random(7)
+        board, scores = leaderboards.SortedSet(), {}
+        for _ in range(2000):
+            member = str(rng.randrange(200))
+            if rng.random() < 0.75:
+                scores[member] = rng.randrange(50)
+                board.add(member, scores[member])
+            else:
+                scores.pop(member, None)
+                board.discard(member)
+        expected = sorted(scores.items(), key=lambda item: (item[1], item[0]), reverse=True)
+        self.assertEqual(board.revrange(0, len(scores)), expected)
+        self.assertEqual(board.revrange(5, 9), expected[5:10])
+        for position, (member, _) in enumerate(expected[:50]):
+            self.assertEqual(len(board) - 1 - board.rank(member), position)
+
+    def test_top_and_rank(self):
+        top = leaderboards.top('acs', self.tournament.pk, limit=2)
+        self.assertEqual([entry['player_id'] for entry in top], [self.players[3].pk, self.players[2].pk])
+        self.assertEqual(top[0]['score'], 230)
+        self.assertEqual(leaderboards.rank('kd', self.players[1].pk), {'rank': 3, 'score': 1.1, 'total': 4})
+        self.assertIsNone(leaderboards.rank('first_kills', 999999))
+        with self.assertRaises(ValueError):
+            leaderboards.top('deaths')
+
+    def test_report_updates_scores_incrementally(self):
+        leaderboards.top('acs', self.tournament.pk)
+        leaderboards.top('acs')
+        payload = {
+            'map_number': 2, 'map_name': 'Haven', 'final_score': '13-5', 'winning_team_name': '排行甲',
+            'player_stats': [{'nickname': '排行選手0', 'kills': 30, 'deaths': 5, 'first_kills': 9, 'acs': 400}],
+        }
+        with mock.patch.object(leaderboards, 'rebuild', side_effect=AssertionError('不應整個重建')):
+            response = self.client.post(reverse('api_match_stats', args=[self.match.pk]), payload, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+            for tournament_id in (self.tournament.pk, None):
+                self.assertEqual(leaderboards.rank('acs', self.players[0].pk, tournament_id)['score'], 300)
+                self.assertEqual(leaderboards.top('first_kills', tournament_id, limit=1)[0]['player_id'], self.players[0].pk)
+
+    def test_deletes_and_bulk_imports_invalidate(self):
+        leaderboards.top('acs')
+        self.players[3].delete()
+        self.assertNotIn(self.players[3].pk, [entry['player_id'] for entry in leaderboards.top('acs')])
+        with batch_updates() as batch:
+            batch.player_stats_changed()
+            self.assertTrue(leaderboards.get_backend().built(leaderboards.ALL))
+        self.assertFalse(leaderboards.get_backend().built(leaderboards.ALL))
+
+    def test_stat_deletes_update_scores_incrementally(self):
+        leaderboards.top('acs', self.tournament.pk)
+        leaderboards.top('acs')
+        with mock.patch.object(leaderboards, 'rebuild', side_effect=AssertionError('不應整個重建')):
+            PlayerGameStat.objects.get(player=self.players[3]).delete()
+            for tournament_id in (self.tournament.pk, None):
+                self.assertEqual(leaderboards.top('acs', tournament_id, limit=1)[0]['player_id'], self.players[2].pk)
+            with batch_updates():
+                PlayerGameStat.objects.filter(player=self.players[2]).delete()
+                self.assertEqual(leaderboards.top('acs', limit=1)[0]['player_id'], self.players[2].pk)
+            self.assertEqual([entry['player_id'] for entry in leaderboards.top('acs')],
+                             [self.players[1].pk, self.players[0].pk])
+
+    def test_page_and_api(self):
+        response = self.client.get(reverse('leaderboard'), {'tournament': self.tournament.pk})
+        self.assertContains(response, '排行選手3')
+        data = self.client.get(reverse('api_leaderboards'), {'metric': 'kd', 'limit': 1, 'player': self.players[0].pk}).json()
+        self.assertEqual(data['results'], [{'rank': 1, 'player_id': self.players[3].pk, 'score': 1.3, 'nickname': '排行選手3'}])
+        self.assertEqual(data['player']['rank'], 4)
+        self.assertEqual(self.client.get(reverse('api_leaderboards'), {'metric': 'x'}).status_code, 400)
+
+
+class SiteSearchTests(TestCase):
+
+    def setUp(self):
+        self.team = Team.objects.create(name='Phoenix Rising', school='臺北科技大學')
+        self.other = Team.objects.create(name='Night Owls', school='國立清華大學')
+        self.player = Player.objects.create(nickname='Shadowblade', team=self.team)
+        self.tournament = Tournament.objects.create(name='Valorant 校園盃', game='Valorant', end_date=timezone.now())
+
+    def keys(self, results):
+        return [(result.kind, result.pk) for result in results]
+
+    def test_fts_index_follows_writes(self):
+        self.assertEqual(search_backend(), 'fts5')
+        self.assertEqual(self.keys(search('phoenix')), [('team', self.team.pk)])
+        # 學校與選手所屬隊伍都可搜尋；隊伍改名後選手的說明也會更新
+        self.assertEqual(self.keys(search('清華')), [('team', self.other.pk)])
+        Team.objects.filter(pk=self.team.pk).update(name='Phoenix Reborn')
+        self.assertEqual(search('shadow', kinds=['player'])[0].detail, 'Phoenix Reborn')
+        Player.objects.bulk_create([Player(nickname='Shadowstep', team=self.other)])
+        self.assertEqual(len(search('shadow')), 2)
+        self.player.delete()
+        self.assertEqual([result.label for result in search('shadow')], ['Shadowstep'])
+
+    def test_ranking_prefix_and_typos(self):
+        Team.objects.create(name='The Phoenix Squad')
+        labels = [result.label for result in search('phoen')]
+        self.assertEqual(labels[0], 'Phoenix Rising')
+        self.assertIn('The Phoenix Squad', labels)
+        # 打錯一個字仍能找到
+        self.assertEqual(search('shadowblede')[0].pk, self.player.pk)
+        self.assertEqual(search('valorent')[0].kind, 'tournament')
+        # 少於三個字改用 LIKE；LIKE 的萬用字元不會被當成萬用字元
+        self.assertEqual(self.keys(search('校園')), [('tournament', self.tournament.pk)])
+        self.assertEqual(search('%'), [])
+
+    def test_basic_backend_matches_fts(self):
+        with mock.patch('tournaments.search.search_backend', return_value='basic'):
+            self.assertEqual(self.keys(search('phoenix')), [('team', self.team.pk)])
+            self.assertEqual(self.keys(search('大學', kinds=['team'])), [('team', self.other.pk), ('team', self.team.pk)])
+
+    def test_views(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_search'), {'q': 'shadow', 'limit': '5'})
+        self.assertEqual(response.json()['results'][0]['url'], reverse('player_detail', args=[self.player.pk]))
+        response = self.client.get(reverse('site_search'), {'q': 'phoenix', 'kind': 'team'})
+        self.assertContains(response, 'Phoenix Rising')
+        self.assertNotContains(response, 'Shadowblade')
+
+
+class HealthCheckTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_live_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('health_live'))
+        self.assertEqual(response.json(), {'status': 'OK'})
+
+    def test_ready_pings_database(self):
+        response = self.client.get(reverse('health_ready'))
+        self.assertEqual(response.json()['database'], 'Connected')
+        with mock.patch('tournaments.health.ping_database', side_effect=Exception('down')):
+            response = self.client.get(reverse('health_ready'))
+        self.assertEqual(response.status_code, 503)
+
+    def test_details_are_cached(self):
+        Tournament.objects.create(name='健康賽', game='Valorant', end_date=timezone.now())
+        response = self.client.get(reverse('health_details'))
+        data = response.json()
+        self.assertEqual(data['tournament_count'], 1)
+        self.assertFalse(data['counts_approximate'])
+        self.assertIn('有錦標賽但沒有隊伍資料', data['issues'])
+        self.assertEqual(data['queue'], {'pending_ratings': 0})
+        self.assertTrue(data['cache']['ok'])
+        # 快取期間不再查詢資料庫；舊的 /health/ 回傳相同內容
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('health_check')).json(), data)
+
+
+class WarmupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        leaderboards.get_backend().clear()
+        now = timezone.now()
+        self.tournament = Tournament.objects.create(
+            name='暖機賽', game='Valorant', status='ongoing', start_date=now, end_date=now + timedelta(days=7),
+        )
+        Tournament.objects.create(name='舊賽事', game='Valorant', status='finished', end_date=now)
+
+    def test_run_primes_pages_and_leaderboards(self):
+        report = warmup.run()
+        self.assertTrue(report['ok'])
+        self.assertEqual([phase['name'] for phase in report['phases']], list(warmup.MASTER_PHASES))
+        phases = {phase['name']: phase['detail'] for phase in report['phases']}
+        self.assertGreater(phases['templates']['compiled'], 0)
+        self.assertEqual(phases['templates']['failed'], 0)
+        self.assertEqual(phases['tournaments'], {'tournaments': [self.tournament.pk]})
+        self.assertTrue(leaderboards.get_backend().built(leaderboards.scope_of(self.tournament.pk)))
+        # 首頁與進行中的賽事頁面已在快取中
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('tournament_list')).status_code, 200)
+            self.client.get(reverse('tournament_detail', args=[self.tournament.pk]))
+
+    def test_failed_phase_does_not_stop_warmup(self):
+        with mock.patch.dict(warmup.PHASES, templates=mock.Mock(side_effect=Exception('broken'))):
+            report = warmup.run(measured={'django_setup': 12.345})
+        self.assertFalse(report['ok'])
+        self.assertEqual(report['phases'][0], {'name': 'django_setup', 'ms': 12.35, 'ok': True, 'detail': None})
+        failed = [phase['name'] for phase in report['phases'] if not phase['ok']]
+        self.assertEqual(failed, ['templates'])
+        self.assertIn('templates', warmup.format_report(report))
+        self.assertEqual(warmup.last_report()['pid'], report['pid'])
+
+    def test_worker_report_does_not_replace_last_report(self):
+        warmup.run(['connections'], source='master')
+        warmup.run(warmup.WORKER_PHASES, source='worker', save=False)
+        self.assertEqual(warmup.last_report()['source'], 'master')
+        self.assertEqual(self.client.get(reverse('health_details')).json()['warmup']['source'], 'master')
+
+    def test_command_reports_phases(self):
+        out = io.StringIO()
+        call_command('warm_up', '--phase', 'connections', '--phase', 'leaderboards', stdout=out)
+        self.assertIn('connections', out.getvalue())
+        self.assertIn('✅', out.getvalue())
+
+
+class FragmentCacheTests(TestCase):
+    databases = {'default', SYNC_TARGET}
+
+    def setUp(self):
+        cache.clear()
+        self.tournament = Tournament.objects.create(
+            name='片段賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.SWISS,
+        )
+        self.a, self.b = Team.objects.bulk_create([Team(name='片段甲'), Team(name='片段乙')])
+        self.tournament.participants.add(self.a, self.b)
+        self.match = Match.objects.create(tournament=self.tournament, round_number=1, team1=self.a, team2=self.b)
+
+    def test_versions_change_with_data(self):
+        version = fragments.get_version('tournament', self.tournament.pk)
+        self.assertEqual(fragments.get_version('tournament', self.tournament.pk), version)
+        self.match.team1_score = 2
+        self.match.save()
+        changed = fragments.get_version('tournament', self.tournament.pk)
+        self.assertNotEqual(changed, version)
+        with batch_updates() as batch:
+            Match.objects.filter(pk=self.match.pk).update(team2_score=1)
+            batch.matches_changed([self.tournament.pk])
+            self.assertEqual(fragments.get_version('tournament', self.tournament.pk), changed)
+        self.assertNotEqual(fragments.get_version('tournament', self.tournament.pk), changed)
+        # 隊伍改名時，參加的賽事與隊伍卡片都會失效
+        versions = fragments.get_versions('team', [self.a.pk, self.b.pk])
+        tournament_version = fragments.get_version('tournament', self.tournament.pk)
+        self.a.name = '片段丙'
+        self.a.save()
+        self.assertNotEqual(fragments.get_version('team', self.a.pk), versions[self.a.pk])
+        self.assertEqual(fragments.get_version('team', self.b.pk), versions[self.b.pk])
+        self.assertNotEqual(fragments.get_version('tournament', self.tournament.pk), tournament_version)
+
+    def test_other_databases_do_not_bump_versions(self):
+        versions = fragments.get_versions('team', [self.a.pk, fragments.ALL])
+        with self.assertNumQueries(0):
+            Team.objects.using(SYNC_TARGET).create(id=self.a.pk, name='同步隊伍')
+        self.assertEqual(fragments.get_versions('team', [self.a.pk, fragments.ALL]), versions)
+
+    def test_cached_page_reflects_new_scores(self):
+        url = reverse('tournament_detail', args=[self.tournament.pk])
+        self.assertContains(self.client.get(url), '0 - 0')
+        self.client.get(url)
+        self.match.team1_score, self.match.team2_score = 2, 1
+        self.match.winner, self.match.status = self.a, 'completed'
+        self.match.save()
+        self.assertContains(self.client.get(url), '2 - 1')
+
+    def test_team_cards_are_reused(self):
+        url = reverse('team_list')
+        # 登入後不使用整頁快取（compression），只有片段快取
+        self.client.force_login(get_user_model().objects.create_user('fan'))
+        self.client.get(url)
+        # 片段命中時只查詢 session、使用者與隊伍列表本身
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertContains(response, '片段甲')
+        Team.objects.filter(pk=self.a.pk).update(name='片段丁')
+        self.assertContains(self.client.get(url), '片段甲')
+        fragments.bump('team', [self.a.pk])
+        self.assertContains(self.client.get(url), '片段丁')
+
+
+class CompressedResponseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tournament = Tournament.objects.create(
+            name='壓縮賽', game='Valorant', end_date=timezone.now(), format=Tournament.Format.SWISS,
+        )
+        self.url = reverse('tournament_detail', args=[self.tournament.pk])
+
+    def test_negotiation(self):
+        body = CompressedBody(b'x' * 1000, 'text/plain')
+        self.assertEqual(body.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(body.negotiate('gzip;q=0, identity'), 'identity')
+        self.assertEqual(body.negotiate('*'), 'br' if 'br' in body.variants else 'gzip')
+        self.assertEqual(body.negotiate(''), 'identity')
+        body.variants['br'] = b'br'
+        self.assertEqual(body.negotiate('gzip, br'), 'br')
+        self.assertEqual(body.negotiate('gzip;q=1, br;q=0.5'), 'gzip')
+        # 太小的內容不壓縮
+        self.assertEqual(set(CompressedBody(b'tiny', 'text/plain').variants), {'identity'})
+
+    def test_page_is_served_from_stored_variants(self):
+        plain = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', plain)
+        with self.assertNumQueries(0), mock.patch('tournaments.compression.gzip.compress') as compress:
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        compress.assert_not_called()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        # ETag 重新驗證
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_data_version_and_logged_in_users_skip_cache(self):
+        self.client.get(self.url)
+        self.tournament.name = '壓縮賽（改名）'
+        self.tournament.save()
+        self.assertContains(self.client.get(self.url), '壓縮賽（改名）')
+        self.client.force_login(get_user_model().objects.create_user('staff', is_staff=True))
+        self.assertContains(self.client.get(self.url), '批次輸入比分')
+
+    def test_api_list_is_cached_after_authentication(self):
+        self.assertIn(self.client.get(reverse('api_tournament_list')).status_code, (401, 403))
+        self.client.force_login(get_user_model().objects.create_user('reader'))
+        first = self.client.get(reverse('api_tournament_list'), HTTP_ACCEPT='application/json',
+                                HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(json.loads(gzip.decompress(first.content))[0]['name'], '壓縮賽')
+        with self.assertNumQueries(2):  # session 與使用者
+            second = self.client.get(reverse('api_tournament_list'), HTTP_ACCEPT='application/json',
+                                     HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(second.content, first.content)
+        # 新增賽事、隊伍改名都會遞增整體版本號
+        Tournament.objects.create(name='新賽事', game='Valorant', end_date=timezone.now())
+        response = self.client.get(reverse('api_tournament_list'), HTTP_ACCEPT='application/json')
+        self.assertEqual({row['name'] for row in response.json()}, {'壓縮賽', '新賽事'})
+        team = Team.objects.create(name='壓縮隊')
+        self.assertEqual(self.client.get(reverse('api_teams'), HTTP_ACCEPT='application/json').json()[0]['name'], '壓縮隊')
+        team.name = '壓縮隊（改名）'
+        team.save()
+        self.assertEqual(self.client.get(reverse('api_teams'), HTTP_ACCEPT='application/json').json()[0]['name'],
+                         '壓縮隊（改名）')
 
-# Create your tests here.
+    def test_fallback_page_is_not_cached(self):
+        with mock.patch('tournaments.views.get_object_or_404', side_effect=DatabaseError('連線中斷')):
+            self.assertContains(self.client.get(self.url), '錦標賽資料載入中')
+        self.assertContains(self.client.get(self.url), '壓縮賽')
@@ -0,0 +1,132 @@
+# tournaments/tiebreakers.py
+"""
+同分比較引擎
+
+update_tiebreakers() 一次載入賽事的積分榜與已完成比賽（含小局回合加總，與對戰矩陣共用
+headtohead.completed_match_rows / match_contribution），在記憶體中一次走訪所有比賽算出每隊的地圖差、
+回合差與對手，再依賽事設定的 Tournament.tiebreakers 順序排序，把各項數值與最終名次寫回 Standing（bulk_update）。
+
+head_to_head 條件讀取對戰矩陣的 mini_table()：分組循環使用該分組快取中的矩陣（get_group_matrix，
+並以剛載入的比賽校正），矩陣尚未快取或其他賽制時以同一份比賽資料建立臨時矩陣，都不需要額外的查詢。
+
+分組循環在各分組內排名，其他賽制在整個賽事內排名；畫面與瑞士輪配對直接以
+STANDING_ORDER 由資料庫排序，不需要再於 Python 中重算。
+"""
+
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+
+from .headtohead import HeadToHeadMatrix, completed_match_rows, get_group_matrix, match_contribution
+from .models import Group, Match, Standing, Tournament
+
+# 依持久化的名次排序；尚未計算名次的資料（rank 為 NULL）排在最後，再退回積分與勝場
+STANDING_ORDER = (F('rank').asc(nulls_last=True), '-points', '-wins', 'team__name')
+
+
+class _TeamRecord:
+    __slots__ = ('map_diff', 'round_diff', 'results')
+
+    def __init__(self):
+        self.map_diff = 0
+        self.round_diff = 0
+        # [(對手 id, 1 勝 / 0 和 / -1 敗), ...]
+        self.results = []
+
+
+def collect_records(tournament_id, using=DEFAULT_DB_ALIAS):
+    """一次查詢載入已完成比賽，回傳 ({team_id: _TeamRecord}, {比賽 id: match_contribution()})。"""
+    records = defaultdict(_TeamRecord)
+    contributions = {}
+    for row in completed_match_rows(Match.objects.using(using).filter(tournament_id=tournament_id)):
+        contribution = contributions[row['id']] = match_contribution(row)
+        team1, team2, outcome, map_diff, round_diff = contribution
+        records[team1].map_diff += map_diff
+        records[team1].round_diff += round_diff
+        records[team1].results.append((team2, outcome))
+        records[team2].map_diff -= map_diff
+        records[team2].round_diff -= round_diff
+        records[team2].results.append((team1, -outcome))
+    return records, contributions
+
+
+def partition_matrix(tournament_id, group_id, team_ids, contributions, using=DEFAULT_DB_ALIAS):
+    """
+    一個排名分區的對戰矩陣（不另外查詢）：分組使用 get_group_matrix()（快取命中時以 contributions 校正），
+    未快取或沒有分組時以分區的隊伍與 contributions 建立臨時矩陣。
+    """
+    if group_id is not None:
+        group = Group(pk=group_id, tournament_id=tournament_id)
+        return get_group_matrix(group, using, contributions, team_ids)
+    matrix = HeadToHeadMatrix(None, sorted(team_ids))
+    matrix.sync(contributions)
+    return matrix
+
+
+def rank_standings(standings, matrix, tiebreakers):
+    """
+    依 (積分, 勝場) 排序，同分時依 tiebreakers 順序比較，最後依隊名；回傳排序後的 list。
+    standings 的 map_diff、round_diff、buchholz、sonneborn_berger 必須已經填好；
+    head_to_head 為同分隊伍之間的對戰積分，取自 matrix.mini_table()（不使用 head_to_head 時 matrix 可為 None）。
+    """
+    tied = defaultdict(list)
+    for standing in standings:
+        tied[(standing.points, standing.wins)].append(standing.team_id)
+    mini_tables = {
+        key: matrix.mini_table(team_ids) for key, team_ids in tied.items() if len(team_ids) > 1
+    } if matrix is not None else {}
+
+    def sort_key(standing):
+        key = [-standing.points, -standing.wins]
+        mini_table = mini_tables.get((standing.points, standing.wins), {})
+        for name in tiebreakers:
+            if name == 'head_to_head':
+                value = mini_table[standing.team_id].points if mini_table else 0
+            else:
+                value = getattr(standing, name)
+            key.append(-value)
+        key.append(standing.team.name)
+        return key
+
+    return sorted(standings, key=sort_key)
+
+
+def update_tiebreakers(tournament_id, using=DEFAULT_DB_ALIAS):
+    """重新計算一個賽事所有積分榜的同分比較數值與名次，並寫回資料庫。"""
+    tournament = Tournament.objects.using(using).only('id', 'format', 'tiebreakers').get(pk=tournament_id)
+    standings = list(Standing.objects.using(using).filter(tournament_id=tournament_id).select_related('team'))
+    if not standings:
+        return []
+    records, contributions = collect_records(tournament_id, using)
+    points = {standing.team_id: standing.points for standing in standings}
+
+    for standing in standings:
+        record = records.get(standing.team_id) or _TeamRecord()
+        standing.map_diff = record.map_diff
+        standing.round_diff = record.round_diff
+        standing.buchholz = sum(points.get(opponent, 0) for opponent, _ in record.results)
+        standing.sonneborn_berger = sum(
+            points.get(opponent, 0) * (1 if outcome > 0 else 0.5)
+            for opponent, outcome in record.results
+            if outcome >= 0
+        )
+
+    partitions = defaultdict(list)
+    for standing in standings:
+        key = standing.group_id if tournament.format == Tournament.Format.ROUND_ROBIN else None
+        partitions[key].append(standing)
+
+    tiebreakers = tournament.get_tiebreakers()
+    for group_id, partition in partitions.items():
+        matrix = None
+        if 'head_to_head' in tiebreakers:
+            team_ids = [standing.team_id for standing in partition]
+            matrix = partition_matrix(tournament_id, group_id, team_ids, contributions, using)
+        for rank, standing in enumerate(rank_standings(partition, matrix, tiebreakers), start=1):
+            standing.rank = rank
+
+    Standing.objects.using(using).bulk_update(
+        standings, ['map_diff', 'round_diff', 'buchholz', 'sonneborn_berger', 'rank'], batch_size=500
+    )
+    return standings
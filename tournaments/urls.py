@@ -11,16 +11,25 @@ urlpatterns = [
     path('teams/', views.team_list, name='team_list'),
     path('teams/<int:pk>/', views.team_detail, name='team_detail'), # 網址用複數 teams 較符合慣例
     path('players/<int:pk>/', views.player_detail, name='player_detail'), # 網址用複數 players 較符合慣例
+    path('players/<int:pk>/timeseries/', views.player_timeseries, name='player_timeseries'),
     path('api/tournaments/', TournamentListAPI.as_view(), name='api_tournaments'),
     path('api/teams/', TeamListAPI.as_view(), name='api_teams'),
     path('api/matches/<int:pk>/', MatchDetailAPI.as_view(), name='api_match_detail'),
     path('api/matches/<int:pk>/report/', GameReportAPIView.as_view(), name='api_game_report'),
+    path('api/search/', views.api_search, name='api_search'),
     path('api/generate-sample-stats/', views.api_generate_sample_stats, name='api_generate_sample_stats'),
     path('api/diagnose-tournament-9/', views.api_diagnose_tournament_9, name='api_diagnose_tournament_9'),
 
     # 數據統計頁面
     path('tournaments/<int:pk>/stats/', views.tournament_stats, name='tournament_stats'),
     path('stats/', views.overall_stats, name='overall_stats'),
+    path('maps/', views.map_stats, name='map_stats'),
+    path('leaderboards/', views.leaderboard, name='leaderboard'),
+    path('stats/export/', views.export_stats, name='export_stats'),
+    path('tournaments/<int:pk>/stats/export/', views.export_tournament_stats, name='export_tournament_stats'),
+
+    # 全站搜尋
+    path('search/', views.site_search, name='site_search'),
 
     # 使用者系統
     path('register/', views.register, name='register'),
@@ -37,6 +46,9 @@ urlpatterns = [
     # 自動分組功能
     path('tournaments/<int:pk>/auto-grouping/', views.auto_random_grouping, name='auto_random_grouping'),
     
+    # 比賽日批次輸入比分
+    path('tournaments/<int:pk>/scores/', views.score_entry, name='score_entry'),
+    
     path('tournaments/create/step2/', views.tournament_create_step2, name='tournament_create_step2'),
     path('tournaments/create/step3/', views.tournament_create_step3, name='tournament_create_step3'),
 ]
\ No newline at end of file
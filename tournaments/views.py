@@ -3,8 +3,7 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-from django.db.models import Q, Prefetch
-from django.views.decorators.cache import cache_page
+from django.db.models import Case, F, Prefetch, Q, When
 from django.core.cache import cache
 from django.core.paginator import Paginator
 from collections import defaultdict
@@ -12,18 +11,35 @@ import random
 import math
 from django.contrib import messages
 from django.http import JsonResponse
+from django.urls import reverse
 from .models import Tournament, Match, Team, Player, PlayerGameStat, Group, Standing, Game
 from .forms import TournamentCreationStep1Form, TeamCreationStep2Form
-from .tables import StatsTable
+from .tables import DEFAULT_SORT, StatsTable, filter_stats, keyset_page, stats_rows
+from .statsexport import EXPORT_FORMATS, export_response
 from .logic import generate_round_robin_matches, generate_swiss_round_matches, generate_single_elimination_matches, generate_double_elimination_matches
+from .headtohead import get_group_matrix
+from .tiebreakers import STANDING_ORDER
+from .draw import GroupDraw, group_name
+from .roster import Roster, import_roster
+from .scoreentry import DEFAULT_MAPS, MAX_MAPS, ScoreSheet
+from . import fragments, leaderboards, mapstats, playerstats
+from .compression import compressed_cache_page, uncacheable
+from .search import (
+    DEFAULT_LIMIT as SEARCH_LIMIT, KIND_LABELS as SEARCH_KIND_LABELS, KINDS as SEARCH_KINDS, normalize_query, search,
+)
 
 # ===== 權限檢查函數 =====
 def is_superuser(user):
     """檢查用戶是否為超級管理員"""
     return user.is_superuser
 
+def is_staff(user):
+    """檢查用戶是否為工作人員（可進入管理後台）"""
+    return user.is_staff
+
 # tournaments/views.py
 
+@compressed_cache_page(120)
 def tournament_list(request):
     try:
         # ===== 優化的快取策略 =====
@@ -43,7 +59,7 @@ def tournament_list(request):
         
         # 1. 極度優化的賽事查詢，只載入必要欄位
         tournaments = Tournament.objects.select_related().only(
-            'id', 'name', 'start_date', 'end_date', 'status', 'format'
+            'id', 'name', 'game', 'start_date', 'end_date', 'status', 'format'
         ).order_by('-start_date')
         
         # 2. 極度優化的即將到來比賽查詢
@@ -78,8 +94,11 @@ def tournament_list(request):
             'upcoming_matches': Match.objects.none(),
             'error_message': f'資料載入中，請稍後再試。'
         }
-        return render(request, 'tournaments/tournament_list.html', context)
+        # 暫時性的錯誤頁面不存入頁面快取
+        return uncacheable(render(request, 'tournaments/tournament_list.html', context))
 
+# 未登入使用者的整頁回應（含 gzip / brotli 版本）依賽事資料版本號快取
+@compressed_cache_page(1800, version=lambda request, pk: fragments.get_version('tournament', pk))
 def tournament_detail(request, pk):
     try:
         # ===== 優化的快取策略 =====
@@ -87,7 +106,9 @@ def tournament_detail(request, pk):
         page_number = request.GET.get('page', '1')
         from django.conf import settings
         cache_version = getattr(settings, 'CACHE_VERSION', 1)
-        cache_key = f'tournament_detail_v{cache_version}_{pk}_page_{page_number}'
+        # 版本號在比賽、積分榜、分組變動時遞增（fragments），資料變動後不會讀到舊的內容
+        data_version = fragments.get_version('tournament', pk)
+        cache_key = f'tournament_detail_v{cache_version}_{pk}_d{data_version}_page_{page_number}'
         
         # 檢查快取（添加錯誤處理）
         try:
@@ -103,12 +124,14 @@ def tournament_detail(request, pk):
         # 1. 極度優化的賽事基本信息載入
         tournament = get_object_or_404(
             Tournament.objects.select_related().only(
-                'id', 'name', 'format', 'status', 'start_date', 'end_date'
+                'id', 'name', 'game', 'rules', 'format', 'status', 'start_date', 'end_date'
             ), 
             pk=pk
         )
         
         context = {'tournament': tournament}
+        # 任何區塊載入失敗時只顯示這次的部分內容，不寫入快取
+        degraded = False
         
         # 2. 根據賽制分別極度優化數據載入
         if tournament.format == 'round_robin':
@@ -130,20 +153,26 @@ def tournament_detail(request, pk):
                 # --- [核心修正點] ---
                 group_standings = []
                 group_matches = []
+                cross_table = []
                 if current_group:
                     try:
-                        # [新增] 查詢當前分組的積分榜 (Standing) 並進行排序
+                        # [新增] 查詢當前分組的積分榜 (Standing) 並依名次排序
                         group_standings = Standing.objects.filter(
                             group=current_group
-                        ).select_related('team').order_by('-points', '-wins', 'team__name')
+                        ).select_related('team').order_by(*STANDING_ORDER)
 
                         # [測試] 檢查 Group-Team 直接關聯是否已修復
                         group_teams_direct = list(current_group.teams.all())
                         
-                        # [保留] 查詢當前分組的積分榜 (Standing) 並進行排序
-                        group_standings = Standing.objects.filter(
+                        # [保留] 查詢當前分組的積分榜 (Standing) 並依名次排序
+                        # （名次由 tiebreakers.update_tiebreakers 依賽事的同分比較設定計算後寫入）
+                        group_standings = list(Standing.objects.filter(
                             group=current_group
-                        ).select_related('team').order_by('-points', '-wins', 'team__name')
+                        ).select_related('team').order_by(*STANDING_ORDER))
+                        
+                        # 對戰表從快取的對戰矩陣讀取
+                        h2h_matrix = get_group_matrix(current_group)
+                        cross_table = h2h_matrix.cross_table([standing.team for standing in group_standings])
                         
                         # [比較] 從Standing獲取的隊伍列表（舊方法）
                         group_teams_from_standing = [standing.team for standing in group_standings]
@@ -182,34 +211,43 @@ def tournament_detail(request, pk):
                         group_matches = list(group_matches[:50])
                     except Exception as e:
                         # 如果查詢失敗，使用空列表
+                        degraded = True
                         group_standings = []
                         group_matches = []
+                        cross_table = []
                 # --- [修正結束] ---
 
                 context['groups'] = page_groups
                 context['current_group'] = current_group
                 context['group_matches'] = group_matches
                 context['group_standings'] = group_standings
+                context['cross_table'] = cross_table
             
             except Exception as e:
                 # 如果分組查詢失敗，顯示空內容
+                degraded = True
                 context['groups'] = []
                 context['current_group'] = None
                 context['group_matches'] = []
                 context['group_standings'] = []
+                context['cross_table'] = []
                 
         elif tournament.format == 'swiss':
             try:
                 # 瑞士輪：極度優化積分榜和分頁比賽
+                # 透過 related manager 查詢時，Django 會讀取 tournament_id 來回填關聯，
+                # 因此 only() 必須包含外鍵，否則每一列都會多一次延遲載入查詢
                 context['standings'] = tournament.standings.select_related('team').only(
-                    'team__name', 'points', 'wins', 'losses', 'draws'
-                ).order_by('-points', '-wins')[:20]  # 限制顯示前20名
+                    'tournament', 'team__name', 'points', 'wins', 'losses', 'draws',
+                    'rank', 'buchholz', 'map_diff'
+                ).order_by(*STANDING_ORDER)[:20]  # 限制顯示前20名
                 
                 # 極度優化的分頁比賽（每頁15場以加快載入）
                 from django.core.paginator import Paginator
                 
                 matches = tournament.matches.select_related('team1', 'team2', 'winner').only(
-                    'id', 'round_number', 'team1__name', 'team2__name', 'winner__name',
+                    'id', 'tournament', 'round_number', 'is_lower_bracket',
+                    'team1__name', 'team2__name', 'winner__name',
                     'team1_score', 'team2_score', 'status', 'match_time'
                 ).order_by('round_number', 'id')
                 
@@ -225,6 +263,7 @@ def tournament_detail(request, pk):
                 context['rounds'] = dict(rounds)
                 context['page_matches'] = page_matches
             except Exception as e:
+                degraded = True
                 context['standings'] = []
                 context['rounds'] = {}
                 context['page_matches'] = []
@@ -235,7 +274,8 @@ def tournament_detail(request, pk):
                 from django.core.paginator import Paginator
                 
                 matches = tournament.matches.select_related('team1', 'team2', 'winner').only(
-                    'id', 'round_number', 'team1__name', 'team2__name', 'winner__name',
+                    'id', 'tournament', 'round_number', 'is_lower_bracket',
+                    'team1__name', 'team2__name', 'winner__name',
                     'team1_score', 'team2_score', 'status', 'match_time'
                 ).order_by('round_number', 'id')
                 
@@ -251,6 +291,7 @@ def tournament_detail(request, pk):
                 context['rounds'] = dict(rounds)
                 context['page_matches'] = page_matches
             except Exception as e:
+                degraded = True
                 context['rounds'] = {}
                 context['page_matches'] = []
         
@@ -265,6 +306,9 @@ def tournament_detail(request, pk):
             # 未開始的賽事快取時間較短（5分鐘），可能有變動
             cache_timeout = 300
         
+        if degraded:
+            return uncacheable(render(request, 'tournaments/tournament_detail.html', context))
+
         # 設定快取，包含錯誤處理
         try:
             cache.set(cache_key, context, cache_timeout)
@@ -280,8 +324,9 @@ def tournament_detail(request, pk):
             'tournament': None,
             'error_message': '錦標賽資料載入中，請稍後再試。'
         }
-        return render(request, 'tournaments/tournament_detail.html', context)
+        return uncacheable(render(request, 'tournaments/tournament_detail.html', context))
 
+@compressed_cache_page(120)
 def team_list(request):
     """臨時修復版本的team_list視圖，移除可能有問題的查詢優化"""
     try:
@@ -312,59 +357,159 @@ def team_detail(request, pk):
     match_history = Match.objects.filter(
         Q(team1=team) | Q(team2=team),
         status='completed' # 只顯示已完成的比賽
-    ).select_related('team1', 'team2', 'tournament').order_by('-match_time')
+    ).select_related('team1', 'team2', 'winner', 'tournament').annotate(
+        # 這場比賽對本隊 Elo 積分的影響（rating_delta 以隊伍一的角度記錄）
+        rating_change=Case(When(team1=team, then=F('rating_delta')), default=-F('rating_delta')),
+    ).order_by('-match_time')
     # --------------------------------
 
     context = {
         'team': team,
         'players': players,
         'match_history': match_history, # 將歷史戰績傳給模板
+        'map_records': mapstats.map_overview(team=team), # 各地圖勝率（讀取彙總表）
     }
 
     return render(request, 'tournaments/team_detail.html', context)
 
 def overall_stats(request):
-    # --- [核心修正點] ---
-    # 查詢路徑從 'match__tournament' 改為 'game__match__tournament'
-    # 為了讓 tables.py 中的 LinkColumn 能運作，我們也需要預先載入 'game__match'
-    stats_queryset = PlayerGameStat.objects.select_related(
-        'player', 
-        'team', 
-        'game__match', 
-        'game__match__tournament'
-    ).all()
-    # --------------------
-
-    # --- 篩選邏輯 (維持不變) ---
+    # 表格欄位（含對手、輪次、地圖）全部由 stats_rows() 以 SQL 註解取得，
+    # 並以 keyset 分頁，每頁只讀取固定筆數
+    stats_queryset = PlayerGameStat.objects.all()
+
+    # --- 篩選邏輯（與數據匯出共用） ---
     selected_team_id = request.GET.get('team')
     player_name_query = request.GET.get('player_name')
+    stats_queryset = filter_stats(stats_queryset, request.GET)
 
-    if selected_team_id:
-        # 篩選條件也要跟著更新
-        stats_queryset = stats_queryset.filter(team__id=selected_team_id)
+    # 只能依有索引的數據欄位排序，預設按 ACS 降序排列
+    page = keyset_page(
+        stats_rows(stats_queryset),
+        sort=request.GET.get('sort', DEFAULT_SORT),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    table = StatsTable(page.rows, order_by=page.sort)
 
-    if player_name_query:
-        stats_queryset = stats_queryset.filter(player__nickname__icontains=player_name_query)
+    # 翻頁連結保留篩選與排序條件
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query['sort'] = page.sort
+    next_query = previous_query = None
+    if page.next_cursor:
+        next_query = query.copy()
+        next_query['after'] = page.next_cursor
+        next_query = next_query.urlencode()
+    if page.previous_cursor:
+        previous_query = query.copy()
+        previous_query['before'] = page.previous_cursor
+        previous_query = previous_query.urlencode()
 
-    # 建立 Table 的實例
-    table = StatsTable(stats_queryset) # <-- 使用修正後的查詢結果
-
-    # 告訴 Table 要根據 URL 中的 "sort" 參數來排序
-    table.order_by = request.GET.get("sort", "-acs") # 預設按 ACS 降序排列
-    
     # 準備篩選器下拉選單要用的所有隊伍資料
-    all_teams = Team.objects.all()
+    all_teams = Team.objects.only('id', 'name').order_by('name')
 
     context = {
         'table': table,
+        'page': page,
+        'next_query': next_query,
+        'previous_query': previous_query,
         'all_teams': all_teams,
         # 讓前端能保留篩選狀態
-        'selected_team_id': int(selected_team_id) if selected_team_id else None,
+        'selected_team_id': selected_team_id,
         'player_name_query': player_name_query,
+        'export_query': query.urlencode(),
     }
 
     return render(request, 'tournaments/overall_stats.html', context)
 
+def export_stats(request):
+    """匯出數據統計（篩選條件與 overall_stats 相同，另可用 tournament 篩選賽事）。"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    return export_response(filter_stats(PlayerGameStat.objects.all(), request.GET), fmt, 'player-stats')
+
+
+def export_tournament_stats(request, pk):
+    tournament = get_object_or_404(Tournament.objects.only('id'), pk=pk)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    queryset = filter_stats(PlayerGameStat.objects.filter(game__match__tournament=tournament), request.GET)
+    return export_response(queryset, fmt, f'tournament-{tournament.pk}-stats')
+
+def site_search(request):
+    """全站搜尋頁：依種類分組顯示結果。"""
+    query = normalize_query(request.GET.get('q'))
+    kind = request.GET.get('kind')
+    kinds = [kind] if kind in SEARCH_KINDS else SEARCH_KINDS
+    results = search(query, kinds=kinds, limit=30) if query else []
+    grouped = {name: [] for name in kinds}
+    for result in results:
+        grouped[result.kind].append(result)
+    context = {
+        'query': query,
+        'kind': kind if kind in SEARCH_KINDS else '',
+        'kind_labels': SEARCH_KIND_LABELS,
+        'results': results,
+        'groups': [(SEARCH_KIND_LABELS[name], items) for name, items in grouped.items() if items],
+    }
+    return render(request, 'tournaments/search.html', context)
+
+
+def api_search(request):
+    """typeahead 用的搜尋端點：GET ?q=...&kind=team|player|tournament&limit=..."""
+    kind = request.GET.get('kind')
+    limit = request.GET.get('limit', '')
+    results = search(
+        request.GET.get('q'),
+        kinds=[kind] if kind in SEARCH_KINDS else SEARCH_KINDS,
+        limit=int(limit) if limit.isdigit() else SEARCH_LIMIT,
+    )
+    response = JsonResponse({'results': [result.as_dict() for result in results]})
+    # 同一個關鍵字短時間內重複輸入時由瀏覽器快取
+    response['Cache-Control'] = 'public, max-age=30'
+    return response
+
+def map_stats(request):
+    """地圖數據：各地圖的場數與選圖率（?tournament= 篩選賽事），?map= 顯示該地圖各隊伍的戰績"""
+    tournament_id = request.GET.get('tournament', '')
+    tournament = Tournament.objects.filter(pk=tournament_id).first() if tournament_id.isdigit() else None
+    map_name = request.GET.get('map') or None
+
+    context = {
+        'maps': mapstats.map_overview(tournament=tournament),
+        'map_name': map_name,
+        'map_teams': mapstats.map_teams(map_name, tournament=tournament) if map_name else [],
+        'tournament': tournament,
+        'tournaments': Tournament.objects.order_by('-start_date').values('pk', 'name'),
+    }
+    return render(request, 'tournaments/map_stats.html', context)
+
+def leaderboard(request):
+    """選手排行榜：各指標前 DEFAULT_LIMIT 名（?tournament= 篩選賽事），由 leaderboards 的有序集合讀取"""
+    tournament_id = request.GET.get('tournament', '')
+    tournament = Tournament.objects.filter(pk=tournament_id).first() if tournament_id.isdigit() else None
+
+    boards = [
+        (label, leaderboards.top(metric, tournament.pk if tournament else None))
+        for metric, label in leaderboards.METRICS.items()
+    ]
+    players = Player.objects.select_related('team').in_bulk(
+        {entry['player_id'] for _, entries in boards for entry in entries}
+    )
+    for _, entries in boards:
+        for entry in entries:
+            entry['player'] = players.get(entry['player_id'])
+
+    context = {
+        'boards': boards,
+        'tournament': tournament,
+        'tournaments': Tournament.objects.order_by('-start_date').values('pk', 'name'),
+    }
+    return render(request, 'tournaments/leaderboard.html', context)
+
 # This is the function that was missing
 def tournament_stats(request, pk):
     tournament = get_object_or_404(Tournament, pk=pk)
@@ -453,18 +598,23 @@ def tournament_create_step2(request):
         return redirect('tournament_create_step1')
 
     if request.method == 'POST':
-        form = TeamCreationStep2Form(request.POST)
+        form = TeamCreationStep2Form(request.POST, request.FILES)
         if form.is_valid():
-            teams_text = form.cleaned_data['teams_text']
+            roster = form.cleaned_data['roster']
             wizard_data['step2'] = {
-                'teams': [name.strip() for name in teams_text.splitlines() if name.strip()]
+                'teams': roster.team_names,
+                'roster': roster.to_session(),
             }
             request.session['wizard_data'] = wizard_data
             return redirect('tournament_create_step3')
     else:
         # 檢查 session 中是否有舊資料
         step2_data = wizard_data.get('step2', {})
-        initial_data = {'teams_text': "\n".join(step2_data.get('teams', []))}
+        if 'roster' in step2_data:
+            teams_text = Roster.from_session(step2_data['roster']).to_text()
+        else:
+            teams_text = "\n".join(step2_data.get('teams', []))
+        initial_data = {'teams_text': teams_text}
         form = TeamCreationStep2Form(initial=initial_data)
 
     return render(request, 'tournaments/wizard_step2.html', {'form': form})
@@ -500,15 +650,12 @@ def tournament_create_step3(request):
             end_date=step1_data['end_date'],
         )
 
-        # 2. 建立或取得 Team 物件，並加入到賽事中
-        team_objects = []
-        for team_name in step2_data['teams']:
-            # get_or_create: 如果隊伍已存在，就直接取得；如果不存在，就建立一個新的
-            team, created = Team.objects.get_or_create(name=team_name)
-            team_objects.append(team)
-
-        # 將所有隊伍一次性地加入賽事的 participants 欄位
-        new_tournament.participants.add(*team_objects)
+        # 2. 依名單批次建立（或比對既有的）隊伍與選手，並加入到賽事中
+        if 'roster' in step2_data:
+            roster = Roster.from_session(step2_data['roster'])
+        else:
+            roster = Roster({name: {'school': '', 'players': []} for name in step2_data['teams']})
+        team_objects = import_roster(roster, tournament=new_tournament).teams
 
         # 3. (可選) 如果是分組循環，可以自動建立一個預設分組
         if new_tournament.format == 'round_robin':
@@ -525,6 +672,7 @@ def tournament_create_step3(request):
     context = {
         'step1_data': step1_data,
         'step2_data': step2_data,
+        'roster': step2_data.get('roster', []),
     }
     return render(request, 'tournaments/wizard_step3.html', context)
 
@@ -532,19 +680,32 @@ def player_detail(request, pk):
     # 根據網址傳來的 pk，去資料庫找對應的 Player
     player = get_object_or_404(Player.objects.select_related('team'), pk=pk)
 
-    # 從選手身上，反向查詢所有他打過的比賽數據
-    # .select_related() 用來優化查詢，一次性抓取相關的比賽和賽事資訊
-    stats = player.game_stats.select_related(
-        'game__match', 'game__match__tournament', 'game__match__team1', 'game__match__team2'
-    ).order_by('-game__match__match_time') # 讓最新的比賽顯示在最上面
+    # 生涯總計與各項分組都在資料庫彙總，逐局紀錄分頁，頁面成本不隨生涯長度增加
+    game_log = Paginator(playerstats.game_log(player), playerstats.GAME_LOG_PAGE_SIZE)
 
     context = {
         'player': player,
-        'stats': stats,
+        'totals': playerstats.career_totals(player),
+        'split_sections': [
+            (title, playerstats.splits(player, by))
+            for by, title in (('map', '地圖'), ('tournament', '賽事'), ('opponent', '對手'))
+        ],
+        'page_obj': game_log.get_page(request.GET.get('page')),
+        # 所有賽事排行榜中的名次（有序集合，O(log n)）
+        'ranks': [(label, leaderboards.rank(metric, player.pk)) for metric, label in leaderboards.METRICS.items()],
     }
 
     return render(request, 'tournaments/player_detail.html', context)
 
+def player_timeseries(request, pk):
+    """圖表用的精簡時間序列：GET ?limit=...（最多 TIMESERIES_LIMIT 局）"""
+    player = get_object_or_404(Player, pk=pk)
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), playerstats.TIMESERIES_LIMIT) if limit.isdigit() else playerstats.TIMESERIES_LIMIT
+    response = JsonResponse(playerstats.timeseries(player, limit))
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
 @login_required
 def generate_tournament_schedule(request, pk):
     """自動產生賽事賽程"""
@@ -621,59 +782,52 @@ def auto_random_grouping(request, pk):
     根據參賽隊伍數量自動建議分組數，並隨機分配隊伍到各組
     """
     tournament = get_object_or_404(Tournament, id=pk)
+    teams = list(tournament.participants.all())
+    preview = None
+    draw_seed = None
     
     if request.method == 'POST':
-        # 獲取分組數量
-        num_groups = int(request.POST.get('num_groups', 2))
-        
-        # 清除現有分組
-        tournament.groups.all().delete()
-        
-        # 獲取所有參賽隊伍
-        teams = list(tournament.participants.all())
+        # 手動種子：seed_<隊伍ID> 欄位，留空代表不指定
+        manual_seeds = {}
+        for team in teams:
+            value = request.POST.get(f'seed_{team.pk}', '').strip()
+            if value.isdigit():
+                manual_seeds[team.pk] = int(value)
+            team.manual_seed = manual_seeds.get(team.pk)
         
-        if len(teams) < num_groups:
-            messages.error(request, f'參賽隊伍數量({len(teams)})不能少於分組數量({num_groups})')
-            return redirect('tournament_detail', pk=pk)
-        
-        # 隨機打亂隊伍順序
-        random.shuffle(teams)
-        
-        # 創建分組
-        groups = []
-        for i in range(num_groups):
-            group_name = chr(65 + i) + '組'  # A組, B組, C組...
-            group = Group.objects.create(
-                tournament=tournament,
-                name=group_name
+        # 預覽時產生新的抽籤種子，放在確認表單的隱藏欄位中；確認時以同一個種子抽籤，寫入的分組與預覽相同
+        if 'preview' in request.POST:
+            draw_seed = random.SystemRandom().randrange(2 ** 31)
+        elif request.POST.get('draw_seed', '').isdigit():
+            draw_seed = int(request.POST['draw_seed'])
+
+        try:
+            draw = GroupDraw(
+                tournament,
+                int(request.POST.get('num_groups', 2)),
+                seeding=request.POST.get('seeding', 'random'),
+                method=request.POST.get('method', 'snake'),
+                separate_schools=bool(request.POST.get('separate_schools')),
+                manual_seeds=manual_seeds,
+                seed=draw_seed,
+                teams=teams,
             )
-            groups.append(group)
-        
-        # 平均分配隊伍到各組
-        for i, team in enumerate(teams):
-            group_index = i % num_groups
-            groups[group_index].teams.add(team)
-        
-        # 為每個分組創建 Standing 記錄
-        for group in groups:
-            for team in group.teams.all():
-                Standing.objects.get_or_create(
-                    tournament=tournament,
-                    team=team,
-                    group=group,
-                    defaults={
-                        'wins': 0,
-                        'losses': 0,
-                        'draws': 0,
-                        'points': 0
-                    }
-                )
-        
-        messages.success(request, f'成功創建 {num_groups} 個分組，已隨機分配 {len(teams)} 支隊伍')
-        return redirect('tournament_detail', pk=pk)
+            if 'preview' in request.POST:
+                # 預覽只計算分組，不寫入資料庫
+                preview = [
+                    {'name': group_name(index), 'teams': group_teams}
+                    for index, group_teams in enumerate(draw.draw())
+                ]
+            else:
+                groups = draw.save()
+                messages.success(request, f'成功創建 {len(groups)} 個分組，已分配 {len(teams)} 支隊伍')
+                return redirect('tournament_detail', pk=pk)
+        except ValueError as e:  # DrawError 或分組數量格式錯誤
+            messages.error(request, str(e))
+            if 'preview' not in request.POST:
+                return redirect('tournament_detail', pk=pk)
     
-    # GET 請求 - 顯示分組設定頁面
-    teams = tournament.participants.all()
+    # GET 請求（或預覽）- 顯示分組設定頁面
     num_teams = len(teams)
     
     # 建議分組數量（每組 3-6 支隊伍為佳）
@@ -701,11 +855,54 @@ def auto_random_grouping(request, pk):
         'teams': teams,
         'num_teams': num_teams,
         'suggested_groups': suggested_groups,
-        'existing_groups': tournament.groups.all()
+        'existing_groups': tournament.groups.all(),
+        'preview': preview,
+        'draw_seed': draw_seed if preview is not None else None,
+        'form_data': request.POST if preview is not None else {},
     }
     
     return render(request, 'tournaments/auto_grouping.html', context)
 
+# ===== 比賽日批次輸入比分 =====
+@login_required
+@user_passes_test(is_staff, login_url='/admin/')
+def score_entry(request, pk):
+    """
+    整輪比分輸入：列出某一輪所有比賽，一次送出所有地圖比分與勝者。
+    全部檢查通過才寫入，積分榜與快取只重算一次（見 scoreentry.ScoreSheet）。
+    """
+    tournament = get_object_or_404(Tournament, id=pk)
+    rounds = list(tournament.matches.order_by('round_number').values_list('round_number', flat=True).distinct())
+    try:
+        round_number = int(request.GET['round'])
+    except (KeyError, ValueError):
+        # 預設為第一個還有未完成比賽的輪次
+        pending = tournament.matches.filter(status='scheduled', team1__isnull=False, team2__isnull=False)
+        round_number = pending.order_by('round_number').values_list('round_number', flat=True).first()
+        if round_number is None:
+            round_number = rounds[-1] if rounds else 1
+    try:
+        maps = max(1, min(MAX_MAPS, int(request.GET.get('maps', DEFAULT_MAPS))))
+    except ValueError:
+        maps = DEFAULT_MAPS
+
+    sheet = ScoreSheet(tournament, round_number, maps)
+    if request.method == 'POST':
+        if sheet.bind(request.POST):
+            result = sheet.save()
+            messages.success(request, f"第 {round_number} 輪已儲存：更新 {result['matches']} 場比賽、{result['games']} 張地圖")
+            return redirect(f"{reverse('score_entry', args=[pk])}?round={round_number}&maps={sheet.map_count}")
+        messages.error(request, f'有 {len(sheet.errors)} 場比賽的比分有誤，請修正後再送出（尚未儲存任何資料）')
+
+    context = {
+        'tournament': tournament,
+        'sheet': sheet,
+        'rounds': rounds,
+        'round_number': round_number,
+        'map_choices': range(1, MAX_MAPS + 1),
+    }
+    return render(request, 'tournaments/score_entry.html', context)
+
 # ===== API 端點 =====
 from django.views.decorators.csrf import csrf_exempt
 
@@ -0,0 +1,177 @@
+# tournaments/warmup.py
+"""
+啟動暖機
+
+Render 免費方案閒置後會休眠，喚醒後的第一個請求要等 Django 載入、建立資料庫連線，並承擔所有快取未命中。
+暖機在服務開始接受請求前先把這些成本付掉，並記錄每個階段花費的時間，方便追蹤冷啟動延遲：
+
+- connections：建立（或自連線池取得）持久連線，並以 SELECT 1 完成第一次往返
+- templates：以 cached loader 預先編譯專案內的所有模板
+- tournament_list：以未登入請求渲染首頁（寫入頁面快取與預先壓縮的回應）
+- tournaments：進行中／即將開始的賽事頁面快照（最多 WARMUP_TOURNAMENT_LIMIT 個，預設 5）
+- leaderboards：建立全部賽事與上述賽事的排行榜
+
+gunicorn（gunicorn.conf.py）在 master 的 when_ready 執行全部階段後關閉連線，worker fork 時繼承已編譯的模板、
+本機快取與排行榜；每個 worker 在 post_fork 只建立自己的連線。也可手動執行 manage.py warm_up。
+
+最近一次的結果存在快取中（last_report()），/health/details 會一併回傳。
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import reverse
+
+from . import leaderboards
+from .models import Tournament
+
+logger = logging.getLogger('tournaments.warmup')
+
+ACTIVE_STATUSES = ('ongoing', 'upcoming')
+
+# master 啟動時執行全部階段；worker 只需要自己的資料庫連線
+MASTER_PHASES = ('connections', 'templates', 'tournament_list', 'tournaments', 'leaderboards')
+WORKER_PHASES = ('connections',)
+
+
+def report_key():
+    return f"warmup:v{getattr(settings, 'CACHE_VERSION', 1)}:last"
+
+
+def _tournament_limit():
+    return getattr(settings, 'WARMUP_TOURNAMENT_LIMIT', 5)
+
+
+def _active_tournament_ids(using=DEFAULT_DB_ALIAS):
+    return list(
+        Tournament.objects.using(using).filter(status__in=ACTIVE_STATUSES)
+        .order_by('-start_date').values_list('pk', flat=True)[:_tournament_limit()]
+    )
+
+
+def _request(path):
+    """未登入的 GET 請求；Host 取 ALLOWED_HOSTS 中第一個明確的主機名稱。"""
+    host = next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith('.') and h != '*'), 'localhost')
+    request = RequestFactory().get(path, HTTP_HOST=host)
+    request.user = AnonymousUser()
+    return request
+
+
+# --- 各階段：回傳要記錄的摘要 ---
+
+def warm_connections(using=DEFAULT_DB_ALIAS):
+    """只開啟提供頁面的資料庫；同步／搬移用的別名（dbsync.register_database）由各自的命令連線。"""
+    connection = connections[using]
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    return {'alias': using, 'vendor': connection.vendor}
+
+
+def warm_templates(using=DEFAULT_DB_ALIAS):
+    """編譯專案目錄下（不含 site-packages）的所有 .html 模板；失敗的模板只記錄，不中斷暖機。"""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    compiled, failed = 0, []
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        dirs = {Path(d).resolve() for loader in engine.template_loaders for d in loader.get_dirs()}
+        for directory in sorted(d for d in dirs if d.is_relative_to(base_dir) and d.is_dir()):
+            for path in sorted(directory.rglob('*.html')):
+                name = path.relative_to(directory).as_posix()
+                try:
+                    engine.get_template(name)
+                    compiled += 1
+                except Exception as e:
+                    failed.append(f'{name}: {e}')
+    if failed:
+        logger.warning('warm-up could not compile %d templates: %s', len(failed), '; '.join(failed))
+    return {'compiled': compiled, 'failed': len(failed)}
+
+
+def warm_tournament_list(using=DEFAULT_DB_ALIAS):
+    from . import views
+    return {'status': views.tournament_list(_request(reverse('tournament_list'))).status_code}
+
+
+def warm_tournaments(using=DEFAULT_DB_ALIAS):
+    from . import views
+    ids = _active_tournament_ids(using)
+    for pk in ids:
+        views.tournament_detail(_request(reverse('tournament_detail', args=[pk])), pk)
+    return {'tournaments': ids}
+
+
+def warm_leaderboards(using=DEFAULT_DB_ALIAS):
+    scopes = [None] + _active_tournament_ids(using)
+    for tournament_id in scopes:
+        for metric in leaderboards.METRICS:
+            leaderboards.top(metric, tournament_id)
+    return {'scopes': len(scopes)}
+
+
+PHASES = {
+    'connections': warm_connections,
+    'templates': warm_templates,
+    'tournament_list': warm_tournament_list,
+    'tournaments': warm_tournaments,
+    'leaderboards': warm_leaderboards,
+}
+
+
+def run(phases=MASTER_PHASES, using=DEFAULT_DB_ALIAS, source='manual', measured=None, save=True):
+    """
+    依序執行暖機階段，回傳並保存報告：
+    {'source', 'pid', 'finished_at', 'total_ms', 'ok', 'phases': [{'name', 'ms', 'ok', 'detail'}]}
+
+    measured 為呼叫端已量測的階段（例如 gunicorn hook 中 django.setup() 的時間），{名稱: 毫秒}，列在最前面。
+    save=False 時只寫入日誌，不取代 last_report()（worker 只建立連線，不覆蓋 master 的完整報告）。
+    任何階段失敗只記錄在報告中，不會讓服務無法啟動。
+    """
+    report = {'source': source, 'pid': os.getpid(), 'phases': []}
+    for name, ms in (measured or {}).items():
+        report['phases'].append({'name': name, 'ms': round(ms, 2), 'ok': True, 'detail': None})
+    for name in phases:
+        started = time.perf_counter()
+        try:
+            detail, ok = PHASES[name](using), True
+        except Exception as e:
+            logger.exception('warm-up phase %s failed', name)
+            detail, ok = str(e), False
+        report['phases'].append({
+            'name': name, 'ms': round((time.perf_counter() - started) * 1000, 2), 'ok': ok, 'detail': detail,
+        })
+    report['total_ms'] = round(sum(phase['ms'] for phase in report['phases']), 2)
+    report['ok'] = all(phase['ok'] for phase in report['phases'])
+    report['finished_at'] = time.time()
+    if save:
+        try:
+            cache.set(report_key(), report, None)
+        except Exception:
+            logger.warning('warm-up report could not be cached', exc_info=True)
+    logger.info('%s', format_report(report))
+    return report
+
+
+def format_report(report):
+    phases = ', '.join(
+        f"{phase['name']} {phase['ms']:.1f} ms" + ('' if phase['ok'] else ' (失敗)') for phase in report['phases']
+    )
+    return f"warm-up [{report['source']}] {report['total_ms']:.1f} ms: {phases}"
+
+
+def last_report():
+    try:
+        return cache.get(report_key())
+    except Exception:
+        return None